@@ -0,0 +1,31 @@
+-- Caixa de saída (outbox) dos lembretes: uma linha por mensagem planejada
+-- Execute este script no SQL Editor do Supabase.
+
+create table if not exists public.caixa_saida (
+    id bigserial primary key,
+    chave text not null unique,              -- job|data_ref|modelo|referencia|chat_id
+    job text not null,
+    data_ref text not null default '',       -- dia de referência (YYYY-MM-DD)
+    modelo text not null default '',
+    referencia text not null default '',     -- ex.: ID do evento
+    chat_id bigint not null,
+    texto text not null,
+    parse_mode text not null default '',
+    status text not null default 'pendente', -- pendente | enviando | enviado | bloqueado | falha | expirado
+    tentativas integer not null default 0,   -- reservas feitas (cada reserva conta)
+    ultimo_erro text not null default '',
+    reservado_ate timestamptz,
+    criado_em timestamptz not null default now(),
+    atualizado_em timestamptz not null default now(),
+    enviado_em timestamptz
+);
+
+-- Reserva de lotes pelo worker (pendentes e reservas vencidas, em ordem de id).
+create index if not exists idx_caixa_saida_status_id
+    on public.caixa_saida (status, id);
+
+create index if not exists idx_caixa_saida_job_data_ref
+    on public.caixa_saida (job, data_ref);
+
+create index if not exists idx_caixa_saida_criado_em
+    on public.caixa_saida (criado_em);
@@ -0,0 +1,13 @@
+-- Estado incremental das conquistas: uma linha por membro
+-- Execute este script no SQL Editor do Supabase.
+
+-- `estado` guarda, em JSON compacto, a contribuição de cada evento confirmado
+-- (ágape, loja, cidade, UFs, ritos, potências) e as conquistas já concedidas.
+-- É atualizado a cada confirmação/cancelamento; sem a tabela, o bot mantém o
+-- estado em memória e o reconstrói do histórico. Depois de criar a tabela,
+-- rode o backfill com /conquistas_reconstruir (ou python -m src.conquistas_estado).
+create table if not exists public.conquistas_estado (
+    telegram_id bigint primary key,
+    estado jsonb not null default '{}'::jsonb,
+    atualizado_em timestamptz not null default now()
+);
@@ -0,0 +1,8 @@
+-- Hash visual do card publicado (cache de renders)
+-- Execute este script no SQL Editor do Supabase.
+
+-- Hash dos campos que aparecem no card quando card_file_id_telegram foi gravado.
+-- Se o evento for editado sem mudar nada visível, o bot reaproveita o file_id
+-- em vez de renderizar e subir a imagem de novo.
+alter table if exists public.eventos
+    add column if not exists card_hash_visual text;
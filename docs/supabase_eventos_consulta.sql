@@ -0,0 +1,62 @@
+-- Consulta de eventos por data, paginada no banco (consultar_eventos)
+-- Execute este script no SQL Editor do Supabase.
+
+-- Data tipada ao lado do texto legado dd/mm/YYYY.
+alter table if exists public.eventos
+    add column if not exists data_evento_dt date;
+
+-- Converte dd/mm/YYYY, dd-mm-YYYY ou YYYY-mm-dd (com ou sem hora); inválido => null.
+create or replace function public.eventos_parse_data(txt text)
+returns date
+language plpgsql
+immutable
+as $$
+declare
+    base text := split_part(btrim(coalesce(txt, '')), ' ', 1);
+begin
+    if base ~ '^\d{2}/\d{2}/\d{4}$' then
+        return to_date(base, 'DD/MM/YYYY');
+    elsif base ~ '^\d{2}-\d{2}-\d{4}$' then
+        return to_date(base, 'DD-MM-YYYY');
+    elsif base ~ '^\d{4}-\d{2}-\d{2}$' then
+        return base::date;
+    end if;
+    return null;
+exception when others then
+    return null;
+end;
+$$;
+
+-- Retrocompatibilidade: preenche a coluna nos registros existentes.
+update public.eventos
+set data_evento_dt = public.eventos_parse_data(data_evento)
+where data_evento_dt is null;
+
+-- Mantém a coluna coerente mesmo quando o texto é editado fora do bot.
+create or replace function public.eventos_sync_data_evento_dt()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op = 'INSERT' or new.data_evento is distinct from old.data_evento then
+        new.data_evento_dt := public.eventos_parse_data(new.data_evento);
+    end if;
+    return new;
+end;
+$$;
+
+drop trigger if exists trg_eventos_data_evento_dt on public.eventos;
+create trigger trg_eventos_data_evento_dt
+    before insert or update on public.eventos
+    for each row execute function public.eventos_sync_data_evento_dt();
+
+-- Keyset (data, id) da paginação; eventos por loja.
+create index if not exists idx_eventos_data_dt_id
+    on public.eventos (data_evento_dt, id_evento);
+
+create index if not exists idx_eventos_loja_id
+    on public.eventos (loja_id);
+
+-- Grau, rito e potência são filtrados no índice em memória do bot.
+drop index if exists public.idx_eventos_potencia_lower;
+drop index if exists public.idx_eventos_grau_lower;
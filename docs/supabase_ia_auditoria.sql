@@ -0,0 +1,33 @@
+-- Auditoria do assistente IA em baldes horários (/ia_stats e /ia_relatorio)
+-- Execute este script no SQL Editor do Supabase.
+--
+-- Uma linha por (hora, processo, evento, dimensão, valor). Cada processo do
+-- bot grava o valor absoluto dos seus contadores; as janelas somam as linhas.
+-- Não há texto das perguntas nem identificação de usuários.
+
+create table if not exists public.ia_auditoria_horaria (
+    hora timestamptz not null,               -- início da hora (UTC)
+    instancia text not null,                 -- host-pid-boot do processo que gravou
+    evento text not null,                    -- intent_matched | unmatched | blocked | empty_input | ...
+    dimensao text not null default '',       -- '' (total do evento) | intent_id | reason | topic_hint
+    valor text not null default '',
+    total integer not null default 0,
+    atualizado_em timestamptz not null default now(),
+    primary key (hora, instancia, evento, dimensao, valor)
+);
+
+-- Soma das janelas (24h, 7d, 30d) e limpeza por retenção.
+create index if not exists idx_ia_auditoria_horaria_hora
+    on public.ia_auditoria_horaria (hora);
+
+-- Soma de uma janela no servidor (/ia_stats, /ia_relatorio): uma linha por
+-- (evento, dimensão, valor), sem paginar baldes que o job regrava a cada minuto.
+create or replace function public.ia_auditoria_somar(desde timestamptz)
+returns table (evento text, dimensao text, valor text, total bigint)
+language sql stable
+as $$
+    select evento, dimensao, valor, sum(total)::bigint as total
+    from public.ia_auditoria_horaria
+    where hora >= desde
+    group by evento, dimensao, valor
+$$;
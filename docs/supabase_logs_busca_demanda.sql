@@ -0,0 +1,66 @@
+-- Demanda de buscas sem resultado, agregada por dia (relatório de gaps do /ia_relatorio)
+-- Execute este script no SQL Editor do Supabase.
+--
+-- Uma linha por (dia, uf, cidade, rito) com o total de buscas frustradas,
+-- mantida por trigger a cada insert em logs_busca. O bot grava os logs em
+-- lote (um insert por lote); o trigger é por comando e soma o lote inteiro
+-- num único upsert. O relatório lê só esta tabela, qualquer que seja o
+-- volume de logs_busca.
+
+create table if not exists public.logs_busca_demanda (
+    dia date not null,                       -- dia do log (UTC)
+    uf text not null default '',
+    cidade text not null,
+    rito text not null default '',
+    total integer not null default 0,
+    atualizado_em timestamptz not null default now(),
+    primary key (dia, uf, cidade, rito)
+);
+
+create index if not exists idx_logs_busca_demanda_dia
+    on public.logs_busca_demanda (dia);
+
+-- Retrocompatibilidade: agrega o histórico existente (mesma normalização do trigger).
+insert into public.logs_busca_demanda (dia, uf, cidade, rito, total)
+select
+    (coalesce(created_at, now()) at time zone 'utc')::date,
+    upper(btrim(coalesce(uf, ''))),
+    btrim(cidade),
+    btrim(coalesce(rito, '')),
+    count(*)
+from public.logs_busca
+where encontrou_resultados = false
+  and btrim(coalesce(cidade, '')) <> ''
+group by 1, 2, 3, 4
+on conflict (dia, uf, cidade, rito) do update
+    set total = excluded.total,
+        atualizado_em = now();
+
+create or replace function public.logs_busca_agregar_demanda()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into public.logs_busca_demanda as d (dia, uf, cidade, rito, total)
+    select
+        (coalesce(n.created_at, now()) at time zone 'utc')::date,
+        upper(btrim(coalesce(n.uf, ''))),
+        btrim(n.cidade),
+        btrim(coalesce(n.rito, '')),
+        count(*)
+    from novas n
+    where n.encontrou_resultados = false
+      and btrim(coalesce(n.cidade, '')) <> ''
+    group by 1, 2, 3, 4
+    on conflict (dia, uf, cidade, rito) do update
+        set total = d.total + excluded.total,
+            atualizado_em = now();
+    return null;
+end;
+$$;
+
+drop trigger if exists trg_logs_busca_demanda on public.logs_busca;
+create trigger trg_logs_busca_demanda
+    after insert on public.logs_busca
+    referencing new table as novas
+    for each statement execute function public.logs_busca_agregar_demanda();
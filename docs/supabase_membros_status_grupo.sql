@@ -0,0 +1,12 @@
+-- Status observado do membro no grupo principal (updates chat_member + faxina)
+-- Execute este script no SQL Editor do Supabase.
+
+alter table if exists public.membros
+    add column if not exists status_grupo text;          -- member, administrator, creator, restricted, left, kicked
+
+alter table if exists public.membros
+    add column if not exists status_observado_em timestamptz;
+
+-- A faxina semanal só consulta o Telegram para quem não foi observado na janela.
+create index if not exists idx_membros_status_observado_em
+    on public.membros (status_observado_em);
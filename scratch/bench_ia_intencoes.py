@@ -0,0 +1,170 @@
+# scratch/bench_ia_intencoes.py
+"""
+Micro-benchmark do fallback do assistente: base lida e classificada a cada
+mensagem (carregar_intencoes_base + varredura de gatilhos, como antes) x
+base compilada (src/ia_intencoes: Aho–Corasick por nível, recarga por mtime).
+
+- confere que as duas abordagens escolhem a mesma intenção para todo o
+  corpus, em todos os níveis, na base real e numa base sintética grande;
+- confere a recarga: editar o arquivo muda a resposta sem reiniciar.
+
+    python scratch/bench_ia_intencoes.py --repeticoes 200 --sinteticas 400
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.ia_intencoes import (
+    BASE_IA_PATH,
+    IntentItem,
+    _norm_text,
+    carregar_intencoes_base,
+    obter_base_intencoes,
+)
+
+CORPUS = [
+    "quais sessoes tem essa semana?",
+    "Quero ver sessões perto de mim",
+    "como faço pra ver as próximas sessões da minha loja",
+    "onde confirmei presença mês passado",
+    "minhas confirmações",
+    "quero ver o histórico de visitas",
+    "meu perfil está errado, como editar perfil?",
+    "Preciso atualizar meu cadastro",
+    "como ativar lembrete de sessão",
+    "quero desativar lembrete",
+    "não entendi como funciona o bot",
+    "ajuda por favor",
+    "o que é ágape?",
+    "o que é VM no glossário",
+    "como cadastrar uma sessão nova",
+    "quero cadastrar evento para sexta",
+    "como cadastrar minha loja",
+    "como publicar card da sessão no grupo",
+    "editar sessão que já publiquei",
+    "cancelar sessão de amanhã",
+    "quem confirmou na minha sessão",
+    "lista de confirmados da sessão de terça",
+    "como promover um irmão a secretário",
+    "ver membros da loja",
+    "relatório de presença do mês",
+    "como funciona o vigor da oficina",
+    "minhas medalhas e conquistas",
+    "trocar potência do meu cadastro",
+    "boa noite irmãos",
+    "qual o endereço da loja amanhã?",
+    "tem sessão de aprendiz em campinas?",
+    "sessões magnas em porto alegre no sábado",
+    "dúvida sobre traje obrigatório",
+    "o bot não mandou lembrete ontem",
+    "como faço para confirmar presença com ágape pago",
+] * 3
+
+
+def _classificar_antigo(texto: str, nivel: str, intencoes: List[IntentItem]) -> Optional[IntentItem]:
+    """_classificar_intencao anterior (ia_assistente), referência."""
+    t = _norm_text(texto)
+    melhor: Optional[IntentItem] = None
+    melhor_score = 0
+
+    for item in intencoes:
+        if nivel not in item.nivel_permitido:
+            continue
+        score = 0
+        for gatilho in item.gatilhos:
+            g = _norm_text(gatilho)
+            if g and g in t:
+                score += max(1, len(g.split()))
+        if score > melhor_score:
+            melhor = item
+            melhor_score = score
+
+    return melhor
+
+
+def _base_sintetica(destino: Path, n: int, rnd: random.Random) -> None:
+    palavras = sorted({w for frase in CORPUS for w in _norm_text(frase).split() if len(w) > 2})
+    linhas = ["version: \"sintetica\"", "intencoes:"]
+    for i in range(n):
+        gatilhos = [" ".join(rnd.sample(palavras, rnd.randint(1, 3))) for _ in range(rnd.randint(2, 6))]
+        niveis = sorted(rnd.sample(["1", "2", "3"], rnd.randint(1, 3)))
+        linhas += [
+            f"  - intent_id: sint_{i}",
+            f"    nivel_permitido: {niveis!r}",
+            f"    gatilhos: {gatilhos!r}",
+            f"    resposta_oficial: \"resposta {i}\"",
+            "    acao_recomendada:",
+            "      tipo: callback",
+            f"      valor: \"cb_{i}\"",
+            "    origem: [\"x\"]",
+        ]
+    destino.write_text("\n".join(linhas) + "\n", encoding="utf-8")
+
+
+def _medir(caminho: Path, repeticoes: int) -> None:
+    niveis = ["1", "2", "3"]
+    antigo = lambda texto, nivel: _classificar_antigo(texto, nivel, carregar_intencoes_base(caminho))
+    novo = lambda texto, nivel: obter_base_intencoes(caminho).classificar(texto, nivel)
+
+    divergentes = [
+        (texto, nivel)
+        for texto in CORPUS for nivel in niveis
+        if (getattr(antigo(texto, nivel), "intent_id", None) != getattr(novo(texto, nivel), "intent_id", None))
+    ]
+    if divergentes:
+        raise SystemExit(f"{len(divergentes)} divergências em {caminho.name}, ex.: {divergentes[0]}")
+
+    intencoes = carregar_intencoes_base(caminho)
+    casadas = sum(1 for texto in CORPUS if novo(texto, "3"))
+    resultados = {}
+    for nome, funcao in (("antigo (lê + varre)", antigo), ("compilado", novo)):
+        t = time.perf_counter()
+        for _ in range(repeticoes):
+            for texto in CORPUS:
+                funcao(texto, "2")
+        resultados[nome] = (time.perf_counter() - t) / (repeticoes * len(CORPUS)) * 1e6
+    print(f"{caminho.name}: {len(intencoes)} intenções, {len(CORPUS)} perguntas ({casadas} casadas no nível 3)")
+    for nome, us in resultados.items():
+        print(f"  {nome:20s} {us:9.1f} µs/mensagem")
+    print(f"  ganho: {resultados['antigo (lê + varre)'] / resultados['compilado']:.0f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticoes", type=int, default=200)
+    parser.add_argument("--sinteticas", type=int, default=400)
+    args = parser.parse_args()
+
+    _medir(BASE_IA_PATH, args.repeticoes)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sintetica = Path(tmp) / "sintetica.yaml"
+        _base_sintetica(sintetica, args.sinteticas, random.Random(3))
+        _medir(sintetica, max(1, args.repeticoes // 10))
+
+        # Recarga por mtime: gatilho novo passa a valer sem reiniciar.
+        copia = Path(tmp) / "base.yaml"
+        shutil.copy(BASE_IA_PATH, copia)
+        base = obter_base_intencoes(copia)
+        assert obter_base_intencoes(copia) is base
+        assert base.classificar("xyzzy plugh", "1") is None
+        texto = copia.read_text(encoding="utf-8").replace(
+            'gatilhos: ["ver sessoes"', 'gatilhos: ["xyzzy plugh", "ver sessoes"', 1
+        )
+        copia.write_text(texto, encoding="utf-8")
+        os.utime(copia, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+        recarregada = obter_base_intencoes(copia)
+        assert recarregada is not base and recarregada.classificar("xyzzy plugh", "1").intent_id == "ver_sessoes"
+    print("OK: mesmas intenções nas duas abordagens; recarga por mtime funciona.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+# scratch/bench_indice_eventos.py
+"""
+Micro-benchmark: filtros por varredura de lista x EventIndex.
+
+A varredura é a dos menus antes do índice (filtros que ficavam em
+src/eventos.py), reproduzida aqui só como referência de medida.
+
+Gera N eventos sintéticos (datas, graus, ritos e potências variados, lojas em
+várias UFs/cidades) e mede, por consulta de menu, o tempo médio de cada
+abordagem. O custo de montagem do índice é medido à parte: ele é pago uma
+vez por atualização do cache, não a cada clique.
+
+    python scratch/bench_indice_eventos.py --tamanhos 10000 100000 --repeticoes 20
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+os.environ.setdefault("SUPABASE_KEY", "chave-local")
+
+from src import eventos as ev
+from src.indice_eventos import EventIndex
+
+_GRAUS = ["Aprendiz", "apr", "Companheiro", "comp", "Mestre", "m", "MI"]
+_RITOS = ["REAA", "Rito Escocês Antigo e Aceito", "York", "Moderno", "Francês", "Brasileiro", "Schröder"]
+_POTENCIAS = ["GOB", "GLESP", "GLMERGS", "GORGS", "COMAB", "CMSB", "GOSC"]
+_UFS = {"SP": ["São Paulo", "Campinas", "Santos"], "RS": ["Porto Alegre", "Pelotas"], "RJ": ["Niterói", "Rio de Janeiro"], "MG": ["Belo Horizonte"]}
+
+
+def _gerar(qtd: int, rnd: random.Random):
+    lojas = {}
+    k = 0
+    for uf, cidades in _UFS.items():
+        for cidade in cidades:
+            for _ in range(25):
+                lojas[str(k)] = {"ID": str(k), "Nome da Loja": f"Loja {k}", "Número": str(k), "Estado UF": uf, "Cidade": cidade}
+                k += 1
+    hoje = date.today()
+    eventos = []
+    for i in range(qtd):
+        d = hoje + timedelta(days=rnd.randint(-30, 400))
+        loja_id = str(rnd.randrange(k))
+        eventos.append({
+            "ID Evento": f"ev{i:06d}",
+            "Data do evento": d.strftime("%d/%m/%Y"),
+            "Hora": f"{rnd.randint(18, 21)}:{rnd.choice(['00', '30'])}",
+            "Grau": rnd.choice(_GRAUS),
+            "Rito": rnd.choice(_RITOS),
+            "Potência": rnd.choice(_POTENCIAS),
+            "ID da loja": loja_id,
+            "Nome da loja": lojas[loja_id]["Nome da Loja"],
+        })
+    return eventos, lojas
+
+
+# ---------- varredura de lista (menus antes do EventIndex) ----------
+
+def _filtrar_por_periodo(eventos, token):
+    intervalo = ev._intervalo_periodo(token)
+    if not intervalo:
+        return []
+    _, ini, fim = intervalo
+    filtrados = []
+    for e in eventos:
+        data_dt = ev.parse_data_evento(e.get("Data do evento", ""))
+        if data_dt and ini <= data_dt.date() <= fim:
+            filtrados.append(e)
+    return ev._eventos_ordenados(filtrados)
+
+
+def _filtrar_por_grau(eventos, grau_nome):
+    alvo = ev.normalizar_grau_nome(grau_nome)
+    return ev._eventos_ordenados(
+        [e for e in eventos if ev.normalizar_grau_nome(str(e.get("Grau") or "").strip()) == alvo]
+    )
+
+
+def _filtrar_por_rito(eventos, rito_nome):
+    alvo = ev._normalizar_rito(rito_nome).lower()
+    return ev._eventos_ordenados(
+        [e for e in eventos if ev._normalizar_rito(e.get("Rito") or e.get("rito")).lower() == alvo]
+    )
+
+
+def _filtrar_por_potencia(eventos, potencia_nome):
+    alvo = potencia_nome.lower()
+    return ev._eventos_ordenados(
+        [e for e in eventos if str(e.get("Potência") or e.get("potencia") or "").strip().lower() == alvo]
+    )
+
+
+def _filtrar_por_cidade(eventos, lojas, uf, cidade):
+    filtrados = []
+    for e in eventos:
+        ev_uf, ev_cid = ev._resolver_dados_geo_loja(e, lojas)
+        if ev_uf.upper() == uf.upper() and ev_cid.lower() == cidade.lower():
+            filtrados.append(e)
+    return ev._eventos_ordenados(filtrados)
+
+
+def _ufs_ativas(eventos, lojas):
+    return sorted({uf for uf, _ in (ev._resolver_dados_geo_loja(e, lojas) for e in eventos) if uf})
+
+
+def _cidades_ativas(eventos, lojas, uf_alvo):
+    cidades = {cid for uf, cid in (ev._resolver_dados_geo_loja(e, lojas) for e in eventos) if uf == uf_alvo and cid}
+    return sorted(cidades, key=str.lower)
+
+
+def _potencias_ativas(eventos):
+    pots = {str(e.get("Potência") or e.get("potencia") or "").strip() for e in eventos}
+    return sorted((p for p in pots if p), key=str.lower)
+
+
+def _ritos_disponiveis(eventos):
+    ritos = []
+    for e in eventos:
+        rito = ev._normalizar_rito(e.get("Rito") or e.get("rito"))
+        if rito and rito not in ritos:
+            ritos.append(rito)
+    return sorted(ritos, key=str.lower)
+
+
+def _medir(func, repeticoes: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        func()
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    hoje = date.today()
+    for qtd in args.tamanhos:
+        eventos, lojas = _gerar(qtd, rnd)
+        ev.parse_data_evento.cache_clear()
+
+        inicio = time.perf_counter()
+        indice = EventIndex(eventos, lojas, hoje)
+        montagem = (time.perf_counter() - inicio) * 1000
+
+        _, ini, fim = ev._intervalo_periodo(ev.TOKEN_MES_ATUAL)
+        consultas = [
+            ("período (mês atual)",
+             lambda: _filtrar_por_periodo(eventos, ev.TOKEN_MES_ATUAL),
+             lambda: indice.intervalo(ini, fim)),
+            ("grau (Mestre)",
+             lambda: _filtrar_por_grau(eventos, "Mestre"),
+             lambda: indice.por_grau("Mestre", desde=hoje)),
+            ("rito (REAA)",
+             lambda: _filtrar_por_rito(eventos, "REAA"),
+             lambda: indice.por_rito("REAA", desde=hoje)),
+            ("potência (GOB)",
+             lambda: _filtrar_por_potencia(eventos, "GOB"),
+             lambda: indice.por_potencia("GOB", desde=hoje)),
+            ("cidade (SP/Campinas)",
+             lambda: _filtrar_por_cidade(eventos, lojas, "SP", "Campinas"),
+             lambda: indice.por_cidade("SP", "Campinas", desde=hoje)),
+            ("lista de UFs",
+             lambda: _ufs_ativas(eventos, lojas),
+             lambda: indice.ufs),
+            ("cidades da UF (SP)",
+             lambda: _cidades_ativas(eventos, lojas, "SP"),
+             lambda: indice.cidades("SP")),
+            ("lista de potências",
+             lambda: _potencias_ativas(eventos),
+             lambda: indice.potencias),
+            ("lista de ritos",
+             lambda: _ritos_disponiveis(eventos),
+             lambda: indice.ritos),
+        ]
+
+        print(f"\n=== {qtd:,} eventos | montagem do índice: {montagem:.1f} ms ===")
+        print(f"{'consulta':24s} {'varredura (ms)':>15s} {'índice (ms)':>12s} {'ganho':>8s}")
+        for nome, varredura, por_indice in consultas:
+            t_lista = _medir(varredura, args.repeticoes)
+            t_indice = _medir(por_indice, args.repeticoes)
+            ganho = t_lista / t_indice if t_indice else float("inf")
+            print(f"{nome:24s} {t_lista:15.3f} {t_indice:12.4f} {ganho:7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# scratch/bench_singleflight.py
+"""
+Benchmark do single-flight do cache: simula uma rajada de N cliques em
+"confirmar" logo após o TTL de eventos expirar e conta quantas consultas
+chegam ao backend, com e sem coalescência.
+
+Dois cenários:
+- async: repositorio_async contra o PostgREST local (scratch/postgrest_local.py);
+- sync: sheets_supabase chamado de várias threads, com um cliente Supabase
+  falso que só conta as chamadas e dorme a latência configurada.
+
+    python scratch/bench_singleflight.py --cliques 200 --membros 60 --latencia-ms 40
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+os.environ.setdefault("SUPABASE_KEY", "chave-local")
+
+import httpx
+
+from scratch.postgrest_local import criar_app
+from src import cache as cache_mod
+from src import repositorio_async as repo
+from src import sheets_supabase as base
+
+
+# ---------- modo sem coalescência (linha de base) ----------
+
+def _sem_coalescencia_sync(self, chave, carregar, tags=()):
+    valor = self.obter(chave)
+    if valor is not cache_mod.AUSENTE:
+        return valor
+    valor = carregar()
+    self.definir(chave, valor, tags)
+    return valor
+
+
+async def _sem_coalescencia_async(self, chave, carregar, tags=()):
+    valor = self.obter(chave)
+    if valor is not cache_mod.AUSENTE:
+        return valor
+    valor = await carregar()
+    self.definir(chave, valor, tags)
+    return valor
+
+
+@contextmanager
+def _modo(coalescer: bool):
+    cls = cache_mod.CacheNamespace
+    originais = (cls.obter_ou_carregar, cls.obter_ou_carregar_async)
+    if not coalescer:
+        cls.obter_ou_carregar = _sem_coalescencia_sync
+        cls.obter_ou_carregar_async = _sem_coalescencia_async
+    try:
+        yield
+    finally:
+        cls.obter_ou_carregar, cls.obter_ou_carregar_async = originais
+
+
+def _zerar_caches():
+    cache_mod.limpar_todos()
+    for st in cache_mod.estatisticas_cache():
+        cache_mod.obter_namespace(st["namespace"]).zerar_estatisticas()
+
+
+# ---------- cenário async ----------
+
+def _dados(qtd_membros: int, qtd_eventos: int):
+    return {
+        "membros": [{"telegram_id": str(1000 + i), "nome": f"Irmão {i}", "nivel": "1"} for i in range(qtd_membros)],
+        "eventos": [{"id_evento": f"ev{i}", "data_evento": "20/11/2026", "status": "Ativo"} for i in range(qtd_eventos)],
+    }
+
+
+async def _rajada_async(cliques: int, membros: int, latencia_ms: float) -> int:
+    app = criar_app(_dados(membros, 80), latencia_ms=latencia_ms)
+    repo.configurar_repositorio(
+        base_url="http://postgrest.local",
+        chave="chave-local",
+        transport=httpx.ASGITransport(app=app),
+        max_concorrencia=50,
+    )
+
+    async def clique(i: int):
+        await repo.buscar_membro(1000 + (i % membros))
+        await repo.listar_eventos()
+
+    await asyncio.gather(*(clique(i) for i in range(cliques)))
+    await repo.fechar_repositorio()
+    return app.state.requisicoes
+
+
+# ---------- cenário sync (threads) ----------
+
+class _ClienteFalso:
+    """Imita a cadeia table().select().eq()...execute() do cliente Supabase."""
+
+    def __init__(self, latencia_s: float, membros: int):
+        self.latencia_s = latencia_s
+        self.membros = membros
+        self.chamadas = 0
+        self._lock = threading.Lock()
+
+    def table(self, nome: str):
+        return _ConsultaFalsa(self, nome)
+
+
+class _ConsultaFalsa:
+    def __init__(self, cliente: _ClienteFalso, tabela: str):
+        self.cliente = cliente
+        self.tabela = tabela
+        self.filtros = {}
+
+    def select(self, *_a, **_k):
+        return self
+
+    def or_(self, *_a, **_k):
+        return self
+
+    def limit(self, *_a, **_k):
+        return self
+
+    def eq(self, coluna, valor):
+        self.filtros[coluna] = valor
+        return self
+
+    def execute(self):
+        with self.cliente._lock:
+            self.cliente.chamadas += 1
+        time.sleep(self.cliente.latencia_s)
+        if self.tabela == "membros":
+            data = [{"telegram_id": self.filtros.get("telegram_id"), "nivel": "1"}]
+        else:
+            data = [{"id_evento": f"ev{i}", "status": "Ativo"} for i in range(80)]
+        return type("Resp", (), {"data": data})()
+
+
+def _rajada_sync(cliques: int, membros: int, latencia_ms: float) -> int:
+    original = base.supabase
+    falso = _ClienteFalso(latencia_ms / 1000, membros)
+    base.supabase = falso
+    barreira = threading.Barrier(min(cliques, 64))
+
+    def clique(i: int):
+        try:
+            barreira.wait(timeout=2)
+        except threading.BrokenBarrierError:
+            pass
+        base.buscar_membro(1000 + (i % membros))
+        base.listar_eventos()
+
+    try:
+        with ThreadPoolExecutor(max_workers=64) as pool:
+            list(pool.map(clique, range(cliques)))
+    finally:
+        base.supabase = original
+    return falso.chamadas
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cliques", type=int, default=200)
+    parser.add_argument("--membros", type=int, default=60)
+    parser.add_argument("--latencia-ms", type=float, default=40.0)
+    args = parser.parse_args()
+
+    print(f"Rajada: {args.cliques} cliques | {args.membros} membros distintos | latência {args.latencia_ms} ms")
+    print(f"Mínimo teórico de consultas: {args.membros + 1} ({args.membros} membros + 1 listagem de eventos)\n")
+
+    for nome, executar in (
+        ("async (repositorio_async)", lambda: asyncio.run(_rajada_async(args.cliques, args.membros, args.latencia_ms))),
+        ("sync  (sheets_supabase + threads)", lambda: _rajada_sync(args.cliques, args.membros, args.latencia_ms)),
+    ):
+        for coalescer in (False, True):
+            _zerar_caches()
+            with _modo(coalescer):
+                inicio = time.perf_counter()
+                chamadas = executar()
+                duracao = time.perf_counter() - inicio
+            coalescidos = sum(st["coalescidos"] for st in cache_mod.estatisticas_cache())
+            rotulo = "com single-flight" if coalescer else "sem single-flight"
+            print(f"{nome:36s} {rotulo:18s} consultas={chamadas:4d}  coalescidos={coalescidos:4d}  tempo={duracao:.2f}s")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# scratch/carga_repositorio_async.py
+"""
+Teste de carga offline do repositório assíncrono contra o PostgREST local.
+
+Dispara N "cliques" concorrentes (buscar_membro + listar_eventos + registrar_confirmacao)
+e mede vazão, latência p50/p95 e o número de requisições que chegaram ao backend.
+
+    python scratch/carga_repositorio_async.py --cliques 500 --latencia-ms 40 --concorrencia 10
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("SUPABASE_URL", "http://postgrest.local")
+os.environ.setdefault("SUPABASE_KEY", "chave-local")
+
+import httpx
+
+from scratch.postgrest_local import criar_app
+from src import repositorio_async as repo
+from src import sheets_supabase as _base
+
+# Os ganchos pós-escrita (estado de conquistas, Sala de Troféus) usam o
+# cliente síncrono, que aqui não tem backend: só contamos as chamadas.
+_ganchos = {"conquistas": 0, "galeria": 0}
+
+
+def _contar_gancho(nome: str):
+    def _gancho(*_args):
+        _ganchos[nome] += 1
+    return _gancho
+
+
+_base._atualizar_estado_conquistas = _contar_gancho("conquistas")
+_base._invalidar_galeria = _contar_gancho("galeria")
+
+
+def _dados_iniciais(qtd_membros: int, qtd_eventos: int):
+    membros = [
+        {"telegram_id": str(1000 + i), "nome": f"Irmão {i}", "grau": "Mestre", "nivel": "1", "status": "Ativo"}
+        for i in range(qtd_membros)
+    ]
+    eventos = [
+        {"id_evento": f"ev{i}", "data_evento": f"{(i % 28) + 1:02d}/11/2026", "nome_loja": f"Loja {i % 40}", "status": "Ativo"}
+        for i in range(qtd_eventos)
+    ]
+    return {"membros": membros, "eventos": eventos, "confirmacoes": []}
+
+
+async def _clique(i: int, qtd_membros: int, qtd_eventos: int, latencias: list):
+    inicio = time.perf_counter()
+    tid = 1000 + (i % qtd_membros)
+    membro = await repo.buscar_membro(tid)
+    await repo.listar_eventos()
+    await repo.registrar_confirmacao({
+        "ID Evento": f"ev{i % qtd_eventos}",
+        "Telegram ID": tid,
+        "Nome": (membro or {}).get("Nome", ""),
+    })
+    latencias.append((time.perf_counter() - inicio) * 1000)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cliques", type=int, default=500)
+    parser.add_argument("--membros", type=int, default=300)
+    parser.add_argument("--eventos", type=int, default=200)
+    parser.add_argument("--latencia-ms", type=float, default=40.0)
+    parser.add_argument("--concorrencia", type=int, default=10)
+    args = parser.parse_args()
+
+    app = criar_app(_dados_iniciais(args.membros, args.eventos), latencia_ms=args.latencia_ms)
+    repo.configurar_repositorio(
+        base_url="http://postgrest.local",
+        chave="chave-local",
+        transport=httpx.ASGITransport(app=app),
+        max_concorrencia=args.concorrencia,
+    )
+
+    latencias: list = []
+    inicio = time.perf_counter()
+    await asyncio.gather(*(_clique(i, args.membros, args.eventos, latencias) for i in range(args.cliques)))
+    total = time.perf_counter() - inicio
+    await repo.fechar_repositorio()
+
+    latencias.sort()
+    p95 = latencias[int(len(latencias) * 0.95) - 1] if latencias else 0.0
+    print(f"Cliques: {args.cliques} | concorrência do pool: {args.concorrencia} | latência simulada: {args.latencia_ms} ms")
+    print(f"Tempo total: {total:.2f}s | vazão: {args.cliques / total:.1f} cliques/s")
+    print(f"Latência por clique: p50={statistics.median(latencias):.1f} ms  p95={p95:.1f} ms")
+    print(f"Requisições no backend: {app.state.requisicoes}")
+    print(f"Confirmações gravadas: {len(app.state.tabelas['confirmacoes'])}")
+    print(f"Ganchos pós-escrita: conquistas={_ganchos['conquistas']} galeria={_ganchos['galeria']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
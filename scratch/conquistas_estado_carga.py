@@ -0,0 +1,213 @@
+# scratch/conquistas_estado_carga.py
+"""
+Confere o estado incremental das conquistas (src/conquistas_estado) contra a
+varredura completa antiga de verificar_novas_conquistas:
+
+- gera lojas, eventos e membros no PostgREST local;
+- aplica uma sequência aleatória de confirmações e cancelamentos pelas
+  funções de src.sheets_supabase (que atualizam o estado);
+- compara, membro a membro, ágapes e conjuntos de lojas/cidades/UFs/ritos/
+  potências (a base de todas as regras de presença) com a varredura antiga
+  (mesmas consultas select("*") de antes) e com o backfill
+  (reconstruir_estados);
+- mede consultas e tempo de uma checagem pelos dois caminhos.
+
+    python scratch/conquistas_estado_carga.py --membros 40 --eventos 120 --latencia-ms 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import socket
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+_PORTA = _porta_livre()
+os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{_PORTA}"
+os.environ["SUPABASE_KEY"] = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.x"
+
+import uvicorn
+
+from scratch.postgrest_local import criar_app
+from src import conquistas_estado as ce
+from src.sheets_supabase import (
+    _row_to_sheets,
+    buscar_confirmacoes_membro,
+    cancelar_confirmacao,
+    cancelar_todas_confirmacoes,
+    contar_consultas,
+    registrar_confirmacao,
+    supabase,
+)
+
+UFS = ["SP", "RJ", "MG", "RS", "PR", "BA"]
+CIDADES = ["Campinas", "Santos", "Niterói", "Belo Horizonte", "Porto Alegre", "Curitiba",
+           "Salvador", "Sorocaba", "Londrina", "Pelotas", "Ilhéus", "Juiz De Fora"]
+RITOS = ["REAA", "York", "Schröder", "Adonhiramita", "Moderno"]
+POTENCIAS = ["GOB", "CMSB", "COMAB", "GLESP", "GOP"]
+
+
+def _dados(n_lojas: int, n_eventos: int, n_membros: int):
+    rnd = random.Random(7)
+    lojas = [
+        {"id": str(i), "nome_loja": f"Loja {i}", "numero": str(i), "estado_uf": rnd.choice(UFS + [""]),
+         "rito": rnd.choice(RITOS), "potencia": rnd.choice(POTENCIAS), "endereco": "Rua X", "cep": "1",
+         "cidade": "C"}
+        for i in range(1, n_lojas + 1)
+    ]
+    eventos = []
+    for i in range(1, n_eventos + 1):
+        loja = rnd.choice(lojas)
+        sep = rnd.choice([" - ", "/", " "])
+        eventos.append({
+            "id_evento": f"EV{i}", "loja_id": loja["id"] if rnd.random() > 0.1 else "",
+            "nome_loja": loja["nome_loja"], "oriente": f"{rnd.choice(CIDADES)}{sep}{rnd.choice(UFS)}",
+            "rito": rnd.choice(RITOS + [""]), "potencia": rnd.choice(POTENCIAS + [""]), "status": "Ativo",
+        })
+    membros = [
+        {"telegram_id": str(1000 + i), "loja_id": rnd.choice(lojas)["id"], "nivel": "1",
+         "data_cadastro": "01/01/2025", "status": "Ativo"}
+        for i in range(n_membros)
+    ]
+    return {"lojas": lojas, "eventos": eventos, "membros": membros, "confirmacoes": [], "membro_conquistas": []}
+
+
+def _varredura_antiga(uid: int):
+    """Consultas e conjuntos de verificar_novas_conquistas antes do estado incremental."""
+    confirmacoes = asyncio.run(buscar_confirmacoes_membro(uid))
+    ids_eventos = list({c.get("ID Evento") for c in confirmacoes if c.get("ID Evento")})
+    eventos = []
+    if ids_eventos:
+        resp = supabase.table("eventos").select("*").in_("id_evento", ids_eventos).execute()
+        eventos = [_row_to_sheets("eventos", r) for r in resp.data or []]
+    ids_lojas = list({str(ev.get("ID da loja")) for ev in eventos if ev.get("ID da loja")})
+    lojas = []
+    if ids_lojas:
+        resp = supabase.table("lojas").select("*").in_("id", ids_lojas).execute()
+        lojas = [_row_to_sheets("lojas", r) for r in resp.data or []]
+
+    # O critério antigo de ágape ("sim" no texto) nunca casava com "Confirmada (...)";
+    # a referência usa o critério corrigido para comparar só a agregação.
+    agapes = sum(1 for c in confirmacoes if ce.eh_agape(c.get("Ágape")))
+    lojas_set = set()
+    cidades = set()
+    for ev in eventos:
+        lid = str(ev.get("ID da loja") or "").strip()
+        lojas_set.add(lid or str(ev.get("Nome da loja") or "").strip().lower())
+        cid = str(ev.get("Oriente") or "").strip().split("-")[0].split("/")[0].strip().title()
+        if cid and cid not in ("Nao Informado", "Não Informado"):
+            cidades.add(cid)
+    ufs, ritos, pots, ufs_loja = set(), set(), set(), set()
+    for lj in lojas:
+        uf = str(lj.get("Estado UF") or "").strip().upper()
+        if uf:
+            ufs.add(uf)
+            ufs_loja.add(uf)
+        if lj.get("Rito"):
+            ritos.add(str(lj["Rito"]).strip().upper())
+        if lj.get("Potência"):
+            pots.add(str(lj["Potência"]).strip().upper())
+    for ev in eventos:
+        m = re.search(r"[-\/]\s*([A-Z]{2})$", str(ev.get("Oriente") or "").strip().upper())
+        if m:
+            ufs.add(m.group(1))
+        if ev.get("Rito"):
+            ritos.add(str(ev["Rito"]).strip().upper())
+        if ev.get("Potência"):
+            pots.add(str(ev["Potência"]).strip().upper())
+    return {"agapes": agapes, "lojas": lojas_set, "cidades": cidades, "ufs": ufs,
+            "ritos": ritos, "potencias": pots, "ufs_loja": ufs_loja}
+
+
+def _conjuntos(estado):
+    return {"agapes": estado.agapes, "lojas": set(estado.lojas), "cidades": set(estado.cidades),
+            "ufs": set(estado.ufs), "ritos": set(estado.ritos), "potencias": set(estado.potencias),
+            "ufs_loja": set(estado.ufs_loja)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--membros", type=int, default=40)
+    parser.add_argument("--eventos", type=int, default=120)
+    parser.add_argument("--lojas", type=int, default=25)
+    parser.add_argument("--operacoes", type=int, default=1500)
+    parser.add_argument("--latencia-ms", type=float, default=10)
+    args = parser.parse_args()
+
+    dados = _dados(args.lojas, args.eventos, args.membros)
+    app = criar_app(dados, latencia_ms=args.latencia_ms)
+    servidor = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=_PORTA, log_level="warning"))
+    threading.Thread(target=servidor.run, daemon=True).start()
+    while not servidor.started:
+        time.sleep(0.05)
+
+    rnd = random.Random(11)
+    membros = [int(m["telegram_id"]) for m in dados["membros"]]
+    confirmados = set()
+    consultas_registro = []
+    for _ in range(args.operacoes):
+        uid = rnd.choice(membros)
+        ev = rnd.choice(dados["eventos"])["id_evento"]
+        acao = rnd.random()
+        with contar_consultas() as consultas:
+            if (uid, ev) in confirmados and acao < 0.3:
+                assert cancelar_confirmacao(ev, uid)
+                confirmados.discard((uid, ev))
+            elif acao < 0.005:
+                assert cancelar_todas_confirmacoes(ev)
+                confirmados = {c for c in confirmados if c[1] != ev}
+            elif (uid, ev) not in confirmados:
+                agape = rnd.choice(["Confirmada (Gratuito)", "Não (Não aplicável)", "Sim"])
+                assert registrar_confirmacao({"id_evento": ev, "telegram_id": str(uid), "agape": agape})
+                confirmados.add((uid, ev))
+                consultas_registro.append(sum(consultas.values()))
+
+    divergentes = []
+    t_antigo = t_novo = 0.0
+    q_antigo = q_novo = 0
+    for uid in membros:
+        with contar_consultas() as consultas:
+            t = time.perf_counter()
+            antigo = _varredura_antiga(uid)
+            t_antigo += time.perf_counter() - t
+        q_antigo += sum(consultas.values())
+        with contar_consultas() as consultas:
+            t = time.perf_counter()
+            estado = ce.obter_estado(uid)
+            devidas = ce.conquistas_devidas(estado)
+            t_novo += time.perf_counter() - t
+        q_novo += sum(consultas.values())
+        if _conjuntos(estado) != antigo:
+            divergentes.append((uid, antigo, _conjuntos(estado)))
+
+    incrementais = {uid: _conjuntos(ce.obter_estado(uid)) for uid in membros}
+    total = ce.reconstruir_estados()
+    backfill = {uid: _conjuntos(ce.obter_estado(uid)) for uid in membros}
+    servidor.should_exit = True
+
+    media_reg = sum(consultas_registro) / max(1, len(consultas_registro))
+    print(f"confirmações ativas: {len(confirmados)}; consultas por registrar_confirmacao: {media_reg:.1f}")
+    print(f"checagem antiga : {q_antigo / len(membros):.1f} consultas/membro, {t_antigo / len(membros) * 1000:.1f} ms/membro")
+    print(f"checagem estado : {q_novo / len(membros):.1f} consultas/membro, {t_novo / len(membros) * 1000:.3f} ms/membro")
+    print(f"backfill: {total} estados")
+    if divergentes:
+        uid, a, n = divergentes[0]
+        raise SystemExit(f"{len(divergentes)} membros divergentes, ex. {uid}:\n antigo={a}\n estado={n}")
+    if incrementais != backfill:
+        raise SystemExit("backfill difere do estado incremental")
+    print("OK: estado incremental = varredura completa = backfill.")
+
+
+if __name__ == "__main__":
+    main()
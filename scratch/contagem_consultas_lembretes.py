@@ -0,0 +1,123 @@
+# scratch/contagem_consultas_lembretes.py
+"""
+Conta as consultas ao Supabase feitas pelos lembretes (24h e meio-dia) com
+poucos e com muitos confirmados. Com a busca em lote o número de consultas
+é fixo (eventos, confirmações, lojas) mais uma consulta de membros por lote
+de 200 IDs; o script falha se passar disso (regressão N+1).
+
+Sobe o PostgREST local (scratch/postgrest_local.py) numa porta livre e usa
+um bot falso que só registra as mensagens.
+
+    python scratch/contagem_consultas_lembretes.py --confirmados 5 200
+"""
+import argparse
+import asyncio
+import math
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+_PORTA = _porta_livre()
+os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{_PORTA}"
+os.environ["SUPABASE_KEY"] = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.x"
+# Caixa de saída em SQLite temporário: cada execução começa vazia.
+os.environ["CAIXA_SAIDA_BACKEND"] = "sqlite"
+os.environ["CAIXA_SAIDA_SQLITE"] = os.path.join(tempfile.mkdtemp(), "caixa_saida.sqlite3")
+
+import uvicorn
+
+from scratch.postgrest_local import criar_app
+from src import cache as cache_mod
+from src import lembretes
+
+
+class _BotFalso:
+    def __init__(self):
+        self.enviadas = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.enviadas += 1
+
+
+def _dados(qtd_confirmados: int, qtd_eventos: int = 3) -> dict:
+    amanha = (datetime.now() + timedelta(days=1)).strftime("%d/%m/%Y")
+    hoje = datetime.now().strftime("%d/%m/%Y")
+    lojas, eventos, confirmacoes, membros = [], [], [], []
+    for e in range(qtd_eventos):
+        secretario = str(900 + e)
+        membros.append({"telegram_id": secretario, "nome": f"Secretário {e}"})
+        lojas.append({"id": str(e + 1), "nome_loja": f"Loja {e}", "numero": str(e), "secretario_responsavel_id": secretario})
+        for dia, sufixo in ((amanha, "a"), (hoje, "h")):
+            id_evento = f"ev{e}{sufixo}"
+            eventos.append({
+                "id_evento": id_evento, "data_evento": dia, "nome_loja": f"Loja {e}",
+                "loja_id": str(e + 1), "hora": "20:00", "status": "Ativo",
+            })
+            for i in range(qtd_confirmados):
+                tid = str(10_000 + i)
+                confirmacoes.append({"id_evento": id_evento, "telegram_id": tid, "nome": f"Irmão {i}"})
+    for i in range(qtd_confirmados):
+        membros.append({
+            "telegram_id": str(10_000 + i), "nome": f"Irmão {i}",
+            "notificacoes": "NÃO" if i % 10 == 0 else "SIM",
+        })
+    return {"lojas": lojas, "eventos": eventos, "confirmacoes": confirmacoes, "membros": membros}
+
+
+async def _rodar(app, qtd: int):
+    app.state.tabelas.clear()
+    app.state.tabelas.update(_dados(qtd))
+    cache_mod.limpar_todos()
+    bot = _BotFalso()
+    r24 = await lembretes.enviar_lembretes_24h(bot)
+    cache_mod.limpar_todos()
+    r12 = await lembretes.enviar_lembretes_meio_dia(bot)
+    return r24, r12
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--confirmados", type=int, nargs="+", default=[5, 200])
+    args = parser.parse_args()
+
+    app = criar_app({})
+    servidor = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=_PORTA, log_level="warning"))
+    threading.Thread(target=servidor.run, daemon=True).start()
+    while not servidor.started:
+        time.sleep(0.05)
+
+    async def _todas():
+        # Um único event loop: o despachante do processo é criado nele.
+        return [(qtd, *await _rodar(app, qtd)) for qtd in args.confirmados]
+
+    excedidos = []
+    for qtd, r24, r12 in asyncio.run(_todas()):
+        # eventos + confirmações + lojas + membros (confirmados e 3 secretários) em lotes de 200
+        limite = 3 + math.ceil((qtd + 3) / 200)
+        for rel in (r24, r12):
+            total = sum(rel.consultas.values())
+            print(f"{qtd:5d} confirmados/evento | limite {limite} | {rel.resumo()}")
+            if total > limite:
+                excedidos.append((rel.nome, qtd, total, limite))
+
+    servidor.should_exit = True
+    if excedidos:
+        raise SystemExit(f"Consultas acima do esperado: {excedidos}")
+    print("OK: consultas limitadas a um lote por tabela.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# scratch/downloads_remotos_stub.py
+"""
+Verifica src/downloads_remotos e render_assets.abrir_imagem_remota contra
+um servidor HTTP local (stub com ETag / Last-Modified):
+
+- primeiro acesso baixa (200); dentro da janela de frescor não há requisição;
+- fora da janela, revalida com If-None-Match e recebe 304;
+- conteúdo trocado no servidor gera nova versão e nova decodificação;
+- objeto acima do limite é recusado;
+- servidor fora do ar com cópia em disco serve a cópia;
+- cache em disco poda pelo limite de bytes.
+
+    python scratch/downloads_remotos_stub.py
+"""
+import io
+import os
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ["DOWNLOAD_CACHE_DIR"] = tempfile.mkdtemp(prefix="bode_dl_")
+os.environ["DOWNLOAD_CACHE_MAX_MB"] = "1"
+
+from PIL import Image
+
+from src import downloads_remotos as dl
+from src import render_assets
+
+ARQUIVOS = {}
+REQUISICOES = []
+
+
+def _png(cor, tamanho=(400, 300)):
+    buf = io.BytesIO()
+    Image.new("RGB", tamanho, cor).save(buf, "PNG")
+    return buf.getvalue()
+
+
+class Stub(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        corpo, etag = ARQUIVOS.get(self.path, (None, None))
+        REQUISICOES.append((self.path, self.headers.get("If-None-Match")))
+        if corpo is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", "Wed, 01 Jan 2025 00:00:00 GMT")
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+def main():
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Stub)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{servidor.server_port}"
+    url = f"{base}/template.png"
+    ARQUIVOS["/template.png"] = (_png("red"), '"v1"')
+
+    d1 = dl.baixar(url)
+    assert d1.origem == "rede", d1.origem
+    d2 = dl.baixar(url)
+    assert d2.origem == "fresco" and len(REQUISICOES) == 1
+
+    dl._FRESCOR_S = 0
+    d3 = dl.baixar(url)
+    assert d3.origem == "revalidado" and REQUISICOES[-1] == ("/template.png", '"v1"')
+    assert d3.versao == d1.versao
+
+    img1 = render_assets.abrir_imagem_remota(url)
+    misses = render_assets.estatisticas_assets()["imagens"]["misses"]
+    img2 = render_assets.abrir_imagem_remota(url)
+    assert render_assets.estatisticas_assets()["imagens"]["misses"] == misses, "template quente decodificado de novo"
+    assert img1.getpixel((0, 0)) == img2.getpixel((0, 0)) == (255, 0, 0, 255)
+
+    ARQUIVOS["/template.png"] = (_png("blue"), '"v2"')
+    d4 = dl.baixar(url)
+    assert d4.origem == "rede" and d4.versao != d1.versao
+    assert render_assets.abrir_imagem_remota(url).getpixel((0, 0)) == (0, 0, 255, 255)
+
+    ARQUIVOS["/grande.bin"] = (b"x" * 4096, '"g"')
+    try:
+        dl.baixar(f"{base}/grande.bin", max_bytes=1024)
+        raise AssertionError("objeto acima do limite foi aceito")
+    except dl.DownloadGrandeDemais:
+        pass
+
+    servidor.shutdown()
+    servidor.server_close()
+    d5 = dl.baixar(url)
+    assert d5.origem == "obsoleto" and d5.versao == d4.versao
+
+    # Poda: 1 MB de limite, objetos de ~400 KB.
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Stub)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{servidor.server_port}"
+    for i in range(5):
+        ARQUIVOS[f"/ruido{i}.bin"] = (os.urandom(400 * 1024), f'"r{i}"')
+        dl.baixar(f"{base}/ruido{i}.bin")
+    total = sum(p.stat().st_size for p in dl.DOWNLOAD_CACHE_DIR.glob("*.bin"))
+    assert total <= 1024 * 1024, total
+    servidor.shutdown()
+
+    print("ok", dl.estatisticas_downloads())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# scratch/galeria_cache_stub.py
+"""
+Verifica /api/galeria com o payload materializado (src/galeria_cache) sobre
+o PostgREST local:
+
+- primeira abertura monta o payload (consultas ao banco, fora do loop);
+- abertura seguinte não consulta nada e If-None-Match devolve 304;
+- confirmação de presença descarta o payload (remontado; mesmo ETag se nada
+  visível mudou); conquista nova e marco coletivo mudam o ETag;
+- mede a latência do handler com e sem cache.
+
+    python scratch/galeria_cache_stub.py --latencia-ms 20
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from urllib.parse import urlencode
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+_PORTA = _porta_livre()
+os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{_PORTA}"
+os.environ["SUPABASE_KEY"] = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.x"
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.routing import Route
+
+from scratch.postgrest_local import criar_app
+from src import galeria_cache
+from src.cache import AUSENTE
+from src.miniapp import api_galeria
+from src.sheets_supabase import contar_consultas, registrar_confirmacao, registrar_conquista, registrar_marco_coletivo
+
+TOKEN = "123:abc"
+UID = 777
+
+
+def _init_data(uid: int) -> str:
+    params = {"auth_date": str(int(time.time())), "user": json.dumps({"id": uid})}
+    check = "\n".join(f"{k}={v}" for k, v in sorted(params.items()))
+    secret = hmac.new(b"WebAppData", TOKEN.encode(), hashlib.sha256).digest()
+    params["hash"] = hmac.new(secret, check.encode(), hashlib.sha256).hexdigest()
+    return urlencode(params)
+
+
+async def _fluxo(app):
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://miniapp.local") as cliente:
+        async def _abrir(etag=None):
+            headers = {"If-None-Match": etag} if etag else {}
+            with contar_consultas() as consultas:
+                t = time.perf_counter()
+                resp = await cliente.post("/api/galeria", json={"init_data": _init_data(UID)}, headers=headers)
+                return resp, (time.perf_counter() - t) * 1000, sum(consultas.values())
+
+        r1, ms_frio, q1 = await _abrir()
+        assert r1.status_code == 200 and r1.json()["ok"] and r1.json()["nome_loja"] == "Loja Teste", r1.text
+        etag = r1.headers["etag"]
+        print(f"frio  : {ms_frio:7.1f} ms, {q1} consultas (montagem em thread)")
+
+        r2, ms_quente, q2 = await _abrir()
+        assert r2.status_code == 200 and r2.headers["etag"] == etag and q2 == 0
+        r3, ms_304, _ = await _abrir(etag)
+        assert r3.status_code == 304 and not r3.content
+        print(f"quente: {ms_quente:7.1f} ms; 304: {ms_304:.1f} ms")
+
+        assert registrar_confirmacao({"id_evento": "EV1", "telegram_id": str(UID), "agape": "Confirmada (Gratuito)"})
+        assert galeria_cache._cache_galeria.obter(("payload", UID), contar=False) is AUSENTE, \
+            "confirmação não invalidou o payload"
+        # Remontado; o conteúdo visível não mudou, então o ETag continua valendo.
+        r4, _, _ = await _abrir(etag)
+        assert r4.status_code == 304
+
+        registrar_conquista(UID, "ic")
+        r5, _, _ = await _abrir(etag)
+        assert r5.status_code == 200 and any(b["slug"] == "ic" and b["desbloqueada"] for b in r5.json()["conquistas_individuais"])
+        etag = r5.headers["etag"]
+
+        registrar_marco_coletivo("arco_integracao|gob", "arco_integracao")
+        r6, _, _ = await _abrir(etag)
+        assert r6.status_code == 200 and len(r6.json()["marcos_expansao"]) == 2
+        assert (await _abrir(r6.headers["etag"]))[0].status_code == 304
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latencia-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    dados = {
+        "membros": [{"telegram_id": str(UID), "nome": "Irmão Teste", "loja_id": "1", "status": "Ativo"}],
+        "lojas": [{"id": "1", "nome_loja": "Loja Teste", "numero": "1"}],
+        "eventos": [{"id_evento": "EV1", "loja_id": "1", "data_evento": "01/01/2026", "status": "Ativo"}],
+        "confirmacoes": [],
+        "membro_conquistas": [],
+        "marcos_coletivos": [{"marco_slug": "expansao_geo|sp", "categoria": "expansao_geografica"}],
+    }
+    servidor = uvicorn.Server(uvicorn.Config(criar_app(dados, latencia_ms=args.latencia_ms),
+                                             host="127.0.0.1", port=_PORTA, log_level="warning"))
+    threading.Thread(target=servidor.run, daemon=True).start()
+    while not servidor.started:
+        time.sleep(0.05)
+
+    app = Starlette(routes=[Route("/api/galeria", api_galeria, methods=["POST"])])
+    app.state.bot_token = TOKEN
+    asyncio.run(_fluxo(app))
+
+    servidor.should_exit = True
+    print("OK: cache, ETag/304 e invalidação por confirmação, conquista e marco.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# scratch/ia_auditoria_carga.py
+"""
+Confere a auditoria do assistente IA em baldes horários (src/ia_auditoria):
+
+- gera eventos sintéticos espalhados por 30 dias (intenções, bloqueios,
+  temas não reconhecidos) e registra cada um no seu balde;
+- compara _agregar_metricas / _sugestoes_aprendizado de src.ia_assistente
+  com a recontagem antiga (varredura da lista de eventos com timestamp ISO),
+  usando o mesmo corte alinhado à hora;
+- simula um deploy (processo novo, memória zerada) e confere que o
+  histórico continua lá e que eventos novos somam por cima;
+- roda no SQLite local e no PostgREST local (caminho Supabase);
+- mede /ia_stats (24h + 7d) pela recontagem antiga x soma de baldes.
+
+    python scratch/ia_auditoria_carga.py --eventos 20000
+"""
+import argparse
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+_PORTA = _porta_livre()
+os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{_PORTA}"
+os.environ["SUPABASE_KEY"] = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.x"
+
+import uvicorn
+
+from scratch.postgrest_local import criar_app
+from src import ia_assistente, ia_auditoria
+
+EVENTOS = ["intent_matched"] * 6 + ["unmatched"] * 3 + ["blocked", "empty_input", "empathy_fallback"]
+INTENCOES = ["ver_eventos", "minhas_confirmacoes", "saudacao_fraterna", "buscar_eventos_natural", "editar_cadastro_proprio"]
+MOTIVOS = ["security_filter", "campo_sensivel", "nivel_insuficiente"]
+TEMAS = ["traje sessao", "agape valor", "loja mudou endereco", "rito york", "visita oriente"]
+
+
+def _gerar(n: int, agora: datetime):
+    rnd = random.Random(13)
+    eventos = []
+    for _ in range(n):
+        quando = agora - timedelta(seconds=rnd.uniform(0, 30 * 86400))
+        ev = rnd.choice(EVENTOS)
+        campos = {
+            "intent_id": rnd.choice(INTENCOES) if ev == "intent_matched" else "",
+            "reason": rnd.choice(MOTIVOS) if ev == "blocked" else "",
+            "topic_hint": rnd.choice(TEMAS) if ev == "unmatched" and rnd.random() < 0.8 else "",
+        }
+        eventos.append((quando, ev, campos))
+    return eventos
+
+
+def _recontagem_antiga(eventos, janela_horas: int):
+    """Mesmo cálculo da deque antiga, com o corte alinhado à hora dos baldes."""
+    corte = datetime.fromisoformat(ia_auditoria._corte(janela_horas))
+    buffer = [{"ts": q.isoformat(), "event": ev, **c} for q, ev, c in eventos]
+    janela = [e for e in buffer if datetime.fromisoformat(e["ts"]) >= corte]
+
+    def _contar(evento, campo):
+        return Counter(e[campo] for e in janela if e["event"] == evento and e[campo])
+
+    return {
+        "total": len(janela),
+        "matched": sum(1 for e in janela if e["event"] == "intent_matched"),
+        "blocked": sum(1 for e in janela if e["event"] == "blocked"),
+        "unmatched": sum(1 for e in janela if e["event"] == "unmatched"),
+        "empty_input": sum(1 for e in janela if e["event"] == "empty_input"),
+        "intents": _contar("intent_matched", "intent_id"),
+        "reasons": _contar("blocked", "reason"),
+        "topics": _contar("unmatched", "topic_hint"),
+    }
+
+
+def _atual(janela_horas: int):
+    m = ia_assistente._agregar_metricas(janela_horas)
+    totais = ia_auditoria.totais_auditoria(janela_horas)
+    return {
+        "total": m["total"], "matched": m["matched"], "blocked": m["blocked"],
+        "unmatched": m["unmatched"], "empty_input": m["empty_input"],
+        "intents": ia_assistente._contagem_dimensao(totais, "intent_matched", "intent_id"),
+        "reasons": ia_assistente._contagem_dimensao(totais, "blocked", "reason"),
+        "topics": ia_assistente._contagem_dimensao(totais, "unmatched", "topic_hint"),
+    }
+
+
+def _novo_processo(instancia: str) -> None:
+    """Simula um deploy: memória zerada e outra instância; o armazenamento fica."""
+    ia_auditoria._contadores.clear()
+    ia_auditoria._alterados.clear()
+    ia_auditoria._INSTANCIA = instancia
+
+
+def _verificar(nome: str, eventos, agora: datetime) -> None:
+    _novo_processo(f"{nome}-a")
+    metade = len(eventos) // 2
+    for quando, ev, campos in eventos[:metade]:
+        ia_auditoria.registrar_auditoria(ev, campos, quando)
+    gravadas = ia_auditoria.descarregar_auditoria()
+
+    _novo_processo(f"{nome}-b")  # deploy no meio do caminho
+    for quando, ev, campos in eventos[metade:]:
+        ia_auditoria.registrar_auditoria(ev, campos, quando)
+    # sem descarregar: totais_auditoria grava o pendente antes de somar
+
+    for janela in (24, 168, 720):
+        esperado, obtido = _recontagem_antiga(eventos, janela), _atual(janela)
+        if esperado != obtido:
+            raise SystemExit(f"[{nome}] janela {janela}h diverge:\n antigo={esperado}\n baldes={obtido}")
+    sugestoes = ia_assistente._sugestoes_aprendizado(168)
+    assert dict(sugestoes["top_unmatched_topics"]) == dict(_recontagem_antiga(eventos, 168)["topics"].most_common(5))
+    print(f"[{nome}] 24h/7d/30d idênticos à recontagem; {gravadas} baldes gravados pelo 1º processo")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--eventos", type=int, default=20000)
+    args = parser.parse_args()
+
+    agora = datetime.now().astimezone()
+    eventos = _gerar(args.eventos, agora)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["IA_AUDITORIA_BACKEND"] = "sqlite"
+        os.environ["IA_AUDITORIA_SQLITE"] = os.path.join(tmp, "ia_auditoria.sqlite3")
+        _verificar("sqlite", eventos, agora)
+
+    # Medição: /ia_stats pede 24h e 7d, com o mesmo histórico de 30 dias nos
+    # dois caminhos (a deque antiga nem guardava isso: parava em 5000).
+    for fator in (1, 10):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["IA_AUDITORIA_SQLITE"] = os.path.join(tmp, "ia_auditoria.sqlite3")
+            ia_auditoria._armazem = None
+            _novo_processo(f"medicao-{fator}")
+            historico = _gerar(args.eventos * fator, agora)
+            for quando, ev, campos in historico:
+                ia_auditoria.registrar_auditoria(ev, campos, quando)
+            baldes = ia_auditoria.descarregar_auditoria()
+            buffer = [{"ts": q.replace(tzinfo=None).isoformat(), "event": ev, **c} for q, ev, c in historico]
+
+            t = time.perf_counter()
+            for janela in (24, 168):
+                corte = datetime.now() - timedelta(hours=janela)
+                janela_ev = [e for e in buffer if datetime.fromisoformat(e["ts"]) >= corte]
+                Counter(e["intent_id"] for e in janela_ev if e["event"] == "intent_matched" and e["intent_id"])
+            ms_antigo = (time.perf_counter() - t) * 1000
+            t = time.perf_counter()
+            for _ in range(10):
+                ia_assistente._agregar_metricas(24)
+                ia_assistente._agregar_metricas(168)
+            ms_novo = (time.perf_counter() - t) / 10 * 1000
+            print(f"/ia_stats com {len(historico)} eventos em 30d: recontagem {ms_antigo:.1f} ms; "
+                  f"soma de {baldes} baldes (SQLite) {ms_novo:.1f} ms")
+
+    app = criar_app({}, latencia_ms=0)
+    servidor = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=_PORTA, log_level="warning"))
+    threading.Thread(target=servidor.run, daemon=True).start()
+    while not servidor.started:
+        time.sleep(0.05)
+    os.environ["IA_AUDITORIA_BACKEND"] = "supabase"
+    ia_auditoria._armazem = None
+    _verificar("supabase", eventos[: args.eventos // 4], agora)
+    print(f"linhas na tabela: {len(app.state.tabelas['ia_auditoria_horaria'])}")
+    servidor.should_exit = True
+    print("OK: baldes horários = recontagem antiga; histórico sobrevive ao deploy.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# scratch/ia_multinivel_golden.py
+"""
+Regressão por saída de ouro do classificar_intencao_multinivel
+(src/ia_multinivel) e medição de latência/vazão.
+
+- gera, com semente fixa, alguns milhares de frases no estilo das mensagens
+  reais (criação de sessão, edição cadastral, comandos admin, saudações,
+  buscas com grau/UF/cidade/rito/potência/data, navegação e ruído), para os
+  três níveis, com e sem lojas do secretário;
+- relógio congelado (datetime.now fixo) para que as datas relativas
+  ("quarta", "amanhã", "dia 25") sejam reprodutíveis;
+- a saída de ouro é gerada na hora pelo módulo do commit de referência
+  (--referencia, carregado via git show; padrão: o commit base, anterior à
+  análise única por mensagem), então nenhum arquivo de saída fica no
+  repositório; falha na primeira divergência do módulo atual;
+- mede a latência/vazão dos dois módulos lado a lado.
+
+    python scratch/ia_multinivel_golden.py
+    python scratch/ia_multinivel_golden.py --referencia <commit> --frases 8000
+"""
+import argparse
+import dataclasses
+import os
+import random
+import subprocess
+import sys
+import time
+import types
+from datetime import datetime
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src import ia_multinivel
+
+REFERENCIA_PADRAO = "80828a7"  # commit base do repositório
+AGORA = datetime(2026, 3, 11, 10, 30)  # quarta-feira
+
+
+class _RelogioFixo(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(AGORA.year, AGORA.month, AGORA.day, AGORA.hour, AGORA.minute)
+
+
+LOJAS = [
+    {"ID": "12", "Nome da Loja": "Acácia do Planalto", "Número": "1234", "Oriente da Loja": "Campinas - SP",
+     "Rito": "REAA", "Potência": "GOB", "Endereço": "Rua das Flores, 10"},
+    {"ID": "31", "Nome da Loja": "Estrela do Oriente", "Número": "88", "Oriente": "Santos",
+     "Rito": "York", "Potência": "GLESP", "Endereço": "Av. Beira-Mar, 200"},
+]
+
+CRIACAO = ["criar sessão", "cadastrar evento", "nova sessao", "agendar sessão", "marcar sessao",
+           "publicar sessão", "novo evento", "Quero criar evento", "preciso cadastrar sessao"]
+DATAS = ["", "dia 25", "dia 3 de abril", "dia 31 de fevereiro", "15/04", "07/05/2026", "32/13",
+         "na próxima quarta", "essa sexta-feira", "sábado", "amanhã", "hoje", "domingo que vem", "seg"]
+HORAS = ["", "às 19h30", "20:00", "19 horas", "as 8 hrs", "25:70", "19h"]
+GRAUS = ["", "de aprendiz", "grau de companheiro", "mestre", "mestre instalado", "A:.M:.", "C.M.",
+         "M:.M:.", "sessão de MI", "VM", "a m", "para o grau 1"]
+AGAPES = ["", "com ágape", "sem ágape", "ágape pago", "agape gratuito"]
+TIPOS = ["", "magna de iniciação", "sessão ordinária", "extraordinaria", "branca", "fúnebre",
+         "exaltação", "sessao magna"]
+TRAJES = ["", "traje escuro", "terno escuro", "traje social", "passeio"]
+LOJAS_TXT = ["", "na Acácia do Planalto", "loja estrela do oriente", "na Loja Inexistente"]
+
+EDICAO = ["alterar meu nome", "editar cadastro do irmão João Silva", "mudar grau do Pedro",
+          "corrigir cadastro", "alterar data de nascimento", "mudar meu rito", "editar membro Carlos",
+          "alterar loja de Antonio Souza", "retificar cadastro do irmao José", "mudar potencia",
+          "alterar numero da loja", "mudar oriente do membro Marcos", "editar meu perfil",
+          "alterar cadastro do Status", "mudar nome de joão", "alterar Nivel do membro Paulo"]
+ADMIN = ["area admin", "abrir painel admin", "ver membros", "listar membros da loja", "promover secretario",
+         "rebaixar membro", "gerenciar lojas", "todos os eventos", "cancelar evento de ontem",
+         "configurar notificacoes", "notificações", "administração"]
+SAUDACOES = ["Bom dia, irmãos!", "boa tarde", "Boa noite meus irmãos", "T:.F:.A:.", "TFA", "salve",
+             "olá", "oi", "saudações fraternas", "saúdo a todos"]
+BUSCAS = ["buscar sessões", "procurar sessão", "tem sessao", "quero ver eventos", "listar eventos",
+          "achar uma oficina", "agenda", "calendário", "trabalhos", "encontrar loja"]
+FILTROS = ["", "em Campinas", "no Rio de Janeiro", "em São Paulo", "na Bahia", "no Pará ", "em Minas",
+           "do para ", "rito york", "rito escocês", "REAA", "schroder", "emulação", "rito francês",
+           "adonhiramita", "brasileiro", "GOB", "grande loja", "COMAB", "grande oriente", "GL", "GO",
+           "em Porto Alegre", "de Belo Horizonte", "na Sessao", "pa", "Santa Catarina"]
+NAVEGACAO = ["quais sessoes tem", "minhas confirmações", "onde confirmei", "histórico de visitas",
+             "meu perfil", "meus dados", "ativar lembrete", "meus lembretes", "ajuda", "não entendi",
+             "como funciona", "glossário", "o que é ágape", "o que significa VM", "faq",
+             "perguntas frequentes", "como confirmar presença", "quero confirmar", "como me cadastrar",
+             "começar", "area do secretario", "meus eventos", "eventos que criei", "minhas lojas",
+             "cadastrar loja", "notificacoes", "dúvida", "socorro", "me ajuda", "o que eu faço",
+             "lembretes", "ja confirmei", "dados pessoais", "termos", "duvidas comuns"]
+RUIDO = ["obrigado", "valeu", "kkk", "qual o horário?", "secretário", "internet caiu", "quarter",
+         "tudo certo", "horario de verao", "preciso de uma informação", "sexto sentido",
+         "123", "", "   ", "Dom Pedro", "ter acesso", "que dia é hoje"]
+
+
+def gerar_corpus(n: int, semente: int = 5):
+    rnd = random.Random(semente)
+    casos = []
+    while len(casos) < n:
+        tipo = rnd.random()
+        if tipo < 0.30:
+            partes = [rnd.choice(CRIACAO), rnd.choice(LOJAS_TXT), rnd.choice(DATAS), rnd.choice(HORAS),
+                      rnd.choice(GRAUS), rnd.choice(AGAPES), rnd.choice(TIPOS), rnd.choice(TRAJES)]
+            rnd.shuffle(partes[1:])
+            texto = " ".join(p for p in partes if p)
+        elif tipo < 0.42:
+            texto = rnd.choice(EDICAO)
+        elif tipo < 0.50:
+            texto = rnd.choice(ADMIN)
+        elif tipo < 0.57:
+            texto = f"{rnd.choice(SAUDACOES)} {rnd.choice(['', 'quero ver sessoes', 'tudo bem?'])}".strip()
+        elif tipo < 0.77:
+            partes = [rnd.choice(BUSCAS), rnd.choice(GRAUS), rnd.choice(FILTROS), rnd.choice(FILTROS),
+                      rnd.choice(DATAS)]
+            texto = " ".join(p for p in partes if p)
+        elif tipo < 0.90:
+            texto = rnd.choice(NAVEGACAO)
+        else:
+            texto = f"{rnd.choice(RUIDO)} {rnd.choice(GRAUS)} {rnd.choice(DATAS)}".strip()
+        if rnd.random() < 0.15:
+            texto = texto.upper()
+        nivel = rnd.choice(["1", "2", "3"])
+        lojas = rnd.choice([None, [], LOJAS, LOJAS[1:]])
+        casos.append({"texto": texto, "nivel": nivel, "lojas": lojas})
+    return casos
+
+
+def _congelar(modulo) -> None:
+    modulo.datetime = _RelogioFixo
+
+
+def _saida(modulo, caso) -> dict:
+    return dataclasses.asdict(modulo.classificar_intencao_multinivel(caso["texto"], caso["nivel"], caso["lojas"]))
+
+
+def _modulo_do_commit(commit: str):
+    fonte = subprocess.run(["git", "show", f"{commit}:src/ia_multinivel.py"], capture_output=True, text=True,
+                           check=True, cwd=Path(__file__).resolve().parents[1]).stdout
+    modulo = types.ModuleType(f"ia_multinivel_{commit}")
+    sys.modules[modulo.__name__] = modulo  # dataclasses resolve o módulo pelo nome
+    exec(compile(fonte, f"{commit}:src/ia_multinivel.py", "exec"), modulo.__dict__)
+    return modulo
+
+
+def _medir(modulo, casos, repeticoes: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for caso in casos:
+            modulo.classificar_intencao_multinivel(caso["texto"], caso["nivel"], caso["lojas"])
+    return (time.perf_counter() - inicio) / (repeticoes * len(casos))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frases", type=int, default=4000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--referencia", default=REFERENCIA_PADRAO)
+    args = parser.parse_args()
+
+    casos = gerar_corpus(args.frases)
+    intents = {}
+    referencia = _modulo_do_commit(args.referencia)
+    _congelar(referencia)
+    _congelar(ia_multinivel)
+    for i, caso in enumerate(casos):
+        esperado, saida = _saida(referencia, caso), _saida(ia_multinivel, caso)
+        if esperado != saida:
+            diff = {k: (esperado[k], saida[k]) for k in saida if esperado[k] != saida[k]}
+            raise SystemExit(f"divergência na frase {i} {caso['texto']!r} (nível {caso['nivel']}): {diff}")
+        intent = saida["intent"] or "(fallback)"
+        intents[intent] = intents.get(intent, 0) + 1
+    print(f"OK: {len(casos)} frases idênticas a {args.referencia}; intents: {dict(sorted(intents.items()))}")
+
+    for nome, modulo in ((args.referencia, referencia), ("atual", ia_multinivel)):
+        por_frase = _medir(modulo, casos, args.repeticoes)
+        print(f"{nome:>10}: {por_frase * 1e6:7.1f} µs/frase, {1 / por_frase:9.0f} frases/s")
+
+
+if __name__ == "__main__":
+    main()
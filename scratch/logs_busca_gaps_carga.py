@@ -0,0 +1,249 @@
+# scratch/logs_busca_gaps_carga.py
+"""
+Confere os logs de busca em lote (src/fila_logs_busca) e o relatório de
+demanda sem oferta (obter_gaps_sessoes) sobre o agregado diário:
+
+- histórico sintético de buscas em logs_busca (30+ dias, cidades com e sem
+  sessões futuras, ritos variados) no PostgREST local;
+- o trigger de docs/supabase_logs_busca_demanda.sql é emulado aqui (mesma
+  normalização) porque o stub não roda SQL: backfill do histórico e soma de
+  cada lote inserido pela fila;
+- buscas novas passam por registrar_log_busca dentro do event loop: conta
+  os inserts que chegam ao banco e o tempo no caminho da resposta;
+- compara obter_gaps_sessoes (agregado + EventIndex) e o caminho sem a
+  tabela (logs brutos) com o algoritmo antigo (logs brutos x listar_eventos
+  em laço aninhado) e mede os dois com --logs buscas no histórico.
+
+    python scratch/logs_busca_gaps_carga.py --logs 20000 --latencia-ms 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+_PORTA = _porta_livre()
+os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{_PORTA}"
+os.environ["SUPABASE_KEY"] = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.x"
+os.environ["LOGS_BUSCA_INTERVALO_S"] = "0.2"
+
+import uvicorn
+
+from scratch.postgrest_local import criar_app
+from src import indice_eventos, sheets_supabase
+from src.fila_logs_busca import obter_fila_logs_busca
+from src.indice_eventos import EventIndex
+
+# Ritos que _normalizar_rito mantém como estão: o algoritmo antigo compara o texto cru.
+RITOS = ["", "", "REAA", "York", "Moderno", "Brasileiro", "Schröder"]
+UFS = {
+    "SP": ["São Paulo", "Campinas", "Santos", "Sorocaba", "Bauru"],
+    "RS": ["Porto Alegre", "Pelotas", "Caxias Do Sul"],
+    "MG": ["Belo Horizonte", "Uberlândia", "Juiz De Fora"],
+    "PR": ["Curitiba", "Londrina"],
+}
+
+
+def _gerar_agenda(rnd: random.Random):
+    lojas, eventos = {}, []
+    hoje = date.today()
+    cidades = [(uf, c) for uf, cs in UFS.items() for c in cs]
+    for k, (uf, cidade) in enumerate(cidades):
+        lojas[str(k)] = {"ID": str(k), "Nome da Loja": f"Loja {k}", "Número": str(k), "Estado UF": uf, "Cidade": cidade}
+    for i in range(400):
+        k = rnd.randrange(len(cidades) - 4)  # as últimas cidades ficam sem sessões
+        uf, cidade = cidades[k]
+        legado = rnd.random() < 0.1  # sem loja cadastrada: vale o "Oriente"
+        eventos.append({
+            "ID Evento": f"ev{i:04d}",
+            "Data do evento": (hoje + timedelta(days=rnd.randint(-20, 90))).strftime("%d/%m/%Y"),
+            "Hora": "20:00",
+            "Rito": rnd.choice(RITOS[1:] if k % 3 else RITOS),
+            "ID da loja": "" if legado else str(k),
+            "Nome da loja": "Loja Legada" if legado else f"Loja {k}",
+            "Oriente": f"{cidade}/{uf}",
+            "Status": "Ativo",
+        })
+    return eventos, lojas
+
+
+def _gerar_buscas(n: int, rnd: random.Random, agora: datetime):
+    cidades = [(uf, c) for uf, cs in UFS.items() for c in cs]
+    buscas = []
+    for _ in range(n):
+        uf, cidade = rnd.choice(cidades)
+        if rnd.random() < 0.2:
+            cidade = ""
+        if rnd.random() < 0.1:
+            quando = agora - timedelta(days=rnd.uniform(31, 60))  # fora da janela
+        else:
+            quando = agora - timedelta(days=rnd.uniform(0.05, 29))
+        buscas.append((quando, dict(uf=uf, cidade=cidade.lower(), rito=rnd.choice(RITOS),
+                                    encontrou_resultados=rnd.random() < 0.4)))
+    return buscas
+
+
+def _chave_trigger(linha: dict):
+    """Mesma normalização do trigger logs_busca_agregar_demanda."""
+    dia = datetime.fromisoformat(linha["created_at"]).date().isoformat()
+    return (dia, (linha.get("uf") or "").strip().upper(), (linha.get("cidade") or "").strip(),
+            (linha.get("rito") or "").strip())
+
+
+def _emular_trigger(tabelas, linhas) -> None:
+    demanda = {(d["dia"], d["uf"], d["cidade"], d["rito"]): d for d in tabelas["logs_busca_demanda"]}
+    for linha in linhas:
+        if linha.get("encontrou_resultados") is not False or not (linha.get("cidade") or "").strip():
+            continue
+        chave = _chave_trigger(linha)
+        if chave not in demanda:
+            demanda[chave] = dict(zip(("dia", "uf", "cidade", "rito"), chave), total=0)
+            tabelas["logs_busca_demanda"].append(demanda[chave])
+        demanda[chave]["total"] += 1
+
+
+def _gaps_antigo(eventos, dias: int = 30) -> list:
+    """obter_gaps_sessoes anterior: logs brutos x listar_eventos em laço aninhado."""
+    limite = datetime.utcnow() - timedelta(days=dias)
+    resp = (
+        sheets_supabase.supabase.table("logs_busca")
+        .select("uf, cidade, rito, grau")
+        .eq("encontrou_resultados", False)
+        .gte("created_at", limite.isoformat())
+        .execute()
+    )
+    contagem = Counter()
+    for log in resp.data or []:
+        uf = (log.get("uf") or "").strip().upper()
+        cid = (log.get("cidade") or "").strip()
+        rito = (log.get("rito") or "").strip()
+        if not cid:
+            continue
+        contagem[(uf, cid, rito)] += 1
+    hoje = datetime.utcnow().date()
+    futuras = set()
+    for ev in eventos:
+        if str(ev.get("Status", "")).lower() in ("cancelado", "inativo"):
+            continue
+        try:
+            if datetime.strptime(ev.get("Data do evento", ""), "%d/%m/%Y").date() < hoje:
+                continue
+        except Exception:
+            pass
+        ori = ev.get("Oriente", "")
+        partes = ori.split("/")
+        futuras.add((partes[1].strip().upper() if len(partes) > 1 else "", partes[0].strip().title(),
+                     (ev.get("Rito") or "").strip()))
+    gaps = []
+    for (uf, cid, rito), total in contagem.most_common():
+        achou = any(
+            cid.lower() == c.lower() and not (rito and r and rito.lower() != r.lower())
+            for (_, c, r) in futuras
+        )
+        if not achou:
+            gaps.append({"uf": uf, "cidade": cid, "rito": rito, "total_buscas": total})
+    return gaps
+
+
+def _ordenar(gaps):
+    # Empates em most_common seguem a ordem de inserção, que difere entre as fontes.
+    return sorted(gaps, key=lambda g: (-g["total_buscas"], g["uf"], g["cidade"], g["rito"]))
+
+
+async def _buscas_novas(app, buscas) -> dict:
+    tabelas = app.state.tabelas
+    antes = app.state.requisicoes
+    fila = obter_fila_logs_busca()
+    t = time.perf_counter()
+    for _, busca in buscas:
+        sheets_supabase.registrar_log_busca(**busca)
+        await asyncio.sleep(0)
+    ms_chamada = (time.perf_counter() - t) / len(buscas) * 1000
+    await asyncio.sleep(0.5)
+    await fila.parar()
+    novas = [l for l in tabelas["logs_busca"] if "created_at" not in l]
+    for linha in novas:
+        linha["created_at"] = datetime.utcnow().isoformat()  # default now() da coluna
+    _emular_trigger(tabelas, novas)
+    return {"inserts": app.state.requisicoes - antes, "linhas": len(novas), "ms_chamada": ms_chamada}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logs", type=int, default=20000)
+    parser.add_argument("--novas", type=int, default=1000)
+    parser.add_argument("--latencia-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    rnd = random.Random(7)
+    agora = datetime.utcnow()
+    eventos, lojas = _gerar_agenda(rnd)
+    indice = EventIndex(eventos, lojas, date.today())
+    indice_eventos.obter_indice_eventos = lambda: indice  # agenda sintética no lugar do banco
+
+    historico = []
+    for quando, busca in _gerar_buscas(args.logs, rnd, agora):
+        linha = sheets_supabase._linha_log_busca(**busca)
+        linha["created_at"] = quando.isoformat()
+        historico.append(linha)
+    app = criar_app({"logs_busca": historico, "logs_busca_demanda": []}, latencia_ms=args.latencia_ms)
+    _emular_trigger(app.state.tabelas, app.state.tabelas["logs_busca"])  # backfill da migração
+
+    servidor = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=_PORTA, log_level="warning"))
+    threading.Thread(target=servidor.run, daemon=True).start()
+    while not servidor.started:
+        time.sleep(0.05)
+
+    # Caminho antigo da escrita: um insert síncrono por busca.
+    t = time.perf_counter()
+    for _ in range(20):
+        sheets_supabase.supabase.table("logs_busca_descartavel").insert({"uf": "SP"}).execute()
+    ms_insert = (time.perf_counter() - t) / 20 * 1000
+
+    r = asyncio.run(_buscas_novas(app, _gerar_buscas(args.novas, rnd, agora)))
+    assert r["linhas"] == args.novas, r
+    print(f"{args.novas} buscas: {r['inserts']} insert(s) em lote (antes: {args.novas}); "
+          f"registrar_log_busca {r['ms_chamada'] * 1000:.1f} µs/chamada (antes: {ms_insert:.1f} ms)")
+
+    esperado = _ordenar(_gaps_antigo(eventos))
+    novo = _ordenar(sheets_supabase.obter_gaps_sessoes(30))
+    sheets_supabase._logs_busca_demanda_indisponivel = True
+    bruto = _ordenar(sheets_supabase.obter_gaps_sessoes(30))
+    sheets_supabase._logs_busca_demanda_indisponivel = False
+    if not (esperado == novo == bruto):
+        raise SystemExit(f"gaps divergem:\n antigo={esperado[:5]}\n agregado={novo[:5]}\n bruto={bruto[:5]}")
+    assert esperado, "cenário sem gaps"
+
+    rep = 5
+    t = time.perf_counter()
+    for _ in range(rep):
+        _gaps_antigo(eventos)
+    ms_antigo = (time.perf_counter() - t) / rep * 1000
+    t = time.perf_counter()
+    for _ in range(rep):
+        sheets_supabase.obter_gaps_sessoes(30)
+    ms_novo = (time.perf_counter() - t) / rep * 1000
+    tabelas = app.state.tabelas
+    print(f"relatório de gaps: {len(esperado)} gaps idênticos ao antigo; "
+          f"{len(tabelas['logs_busca'])} logs brutos {ms_antigo:.1f} ms x "
+          f"{len(tabelas['logs_busca_demanda'])} linhas do agregado {ms_novo:.1f} ms")
+    servidor.should_exit = True
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# scratch/pool_updates_carga.py
+"""
+Carga do webhook com e sem o pool de updates (src/pool_updates):
+
+- endpoint Starlette no mesmo formato do src/aplicacao.py (process_update dentro da
+  requisição x enfileirar e responder), servido via httpx ASGITransport;
+- WEBHOOK_MAX_CONNECTIONS entregas simultâneas, em ritmo abaixo da
+  capacidade e em rajada contínua, updates de vários chats privados com
+  numeração sequencial por chave (chave_ordem); o "handler" dorme um tempo
+  aleatório (consulta ao banco, render) e anota a ordem em que cada chave
+  foi atendida;
+- confere que no pool cada chave é atendida na ordem de chegada e nunca em
+  dois workers ao mesmo tempo; mede latência da resposta HTTP e vazão;
+- anúncio no grupo: muitos irmãos clicando no card do mesmo evento ao mesmo
+  tempo (um chat, usuários diferentes) andam em paralelo;
+- back-pressure: fila pequena e handlers lentos produzem esperas e 503;
+- dreno: parar() processa tudo o que foi aceito antes de encerrar.
+
+    python scratch/pool_updates_carga.py --updates 2000 --chats 50 --irmaos 300
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+from src.pool_updates import PoolUpdates, chave_ordem
+
+_GRUPO = -1001234567890
+
+
+class Handler:
+    """process_update falso: dorme e registra a ordem de atendimento por chave."""
+
+    def __init__(self, media_ms: float, semente: int = 3):
+        self.rnd = random.Random(semente)
+        self.media_ms = media_ms
+        self.atendidos = {}
+        self.em_andamento = set()
+        self.sobrepostos = 0
+        self.pico_paralelo = 0
+
+    async def __call__(self, update):
+        chave = chave_ordem(update)
+        if chave in self.em_andamento:
+            self.sobrepostos += 1
+        self.em_andamento.add(chave)
+        self.pico_paralelo = max(self.pico_paralelo, len(self.em_andamento))
+        await asyncio.sleep(self.rnd.expovariate(1 / self.media_ms) / 1000)
+        self.atendidos.setdefault(chave, []).append(update.seq)
+        self.em_andamento.discard(chave)
+
+
+def _app(handler, pool):
+    async def webhook(request: Request) -> Response:
+        data = await request.json()
+        update = _update(data["chat"], data["usuario"], data["seq"])
+        if pool is None:
+            await handler(update)
+        elif not await pool.enfileirar(update):
+            return Response(status_code=503)
+        return Response(status_code=200)
+
+    return Starlette(routes=[Route("/webhook", webhook, methods=["POST"])])
+
+
+def _update(chat: int, usuario: int, seq: int):
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=chat), effective_user=SimpleNamespace(id=usuario), seq=seq)
+
+
+def _gerar(n: int, chats: int, rnd: random.Random, grupo: bool = False):
+    """Chats privados (chat = usuário) ou, com `grupo`, `chats` irmãos clicando no mesmo grupo."""
+    contadores = {}
+    updates = []
+    for _ in range(n):
+        usuario = 1 + rnd.randrange(chats)
+        chat = _GRUPO if grupo else usuario
+        contadores[usuario] = contadores.get(usuario, 0) + 1
+        updates.append({"chat": chat, "usuario": usuario, "seq": contadores[usuario]})
+    return updates
+
+
+async def _entregar(app, updates, conexoes: int, pausa_s: float = 0.0):
+    """Como o Telegram: até `conexoes` entregas em paralelo, na ordem da fila."""
+    fila = asyncio.Queue()
+    for u in updates:
+        fila.put_nowait(u)
+    latencias, codigos = [], {}
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bot") as cliente:
+        async def conexao():
+            while not fila.empty():
+                u = fila.get_nowait()
+                t = time.perf_counter()
+                r = await cliente.post("/webhook", json=u)
+                latencias.append((time.perf_counter() - t) * 1000)
+                codigos[r.status_code] = codigos.get(r.status_code, 0) + 1
+                if pausa_s:
+                    await asyncio.sleep(pausa_s)
+
+        await asyncio.gather(*(conexao() for _ in range(conexoes)))
+    return latencias, codigos
+
+
+def _fora_de_ordem(handler) -> int:
+    return sum(1 for seqs in handler.atendidos.values() for a, b in zip(seqs, seqs[1:]) if b < a)
+
+
+async def _cenario(nome, updates, conexoes, media_ms, workers=None, fila_max=500, espera_s=5.0, pausa_s=0.0):
+    handler = Handler(media_ms)
+    pool = None
+    if workers:
+        pool = PoolUpdates(handler, workers=workers, fila_max=fila_max, espera_s=espera_s)
+        pool.iniciar()
+    inicio = time.perf_counter()
+    latencias, codigos = await _entregar(_app(handler, pool), updates, conexoes, pausa_s)
+    if pool is not None:
+        await pool.parar(timeout_s=60)
+    total_s = time.perf_counter() - inicio
+    processados = sum(len(v) for v in handler.atendidos.values())
+    q = statistics.quantiles(latencias, n=100)
+    print(f"[{nome}] HTTP {codigos}; resposta p50 {q[49]:.1f} ms, p95 {q[94]:.1f} ms; "
+          f"{processados} processados em {total_s:.2f}s ({processados / total_s:.0f}/s); "
+          f"pico {handler.pico_paralelo} chaves em paralelo; fora de ordem {_fora_de_ordem(handler)}, "
+          f"mesma chave sobreposta {handler.sobrepostos}")
+    return handler, pool, codigos
+
+
+async def main_async(args):
+    updates = _gerar(args.updates, args.chats, random.Random(11))
+
+    # Tráfego abaixo da capacidade (~200 updates/s): o que muda é o tempo até o 200.
+    for nome, workers in (("ritmo, dentro da requisição", None), ("ritmo, pool", args.workers)):
+        await _cenario(nome, updates[:1000], args.conexoes, args.media_ms, workers=workers, pausa_s=0.1)
+
+    # Rajada contínua: as conexões entregam sem pausa.
+    await _cenario("dentro da requisição", updates, args.conexoes, args.media_ms)
+    handler, pool, codigos = await _cenario("pool", updates, args.conexoes, args.media_ms, workers=args.workers)
+    assert codigos == {200: len(updates)}
+    assert _fora_de_ordem(handler) == 0 and handler.sobrepostos == 0
+    assert sum(len(v) for v in handler.atendidos.values()) == len(updates)
+    st = pool.estatisticas()
+    print(f"  fila: pico {st['pico_fila']}, tempo médio {st['segundos_fila_media'] * 1000:.0f} ms, "
+          f"máx. {st['segundos_fila_max'] * 1000:.0f} ms")
+
+    # Anúncio no grupo: irmãos diferentes clicando no card do mesmo evento.
+    # Chaveado só pelo chat, a rajada andaria um clique de cada vez
+    # (~updates x media_ms); por (chat, usuário), ocupa todos os workers.
+    cliques = _gerar(args.updates, args.irmaos, random.Random(17), grupo=True)
+    inicio = time.perf_counter()
+    handler, pool, codigos = await _cenario("pool, anúncio no grupo", cliques, args.conexoes, args.media_ms,
+                                            workers=args.workers)
+    total_s = time.perf_counter() - inicio
+    serial_s = len(cliques) * args.media_ms / 1000
+    assert codigos == {200: len(cliques)}
+    assert _fora_de_ordem(handler) == 0 and handler.sobrepostos == 0
+    assert handler.pico_paralelo > args.workers // 2 and total_s < serial_s / 4
+    print(f"  {args.irmaos} irmãos em um grupo: {total_s:.2f}s (um de cada vez: ~{serial_s:.0f}s)")
+
+    # Back-pressure: fila de 20, handlers 10x mais lentos, espera curta por vaga.
+    rajada = updates[:600]
+    handler, pool, codigos = await _cenario(
+        "pool saturado", rajada, args.conexoes, args.media_ms * 10, workers=4, fila_max=20, espera_s=0.2
+    )
+    st = pool.estatisticas()
+    assert codigos.get(503, 0) == st["recusados"] > 0 and st["esperas_vaga"] > 0 and st["pico_fila"] <= 20
+    aceitos = codigos.get(200, 0)
+    assert sum(len(v) for v in handler.atendidos.values()) == aceitos  # dreno: todo aceito foi processado
+    assert _fora_de_ordem(handler) == 0
+    print(f"  esperas por vaga {st['esperas_vaga']}, recusados {st['recusados']} (503), "
+          f"{aceitos} aceitos e todos processados no dreno")
+
+    # Depois de parar(), novos updates são recusados.
+    assert not await pool.enfileirar(_update(1, 1, 0))
+    print("OK")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--irmaos", type=int, default=300)
+    parser.add_argument("--conexoes", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=20)
+    parser.add_argument("--media-ms", type=float, default=40)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+# scratch/postgrest_local.py
+"""
+PostgREST local em memória para testes de carga offline do repositório assíncrono.
+
+Implementa o subconjunto da API REST usado pelo bot:
+- GET/POST/PATCH/DELETE em /rest/v1/<tabela>
+- filtros `col=op.valor` com eq, neq, gt, gte, lt, lte, like, ilike, is, in
+- `or=(...)` e `and(...)` aninhados, `order`, `limit`, `offset`
+- POST /rest/v1/rpc/<função> para as funções SQL de docs/ (FUNCOES_RPC);
+  função desconhecida responde PGRST202, como o PostgREST
+- latência artificial opcional por requisição (simula a rede até o Supabase)
+
+Uso como fixture (sem rede):
+
+    app = criar_app({"membros": [...]}, latencia_ms=40)
+    configurar_repositorio(base_url="http://postgrest.local", chave="x",
+                           transport=httpx.ASGITransport(app=app))
+
+Uso como servidor:  python scratch/postgrest_local.py --porta 54321
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import fnmatch
+import json
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+# Tabelas cuja PK é bigserial no Supabase: o stub numera as linhas inseridas.
+_TABELAS_COM_ID_SERIAL = {"caixa_saida", "notificacoes_secretario_pendentes"}
+
+_PARAMS_RESERVADOS = {"select", "order", "limit", "offset", "or", "and", "columns", "on_conflict"}
+
+
+def _dividir_topo(texto: str) -> List[str]:
+    """Divide por vírgula respeitando parênteses e aspas."""
+    partes, atual, nivel, aspas = [], [], 0, False
+    for ch in texto:
+        if ch == '"':
+            aspas = not aspas
+        elif not aspas and ch == "(":
+            nivel += 1
+        elif not aspas and ch == ")":
+            nivel -= 1
+        if ch == "," and nivel == 0 and not aspas:
+            partes.append("".join(atual))
+            atual = []
+            continue
+        atual.append(ch)
+    if atual:
+        partes.append("".join(atual))
+    return partes
+
+
+def _valor_lista(texto: str) -> List[str]:
+    interno = texto.strip()[1:-1]
+    return [v.strip().strip('"').replace('\\"', '"') for v in _dividir_topo(interno) if v.strip()]
+
+
+def _comparar(valor: Any, op: str, alvo: str) -> bool:
+    if op == "is":
+        alvo_l = alvo.lower()
+        if alvo_l == "null":
+            return valor is None
+        if alvo_l == "true":
+            return valor is True
+        if alvo_l == "false":
+            return valor is False
+        return False
+    if op == "in":
+        return valor is not None and str(valor) in _valor_lista(alvo)
+    if valor is None:
+        return False
+    atual = str(valor)
+    if op == "eq":
+        return atual == alvo or (isinstance(valor, bool) and str(valor).lower() == alvo.lower())
+    if op == "neq":
+        return atual != alvo
+    if op in ("like", "ilike"):
+        padrao = alvo.replace("%", "*")
+        if op == "ilike":
+            return fnmatch.fnmatchcase(atual.lower(), padrao.lower())
+        return fnmatch.fnmatchcase(atual, padrao)
+    try:
+        a, b = float(atual), float(alvo)
+    except ValueError:
+        a, b = atual, alvo
+    return {"gt": a > b, "gte": a >= b, "lt": a < b, "lte": a <= b}.get(op, False)
+
+
+def _avaliar_condicao(row: Dict[str, Any], expr: str) -> bool:
+    expr = expr.strip()
+    for logico in ("and", "or"):
+        if expr.startswith(f"{logico}(") and expr.endswith(")"):
+            itens = _dividir_topo(expr[len(logico) + 1:-1])
+            resultados = (_avaliar_condicao(row, item) for item in itens)
+            return all(resultados) if logico == "and" else any(resultados)
+    coluna, op, alvo = expr.split(".", 2)
+    negado = op == "not"
+    if negado:
+        op, alvo = alvo.split(".", 1)
+    if op != "in" and len(alvo) >= 2 and alvo[0] == alvo[-1] == '"':
+        alvo = alvo[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    ok = _comparar(row.get(coluna), op, alvo)
+    return not ok if negado else ok
+
+
+def _filtrar(rows: List[Dict[str, Any]], params) -> List[Dict[str, Any]]:
+    condicoes: List[str] = []
+    for chave, valor in params.multi_items():
+        if chave in ("or", "and"):
+            condicoes.append(f"{chave}{valor}")
+        elif chave not in _PARAMS_RESERVADOS:
+            condicoes.append(f"{chave}.{valor}")
+    return [row for row in rows if all(_avaliar_condicao(row, c) for c in condicoes)]
+
+
+def _ordenar_paginar(rows: List[Dict[str, Any]], params) -> List[Dict[str, Any]]:
+    ordem = params.get("order")
+    if ordem:
+        for item in reversed(ordem.split(",")):
+            partes = item.split(".")
+            coluna = partes[0]
+            desc = "desc" in partes[1:]
+            rows = sorted(rows, key=lambda r: (r.get(coluna) is None, r.get(coluna) or ""), reverse=desc)
+    offset = int(params.get("offset") or 0)
+    limite = params.get("limit")
+    rows = rows[offset:]
+    if limite is not None:
+        rows = rows[: int(limite)]
+    return rows
+
+
+def _projetar(rows: List[Dict[str, Any]], select: Optional[str]) -> List[Dict[str, Any]]:
+    if not select or select.strip() == "*":
+        return [dict(r) for r in rows]
+    colunas = [c.strip() for c in select.split(",") if c.strip() and "(" not in c]
+    return [{c: r.get(c) for c in colunas} for r in rows]
+
+
+def _rpc_ia_auditoria_somar(dados: Dict[str, List[Dict[str, Any]]], args: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """docs/supabase_ia_auditoria.sql: soma dos baldes desde `desde`, por (evento, dimensão, valor)."""
+    desde = datetime.fromisoformat(str(args["desde"]))
+    totais: Dict[tuple, int] = defaultdict(int)
+    for row in dados.get("ia_auditoria_horaria", []):
+        if datetime.fromisoformat(str(row["hora"])) >= desde:
+            totais[(row["evento"], row.get("dimensao", ""), row.get("valor", ""))] += int(row.get("total") or 0)
+    return [
+        {"evento": evento, "dimensao": dimensao, "valor": valor, "total": total}
+        for (evento, dimensao, valor), total in totais.items()
+    ]
+
+
+FUNCOES_RPC: Dict[str, Callable[[Dict[str, List[Dict[str, Any]]], Dict[str, Any]], Any]] = {
+    "ia_auditoria_somar": _rpc_ia_auditoria_somar,
+}
+
+
+def criar_app(tabelas: Optional[Dict[str, List[Dict[str, Any]]]] = None, latencia_ms: float = 0.0) -> Starlette:
+    """Cria a aplicação ASGI. `app.state.tabelas` e `app.state.requisicoes` ficam expostos."""
+    dados: Dict[str, List[Dict[str, Any]]] = {k: [dict(r) for r in v] for k, v in (tabelas or {}).items()}
+
+    async def endpoint(request: Request) -> Response:
+        request.app.state.requisicoes += 1
+        if latencia_ms:
+            await asyncio.sleep(latencia_ms / 1000)
+
+        tabela = request.path_params["tabela"]
+        rows = dados.setdefault(tabela, [])
+        params = request.query_params
+
+        if request.method == "GET":
+            filtrados = _ordenar_paginar(_filtrar(rows, params), params)
+            return JSONResponse(_projetar(filtrados, params.get("select")))
+
+        if request.method == "POST":
+            corpo = json.loads(await request.body() or b"null")
+            novos = corpo if isinstance(corpo, list) else [corpo]
+            conflito = params.get("on_conflict")
+            ignorar = "ignore-duplicates" in request.headers.get("prefer", "")
+            inseridos = []
+            for novo in novos:
+                if conflito:
+                    chaves = conflito.split(",")
+                    existente = next((r for r in rows if all(r.get(k) == novo.get(k) for k in chaves)), None)
+                    if existente is not None:
+                        if not ignorar:
+                            existente.update(novo)
+                        continue
+                linha = dict(novo)
+                if "id" not in linha and tabela in _TABELAS_COM_ID_SERIAL:
+                    linha["id"] = max((r.get("id") or 0 for r in rows), default=0) + 1
+                rows.append(linha)
+                inseridos.append(linha)
+            if "return=representation" in request.headers.get("prefer", ""):
+                return JSONResponse(inseridos, status_code=201)
+            return Response(status_code=201)
+
+        if request.method == "PATCH":
+            corpo = json.loads(await request.body() or b"{}")
+            for row in _filtrar(rows, params):
+                row.update(corpo)
+            return Response(status_code=204)
+
+        if request.method == "DELETE":
+            removidos = _filtrar(rows, params)
+            alvo = {id(r) for r in removidos}
+            dados[tabela] = [r for r in rows if id(r) not in alvo]
+            if "return=representation" in request.headers.get("prefer", ""):
+                return JSONResponse([dict(r) for r in removidos])
+            return Response(status_code=204)
+
+        return Response(status_code=405)
+
+    async def rpc(request: Request) -> Response:
+        request.app.state.requisicoes += 1
+        if latencia_ms:
+            await asyncio.sleep(latencia_ms / 1000)
+
+        nome = request.path_params["funcao"]
+        funcao = FUNCOES_RPC.get(nome)
+        if funcao is None:
+            return JSONResponse(
+                {
+                    "code": "PGRST202",
+                    "message": f"Could not find the function public.{nome} in the schema cache",
+                    "details": None,
+                    "hint": None,
+                },
+                status_code=404,
+            )
+        args = json.loads(await request.body() or b"{}") or {}
+        return JSONResponse(funcao(dados, args))
+
+    app = Starlette(routes=[
+        Route("/rest/v1/rpc/{funcao}", rpc, methods=["POST"]),
+        Route("/rest/v1/{tabela}", endpoint, methods=["GET", "POST", "PATCH", "DELETE"]),
+    ])
+    app.state.tabelas = dados
+    app.state.requisicoes = 0
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="PostgREST local em memória")
+    parser.add_argument("--porta", type=int, default=54321)
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    uvicorn.run(criar_app(latencia_ms=args.latencia_ms), host="127.0.0.1", port=args.porta, log_level="warning")
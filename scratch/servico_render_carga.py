@@ -0,0 +1,68 @@
+# scratch/servico_render_carga.py
+"""
+Dispara N renders de vigor ao mesmo tempo pelo serviço de render e mede:
+- tempo total;
+- maior atraso do event loop (um tique a cada 50 ms) durante os renders.
+
+Compara RENDER_PROCESSOS=0 (thread) com o pool de processos.
+
+    python scratch/servico_render_carga.py --renders 6 --processos 2
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.render_saida import ImagemRenderizada
+from src.servico_render import ServicoRender
+
+STATS = {
+    "nome_loja": "Loja Teste", "numero_loja": "12", "periodo": "Outubro/2026",
+    "vigor_agenda": 9.5, "acolhimento": 14, "engajamento": 71.0,
+}
+
+
+async def _medir(processos: int, renders: int) -> None:
+    servico = ServicoRender(processos=processos, fila_max=renders)
+    servico.iniciar()
+    if processos:
+        await servico.render("vigor", {"dados_vigor": STATS})  # processos no ar e aquecidos
+
+    atraso_max = 0.0
+    parar = asyncio.Event()
+
+    async def _tique():
+        nonlocal atraso_max
+        while not parar.is_set():
+            t = time.perf_counter()
+            await asyncio.sleep(0.05)
+            atraso_max = max(atraso_max, time.perf_counter() - t - 0.05)
+
+    tique = asyncio.create_task(_tique())
+    inicio = time.perf_counter()
+    imagens = await asyncio.gather(*(servico.render("vigor", {"dados_vigor": STATS}) for _ in range(renders)))
+    total = time.perf_counter() - inicio
+    parar.set()
+    await tique
+    servico.parar()
+    assert all(isinstance(img, ImagemRenderizada) and img.tamanho for img in imagens)
+    kb = sum(img.tamanho for img in imagens) / len(imagens) / 1024
+    modo = f"{processos} processos" if processos else "thread"
+    print(f"{modo:12s} | {renders} renders em {total:5.2f}s ({kb:.0f} KB cada) | "
+          f"maior atraso do loop {atraso_max*1000:6.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--renders", type=int, default=6)
+    parser.add_argument("--processos", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(_medir(0, args.renders))
+    asyncio.run(_medir(args.processos, args.renders))
+
+
+if __name__ == "__main__":
+    main()
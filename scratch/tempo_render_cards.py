@@ -0,0 +1,65 @@
+# scratch/tempo_render_cards.py
+"""
+Mede o tempo de render do card padrão, do card de celebração e do diploma
+antes e depois do preaquecimento de src/render_assets, e o tamanho/tempo
+de codificação de cada um (src/render_saida).
+
+    python scratch/tempo_render_cards.py --repeticoes 5
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src import render_assets, render_saida
+from src.render_cards import render_event_card
+from src.render_diploma import renderizar_diploma
+from src.render_marcos import renderizar_card_celebracao
+
+EVENTO = {
+    "ID Evento": "bench", "Data do evento": "20/11/2026", "Hora": "20:00",
+    "Nome da loja": "Loja Teste", "Número da loja": "12", "Cidade": "Porto Alegre", "UF": "RS",
+    "Grau": "Mestre", "Potência": "GOB", "Rito": "REAA", "Tipo de sessão": "Ordinária",
+    "Observações": "Ordem do dia " * 20,
+}
+MEMBRO = {"Nome": "Irmão Teste", "Grau": "Mestre", "Loja": "Loja Teste 12"}
+
+
+def _medir(rotulo, func, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        t = time.perf_counter()
+        resultado = func()
+        render_saida.registrar_codificacao(getattr(resultado, "imagem", resultado))
+        tempos.append(time.perf_counter() - t)
+    print(f"{rotulo:28s} primeiro {tempos[0]*1000:7.1f} ms | demais {min(tempos[1:] or tempos)*1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticoes", type=int, default=4)
+    args = parser.parse_args()
+
+    renders = (
+        ("card de evento", lambda: render_event_card(EVENTO, {})),
+        ("card de celebração", lambda: renderizar_card_celebracao("marco", "Título", "Sub", "Detalhes")),
+        ("diploma", lambda: renderizar_diploma(MEMBRO, ["ic", "mp"])),
+    )
+    print("-- cache frio")
+    for rotulo, func in renders:
+        _medir(rotulo, func, args.repeticoes)
+
+    render_assets.limpar_cache_assets()
+    t = time.perf_counter()
+    render_assets.preaquecer()
+    print(f"-- preaquecimento: {(time.perf_counter() - t)*1000:.0f} ms")
+    for rotulo, func in renders:
+        _medir(rotulo, func, args.repeticoes)
+    print(render_assets.estatisticas_assets())
+    print(render_saida.estatisticas_codificacao())
+
+
+if __name__ == "__main__":
+    main()
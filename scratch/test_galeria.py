@@ -1,6 +1,7 @@
 # scratch/test_galeria.py
 import os
 import sys
+import tempfile
 from datetime import datetime
 
 # Adiciona o diretorio pai ao sys.path para conseguir importar os modulos
@@ -44,17 +45,19 @@ def run_mock_rendering_test():
     # 2. Disparar renderizacao
     print("🎨 Processando canvas 1200x675 com Pillow...")
     try:
-        caminho_resultado = renderizar_badge_wall(mock_dados, nome_membro, nome_loja)
+        imagem = renderizar_badge_wall(mock_dados, nome_membro, nome_loja)
         
-        if caminho_resultado and os.path.exists(caminho_resultado):
-            tamanho = os.path.getsize(caminho_resultado)
+        if imagem and imagem.tamanho:
+            # O render devolve o buffer em memória; grava uma cópia só para inspeção local.
+            caminho_resultado = os.path.join(tempfile.gettempdir(), f"galeria_teste{imagem.extensao}")
+            with open(caminho_resultado, "wb") as f:
+                f.write(imagem.dados)
             print(f"✅ Sucesso! Quadro gerado em: {caminho_resultado}")
-            print(f"📦 Tamanho do arquivo: {tamanho / 1024:.2f} KB")
+            print(f"📦 Tamanho do arquivo: {imagem.tamanho / 1024:.2f} KB")
             
-            # Em ambiente local, poderíamos manter para inspeção, mas em produção seria excluído
             print(f"💡 Verifique visualmente a composição do arquivo gerado.")
         else:
-            print("❌ Falha crítica: O caminho retornado não existe ou é vazio.")
+            print("❌ Falha crítica: O render retornou um buffer vazio.")
             
     except Exception as e:
         import traceback
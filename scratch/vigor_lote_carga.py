@@ -0,0 +1,296 @@
+# scratch/vigor_lote_carga.py
+"""
+Compara o fechamento mensal de vigor loja a loja (o get_estatisticas_vigor
+antigo, com consultas por loja, + render + envio, como o job antigo) com o
+pipeline em lote (src/vigor_lote sobre src/vigor_estatisticas):
+
+- confere que as estatísticas de cada loja são idênticas nos dois caminhos,
+  no mês anterior e na janela móvel do painel /vigor;
+- mede tempo total, consultas ao banco e o tempo de cada etapa do lote.
+
+Sobe o PostgREST local (scratch/postgrest_local.py) com latência artificial
+e usa um bot falso que só conta as fotos.
+
+    python scratch/vigor_lote_carga.py --lojas 30 --membros 20 --latencia-ms 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+_PORTA = _porta_livre()
+os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{_PORTA}"
+os.environ["SUPABASE_KEY"] = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.x"
+os.environ.setdefault("DESPACHO_INTERVALO_CHAT", "0")
+
+import uvicorn
+
+from scratch.postgrest_local import criar_app
+from src import sheets_supabase, vigor_estatisticas, vigor_lote
+from src.servico_render import obter_servico_render, render
+from src.sheets_supabase import _parse_data_generica, logger, supabase
+
+
+def _vigor_legado(loja_id: str, usar_mes_anterior: bool = False) -> Dict[str, Any]:
+    """get_estatisticas_vigor anterior ao motor colunar (referência, consultas por loja)."""
+    from datetime import datetime, timedelta
+    import statistics
+
+    agora = datetime.now()
+    lid_str = str(loja_id).strip()
+
+    if usar_mes_anterior:
+        primeiro_dia_mes_atual = agora.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        ultimo_dia_mes_anterior = primeiro_dia_mes_atual - timedelta(seconds=1)
+        primeiro_dia_mes_anterior = ultimo_dia_mes_anterior.replace(day=1, hour=0, minute=0, second=0)
+        data_inicio = primeiro_dia_mes_anterior
+        data_fim = ultimo_dia_mes_anterior
+    else:
+        # Janela movel dos ultimos 30 dias ate o futuro proximo
+        data_inicio = agora - timedelta(days=30)
+        data_fim = agora + timedelta(days=60)
+
+    try:
+        # 1. BUSCAR EVENTOS DA LOJA NO PERÍODO
+        resp_ev = supabase.table("eventos") \
+            .select("id_evento, created_at, data_evento") \
+            .eq("loja_id", lid_str) \
+            .eq("status", "Ativo") \
+            .execute()
+
+        eventos_filtrados = []
+        diferencas_dias = []
+
+        for ev in (resp_ev.data or []):
+            data_ev = _parse_data_generica(ev.get("data_evento"))
+            if data_ev and data_inicio <= data_ev <= data_fim:
+                eventos_filtrados.append(ev)
+                
+                # Processamento da Média de Antecedência
+                dt_cre_str = str(ev.get("created_at") or "")[:10]
+                dt_cre = _parse_data_generica(dt_cre_str)
+                if not dt_cre:
+                    try:
+                        dt_cre = datetime.fromisoformat(ev.get("created_at").replace("Z", "+00:00")).replace(tzinfo=None)
+                    except:
+                        continue
+                if data_ev and dt_cre:
+                    diff = (data_ev - dt_cre).days
+                    diferencas_dias.append(max(0, diff))
+
+        vigor_agenda = round(statistics.mean(diferencas_dias), 1) if diferencas_dias else 0.0
+
+        # 2. ÍNDICE DE ACOLHIMENTO (VISITANTES)
+        ids_eventos = [ev["id_evento"] for ev in eventos_filtrados]
+        total_visitantes = 0
+        if ids_eventos:
+            resp_conf = supabase.table("confirmacoes") \
+                .select("telegram_id") \
+                .in_("id_evento", ids_eventos) \
+                .execute()
+            
+            tids = list(set([str(c.get("telegram_id")) for c in (resp_conf.data or []) if c.get("telegram_id")]))
+            
+            if tids:
+                resp_memb = supabase.table("membros") \
+                    .select("telegram_id, loja_id") \
+                    .in_("telegram_id", tids) \
+                    .execute()
+                
+                map_membros = {str(m["telegram_id"]): str(m["loja_id"]).strip() for m in (resp_memb.data or []) if m.get("telegram_id") and m.get("loja_id")}
+                
+                for c in (resp_conf.data or []):
+                    tid = str(c.get("telegram_id"))
+                    m_loja_id = map_membros.get(tid)
+                    # Se o loja_id cadastrado do confirmante difere do loja_id da sessão, é visitante!
+                    if m_loja_id and m_loja_id != lid_str:
+                        total_visitantes += 1
+
+        # 3. TAXA DE ENGAJAMENTO (QUÓRUM)
+        resp_ativos = supabase.table("membros") \
+            .select("telegram_id") \
+            .eq("loja_id", lid_str) \
+            .eq("status", "Ativo") \
+            .execute()
+        
+        ativos_count = len(resp_ativos.data or [])
+        ativos_ids = [str(m.get("telegram_id")) for m in (resp_ativos.data or []) if m.get("telegram_id")]
+        
+        presentes_count = 0
+        if ativos_ids:
+            resp_tot_conf = supabase.table("confirmacoes") \
+                .select("telegram_id, data_hora") \
+                .in_("telegram_id", ativos_ids) \
+                .execute()
+            
+            confirmantes_unicos = set()
+            for c in (resp_tot_conf.data or []):
+                dt_conf = _parse_data_generica(c.get("data_hora"))
+                if not dt_conf:
+                    try:
+                        dt_conf = datetime.fromisoformat(c.get("data_hora").replace("Z", "+00:00")).replace(tzinfo=None)
+                    except:
+                        continue
+                if dt_conf and data_inicio <= dt_conf <= data_fim:
+                    confirmantes_unicos.add(str(c.get("telegram_id")))
+            
+            presentes_count = len(confirmantes_unicos)
+
+        taxa_engajamento = round((presentes_count / ativos_count * 100), 1) if ativos_count > 0 else 0.0
+
+        # 4. CAPTURA METADADOS DA LOJA
+        loja_nome = "Oficina"
+        loja_num = ""
+        resp_loja = supabase.table("lojas").select("nome_loja, numero").eq("id", lid_str).limit(1).execute()
+        if resp_loja.data:
+            loja_nome = resp_loja.data[0].get("nome_loja") or "Oficina"
+            loja_num = resp_loja.data[0].get("numero") or ""
+
+        return {
+            "loja_id": lid_str,
+            "nome_loja": loja_nome,
+            "numero_loja": loja_num,
+            "periodo_inicio": data_inicio.strftime("%d/%m/%Y"),
+            "periodo_fim": data_fim.strftime("%d/%m/%Y"),
+            "vigor_agenda": vigor_agenda,
+            "acolhimento": total_visitantes,
+            "ativos_quadro": ativos_count,
+            "presentes_quadro": presentes_count,
+            "engajamento": taxa_engajamento,
+            "eventos_no_periodo": len(eventos_filtrados)
+        }
+
+    except Exception as e:
+        logger.error("Erro ao calcular estatisticas de vigor para loja %s: %s", lid_str, e)
+        return {
+            "loja_id": lid_str,
+            "nome_loja": "Erro de Leitura",
+            "numero_loja": "",
+            "periodo_inicio": data_inicio.strftime("%d/%m/%Y"),
+            "periodo_fim": data_fim.strftime("%d/%m/%Y"),
+            "vigor_agenda": 0.0,
+            "acolhimento": 0,
+            "ativos_quadro": 0,
+            "presentes_quadro": 0,
+            "engajamento": 0.0,
+            "eventos_no_periodo": 0
+        }
+
+
+class _BotFalso:
+    def __init__(self):
+        self.fotos = 0
+
+    async def send_photo(self, chat_id, photo, **kwargs):
+        photo.read()
+        self.fotos += 1
+
+
+def _dados(qtd_lojas: int, membros_por_loja: int) -> dict:
+    rnd = random.Random(7)
+    inicio, _ = vigor_estatisticas.limites_mes(*vigor_estatisticas.mes_anterior())
+    lojas, membros, eventos, confirmacoes = [], [], [], []
+    for l in range(1, qtd_lojas + 1):
+        lojas.append({"id": str(l), "nome_loja": f"Loja {l}", "numero": str(l), "secretario_responsavel_id": str(900 + l)})
+        for m in range(membros_por_loja):
+            membros.append({
+                "telegram_id": str(l * 1000 + m), "loja_id": str(l),
+                "status": "Ativo" if m % 7 else "Inativo",
+            })
+        for e in range(4):
+            data = inicio + timedelta(days=rnd.randint(0, 27))
+            criado = data - timedelta(days=rnd.randint(0, 30))
+            id_evento = f"ev{l}_{e}"
+            eventos.append({
+                "id_evento": id_evento, "loja_id": str(l), "status": "Ativo",
+                "data_evento": data.strftime("%d/%m/%Y"), "created_at": criado.isoformat() + "Z",
+            })
+            for _ in range(rnd.randint(3, 12)):
+                dono = rnd.randint(1, qtd_lojas)
+                tid = str(dono * 1000 + rnd.randint(0, membros_por_loja - 1))
+                confirmacoes.append({
+                    "id_evento": id_evento, "telegram_id": tid,
+                    "data_hora": (data - timedelta(days=1)).strftime("%d/%m/%Y %H:%M:%S"),
+                })
+    return {"lojas": lojas, "membros": membros, "eventos": eventos, "confirmacoes": confirmacoes}
+
+
+async def _loja_a_loja(bot, lojas):
+    estatisticas = {}
+    with sheets_supabase.contar_consultas() as consultas:
+        for loja in lojas:
+            await asyncio.sleep(0.5)
+            stats = await asyncio.to_thread(_vigor_legado, loja["id"], usar_mes_anterior=True)
+            card = await render("vigor", {"dados_vigor": stats}, espera=None)
+            await bot.send_photo(chat_id=int(loja["secretario_responsavel_id"]), photo=card.arquivo("vigor"))
+            estatisticas[loja["id"]] = stats
+    return estatisticas, dict(consultas)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lojas", type=int, default=30)
+    parser.add_argument("--membros", type=int, default=20)
+    parser.add_argument("--latencia-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    dados = _dados(args.lojas, args.membros)
+    app = criar_app(dados, latencia_ms=args.latencia_ms)
+    servidor = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=_PORTA, log_level="warning"))
+    threading.Thread(target=servidor.run, daemon=True).start()
+    while not servidor.started:
+        time.sleep(0.05)
+
+    async def _tudo():
+        obter_servico_render().iniciar()
+        bot = _BotFalso()
+        t = time.perf_counter()
+        antigo, consultas_antigo = await _loja_a_loja(bot, dados["lojas"])
+        tempo_antigo = time.perf_counter() - t
+
+        t = time.perf_counter()
+        relatorio = await vigor_lote.executar_fechamento_vigor(bot)
+        tempo_lote = time.perf_counter() - t
+
+        novo = {lid: sheets_supabase.get_estatisticas_vigor(lid, usar_mes_anterior=True) for lid in antigo}
+        janela_antiga = {lid: await asyncio.to_thread(_vigor_legado, lid) for lid in antigo}
+        t = time.perf_counter()
+        janela_nova = {lid: sheets_supabase.get_estatisticas_vigor(lid) for lid in antigo}
+        tempo_painel = time.perf_counter() - t
+        obter_servico_render().parar()
+        antigo.update({f"janela:{k}": v for k, v in janela_antiga.items()})
+        novo.update({f"janela:{k}": v for k, v in janela_nova.items()})
+        return antigo, consultas_antigo, tempo_antigo, relatorio, tempo_lote, novo, bot, tempo_painel
+
+    antigo, consultas_antigo, tempo_antigo, relatorio, tempo_lote, novo, bot, tempo_painel = asyncio.run(_tudo())
+    servidor.should_exit = True
+
+    print(f"painel /vigor (todas as lojas, motor em cache): {tempo_painel * 1000:.1f} ms")
+    diferentes = [lid for lid, stats in antigo.items() if novo.get(lid) != stats]
+    print(f"loja a loja: {tempo_antigo:6.1f}s, {sum(consultas_antigo.values())} consultas")
+    print(f"em lote    : {tempo_lote:6.1f}s, {sum(relatorio.consultas.values())} consultas")
+    print(relatorio.texto())
+    print(f"fotos enviadas no total: {bot.fotos}")
+    if diferentes:
+        lid = diferentes[0]
+        raise SystemExit(f"Estatísticas divergentes em {len(diferentes)} lojas, ex. {lid}: {antigo[lid]} != {novo.get(lid)}")
+    print("OK: estatísticas idênticas nos dois caminhos.")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 from typing import Optional
 
@@ -1602,23 +1603,26 @@ async def broadcast_confirmar_disparo(update: Update, context: ContextTypes.DEFA
     msg_text = context.user_data.get("br_msg", "")
     destinatarios = context.user_data.get("br_destinatarios", [])
     
-    sucessos = 0
-    for tid in destinatarios:
-        try:
-            await context.bot.send_message(
-                chat_id=tid,
-                text=f"📢 *Comunicado da Administração*\n\n{msg_text}",
-                parse_mode="Markdown"
-            )
-            sucessos += 1
-        except Exception:
-            pass
+    from src.despachante import MensagemSaida, enviar_em_lote
+    texto = f"📢 *Comunicado da Administração*\n\n{msg_text}"
+    relatorio = await enviar_em_lote(
+        context.bot,
+        [MensagemSaida(tid, texto, rotulo="broadcast") for tid in destinatarios],
+        nome="broadcast_secretarios",
+    )
+
+    detalhes = ""
+    if relatorio.bloqueados:
+        detalhes += f"\n🚫 Bot bloqueado / conversa não iniciada: {relatorio.bloqueados}"
+    if relatorio.falhas:
+        detalhes += f"\n⚠️ Falhas de envio: {relatorio.falhas}"
 
     await navegar_para(
         update, context,
         "Broadcast > Concluído",
         f"✅ *Disparo Finalizado*\n\n"
-        f"Mensagem enviada com sucesso para {sucessos} de {len(destinatarios)} Secretários.",
+        f"Mensagem enviada com sucesso para {relatorio.enviados} de {len(destinatarios)} Secretários."
+        f"{detalhes}",
         InlineKeyboardMarkup([[InlineKeyboardButton("Menu principal", callback_data="area_admin")]])
     )
     return ConversationHandler.END
@@ -1642,6 +1646,69 @@ async def admin_toggle_comunicacao(update: Update, context: ContextTypes.DEFAULT
     )
 
 
+
+async def admin_cache_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Mostra hits, misses e descartes de cada namespace do cache em memória."""
+    user_id = update.effective_user.id
+    if get_nivel(user_id) != "3":
+        return
+
+    from src.cache import estatisticas_cache
+    linhas = ["📊 *Cache em memória*\n"]
+    for st in estatisticas_cache():
+        linhas.append(
+            f"*{st['namespace']}* — {st['entradas']}/{st['max_entradas']} itens, TTL {int(st['ttl'])}s\n"
+            f"  hits {st['hits']} · misses {st['misses']} · taxa {st['taxa_hit'] * 100:.1f}%\n"
+            f"  expirados {st['expirados']} · descartes LRU {st['descartes']}"
+        )
+    if len(linhas) == 1:
+        linhas.append("_Nenhum namespace registrado._")
+
+    await update.message.reply_text("\n".join(linhas), parse_mode="Markdown")
+
+
+async def admin_webhook_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Mostra fila, pico, esperas e recusas do pool de updates do webhook."""
+    user_id = update.effective_user.id
+    if get_nivel(user_id) != "3":
+        return
+
+    from src.pool_updates import obter_pool_updates
+    pool = obter_pool_updates()
+    if pool is None:
+        await update.message.reply_text("Pool de updates desligado (WEBHOOK_WORKERS=0).")
+        return
+
+    st = pool.estatisticas()
+    texto = (
+        "📥 *Pool de updates do webhook*\n\n"
+        f"Workers: {st['workers']} · chats ativos: {st['chats_ativos']}\n"
+        f"Fila: {st['na_fila']}/{st['fila_max']} (pico {st['pico_fila']}) · "
+        f"em processamento: {st['em_processamento']}\n"
+        f"Recebidos {st['recebidos']} · processados {st['processados']} · falhas {st['falhas']}\n"
+        f"Esperas por vaga {st['esperas_vaga']} ({st['segundos_espera_vaga']:.1f}s) · recusados {st['recusados']}\n"
+        f"Tempo na fila: médio {st['segundos_fila_media'] * 1000:.0f} ms · máx. {st['segundos_fila_max'] * 1000:.0f} ms"
+    )
+    await update.message.reply_text(texto, parse_mode="Markdown")
+
+
+async def admin_conquistas_reconstruir(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Backfill do estado incremental das conquistas: /conquistas_reconstruir [telegram_id ...]."""
+    user_id = update.effective_user.id
+    if get_nivel(user_id) != "3":
+        return
+
+    from src.conquistas_estado import reconstruir_estados
+    await update.message.reply_text("⏳ Reconstruindo estados de conquistas a partir do histórico...")
+    try:
+        total = await asyncio.to_thread(reconstruir_estados, context.args or [])
+    except Exception as e:
+        logger.error("Erro ao reconstruir estados de conquistas: %s", e)
+        await update.message.reply_text("❌ Falha ao reconstruir estados de conquistas. Veja o log.")
+        return
+    await update.message.reply_text(f"✅ {total} estados de conquistas reconstruídos.")
+
+
 # HANDLER REGISTRATION
 broadcast_handler = ConversationHandler(
     entry_points=[CallbackQueryHandler(broadcast_inicio, pattern="^admin_broadcast_inicio$")],
@@ -0,0 +1,286 @@
+# src/cache.py
+# ============================================
+# BODE ANDARILHO - MOTOR DE CACHE EM MEMÓRIA
+# ============================================
+#
+# Cache único para os dados lidos do Supabase, organizado em namespaces
+# (membros, eventos, confirmações, lojas...). Cada namespace tem:
+#
+# - TTL próprio;
+# - limite de entradas com descarte LRU (o menos usado sai primeiro);
+# - invalidação por tag (ex.: "evento:<id>" remove todas as chaves ligadas
+#   àquele evento sem varrer o dicionário inteiro);
+# - contadores de hits, misses, expirações e descartes, legíveis em tempo de
+#   execução via estatisticas_cache();
+# - single-flight: misses simultâneos da mesma chave compartilham uma única
+#   busca no backend (obter_ou_carregar / obter_ou_carregar_async). Evita a
+#   avalanche de SELECTs idênticos quando o TTL expira no meio de uma rajada
+#   de cliques em "confirmar".
+#
+# As funções síncronas de sheets_supabase rodam tanto no event loop quanto
+# em threads (asyncio.to_thread), por isso todo acesso é protegido por lock.
+#
+# ============================================
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+# Sentinela para diferenciar "não está no cache" de "valor em cache é None".
+AUSENTE: Any = object()
+
+
+class _Voo:
+    """Busca em andamento para uma chave (single-flight entre threads)."""
+
+    __slots__ = ("concluido", "valor", "erro")
+
+    def __init__(self):
+        self.concluido = threading.Event()
+        self.valor: Any = None
+        self.erro: Optional[BaseException] = None
+
+
+class CacheNamespace:
+    """Namespace de cache com TTL, limite LRU, tags e métricas."""
+
+    def __init__(self, nome: str, ttl: float, max_entradas: int):
+        self.nome = nome
+        self.ttl = float(ttl)
+        self.max_entradas = max(1, int(max_entradas))
+        self._dados: "OrderedDict[Hashable, Tuple[Any, float, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        self._lock = threading.RLock()
+        self._voos: Dict[Hashable, _Voo] = {}
+        self._voos_async: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        # Incrementada a cada invalidação: uma busca iniciada antes dela não
+        # grava o resultado (poderia estar desatualizado).
+        self._geracao = 0
+        self.hits = 0
+        self.misses = 0
+        self.expirados = 0
+        self.descartes = 0
+        self.coalescidos = 0
+
+    def __len__(self) -> int:
+        return len(self._dados)
+
+    @property
+    def geracao(self) -> int:
+        """Muda a cada invalidação; serve para derivar estruturas deste namespace."""
+        return self._geracao
+
+    def __contains__(self, chave: Hashable) -> bool:
+        return self.obter(chave, contar=False) is not AUSENTE
+
+    # ---------- leitura / escrita ----------
+
+    def obter(self, chave: Hashable, contar: bool = True) -> Any:
+        """Retorna o valor em cache ou AUSENTE (expirado conta como miss)."""
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is not None:
+                valor, criado_em, _ = item
+                if time.monotonic() - criado_em < self.ttl:
+                    self._dados.move_to_end(chave)
+                    if contar:
+                        self.hits += 1
+                    return valor
+                self._remover(chave)
+                self.expirados += 1
+            if contar:
+                self.misses += 1
+            return AUSENTE
+
+    def definir(self, chave: Hashable, valor: Any, tags: Iterable[str] = ()) -> None:
+        """Grava o valor, descartando o item menos usado se o limite for atingido."""
+        with self._lock:
+            if chave in self._dados:
+                self._remover(chave)
+            tags_tupla = tuple(dict.fromkeys(tags))
+            self._dados[chave] = (valor, time.monotonic(), tags_tupla)
+            for tag in tags_tupla:
+                self._tags.setdefault(tag, set()).add(chave)
+            while len(self._dados) > self.max_entradas:
+                antiga = next(iter(self._dados))
+                self._remover(antiga)
+                self.descartes += 1
+
+    # ---------- single-flight ----------
+
+    def obter_ou_carregar(
+        self,
+        chave: Hashable,
+        carregar: Callable[[], Any],
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """
+        Retorna o valor em cache ou executa `carregar()` uma única vez por chave,
+        mesmo com várias threads pedindo a mesma chave ao mesmo tempo.
+        Exceções do carregamento são repassadas a todos e nada é gravado.
+        """
+        valor = self.obter(chave)
+        if valor is not AUSENTE:
+            return valor
+
+        with self._lock:
+            valor = self.obter(chave, contar=False)
+            if valor is not AUSENTE:
+                return valor
+            voo = self._voos.get(chave)
+            lider = voo is None
+            if lider:
+                voo = _Voo()
+                self._voos[chave] = voo
+                geracao = self._geracao
+            else:
+                self.coalescidos += 1
+
+        if not lider:
+            voo.concluido.wait()
+            if voo.erro is not None:
+                raise voo.erro
+            return voo.valor
+
+        try:
+            voo.valor = carregar()
+            self._definir_se_atual(chave, voo.valor, tags, geracao)
+            return voo.valor
+        except BaseException as e:
+            voo.erro = e
+            raise
+        finally:
+            with self._lock:
+                self._voos.pop(chave, None)
+            voo.concluido.set()
+
+    async def obter_ou_carregar_async(
+        self,
+        chave: Hashable,
+        carregar: Callable[[], Awaitable[Any]],
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """
+        Versão assíncrona: corrotinas concorrentes na mesma chave aguardam a
+        mesma task. O cancelamento de quem espera não cancela a busca.
+        """
+        valor = self.obter(chave)
+        if valor is not AUSENTE:
+            return valor
+
+        tarefa = self._voos_async.get(chave)
+        if tarefa is None:
+            tarefa = asyncio.ensure_future(carregar())
+            self._voos_async[chave] = tarefa
+            tags_tupla = tuple(tags)
+            geracao = self._geracao
+            tarefa.add_done_callback(lambda t: self._concluir_voo_async(chave, t, tags_tupla, geracao))
+        else:
+            with self._lock:
+                self.coalescidos += 1
+        return await asyncio.shield(tarefa)
+
+    def _concluir_voo_async(
+        self,
+        chave: Hashable,
+        tarefa: "asyncio.Future[Any]",
+        tags: Tuple[str, ...],
+        geracao: int,
+    ) -> None:
+        if self._voos_async.get(chave) is tarefa:
+            del self._voos_async[chave]
+        if tarefa.cancelled() or tarefa.exception() is not None:
+            return
+        self._definir_se_atual(chave, tarefa.result(), tags, geracao)
+
+    def _definir_se_atual(self, chave: Hashable, valor: Any, tags: Iterable[str], geracao: int) -> None:
+        with self._lock:
+            if self._geracao == geracao:
+                self.definir(chave, valor, tags)
+
+    # ---------- invalidação ----------
+
+    def invalidar(self, chave: Hashable) -> None:
+        with self._lock:
+            self._geracao += 1
+            self._remover(chave)
+
+    def invalidar_tag(self, tag: str) -> int:
+        """Remove todas as chaves associadas à tag. Retorna quantas saíram."""
+        with self._lock:
+            self._geracao += 1
+            chaves = list(self._tags.get(tag, ()))
+            for chave in chaves:
+                self._remover(chave)
+            return len(chaves)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._geracao += 1
+            self._dados.clear()
+            self._tags.clear()
+
+    def _remover(self, chave: Hashable) -> None:
+        item = self._dados.pop(chave, None)
+        if item is None:
+            return
+        for tag in item[2]:
+            chaves = self._tags.get(tag)
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._tags[tag]
+
+    # ---------- métricas ----------
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "namespace": self.nome,
+                "entradas": len(self._dados),
+                "max_entradas": self.max_entradas,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expirados": self.expirados,
+                "descartes": self.descartes,
+                "coalescidos": self.coalescidos,
+                "taxa_hit": round(self.hits / consultas, 4) if consultas else 0.0,
+            }
+
+    def zerar_estatisticas(self) -> None:
+        with self._lock:
+            self.hits = self.misses = self.expirados = self.descartes = self.coalescidos = 0
+
+
+_namespaces: Dict[str, CacheNamespace] = {}
+_namespaces_lock = threading.Lock()
+
+
+def namespace(nome: str, ttl: float, max_entradas: int) -> CacheNamespace:
+    """Retorna (criando se preciso) o namespace registrado com este nome."""
+    with _namespaces_lock:
+        ns = _namespaces.get(nome)
+        if ns is None:
+            ns = CacheNamespace(nome, ttl, max_entradas)
+            _namespaces[nome] = ns
+        return ns
+
+
+def obter_namespace(nome: str) -> Optional[CacheNamespace]:
+    return _namespaces.get(nome)
+
+
+def estatisticas_cache() -> List[Dict[str, Any]]:
+    """Métricas de todos os namespaces, em ordem de registro."""
+    return [ns.estatisticas() for ns in list(_namespaces.values())]
+
+
+def limpar_todos() -> None:
+    for ns in list(_namespaces.values()):
+        ns.limpar()
@@ -0,0 +1,521 @@
+# src/caixa_saida.py
+# ============================================
+# BODE ANDARILHO - CAIXA DE SAÍDA PERSISTENTE (OUTBOX)
+# ============================================
+#
+# Os jobs de lembrete rodam dentro do processo do bot. Sem registro do que
+# já foi enviado, um reinício às 08:00:30 perde o lembrete do dia ou, numa
+# reexecução manual, manda tudo em dobro. A caixa de saída separa o envio
+# em duas fases:
+#
+# 1. planejar (barato): o job materializa cada mensagem como uma linha
+#    (job, modelo, referência/evento, destinatário) com chave de
+#    idempotência. Planejar de novo o mesmo dia não cria linhas repetidas.
+# 2. entregar (com limite de taxa): o worker reserva lotes pendentes,
+#    entrega pelo despachante e grava a situação de cada linha.
+#
+# Linhas reservadas ("enviando") cujo prazo de reserva venceu voltam para
+# a fila: se o processo cair no meio do envio, o próximo ciclo retoma de
+# onde parou. O resultado é gravado em pequenos lotes; na pior hipótese um
+# crash reenvia só as mensagens do lote que ainda não foi gravado.
+#
+# Cada reserva conta uma tentativa (inclusive a retomada de reserva
+# vencida): uma mensagem que derruba o processo não volta para sempre.
+# BadRequest é falha definitiva. Mensagens cujo dia de referência já passou
+# do prazo do job (definir_validade; ex.: o lembrete de "amanhã" depois que
+# o dia chegou) são marcadas "expirado" em vez de enviadas.
+#
+# Armazenamento: tabela public.caixa_saida no Supabase
+# (docs/supabase_caixa_saida.sql). Quando a tabela não existe, ou com
+# CAIXA_SAIDA_BACKEND=sqlite, usa um arquivo SQLite local
+# (CAIXA_SAIDA_SQLITE), útil para rodar o bot fora da produção.
+#
+# ============================================
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import pathlib
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from telegram import Bot
+
+from src.despachante import FALHA, REJEITADA, MensagemSaida, RelatorioEnvio, enviar_em_lote
+
+logger = logging.getLogger(__name__)
+
+PENDENTE = "pendente"
+ENVIANDO = "enviando"
+EXPIRADO = "expirado"
+
+_TABELA = "caixa_saida"
+_LOTE_RESERVA = int(os.getenv("CAIXA_SAIDA_LOTE", "200"))
+_PRAZO_RESERVA_S = int(os.getenv("CAIXA_SAIDA_PRAZO_RESERVA_S", "600"))
+_MAX_TENTATIVAS = int(os.getenv("CAIXA_SAIDA_MAX_TENTATIVAS", "3"))
+_LOTE_GRAVACAO = 25  # resultados acumulados antes de gravar a situação no banco
+# Sem prazo definido para o job, a mensagem vale até o fim do dia de referência.
+_VALIDADE_PADRAO = timedelta(hours=float(os.getenv("CAIXA_SAIDA_VALIDADE_PADRAO_H", "24")))
+_validade_por_job: Dict[str, timedelta] = {}
+
+# Fuso dos jobs de lembrete: data_ref, prazo de validade e a janela de
+# recuperação do scheduler usam o mesmo relógio, independente do host.
+FUSO_LOCAL = ZoneInfo("America/Sao_Paulo")
+
+_SQLITE_PADRAO = pathlib.Path(__file__).resolve().parent.parent / "data" / "caixa_saida.sqlite3"
+
+
+def _agora() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def agora_local() -> datetime:
+    """Agora no fuso dos lembretes (America/Sao_Paulo), com tzinfo."""
+    return datetime.now(FUSO_LOCAL)
+
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat(timespec="seconds")
+
+
+def definir_validade(job: str, apos_data_ref: timedelta) -> None:
+    """
+    Prazo das mensagens do job, contado da 00:00 (horário local) do dia de
+    referência (FUSO_LOCAL); depois dele a mensagem é marcada "expirado"
+    sem envio.
+    """
+    _validade_por_job[job] = apos_data_ref
+
+
+def _expirada(linha: dict, agora: datetime) -> bool:
+    try:
+        dia = datetime.strptime(str(linha.get("data_ref") or ""), "%Y-%m-%d").replace(tzinfo=FUSO_LOCAL)
+    except ValueError:
+        return False  # sem dia de referência: não expira
+    return agora >= dia + _validade_por_job.get(linha.get("job") or "", _VALIDADE_PADRAO)
+
+
+def chave_idempotencia(job: str, data_ref: str, msg: MensagemSaida) -> str:
+    """Uma mensagem por (job, dia de referência, modelo|evento, destinatário)."""
+    return f"{job}|{data_ref}|{msg.rotulo}|{msg.chat_id}"
+
+
+def _linha(job: str, data_ref: str, msg: MensagemSaida, agora: str) -> dict:
+    modelo, _, referencia = (msg.rotulo or job).partition("|")
+    return {
+        "chave": chave_idempotencia(job, data_ref, msg),
+        "job": job,
+        "data_ref": data_ref,
+        "modelo": modelo,
+        "referencia": referencia,
+        "chat_id": int(msg.chat_id),
+        "texto": msg.texto,
+        "parse_mode": msg.parse_mode or "",
+        "status": PENDENTE,
+        "tentativas": 0,
+        "ultimo_erro": "",
+        "criado_em": agora,
+        "atualizado_em": agora,
+    }
+
+
+# =========================
+# Armazenamento: Supabase
+# =========================
+
+class _ArmazemSupabase:
+    nome = "supabase"
+
+    def __init__(self):
+        from src.sheets_supabase import supabase
+        self._db = supabase
+
+    def inserir(self, linhas: List[dict]) -> int:
+        resp = (
+            self._db.table(_TABELA)
+            .upsert(linhas, on_conflict="chave", ignore_duplicates=True)
+            .execute()
+        )
+        return len(resp.data or [])
+
+    def reservar(self, job: Optional[str], limite: int, prazo_s: int) -> List[dict]:
+        agora = _agora()
+        consulta = (
+            self._db.table(_TABELA)
+            .select("*")
+            .or_(f"status.eq.{PENDENTE},and(status.eq.{ENVIANDO},reservado_ate.lt.{_iso(agora)})")
+        )
+        if job:
+            consulta = consulta.eq("job", job)
+        linhas = consulta.order("id").limit(limite).execute().data or []
+        # A reserva conta a tentativa: um update por valor atual de tentativas.
+        por_tentativas: Dict[int, List[dict]] = {}
+        for l in linhas:
+            por_tentativas.setdefault(int(l.get("tentativas") or 0), []).append(l)
+        for tentativas, grupo in por_tentativas.items():
+            (
+                self._db.table(_TABELA)
+                .update({
+                    "status": ENVIANDO,
+                    "tentativas": tentativas + 1,
+                    "reservado_ate": _iso(agora + timedelta(seconds=prazo_s)),
+                    "atualizado_em": _iso(agora),
+                })
+                .in_("id", [l["id"] for l in grupo])
+                .execute()
+            )
+            for l in grupo:
+                l["tentativas"] = tentativas + 1
+        return linhas
+
+    def concluir(self, resultados: List[Tuple[int, str, str, int]]) -> None:
+        agora = _iso(_agora())
+        grupos: Dict[Tuple[str, str, int], List[int]] = {}
+        for id_linha, status, erro, tentativas in resultados:
+            grupos.setdefault((status, erro, tentativas), []).append(id_linha)
+        for (status, erro, tentativas), ids in grupos.items():
+            dados = {
+                "status": status,
+                "ultimo_erro": erro[:500],
+                "tentativas": tentativas,
+                "reservado_ate": None,
+                "atualizado_em": agora,
+            }
+            if status not in (PENDENTE, FALHA, EXPIRADO):
+                dados["enviado_em"] = agora
+            self._db.table(_TABELA).update(dados).in_("id", ids).execute()
+
+    def resumo(self, job: Optional[str], data_ref: Optional[str]) -> Dict[str, int]:
+        consulta = self._db.table(_TABELA).select("status")
+        if job:
+            consulta = consulta.eq("job", job)
+        if data_ref:
+            consulta = consulta.eq("data_ref", data_ref)
+        contagem: Dict[str, int] = {}
+        for row in consulta.execute().data or []:
+            contagem[row["status"]] = contagem.get(row["status"], 0) + 1
+        return contagem
+
+    def limpar(self, dias: int) -> int:
+        limite = _iso(_agora() - timedelta(days=dias))
+        resp = (
+            self._db.table(_TABELA)
+            .delete()
+            .lt("criado_em", limite)
+            .neq("status", PENDENTE)
+            .execute()
+        )
+        return len(resp.data or [])
+
+
+# =========================
+# Armazenamento: SQLite local
+# =========================
+
+_SQL_SQLITE = f"""
+create table if not exists {_TABELA} (
+    id integer primary key autoincrement,
+    chave text not null unique,
+    job text not null,
+    data_ref text not null default '',
+    modelo text not null default '',
+    referencia text not null default '',
+    chat_id integer not null,
+    texto text not null,
+    parse_mode text not null default '',
+    status text not null default '{PENDENTE}',
+    tentativas integer not null default 0,
+    ultimo_erro text not null default '',
+    reservado_ate text,
+    criado_em text not null,
+    atualizado_em text not null,
+    enviado_em text
+);
+create index if not exists idx_{_TABELA}_status on {_TABELA} (status, id);
+"""
+
+_COLUNAS = (
+    "chave", "job", "data_ref", "modelo", "referencia", "chat_id", "texto",
+    "parse_mode", "status", "tentativas", "ultimo_erro", "criado_em", "atualizado_em",
+)
+
+
+class _ArmazemSQLite:
+    nome = "sqlite"
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        pathlib.Path(caminho).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.executescript(_SQL_SQLITE)
+
+    def inserir(self, linhas: List[dict]) -> int:
+        sql = (
+            f"insert or ignore into {_TABELA} ({', '.join(_COLUNAS)}) "
+            f"values ({', '.join('?' for _ in _COLUNAS)})"
+        )
+        with self._lock:
+            antes = self._conn.total_changes
+            self._conn.execute("begin")
+            self._conn.executemany(sql, [tuple(l[c] for c in _COLUNAS) for l in linhas])
+            self._conn.execute("commit")
+            return self._conn.total_changes - antes
+
+    def reservar(self, job: Optional[str], limite: int, prazo_s: int) -> List[dict]:
+        agora = _agora()
+        filtro_job = " and job = ?" if job else ""
+        params: list = [PENDENTE, ENVIANDO, _iso(agora)] + ([job] if job else []) + [limite]
+        with self._lock:
+            self._conn.execute("begin immediate")
+            linhas = [
+                dict(r) for r in self._conn.execute(
+                    f"select * from {_TABELA} "
+                    f"where (status = ? or (status = ? and reservado_ate < ?)){filtro_job} "
+                    f"order by id limit ?",
+                    params,
+                )
+            ]
+            self._conn.executemany(
+                f"update {_TABELA} set status = ?, tentativas = tentativas + 1, reservado_ate = ?, "
+                f"atualizado_em = ? where id = ?",
+                [(ENVIANDO, _iso(agora + timedelta(seconds=prazo_s)), _iso(agora), l["id"]) for l in linhas],
+            )
+            self._conn.execute("commit")
+        for l in linhas:
+            l["tentativas"] = int(l.get("tentativas") or 0) + 1
+        return linhas
+
+    def concluir(self, resultados: List[Tuple[int, str, str, int]]) -> None:
+        agora = _iso(_agora())
+        with self._lock:
+            self._conn.execute("begin")
+            self._conn.executemany(
+                f"update {_TABELA} set status = ?, ultimo_erro = ?, tentativas = ?, reservado_ate = null, "
+                f"atualizado_em = ?, enviado_em = case when ? in (?, ?, ?) then enviado_em else ? end "
+                f"where id = ?",
+                [
+                    (status, erro[:500], tentativas, agora, status, PENDENTE, FALHA, EXPIRADO, agora, id_linha)
+                    for id_linha, status, erro, tentativas in resultados
+                ],
+            )
+            self._conn.execute("commit")
+
+    def resumo(self, job: Optional[str], data_ref: Optional[str]) -> Dict[str, int]:
+        filtros, params = [], []
+        if job:
+            filtros.append("job = ?")
+            params.append(job)
+        if data_ref:
+            filtros.append("data_ref = ?")
+            params.append(data_ref)
+        where = f" where {' and '.join(filtros)}" if filtros else ""
+        with self._lock:
+            return {
+                r["status"]: r["qtd"]
+                for r in self._conn.execute(f"select status, count(*) as qtd from {_TABELA}{where} group by status", params)
+            }
+
+    def limpar(self, dias: int) -> int:
+        limite = _iso(_agora() - timedelta(days=dias))
+        with self._lock:
+            cur = self._conn.execute(
+                f"delete from {_TABELA} where criado_em < ? and status != ?", (limite, PENDENTE)
+            )
+            return cur.rowcount
+
+
+# =========================
+# Seleção do armazenamento
+# =========================
+
+_armazem = None
+_armazem_lock = threading.Lock()
+# Um worker de entrega por processo: a reserva no Supabase (select + update)
+# não é atômica, então o job das 08:00 e o worker periódico não correm juntos.
+_entrega_lock = asyncio.Lock()
+
+
+def _erro_tabela_ausente(exc: Exception) -> bool:
+    msg = str(exc or "")
+    return _TABELA in msg and ("PGRST205" in msg or "Could not find the table" in msg)
+
+
+def _usar_sqlite(motivo: Optional[Exception] = None) -> _ArmazemSQLite:
+    global _armazem
+    caminho = os.getenv("CAIXA_SAIDA_SQLITE", str(_SQLITE_PADRAO))
+    with _armazem_lock:
+        if not isinstance(_armazem, _ArmazemSQLite):
+            if motivo is not None:
+                logger.warning(
+                    "Tabela '%s' indisponível no Supabase. Usando SQLite local em %s. Erro original: %s",
+                    _TABELA, caminho, motivo,
+                )
+            _armazem = _ArmazemSQLite(caminho)
+        return _armazem
+
+
+def _obter_armazem():
+    global _armazem
+    if _armazem is None:
+        if os.getenv("CAIXA_SAIDA_BACKEND", "supabase").strip().lower() == "sqlite":
+            return _usar_sqlite()
+        with _armazem_lock:
+            if _armazem is None:
+                _armazem = _ArmazemSupabase()
+    return _armazem
+
+
+def _executar(operacao: str, *args):
+    """Executa a operação no armazenamento atual; cai para o SQLite se a tabela não existir."""
+    armazem = _obter_armazem()
+    try:
+        return getattr(armazem, operacao)(*args)
+    except Exception as e:
+        if isinstance(armazem, _ArmazemSupabase) and _erro_tabela_ausente(e):
+            return getattr(_usar_sqlite(e), operacao)(*args)
+        raise
+
+
+# =========================
+# API pública
+# =========================
+
+def planejar(job: str, mensagens: Iterable[MensagemSaida], data_ref: str) -> int:
+    """
+    Fase 1: materializa as mensagens na caixa de saída. Retorna quantas linhas
+    novas foram criadas (as já planejadas para o mesmo dia são ignoradas).
+    """
+    agora = _iso(_agora())
+    linhas = list({
+        l["chave"]: l for l in (_linha(job, data_ref, m, agora) for m in mensagens)
+    }.values())
+    if not linhas:
+        return 0
+    try:
+        novas = 0
+        for i in range(0, len(linhas), 500):
+            novas += _executar("inserir", linhas[i:i + 500])
+        logger.info("Caixa de saída: %s/%s planejou %d mensagens (%d novas).", job, data_ref, len(linhas), novas)
+        return novas
+    except Exception as e:
+        logger.error("Erro ao planejar mensagens do job %s na caixa de saída: %s", job, e)
+        return 0
+
+
+async def entregar_pendentes(bot: Bot, job: Optional[str] = None, nome: str = "") -> RelatorioEnvio:
+    """
+    Fase 2: drena as linhas pendentes (e reservas vencidas) em lotes, pelo
+    despachante, gravando a situação de cada mensagem. `job` restringe a
+    entrega a um job; sem ele, drena a caixa inteira.
+    """
+    total = RelatorioEnvio(nome=nome or f"caixa_saida:{job or '*'}")
+    async with _entrega_lock:
+        while True:
+            try:
+                linhas = await asyncio.to_thread(_executar, "reservar", job, _LOTE_RESERVA, _PRAZO_RESERVA_S)
+            except Exception as e:
+                logger.error("Erro ao reservar mensagens na caixa de saída: %s", e)
+                break
+            if not linhas:
+                break
+
+            agora = agora_local()
+            descartadas: List[Tuple[int, str, str, int]] = []
+            enviar: List[dict] = []
+            for l in linhas:
+                tentativas = int(l.get("tentativas") or 0)
+                if _expirada(l, agora):
+                    descartadas.append((l["id"], EXPIRADO, "", tentativas))
+                elif tentativas > _MAX_TENTATIVAS:
+                    # Reserva vencida da última tentativa (o processo caiu no envio).
+                    descartadas.append((l["id"], FALHA, l.get("ultimo_erro") or "tentativas esgotadas", tentativas))
+                else:
+                    enviar.append(l)
+            if descartadas:
+                try:
+                    await asyncio.to_thread(_executar, "concluir", descartadas)
+                except Exception as e:
+                    logger.error("Erro ao gravar %d mensagens expiradas/esgotadas na caixa de saída: %s",
+                                 len(descartadas), e)
+                    break
+                expiradas = sum(1 for d in descartadas if d[1] == EXPIRADO)
+                total.expirados += expiradas
+                logger.info("Caixa de saída: %d mensagem(ns) fora do prazo do job, %d sem tentativas restantes.",
+                            expiradas, len(descartadas) - expiradas)
+
+            por_id = {l["id"]: l for l in enviar}
+            mensagens = [
+                MensagemSaida(
+                    chat_id=int(l["chat_id"]),
+                    texto=l["texto"],
+                    parse_mode=l.get("parse_mode") or None,
+                    rotulo=f"{l.get('modelo', '')}|{l.get('referencia', '')}",
+                    ref=l["id"],
+                )
+                for l in enviar
+            ]
+            resultados: List[Tuple[int, str, str, int]] = []
+
+            async def _gravar() -> None:
+                if not resultados:
+                    return
+                lote = resultados[:]
+                resultados.clear()
+                try:
+                    await asyncio.to_thread(_executar, "concluir", lote)
+                except Exception as e:
+                    # Sem gravação, a reserva vence e o lote volta para a fila.
+                    logger.error("Erro ao gravar situação de %d mensagens na caixa de saída: %s", len(lote), e)
+
+            async def _ao_concluir(msg: MensagemSaida, situacao: str, erro: str) -> None:
+                tentativas = int(por_id[msg.ref].get("tentativas") or 0)  # já contada na reserva
+                if situacao == REJEITADA:
+                    situacao = FALHA  # BadRequest: definitiva, não volta para a fila
+                elif situacao == FALHA and tentativas < _MAX_TENTATIVAS:
+                    situacao = PENDENTE  # falha transitória: volta para o próximo ciclo
+                resultados.append((msg.ref, situacao, erro, tentativas))
+                if len(resultados) >= _LOTE_GRAVACAO:
+                    await _gravar()
+
+            relatorio = await enviar_em_lote(bot, mensagens, nome=total.nome, ao_concluir=_ao_concluir)
+            await _gravar()
+
+            total.total += relatorio.total
+            total.enviados += relatorio.enviados
+            total.bloqueados += relatorio.bloqueados
+            total.falhas += relatorio.falhas
+            total.retentativas += relatorio.retentativas
+            total.duracao_s += relatorio.duracao_s
+            total.erros.update(relatorio.erros)
+
+            if (enviar and relatorio.enviados + relatorio.bloqueados == 0) or len(linhas) < _LOTE_RESERVA:
+                # Fila esgotada, ou o lote inteiro falhou (ex.: Telegram fora do ar):
+                # as falhas transitórias ficam para o próximo ciclo do worker.
+                break
+    return total
+
+
+def resumo_caixa_saida(job: Optional[str] = None, data_ref: Optional[str] = None) -> Dict[str, int]:
+    """Contagem de linhas por situação (pendente, enviando, enviado, bloqueado, falha, expirado)."""
+    try:
+        return _executar("resumo", job, data_ref)
+    except Exception as e:
+        logger.error("Erro ao resumir caixa de saída: %s", e)
+        return {}
+
+
+def limpar_caixa_saida(dias: int = 30) -> int:
+    """Remove linhas concluídas com mais de `dias` dias."""
+    try:
+        return _executar("limpar", dias)
+    except Exception as e:
+        logger.error("Erro ao limpar caixa de saída: %s", e)
+        return 0
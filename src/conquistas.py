@@ -2,7 +2,6 @@
 import os
 import logging
 import asyncio
-import re
 from datetime import datetime
 from typing import Optional, Any, Dict, List
 
@@ -136,63 +135,34 @@ async def checar_conquistas_presenca(
     """
     Avalia as conquistas atreladas ao ato de confirmar presença.
     Executado de forma segura e assíncrona.
+
+    registrar_confirmacao já somou a presença ao estado incremental do
+    membro (src.conquistas_estado); aqui só se leem os contadores.
     """
     try:
-        # 1. Iniciado na Colher (Primeiro Ágape)
-        if participacao_agape and "sim" in str(participacao_agape).lower():
-            await checar_e_conceder(user_id, "iniciado_colher", bot)
-            
-        # 2. Andarilho de Marca (Visita a loja diferente)
-        m_loja = str(membro_dict.get("Loja", membro_dict.get("loja", ""))).strip().lower()
-        m_num = str(membro_dict.get("Número da loja", membro_dict.get("numero_loja", ""))).strip()
-        
-        e_loja = str(evento_dict.get("Nome da loja", evento_dict.get("nome_loja", ""))).strip().lower()
-        e_num = str(evento_dict.get("Número da loja", evento_dict.get("numero_loja", ""))).strip()
-        
-        eh_visita = False
-        if m_loja and e_loja:
-            if m_loja != e_loja:
-                eh_visita = True
-            elif m_num and e_num and m_num != e_num and m_num != "0":
-                eh_visita = True
-                
-        if eh_visita:
-            await checar_e_conceder(user_id, "andarilho_marca", bot)
-            
-        # 3. Mestre das Sete Fronteiras (7 cidades visitadas)
-        from src.sheets_supabase import buscar_confirmacoes_membro, listar_eventos
-        
-        confirmacoes = await buscar_confirmacoes_membro(user_id)
-        if not confirmacoes:
+        from src.conquistas_estado import obter_estado
+
+        estado = await asyncio.to_thread(obter_estado, user_id)
+        if estado is None:
             return
-            
-        ids_eventos_visitados = {str(c.get("ID Evento") or c.get("id_evento")) for c in confirmacoes}
-        
-        # Adiciona o evento atual caso ainda não esteja retornado pelo DB
-        id_ev_atual = str(evento_dict.get("ID Evento") or evento_dict.get("id_evento") or evento_dict.get("id", ""))
-        if id_ev_atual:
-            ids_eventos_visitados.add(id_ev_atual)
-            
-        # Pull all events to map cities
-        def _fetch_ev():
-            return listar_eventos(include_passados=True)
-        all_events = await asyncio.to_thread(_fetch_ev)
-        
-        cidades_visitadas = set()
-        for ev in all_events:
-            ev_id = str(ev.get("ID Evento") or ev.get("id_evento") or ev.get("id", ""))
-            if ev_id in ids_eventos_visitados:
-                oriente = str(ev.get("Oriente", "")).strip().split("/")[0].title()
-                if oriente and oriente not in ("Não Informado", ""):
-                    cidades_visitadas.add(oriente)
-                    
-        if len(cidades_visitadas) >= 7:
-            await checar_e_conceder(user_id, "sete_fronteiras", bot)
-            
+        await _conceder_devidas(user_id, estado, bot)
+
     except Exception as e:
         logger.error("Erro em checar_conquistas_presenca para user %s: %s", user_id, e)
 
 
+async def _conceder_devidas(user_id: int, estado: Any, bot: Any, extras: Optional[List[str]] = None) -> None:
+    """Concede as conquistas atingidas e ainda não concedidas; memoriza no estado."""
+    from src.conquistas_estado import conquistas_devidas, marcar_concedidas
+
+    pendentes = conquistas_devidas(estado) + [s for s in (extras or []) if s not in estado.concedidas]
+    if not pendentes:
+        return
+    concedidas = [slug for slug in pendentes if await checar_e_conceder(user_id, slug, bot)]
+    if concedidas:
+        await asyncio.to_thread(marcar_concedidas, user_id, concedidas)
+
+
 # ============================================
 # GATILHOS COLETIVOS (EXPANSÃO)
 # ============================================
@@ -317,158 +287,29 @@ async def checar_aniversarios_cadastro(bot: Any) -> None:
 
 async def verificar_novas_conquistas(user_id: int, bot: Any) -> None:
     """
-    Executa a varredura agregada de estatisticas de presencas,
-    cidades, UFs e prazos para outorgar automaticamente novas medalhas.
+    Confere as medalhas de estatística de presenças (sobre o estado
+    incremental do membro), de prazo de cadastro e de perfil da sede para
+    outorgar automaticamente novas medalhas.
     Invocado transparente e assincronamente antes da abertura de Perfil.
     """
     try:
-        from src.sheets_supabase import (
-            buscar_membro,
-            buscar_confirmacoes_membro,
-            supabase,
-            _row_to_sheets
-        )
-        
+        from src.conquistas_estado import obter_estado
+        from src.sheets_supabase import buscar_loja_por_id, buscar_membro
+
         uid = int(float(user_id))
         membro = buscar_membro(uid)
         if not membro:
             return
-            
-        # 1. Buscar Historico de Confirmacoes
-        confirmacoes = await buscar_confirmacoes_membro(uid)
-        if not confirmacoes:
-            confirmacoes = []
-            
-        # 2. Buscar Metadados dos Eventos confirmados
-        eventos = []
-        ids_eventos = list({c.get("ID Evento") or c.get("id_evento") for c in confirmacoes if c.get("ID Evento") or c.get("id_evento")})
-        if ids_eventos:
-            def _fetch_evs():
-                resp = supabase.table("eventos").select("*").in_("id_evento", ids_eventos).execute()
-                return [_row_to_sheets("eventos", r) for r in (resp.data or [])]
-            eventos = await asyncio.to_thread(_fetch_evs)
-            
-        # 3. Buscar Lojas vinculadas a esses eventos
-        lojas_visitadas_db = []
-        ids_lojas = list({str(ev.get("ID da loja") or ev.get("loja_id")) for ev in eventos if ev.get("ID da loja") or ev.get("loja_id")})
-        if ids_lojas:
-            def _fetch_lojas():
-                resp = supabase.table("lojas").select("*").in_("id", ids_lojas).execute()
-                return [_row_to_sheets("lojas", r) for r in (resp.data or [])]
-            lojas_visitadas_db = await asyncio.to_thread(_fetch_lojas)
-            
-        # 4. Buscar Loja Sede do membro
-        loja_sede = None
-        loja_sede_id = membro.get("loja_id") or membro.get("ID da loja")
-        if loja_sede_id:
-            def _fetch_sede():
-                resp = supabase.table("lojas").select("*").eq("id", loja_sede_id).execute()
-                if resp.data:
-                    return _row_to_sheets("lojas", resp.data[0])
-                return None
-            loja_sede = await asyncio.to_thread(_fetch_sede)
-            
-        # ==========================================
-        # APURAÇÃO E AGREGAÇÃO DE CONJUNTOS
-        # ==========================================
-        
-        # AGAPES
-        contagem_agape = sum(1 for c in confirmacoes if "sim" in str(c.get("Ágape") or c.get("agape") or "").lower())
-        
-        # LOJAS
-        lojas_visitadas_set = set()
-        for ev in eventos:
-            lid = str(ev.get("ID da loja") or ev.get("loja_id") or "").strip()
-            if lid:
-                lojas_visitadas_set.add(lid)
-            else:
-                nome_l = str(ev.get("Nome da loja") or ev.get("nome_loja") or "").strip().lower()
-                if nome_l:
-                    lojas_visitadas_set.add(nome_l)
-                    
-        # CIDADES (ORIENTES)
-        cidades_visitadas = set()
-        for ev in eventos:
-            ori = str(ev.get("Oriente") or ev.get("oriente") or "").strip()
-            # Limpa e extrai a cidade
-            cid = ori.split("-")[0].split("/")[0].strip().title()
-            if cid and cid not in ("Nao Informado", "Não Informado", ""):
-                cidades_visitadas.add(cid)
-                
-        # UFS, RITOS E POTÊNCIAS
-        ufs_visitados = set()
-        ritos_visitados = set()
-        potencias_visitadas = set()
-        
-        for lj in lojas_visitadas_db:
-            uf = str(lj.get("Estado UF") or lj.get("estado_uf") or "").strip().upper()
-            if uf: ufs_visitados.add(uf)
-            rit = str(lj.get("Rito") or lj.get("rito") or "").strip().upper()
-            if rit: ritos_visitados.add(rit)
-            pot = str(lj.get("Potência") or lj.get("potencia") or "").strip().upper()
-            if pot: potencias_visitadas.add(pot)
-            
-        # Fallbacks via parsing de strings para resiliencia legada
-        for ev in eventos:
-            ori = str(ev.get("Oriente") or ev.get("oriente") or "").strip().upper()
-            m_uf = re.search(r"[-\/]\s*([A-Z]{2})$", ori)
-            if m_uf:
-                ufs_visitados.add(m_uf.group(1))
-                
-            rit = str(ev.get("Rito") or ev.get("rito") or "").strip().upper()
-            if rit: ritos_visitados.add(rit)
-            
-            pot = str(ev.get("Potência") or ev.get("potencia") or "").strip().upper()
-            if pot: potencias_visitadas.add(pot)
-            
-        # ==========================================
-        # VERIFICAÇÃO INDIVIDUAL DE REGRAS
-        # ==========================================
-        
-        # 🥄 IC: Iniciado na Colher (Count Agape >= 1)
-        if contagem_agape >= 1:
-            await checar_e_conceder(uid, "ic", bot)
-            
-        # 🍷 OG: Cavaleiro do Garfo (Count Agape >= 15)
-        if contagem_agape >= 15:
-            await checar_e_conceder(uid, "og", bot)
-            
-        # 📍 MP: Mestre de Marca (Lojas distintas >= 5)
-        if len(lojas_visitadas_set) >= 5:
-            await checar_e_conceder(uid, "mp", bot)
-            
-        # 🌍 E9: Eleito dos Nove Orientes (Cidades >= 9)
-        if len(cidades_visitadas) >= 9:
-            await checar_e_conceder(uid, "e9", bot)
-            
-        # 🛣️ CE: Cavaleiro da Estrada (UFs distintas >= 3)
-        if len(ufs_visitados) >= 3:
-            await checar_e_conceder(uid, "ce", bot)
-            
-        # 🌹 RC: Rosa-Cruz das Visitações (Ritos distintos >= 3)
-        if len(ritos_visitados) >= 3:
-            await checar_e_conceder(uid, "rc", bot)
-            
-        # 👑 RS: Principe do Real Segredo (GOB, CMSB e COMAB)
-        tem_gob = any("GOB" in p for p in potencias_visitadas)
-        tem_cmsb = any("CMSB" in p or "GL" in p for p in potencias_visitadas) # CMSB costuma ter GL (Grandes Lojas)
-        tem_comab = any("COMAB" in p or "GOP" in p for p in potencias_visitadas) # COMAB/GOP
-        if tem_gob and tem_cmsb and tem_comab:
-            await checar_e_conceder(uid, "rs", bot)
-            
-        # 🏰 PJ: Principe de Jerusalem (Distancia > 200km - Heuristica UF diferente)
-        if loja_sede:
-            sede_uf = str(loja_sede.get("Estado UF") or loja_sede.get("estado_uf") or "").strip().upper()
-            if sede_uf:
-                for lj in lojas_visitadas_db:
-                    v_uf = str(lj.get("Estado UF") or lj.get("estado_uf") or "").strip().upper()
-                    if v_uf and v_uf != sede_uf:
-                        await checar_e_conceder(uid, "pj", bot)
-                        break
-                        
+
+        estado = await asyncio.to_thread(obter_estado, uid)
+        if estado is None:
+            return
+
+        extras: List[str] = []
+
         # ⏳ NA: Noaquita do Asfalto (Data Cadastro >= 365 dias)
         data_cad_str = membro.get("Data de cadastro") or membro.get("data_cadastro")
-        if data_cad_str:
+        if data_cad_str and "na" not in estado.concedidas:
             dt_cad = None
             for fmt in ("%d/%m/%Y", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
                 try:
@@ -476,22 +317,38 @@ async def verificar_novas_conquistas(user_id: int, bot: Any) -> None:
                     break
                 except:
                     pass
-            if dt_cad:
-                if (datetime.now() - dt_cad).days >= 365:
-                    await checar_e_conceder(uid, "na", bot)
-                    
-        # 💼 IO: Intendente das Oficinas (Secretario com perfil 100% preenchido)
+            if dt_cad and (datetime.now() - dt_cad).days >= 365:
+                extras.append("na")
+
+        # Loja Sede só é lida se ainda houver medalha que dependa dela.
         nivel = str(membro.get("Nivel") or membro.get("nivel") or "1").strip()
-        if nivel in ("2", "2.5", "3") and loja_sede:
-            end = str(loja_sede.get("Endereço") or loja_sede.get("endereco") or "").strip()
-            cep = str(loja_sede.get("CEP") or loja_sede.get("cep") or "").strip()
-            cid = str(loja_sede.get("Cidade") or loja_sede.get("cidade") or "").strip()
-            uf = str(loja_sede.get("Estado UF") or loja_sede.get("estado_uf") or "").strip()
-            rit = str(loja_sede.get("Rito") or loja_sede.get("rito") or "").strip()
-            pot = str(loja_sede.get("Potência") or loja_sede.get("potencia") or "").strip()
-            if all([end, cep, cid, uf, rit, pot]):
-                await checar_e_conceder(uid, "io", bot)
-                
+        precisa_pj = "pj" not in estado.concedidas and bool(estado.ufs_loja)
+        precisa_io = "io" not in estado.concedidas and nivel in ("2", "2.5", "3")
+        loja_sede_id = membro.get("loja_id") or membro.get("ID da loja")
+        loja_sede = None
+        if loja_sede_id and (precisa_pj or precisa_io):
+            loja_sede = await asyncio.to_thread(buscar_loja_por_id, loja_sede_id)
+
+        if loja_sede:
+            sede_uf = str(loja_sede.get("Estado UF") or loja_sede.get("estado_uf") or "").strip().upper()
+
+            # 🏰 PJ: Principe de Jerusalem (Distancia > 200km - Heuristica UF diferente)
+            if precisa_pj and estado.visitou_fora_da_uf(sede_uf):
+                extras.append("pj")
+
+            # 💼 IO: Intendente das Oficinas (Secretario com perfil 100% preenchido)
+            if precisa_io:
+                end = str(loja_sede.get("Endereço") or loja_sede.get("endereco") or "").strip()
+                cep = str(loja_sede.get("CEP") or loja_sede.get("cep") or "").strip()
+                cid = str(loja_sede.get("Cidade") or loja_sede.get("cidade") or "").strip()
+                rit = str(loja_sede.get("Rito") or loja_sede.get("rito") or "").strip()
+                pot = str(loja_sede.get("Potência") or loja_sede.get("potencia") or "").strip()
+                if all([end, cep, cid, sede_uf, rit, pot]):
+                    extras.append("io")
+
+        # 🥄 IC, 🍷 OG, 📍 MP, 🌍 E9, 🛣️ CE, 🌹 RC, 👑 RS: regras de presença do estado
+        await _conceder_devidas(uid, estado, bot, extras)
+
     except Exception as e:
         logger.error("Erro em verificar_novas_conquistas para %s: %s", user_id, e)
 
@@ -564,17 +421,15 @@ async def menu_galeria_medalhas(update: Any, context: Any) -> None:
     """
     from telegram import InlineKeyboardButton, InlineKeyboardMarkup
     from src.bot import navegar_para
-    from src.sheets_supabase import buscar_membro, get_galeria_completa
+    from src.galeria_cache import obter_galeria
     
     query = update.callback_query
     if query:
         await query.answer()
         
     user_id = update.effective_user.id
-    membro = buscar_membro(user_id)
-    loja_id = membro.get("loja_id") or membro.get("ID da loja")
-    
-    galeria = get_galeria_completa(user_id, loja_id)
+    pronta = await obter_galeria(user_id)
+    galeria = pronta.dados if pronta else {}
     individuais = galeria.get("conquistas_individuais", [])
     
     texto = "🎖️ *Minhas Medalhas Individuais*\n\n"
@@ -602,17 +457,15 @@ async def menu_galeria_oficina(update: Any, context: Any) -> None:
     """
     from telegram import InlineKeyboardButton, InlineKeyboardMarkup
     from src.bot import navegar_para
-    from src.sheets_supabase import buscar_membro, get_galeria_completa
+    from src.galeria_cache import obter_galeria
     
     query = update.callback_query
     if query:
         await query.answer()
         
     user_id = update.effective_user.id
-    membro = buscar_membro(user_id)
-    loja_id = membro.get("loja_id") or membro.get("ID da loja")
-    
-    galeria = get_galeria_completa(user_id, loja_id)
+    pronta = await obter_galeria(user_id)
+    galeria = pronta.dados if pronta else {}
     marcos_of = galeria.get("marcos_oficina", [])
     marcos_exp = galeria.get("marcos_expansao", [])
     
@@ -657,35 +510,36 @@ async def menu_gerar_quadro(update: Any, context: Any) -> None:
             pass
             
     user_id = update.effective_user.id
-    from src.sheets_supabase import buscar_membro, get_galeria_completa
+    from src.galeria_cache import obter_galeria
     
-    membro = buscar_membro(user_id)
-    nome_membro = membro.get("Nome") or membro.get("nome") or "Obreiro"
-    loja_id = membro.get("loja_id") or membro.get("ID da loja")
-    
-    dados = get_galeria_completa(user_id, loja_id)
+    pronta = await obter_galeria(user_id)
+    dados = pronta.dados if pronta else {}
+    nome_membro = dados.get("nome_membro", "Obreiro")
     nome_loja = dados.get("nome_loja", "Oficina")
     
-    from src.render_marcos import renderizar_badge_wall
+    from src.servico_render import render
     from telegram import InlineKeyboardButton, InlineKeyboardMarkup
     
     try:
-        caminho_png = renderizar_badge_wall(dados, nome_membro, nome_loja)
+        imagem = await render("badge_wall", {
+            "dados_conquistas": dados,
+            "nome_membro": nome_membro,
+            "nome_loja": nome_loja,
+        })
         
-        if caminho_png and os.path.exists(caminho_png):
+        if imagem and imagem.dados:
             teclado = InlineKeyboardMarkup([
                 [InlineKeyboardButton("🔙 Voltar à Galeria", callback_data="abrir_galeria")]
             ])
             
-            with open(caminho_png, "rb") as photo:
-                msg_enviada = await context.bot.send_photo(
-                    chat_id=user_id,
-                    photo=photo,
-                    caption="📜 *Quadro de Honra e Sala de Troféus*\n\n"
-                            "Obreiro autenticado e lacrado com o selo de autenticidade digital.",
-                    parse_mode="Markdown",
-                    reply_markup=teclado
-                )
+            msg_enviada = await context.bot.send_photo(
+                chat_id=user_id,
+                photo=imagem.arquivo("quadro_honra"),
+                caption="📜 *Quadro de Honra e Sala de Troféus*\n\n"
+                        "Obreiro autenticado e lacrado com o selo de autenticidade digital.",
+                parse_mode="Markdown",
+                reply_markup=teclado
+            )
                 
             # Regista no rastreador para navegacao limpa
             from src.bot import estado_mensagens, TIPO_RESULTADO
@@ -695,12 +549,6 @@ async def menu_gerar_quadro(update: Any, context: Any) -> None:
                 "message_id": msg_enviada.message_id,
                 "content_hash": None
             }
-            
-            # Clean-up local seguro
-            try:
-                os.remove(caminho_png)
-            except:
-                pass
         else:
             raise FileNotFoundError("Imagem nao gerada.")
             
@@ -0,0 +1,562 @@
+# src/conquistas_estado.py
+# ============================================
+# BODE ANDARILHO - ESTADO INCREMENTAL DAS CONQUISTAS
+# ============================================
+#
+# verificar_novas_conquistas recarregava, a cada abertura de perfil, todas
+# as confirmações do membro, os eventos confirmados com select("*") e as
+# lojas visitadas, e remontava do zero os conjuntos de cidades, UFs, ritos e
+# potências. checar_conquistas_presenca lia a tabela inteira de eventos a
+# cada confirmação de presença.
+#
+# Aqui cada membro tem um EstadoConquistas:
+#
+# - a contribuição de cada evento confirmado (ágape, loja, cidade, UFs,
+#   ritos, potências), guardada por id_evento para que o cancelamento
+#   desfaça exatamente o que a confirmação somou;
+# - contadores por valor (multiconjuntos) de lojas, cidades, UFs, ritos e
+#   potências, e o total de ágapes — as regras do catálogo leem só os
+#   tamanhos, em O(1);
+# - as conquistas já concedidas, para não consultar membro_conquistas a
+#   cada confirmação.
+#
+# registrar_confirmacao / cancelar_confirmacao / cancelar_todas_confirmacoes
+# (src.sheets_supabase) enfileiram a mudança (agendar_atualizacao), aplicada
+# em ordem por uma thread própria, fora do event loop; obter_estado espera
+# as mudanças já enfileiradas antes de ler. O estado é persistido em JSON
+# compacto na tabela public.conquistas_estado
+# (docs/supabase_conquistas_estado.sql), com cópia quente em memória; sem a
+# tabela, fica só em memória e é reconstruído do histórico quando preciso.
+#
+# Backfill: reconstruir_estados() remonta todos os estados a partir do
+# histórico (comando /conquistas_reconstruir ou
+# `python -m src.conquistas_estado [telegram_id ...]`).
+#
+# ============================================
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.cache import AUSENTE, namespace as _cache_namespace
+from src.sheets_supabase import (
+    _TAMANHO_LOTE_IN,
+    _norm_intlike,
+    _norm_text,
+    _selecionar_todos,
+    listar_conquistas_obtidas,
+    supabase,
+)
+
+logger = logging.getLogger(__name__)
+
+_TABELA = "conquistas_estado"
+_VERSAO = 1
+_LOTE_GRAVACAO = 500
+
+_cache_estados = _cache_namespace(
+    "conquistas_estado",
+    float(os.getenv("CONQUISTAS_ESTADO_TTL_S", "900")),
+    int(os.getenv("CACHE_MAX_CONQUISTAS_ESTADO", "5000")),
+)
+# id_evento -> contribuição-modelo (sem ágape); eventos mudam pouco.
+_cache_eventos = _cache_namespace("conquistas_eventos", 600, 2000)
+
+_COLUNAS_EVENTO = "id_evento, loja_id, nome_loja, oriente, rito, potencia"
+_COLUNAS_LOJA = "id, estado_uf, rito, potencia"
+
+# Sem a tabela no Supabase os estados ficam só neste processo.
+_estados_em_memoria: Dict[int, str] = {}
+_tabela_indisponivel = False
+_tabela_alertada = False
+
+# Membros cuja atualização incremental falhou: o próximo acesso reconstrói.
+_pendentes_reconstrucao: Set[int] = set()
+
+# Reentrante: _atualizar reconstrói o estado sem soltar a trava do membro.
+_travas: Dict[int, threading.RLock] = {}
+_travas_guarda = threading.Lock()
+
+# Mudanças vindas das escritas de confirmação: uma thread, na ordem em que chegaram.
+_ESPERA_ATUALIZACOES_S = float(os.getenv("CONQUISTAS_ESPERA_ATUALIZACOES_S", "10"))
+_executor_atualizacoes = ThreadPoolExecutor(max_workers=1, thread_name_prefix="conquistas_estado")
+_ultima_atualizacao: Optional[Future] = None
+_atualizacoes_guarda = threading.Lock()
+
+
+def _trava(tid: int) -> threading.RLock:
+    with _travas_guarda:
+        trava = _travas.get(tid)
+        if trava is None:
+            trava = _travas[tid] = threading.RLock()
+        return trava
+
+
+def _tid(telegram_id: Any) -> Optional[int]:
+    alvo = _norm_intlike(telegram_id)
+    return int(alvo) if alvo else None
+
+
+# =========================
+# Contribuição de um evento
+# =========================
+
+_UF_ORIENTE = re.compile(r"[-\/]\s*([A-Z]{2})$")
+_CIDADES_VAZIAS = ("Nao Informado", "Não Informado", "")
+
+
+def eh_agape(valor: Any) -> bool:
+    """Ágape confirmado: "Confirmada (...)" (fluxo atual) ou "Sim" (legado)."""
+    texto = str(valor or "").strip().lower()
+    return texto.startswith("confirmad") or "sim" in texto
+
+
+def _cidade(oriente: str) -> str:
+    cidade = oriente.split("-")[0].split("/")[0].strip().title()
+    return "" if cidade in _CIDADES_VAZIAS else cidade
+
+
+def contribuicao_evento(evento: Dict[str, Any], loja: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    O que um evento soma ao estado (sem o ágape), a partir das linhas cruas
+    de `eventos` e `lojas`. Mesmas regras da antiga varredura completa.
+    """
+    loja = loja or {}
+    oriente = _norm_text(evento.get("oriente"))
+
+    lid = _norm_text(evento.get("loja_id"))
+    chave_loja = lid or _norm_text(evento.get("nome_loja")).lower()
+
+    ufs: Set[str] = set()
+    uf_loja = _norm_text(loja.get("estado_uf")).upper()
+    if uf_loja:
+        ufs.add(uf_loja)
+    m_uf = _UF_ORIENTE.search(oriente.upper())
+    if m_uf:
+        ufs.add(m_uf.group(1))
+
+    ritos = {r for r in (_norm_text(x).upper() for x in (loja.get("rito"), evento.get("rito"))) if r}
+    potencias = {p for p in (_norm_text(x).upper() for x in (loja.get("potencia"), evento.get("potencia"))) if p}
+
+    contrib = {
+        "l": chave_loja,
+        "c": _cidade(oriente),
+        "u": sorted(ufs),
+        "ul": uf_loja,
+        "r": sorted(ritos),
+        "p": sorted(potencias),
+    }
+    return {k: v for k, v in contrib.items() if v}
+
+
+def _com_agape(modelo: Dict[str, Any], agape: Any) -> Dict[str, Any]:
+    return {**modelo, "a": 1} if eh_agape(agape) else dict(modelo)
+
+
+# =========================
+# Estado por membro
+# =========================
+
+class EstadoConquistas:
+    """Contribuições por evento + multiconjuntos derivados + conquistas concedidas."""
+
+    def __init__(self, telegram_id: int):
+        self.telegram_id = telegram_id
+        self.eventos: Dict[str, Dict[str, Any]] = {}
+        self.concedidas: Set[str] = set()
+        self.agapes = 0
+        self.lojas: Counter = Counter()
+        self.cidades: Counter = Counter()
+        self.ufs: Counter = Counter()
+        self.ufs_loja: Counter = Counter()
+        self.ritos: Counter = Counter()
+        self.potencias: Counter = Counter()
+
+    def _aplicar(self, contrib: Dict[str, Any], sinal: int) -> None:
+        self.agapes += sinal * int(bool(contrib.get("a")))
+        for contador, valores in (
+            (self.lojas, [contrib.get("l")]),
+            (self.cidades, [contrib.get("c")]),
+            (self.ufs, contrib.get("u") or []),
+            (self.ufs_loja, [contrib.get("ul")]),
+            (self.ritos, contrib.get("r") or []),
+            (self.potencias, contrib.get("p") or []),
+        ):
+            for valor in valores:
+                if not valor:
+                    continue
+                contador[valor] += sinal
+                if contador[valor] <= 0:
+                    del contador[valor]
+
+    def adicionar(self, id_evento: str, contrib: Dict[str, Any]) -> None:
+        """Soma a contribuição do evento (substitui a anterior, se houver)."""
+        self.remover(id_evento)
+        self.eventos[id_evento] = contrib
+        self._aplicar(contrib, +1)
+
+    def remover(self, id_evento: str) -> bool:
+        contrib = self.eventos.pop(id_evento, None)
+        if contrib is None:
+            return False
+        self._aplicar(contrib, -1)
+        return True
+
+    def visitou_fora_da_uf(self, sede_uf: str) -> bool:
+        """Alguma loja visitada com UF cadastrada diferente da UF da sede."""
+        sede_uf = (sede_uf or "").strip().upper()
+        if not sede_uf or not self.ufs_loja:
+            return False
+        return len(self.ufs_loja) > 1 or sede_uf not in self.ufs_loja
+
+    def para_json(self) -> str:
+        return json.dumps(
+            {"v": _VERSAO, "ev": self.eventos, "ok": sorted(self.concedidas)},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def de_json(cls, telegram_id: int, bruto: Any) -> "EstadoConquistas":
+        dados = json.loads(bruto) if isinstance(bruto, str) else (bruto or {})
+        estado = cls(telegram_id)
+        for id_evento, contrib in (dados.get("ev") or {}).items():
+            estado.adicionar(str(id_evento), contrib)
+        estado.concedidas = set(dados.get("ok") or [])
+        return estado
+
+
+# =========================
+# Regras (catálogo de src.conquistas)
+# =========================
+
+def _rs(e: EstadoConquistas) -> bool:
+    pots = e.potencias
+    return (
+        any("GOB" in p for p in pots)
+        and any("CMSB" in p or "GL" in p for p in pots)      # CMSB costuma ter GL (Grandes Lojas)
+        and any("COMAB" in p or "GOP" in p for p in pots)
+    )
+
+
+REGRAS_PRESENCA: List[Tuple[str, Callable[[EstadoConquistas], bool]]] = [
+    ("ic", lambda e: e.agapes >= 1),
+    ("og", lambda e: e.agapes >= 15),
+    ("mp", lambda e: len(e.lojas) >= 5),
+    ("e9", lambda e: len(e.cidades) >= 9),
+    ("ce", lambda e: len(e.ufs) >= 3),
+    ("rc", lambda e: len(e.ritos) >= 3),
+    ("rs", _rs),
+]
+
+
+def conquistas_devidas(estado: EstadoConquistas) -> List[str]:
+    """Slugs de presença atingidos e ainda não concedidos."""
+    return [slug for slug, regra in REGRAS_PRESENCA if slug not in estado.concedidas and regra(estado)]
+
+
+# =========================
+# Persistência
+# =========================
+
+def _erro_tabela_ausente(exc: Exception) -> bool:
+    msg = str(exc or "")
+    return _TABELA in msg and ("PGRST205" in msg or "Could not find the table" in msg)
+
+
+def _marcar_tabela_indisponivel(exc: Exception) -> None:
+    global _tabela_indisponivel, _tabela_alertada
+    _tabela_indisponivel = True
+    if not _tabela_alertada:
+        logger.warning(
+            "Tabela '%s' indisponível no Supabase. Estados de conquistas ficam "
+            "em memória até a tabela ser criada. Erro original: %s",
+            _TABELA,
+            exc,
+        )
+        _tabela_alertada = True
+
+
+def _ler(tid: int) -> Optional[EstadoConquistas]:
+    if _tabela_indisponivel:
+        bruto = _estados_em_memoria.get(tid)
+        return EstadoConquistas.de_json(tid, bruto) if bruto else None
+    try:
+        resp = supabase.table(_TABELA).select("estado").eq("telegram_id", tid).limit(1).execute()
+    except Exception as e:
+        if _erro_tabela_ausente(e):
+            _marcar_tabela_indisponivel(e)
+            return _ler(tid)
+        raise
+    if not resp.data:
+        return None
+    return EstadoConquistas.de_json(tid, resp.data[0].get("estado"))
+
+
+def _gravar(estados: List[EstadoConquistas]) -> None:
+    if not estados:
+        return
+    if not _tabela_indisponivel:
+        agora = datetime.now().isoformat(timespec="seconds")
+        linhas = [
+            {"telegram_id": e.telegram_id, "estado": json.loads(e.para_json()), "atualizado_em": agora}
+            for e in estados
+        ]
+        try:
+            for i in range(0, len(linhas), _LOTE_GRAVACAO):
+                supabase.table(_TABELA).upsert(linhas[i:i + _LOTE_GRAVACAO], on_conflict="telegram_id").execute()
+        except Exception as e:
+            if not _erro_tabela_ausente(e):
+                raise
+            _marcar_tabela_indisponivel(e)
+    if _tabela_indisponivel:
+        for e in estados:
+            _estados_em_memoria[e.telegram_id] = e.para_json()
+
+
+def _guardar(estado: EstadoConquistas) -> None:
+    _gravar([estado])
+    _cache_estados.definir(estado.telegram_id, estado)
+
+
+# =========================
+# Leitura de eventos/lojas
+# =========================
+
+def _lojas_por_id(ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    alvo = list(dict.fromkeys(i for i in ids if i))
+    lojas: Dict[str, Dict[str, Any]] = {}
+    for i in range(0, len(alvo), _TAMANHO_LOTE_IN):
+        resp = supabase.table("lojas").select(_COLUNAS_LOJA).in_("id", alvo[i:i + _TAMANHO_LOTE_IN]).execute()
+        for row in resp.data or []:
+            lojas[_norm_text(row.get("id"))] = row
+    return lojas
+
+
+def _contribuicoes_eventos(ids_evento: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """{id_evento: contribuição} com cache; os que faltam vêm em lote (eventos + lojas)."""
+    saida: Dict[str, Dict[str, Any]] = {}
+    faltam: List[str] = []
+    for id_evento in dict.fromkeys(i for i in ids_evento if i):
+        contrib = _cache_eventos.obter(id_evento)
+        if contrib is AUSENTE:
+            faltam.append(id_evento)
+        else:
+            saida[id_evento] = contrib
+
+    eventos: List[Dict[str, Any]] = []
+    for i in range(0, len(faltam), _TAMANHO_LOTE_IN):
+        resp = supabase.table("eventos").select(_COLUNAS_EVENTO).in_("id_evento", faltam[i:i + _TAMANHO_LOTE_IN]).execute()
+        eventos.extend(resp.data or [])
+    lojas = _lojas_por_id(_norm_text(ev.get("loja_id")) for ev in eventos)
+    for ev in eventos:
+        id_evento = _norm_text(ev.get("id_evento"))
+        contrib = contribuicao_evento(ev, lojas.get(_norm_text(ev.get("loja_id"))))
+        _cache_eventos.definir(id_evento, contrib)
+        saida[id_evento] = contrib
+    return saida
+
+
+def _montar_estado(tid: int, confirmacoes: List[Dict[str, Any]], contribs: Dict[str, Dict[str, Any]],
+                   concedidas: Iterable[str]) -> EstadoConquistas:
+    estado = EstadoConquistas(tid)
+    for c in confirmacoes:
+        id_evento = _norm_text(c.get("id_evento"))
+        # Evento apagado: sem modelo, ainda conta o ágape, como na varredura antiga.
+        estado.adicionar(id_evento, _com_agape(contribs.get(id_evento, {}), c.get("agape")))
+    estado.concedidas = {str(s).strip().lower() for s in concedidas if s}
+    return estado
+
+
+# =========================
+# API
+# =========================
+
+def reconstruir_estado(telegram_id: Any) -> Optional[EstadoConquistas]:
+    """Remonta o estado de um membro a partir do histórico e grava."""
+    tid = _tid(telegram_id)
+    if tid is None:
+        return None
+    with _trava(tid):
+        confirmacoes = _selecionar_todos("confirmacoes", "id_evento, agape", ordem=("id",), telegram_id=str(tid))
+        contribs = _contribuicoes_eventos(_norm_text(c.get("id_evento")) for c in confirmacoes)
+        estado = _montar_estado(tid, confirmacoes, contribs, listar_conquistas_obtidas(tid))
+        _guardar(estado)
+        _pendentes_reconstrucao.discard(tid)
+        return estado
+
+
+def obter_estado(telegram_id: Any) -> Optional[EstadoConquistas]:
+    """Estado do membro (memória → tabela → reconstrução do histórico)."""
+    tid = _tid(telegram_id)
+    if tid is None:
+        return None
+    _aguardar_atualizacoes()
+    if tid in _pendentes_reconstrucao:
+        return reconstruir_estado(tid)
+    estado = _cache_estados.obter(tid)
+    if estado is not AUSENTE:
+        return estado
+    try:
+        estado = _ler(tid)
+    except Exception as e:
+        logger.error("Erro ao ler estado de conquistas de %s: %s", tid, e)
+        estado = None
+    if estado is None:
+        return reconstruir_estado(tid)
+    _cache_estados.definir(tid, estado)
+    return estado
+
+
+def _atualizar(telegram_id: Any, mudar: Callable[[EstadoConquistas], bool]) -> None:
+    tid = _tid(telegram_id)
+    if tid is None:
+        return
+    try:
+        # Lê dentro da trava: uma reconstrução em curso termina antes e o
+        # estado lido já é o dela.
+        with _trava(tid):
+            estado = None if tid in _pendentes_reconstrucao else _cache_estados.obter(tid)
+            if estado is AUSENTE:
+                estado = _ler(tid)
+            if estado is None:
+                # Primeiro contato (ou falha anterior): o histórico já inclui a mudança.
+                reconstruir_estado(tid)
+                return
+            if mudar(estado):
+                _guardar(estado)
+    except Exception as e:
+        logger.error("Erro ao atualizar estado de conquistas de %s: %s", tid, e)
+        _cache_estados.invalidar(tid)
+        _pendentes_reconstrucao.add(tid)
+
+
+def _executar_atualizacao(operacao: str, args: Tuple[Any, ...]) -> None:
+    try:
+        globals()[operacao](*args)
+    except Exception as e:
+        logger.error("Erro ao atualizar estado de conquistas (%s): %s", operacao, e)
+
+
+def agendar_atualizacao(operacao: str, *args: Any) -> None:
+    """
+    Enfileira registrar_presenca / remover_presenca / remover_evento para a
+    thread de atualização e retorna na hora (chamado pelas escritas de
+    confirmação, que rodam dentro dos handlers).
+    """
+    global _ultima_atualizacao
+    with _atualizacoes_guarda:
+        _ultima_atualizacao = _executor_atualizacoes.submit(_executar_atualizacao, operacao, args)
+
+
+def _aguardar_atualizacoes() -> None:
+    """Espera as mudanças já enfileiradas (a fila é única e ordenada: basta a última)."""
+    futuro = _ultima_atualizacao
+    if futuro is None or futuro.done() or threading.current_thread().name.startswith("conquistas_estado"):
+        return
+    try:
+        futuro.result(timeout=_ESPERA_ATUALIZACOES_S)
+    except Exception:
+        logger.warning("Atualizações de conquistas ainda pendentes após %.0fs.", _ESPERA_ATUALIZACOES_S)
+
+
+def registrar_presenca(telegram_id: Any, id_evento: Any, agape: Any) -> None:
+    """Soma ao estado a confirmação recém-gravada (chamado por registrar_confirmacao)."""
+    id_ev = _norm_text(id_evento)
+    if not id_ev:
+        return
+
+    def _mudar(estado: EstadoConquistas) -> bool:
+        modelo = _contribuicoes_eventos([id_ev]).get(id_ev, {})
+        estado.adicionar(id_ev, _com_agape(modelo, agape))
+        return True
+
+    _atualizar(telegram_id, _mudar)
+
+
+def remover_presenca(telegram_id: Any, id_evento: Any) -> None:
+    """Desfaz a contribuição do evento (chamado por cancelar_confirmacao)."""
+    id_ev = _norm_text(id_evento)
+    _atualizar(telegram_id, lambda estado: estado.remover(id_ev))
+
+
+def remover_evento(id_evento: Any, telegram_ids: Iterable[Any]) -> None:
+    """Cancelamento de todas as confirmações de um evento."""
+    for tid in telegram_ids:
+        remover_presenca(tid, id_evento)
+
+
+def marcar_concedidas(telegram_id: Any, slugs: Iterable[str]) -> None:
+    novos = {str(s).strip().lower() for s in slugs if s}
+    if not novos:
+        return
+
+    def _mudar(estado: EstadoConquistas) -> bool:
+        if novos <= estado.concedidas:
+            return False
+        estado.concedidas |= novos
+        return True
+
+    _atualizar(telegram_id, _mudar)
+
+
+def reconstruir_estados(telegram_ids: Iterable[Any] = ()) -> int:
+    """
+    Backfill: remonta do histórico o estado de todos os membros com
+    confirmações (ou só dos indicados). Lê cada tabela uma vez, paginada.
+    Retorna quantos estados foram gravados.
+    """
+    alvo = {t for t in (_tid(x) for x in telegram_ids) if t is not None}
+    if alvo and len(alvo) <= 20:
+        return sum(1 for tid in alvo if reconstruir_estado(tid) is not None)
+
+    confirmacoes = _selecionar_todos("confirmacoes", "telegram_id, id_evento, agape", ordem=("id",))
+    eventos = _selecionar_todos("eventos", _COLUNAS_EVENTO, ordem=("id_evento",))
+    lojas = {_norm_text(l.get("id")): l for l in _selecionar_todos("lojas", _COLUNAS_LOJA, ordem=("id",))}
+    obtidas = _selecionar_todos(
+        "membro_conquistas", "user_id, conquista_slug", ordem=("user_id", "conquista_slug")
+    )
+
+    contribs = {
+        _norm_text(ev.get("id_evento")): contribuicao_evento(ev, lojas.get(_norm_text(ev.get("loja_id"))))
+        for ev in eventos
+    }
+    por_membro: Dict[int, List[Dict[str, Any]]] = {}
+    for c in confirmacoes:
+        tid = _tid(c.get("telegram_id"))
+        if tid is not None and (not alvo or tid in alvo):
+            por_membro.setdefault(tid, []).append(c)
+    concedidas: Dict[int, List[str]] = {}
+    for o in obtidas:
+        tid = _tid(o.get("user_id"))
+        if tid in por_membro:
+            concedidas.setdefault(tid, []).append(o.get("conquista_slug"))
+
+    estados = [
+        _montar_estado(tid, confs, contribs, concedidas.get(tid, []))
+        for tid, confs in por_membro.items()
+    ]
+    _gravar(estados)
+    _cache_estados.limpar()
+    _cache_eventos.limpar()
+    logger.info(
+        "Estados de conquistas reconstruídos: %s membros, %s confirmações, %s eventos",
+        len(estados), len(confirmacoes), len(eventos),
+    )
+    return len(estados)
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    total = reconstruir_estados(sys.argv[1:])
+    print(f"{total} estados de conquistas reconstruídos")
@@ -0,0 +1,330 @@
+# src/despachante.py
+# ============================================
+# BODE ANDARILHO - DESPACHANTE DE MENSAGENS EM LOTE
+# ============================================
+#
+# Envio paralelo e com controle de taxa para lembretes, circulares e
+# broadcasts. Respeita os limites do Telegram:
+#
+# - global: ~30 mensagens/s por bot (token bucket compartilhado por todos
+#   os envios do processo);
+# - por chat: ~1 mensagem/s em conversas privadas e ~20/min em grupos.
+#
+# Trata automaticamente:
+# - RetryAfter (flood control): pausa o bucket global pelo tempo pedido e
+#   reenfileira a mensagem;
+# - erros de rede/timeout: nova tentativa com backoff exponencial;
+# - Forbidden (usuário bloqueou o bot / nunca iniciou conversa): conta como
+#   "bloqueado", sem retentativa;
+# - BadRequest (mensagem inválida, chat inexistente): falha permanente,
+#   informada ao `ao_concluir` como "rejeitada" — reenviar não adianta.
+#
+# Mensagens com `foto` (ex.: ImagemRenderizada) saem por send_photo, com o
+# texto como legenda. `enviar_fluxo` aceita uma fonte assíncrona: o envio
+# começa enquanto o produtor (ex.: renders em lote) ainda gera mensagens.
+#
+# Cada execução devolve um RelatorioEnvio (enviados, bloqueados, falhas,
+# retentativas) para os jobs registrarem em log ou exibirem ao admin. Quem
+# precisa do desfecho de cada mensagem (ex.: a caixa de saída) passa
+# `ao_concluir`, chamado com (mensagem, situação, erro) após cada entrega.
+#
+# ============================================
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from telegram import Bot
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TimedOut
+
+logger = logging.getLogger(__name__)
+
+_TAXA_GLOBAL = float(os.getenv("DESPACHO_TAXA_GLOBAL", "25"))        # msg/s (margem abaixo de 30)
+_INTERVALO_CHAT_PRIVADO = float(os.getenv("DESPACHO_INTERVALO_CHAT", "1.0"))   # s entre msgs no mesmo chat
+_INTERVALO_CHAT_GRUPO = float(os.getenv("DESPACHO_INTERVALO_GRUPO", "3.0"))    # ~20/min
+_CONCORRENCIA = int(os.getenv("DESPACHO_CONCORRENCIA", "8"))
+_MAX_TENTATIVAS = int(os.getenv("DESPACHO_MAX_TENTATIVAS", "4"))
+
+
+@dataclass
+class MensagemSaida:
+    """Uma mensagem a ser entregue pelo despachante."""
+
+    chat_id: int
+    texto: str
+    parse_mode: Optional[str] = "Markdown"
+    reply_markup: Any = None
+    rotulo: str = ""  # identificação curta para logs (ex.: "lembrete_24h|EV123")
+    ref: Any = None   # referência livre do chamador (ex.: ID da linha na caixa de saída)
+    foto: Any = None  # objeto com .arquivo(nome) (ImagemRenderizada); texto vira legenda
+
+
+@dataclass
+class RelatorioEnvio:
+    """Resultado de uma execução do despachante."""
+
+    nome: str
+    total: int = 0
+    enviados: int = 0
+    bloqueados: int = 0
+    falhas: int = 0
+    retentativas: int = 0
+    expirados: int = 0  # caixa de saída: fora do prazo, descartados sem envio
+    duracao_s: float = 0.0
+    erros: Dict[int, str] = field(default_factory=dict)  # chat_id -> último erro
+    consultas: Dict[str, int] = field(default_factory=dict)  # tabela -> idas ao banco na preparação
+
+    def resumo(self) -> str:
+        texto = (
+            f"{self.nome}: {self.enviados}/{self.total} enviados, "
+            f"{self.bloqueados} bloqueados, {self.falhas} falhas, "
+            f"{self.retentativas} retentativas em {self.duracao_s:.1f}s"
+        )
+        if self.expirados:
+            texto += f", {self.expirados} expirados"
+        if self.consultas:
+            texto += f", {sum(self.consultas.values())} consultas ({self.consultas})"
+        return texto
+
+
+# Situação final de cada mensagem entregue pelo despachante.
+ENVIADO = "enviado"
+BLOQUEADO = "bloqueado"
+FALHA = "falha"
+REJEITADA = "rejeitada"  # BadRequest: falha permanente (conta em `falhas` no relatório)
+
+AoConcluir = Callable[[MensagemSaida, str, str], Optional[Awaitable[None]]]
+
+
+class TokenBucket:
+    """Token bucket assíncrono; `pausar` bloqueia todos os consumidores (flood control)."""
+
+    def __init__(self, taxa: float, capacidade: Optional[float] = None):
+        self.taxa = max(0.1, float(taxa))
+        self.capacidade = float(capacidade if capacidade is not None else max(1.0, self.taxa))
+        self._tokens = self.capacidade
+        self._atualizado = time.monotonic()
+        self._pausa_ate = 0.0
+        self._lock = asyncio.Lock()
+
+    def pausar(self, segundos: float) -> None:
+        self._pausa_ate = max(self._pausa_ate, time.monotonic() + max(0.0, segundos))
+        self._tokens = 0.0
+
+    async def adquirir(self) -> None:
+        async with self._lock:
+            while True:
+                agora = time.monotonic()
+                if agora < self._pausa_ate:
+                    await asyncio.sleep(self._pausa_ate - agora)
+                    continue
+                self._tokens = min(self.capacidade, self._tokens + (agora - self._atualizado) * self.taxa)
+                self._atualizado = agora
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self.taxa)
+
+
+def _segundos_retry_after(erro: RetryAfter) -> float:
+    valor = erro.retry_after
+    if isinstance(valor, timedelta):
+        return valor.total_seconds()
+    return float(valor)
+
+
+class Despachante:
+    """Envia lotes de mensagens com limite global, limite por chat e concorrência limitada."""
+
+    def __init__(
+        self,
+        taxa_global: float = _TAXA_GLOBAL,
+        intervalo_chat: float = _INTERVALO_CHAT_PRIVADO,
+        intervalo_grupo: float = _INTERVALO_CHAT_GRUPO,
+        concorrencia: int = _CONCORRENCIA,
+        max_tentativas: int = _MAX_TENTATIVAS,
+    ):
+        self.bucket = TokenBucket(taxa_global)
+        self.intervalo_chat = intervalo_chat
+        self.intervalo_grupo = intervalo_grupo
+        self.concorrencia = max(1, int(concorrencia))
+        self.max_tentativas = max(1, int(max_tentativas))
+        self._proximo_por_chat: Dict[int, float] = {}
+
+    async def _aguardar_chat(self, chat_id: int) -> None:
+        intervalo = self.intervalo_grupo if int(chat_id) < 0 else self.intervalo_chat
+        agora = time.monotonic()
+        liberado_em = self._proximo_por_chat.get(chat_id, 0.0)
+        self._proximo_por_chat[chat_id] = max(agora, liberado_em) + intervalo
+        if liberado_em > agora:
+            await asyncio.sleep(liberado_em - agora)
+        if len(self._proximo_por_chat) > 10_000:
+            limite = time.monotonic()
+            self._proximo_por_chat = {k: v for k, v in self._proximo_por_chat.items() if v > limite}
+
+    async def _entregar(self, bot: Bot, msg: MensagemSaida, relatorio: RelatorioEnvio) -> Tuple[str, str]:
+        """Entrega uma mensagem; retorna (situação, erro) com situação em ENVIADO/BLOQUEADO/REJEITADA/FALHA."""
+        for tentativa in range(1, self.max_tentativas + 1):
+            await self._aguardar_chat(msg.chat_id)
+            await self.bucket.adquirir()
+            try:
+                if msg.foto is not None:
+                    await bot.send_photo(
+                        chat_id=msg.chat_id,
+                        photo=msg.foto.arquivo(msg.rotulo.replace("|", "_") or "foto"),
+                        caption=msg.texto,
+                        parse_mode=msg.parse_mode,
+                        reply_markup=msg.reply_markup,
+                    )
+                else:
+                    await bot.send_message(
+                        chat_id=msg.chat_id,
+                        text=msg.texto,
+                        parse_mode=msg.parse_mode,
+                        reply_markup=msg.reply_markup,
+                    )
+                relatorio.enviados += 1
+                return ENVIADO, ""
+            except RetryAfter as e:
+                espera = _segundos_retry_after(e) + 0.5
+                logger.warning("Flood control do Telegram: pausando envios por %.1fs.", espera)
+                self.bucket.pausar(espera)
+                erro = e
+            except Forbidden as e:
+                relatorio.bloqueados += 1
+                relatorio.erros[msg.chat_id] = str(e)
+                return BLOQUEADO, str(e)
+            except BadRequest as e:
+                relatorio.falhas += 1
+                relatorio.erros[msg.chat_id] = str(e)
+                logger.warning("Mensagem rejeitada para %s (%s): %s", msg.chat_id, msg.rotulo, e)
+                return REJEITADA, str(e)
+            except (TimedOut, NetworkError) as e:
+                await asyncio.sleep(min(30.0, 2 ** (tentativa - 1)) + random.uniform(0, 0.5))
+                erro = e
+            except Exception as e:
+                relatorio.falhas += 1
+                relatorio.erros[msg.chat_id] = str(e)
+                logger.error("Erro inesperado ao enviar para %s (%s): %s", msg.chat_id, msg.rotulo, e)
+                return FALHA, str(e)
+
+            if tentativa < self.max_tentativas:
+                relatorio.retentativas += 1
+
+        relatorio.falhas += 1
+        relatorio.erros[msg.chat_id] = str(erro)
+        logger.warning("Desistindo de enviar para %s (%s) após %d tentativas: %s",
+                       msg.chat_id, msg.rotulo, self.max_tentativas, erro)
+        return FALHA, str(erro)
+
+    async def enviar(
+        self,
+        bot: Bot,
+        mensagens: Iterable[MensagemSaida],
+        nome: str = "envio",
+        ao_concluir: Optional[AoConcluir] = None,
+    ) -> RelatorioEnvio:
+        """Entrega todas as mensagens e devolve o relatório da execução."""
+        fila: "asyncio.Queue[MensagemSaida]" = asyncio.Queue()
+        for msg in mensagens:
+            fila.put_nowait(msg)
+
+        relatorio = RelatorioEnvio(nome=nome, total=fila.qsize())
+        if not relatorio.total:
+            return relatorio
+
+        inicio = time.monotonic()
+
+        async def trabalhador() -> None:
+            while True:
+                try:
+                    msg = fila.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await self._entregar_e_notificar(bot, msg, relatorio, ao_concluir)
+
+        await asyncio.gather(*(trabalhador() for _ in range(min(self.concorrencia, relatorio.total))))
+        relatorio.duracao_s = time.monotonic() - inicio
+        logger.info("Despacho concluído — %s", relatorio.resumo())
+        return relatorio
+
+    async def enviar_fluxo(
+        self,
+        bot: Bot,
+        fonte: AsyncIterable[MensagemSaida],
+        nome: str = "envio",
+        ao_concluir: Optional[AoConcluir] = None,
+    ) -> RelatorioEnvio:
+        """
+        Como `enviar`, mas consome uma fonte assíncrona: cada mensagem sai
+        assim que é produzida, respeitando os mesmos limites.
+        """
+        fila: "asyncio.Queue[Optional[MensagemSaida]]" = asyncio.Queue(maxsize=self.concorrencia * 2)
+        relatorio = RelatorioEnvio(nome=nome)
+        inicio = time.monotonic()
+
+        async def produtor() -> None:
+            try:
+                async for msg in fonte:
+                    relatorio.total += 1
+                    await fila.put(msg)
+            finally:
+                for _ in range(self.concorrencia):
+                    await fila.put(None)
+
+        async def trabalhador() -> None:
+            while True:
+                msg = await fila.get()
+                if msg is None:
+                    return
+                await self._entregar_e_notificar(bot, msg, relatorio, ao_concluir)
+
+        await asyncio.gather(produtor(), *(trabalhador() for _ in range(self.concorrencia)))
+        relatorio.duracao_s = time.monotonic() - inicio
+        if relatorio.total:
+            logger.info("Despacho concluído — %s", relatorio.resumo())
+        return relatorio
+
+    async def _entregar_e_notificar(
+        self,
+        bot: Bot,
+        msg: MensagemSaida,
+        relatorio: RelatorioEnvio,
+        ao_concluir: Optional[AoConcluir],
+    ) -> None:
+        situacao, erro = await self._entregar(bot, msg, relatorio)
+        if ao_concluir is not None:
+            try:
+                retorno = ao_concluir(msg, situacao, erro)
+                if asyncio.iscoroutine(retorno):
+                    await retorno
+            except Exception as e:
+                logger.error("Erro no callback de conclusão (%s): %s", msg.rotulo, e)
+
+
+_despachante: Optional[Despachante] = None
+
+
+def obter_despachante() -> Despachante:
+    """Despachante do processo: todos os jobs dividem o mesmo limite global."""
+    global _despachante
+    if _despachante is None:
+        _despachante = Despachante()
+    return _despachante
+
+
+async def enviar_em_lote(
+    bot: Bot,
+    mensagens: Iterable[MensagemSaida],
+    nome: str = "envio",
+    ao_concluir: Optional[AoConcluir] = None,
+) -> RelatorioEnvio:
+    """Atalho para obter_despachante().enviar(...)."""
+    return await obter_despachante().enviar(bot, mensagens, nome=nome, ao_concluir=ao_concluir)
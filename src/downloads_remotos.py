@@ -0,0 +1,260 @@
+# src/downloads_remotos.py
+# ============================================
+# BODE ANDARILHO - DOWNLOADS REMOTOS COM CACHE (TEMPLATES E CARDS ESPECIAIS)
+# ============================================
+#
+# Templates de loja ("Template sessão URL") e cards especiais moram no
+# Supabase Storage. Antes, cada render de uma loja com template próprio
+# baixava o arquivo inteiro de novo com requests.get avulso (sem keep-alive
+# e sem limite de tamanho). Aqui:
+#
+# - uma requests.Session compartilhada, com pool de conexões;
+# - cache em disco por URL (DOWNLOAD_CACHE_DIR), com descarte LRU pelo total
+#   de bytes (DOWNLOAD_CACHE_MAX_MB);
+# - revalidação condicional: If-None-Match / If-Modified-Since com o ETag e
+#   o Last-Modified guardados; 304 reaproveita o arquivo do disco. Dentro de
+#   DOWNLOAD_FRESCOR_S após a última validação nem a revalidação é feita;
+# - limite por objeto (DOWNLOAD_MAX_MB), checado no Content-Length e durante
+#   a leitura em streaming;
+# - falha de conexão ou timeout com cópia em disco serve a cópia (com
+#   aviso); 404/410 apagam a cópia (o objeto foi removido) e os demais
+#   erros HTTP sobem para quem chamou.
+#
+# O cache em disco é compartilhado pelos processos do serviço de render;
+# a imagem decodificada de templates quentes fica em memória via
+# render_assets.abrir_imagem_remota.
+#
+# ============================================
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CACHE_DIR = Path(os.getenv("DOWNLOAD_CACHE_DIR", os.path.join(tempfile.gettempdir(), "bode_download_cache")))
+_MAX_BYTES_CACHE = int(float(os.getenv("DOWNLOAD_CACHE_MAX_MB", "200")) * 1024 * 1024)
+_MAX_BYTES_OBJETO = int(float(os.getenv("DOWNLOAD_MAX_MB", "15")) * 1024 * 1024)
+_FRESCOR_S = float(os.getenv("DOWNLOAD_FRESCOR_S", "300"))
+_TIMEOUT_S = float(os.getenv("DOWNLOAD_TIMEOUT_S", "20"))
+
+
+class DownloadGrandeDemais(ValueError):
+    """Objeto remoto maior que DOWNLOAD_MAX_MB."""
+
+
+@dataclass
+class Download:
+    """Conteúdo de uma URL; `versao` muda sempre que o conteúdo muda."""
+
+    url: str
+    dados: bytes
+    content_type: str
+    versao: str
+    origem: str  # "rede" | "revalidado" | "fresco" | "obsoleto"
+
+
+_sessao: Optional[requests.Session] = None
+_sessao_lock = threading.Lock()
+_disco_lock = threading.Lock()
+_estatisticas: Dict[str, int] = {
+    "rede": 0, "revalidado": 0, "fresco": 0, "obsoleto": 0,
+    "bytes_baixados": 0, "recusados_tamanho": 0, "descartes": 0,
+}
+
+
+def obter_sessao() -> requests.Session:
+    """Session única do processo (keep-alive e pool de conexões)."""
+    global _sessao
+    with _sessao_lock:
+        if _sessao is None:
+            sessao = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=1)
+            sessao.mount("http://", adaptador)
+            sessao.mount("https://", adaptador)
+            _sessao = sessao
+        return _sessao
+
+
+# ---------- cache em disco ----------
+
+def _caminhos(url: str) -> tuple[Path, Path]:
+    chave = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return DOWNLOAD_CACHE_DIR / f"{chave}.bin", DOWNLOAD_CACHE_DIR / f"{chave}.json"
+
+
+def _ler_disco(url: str) -> Optional[tuple[Dict[str, Any], bytes]]:
+    dados_path, meta_path = _caminhos(url)
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        dados = dados_path.read_bytes()
+    except (OSError, ValueError):
+        return None
+    if meta.get("url") != url or meta.get("tamanho") != len(dados):
+        return None
+    try:
+        os.utime(dados_path)  # marca como usado recentemente (poda por mtime)
+    except OSError:
+        pass
+    return meta, dados
+
+
+def _gravar_atomico(caminho: Path, conteudo: bytes) -> None:
+    tmp = caminho.with_name(f"{caminho.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(conteudo)
+    os.replace(tmp, caminho)
+
+
+def _gravar_meta(url: str, meta: Dict[str, Any]) -> None:
+    _, meta_path = _caminhos(url)
+    try:
+        _gravar_atomico(meta_path, json.dumps(meta).encode("utf-8"))
+    except OSError as e:
+        logger.debug("Falha ao atualizar metadados do download %s: %s", url, e)
+
+
+def _gravar_disco(url: str, meta: Dict[str, Any], dados: bytes) -> None:
+    dados_path, meta_path = _caminhos(url)
+    try:
+        DOWNLOAD_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _gravar_atomico(dados_path, dados)
+        _gravar_atomico(meta_path, json.dumps(meta).encode("utf-8"))
+    except OSError as e:
+        logger.warning("Não foi possível guardar %s no cache de downloads: %s", url, e)
+        return
+    _podar()
+
+
+def _apagar_disco(url: str) -> None:
+    dados_path, meta_path = _caminhos(url)
+    with _disco_lock:
+        try:
+            dados_path.unlink(missing_ok=True)
+            meta_path.unlink(missing_ok=True)
+        except OSError as e:
+            logger.debug("Falha ao apagar %s do cache de downloads: %s", url, e)
+
+
+def _podar() -> None:
+    """Remove os arquivos menos usados até caber em DOWNLOAD_CACHE_MAX_MB."""
+    with _disco_lock:
+        try:
+            arquivos = sorted(DOWNLOAD_CACHE_DIR.glob("*.bin"), key=lambda p: p.stat().st_mtime)
+            total = sum(p.stat().st_size for p in arquivos)
+            for antigo in arquivos:
+                if total <= _MAX_BYTES_CACHE:
+                    break
+                total -= antigo.stat().st_size
+                antigo.unlink(missing_ok=True)
+                antigo.with_suffix(".json").unlink(missing_ok=True)
+                _estatisticas["descartes"] += 1
+        except OSError as e:
+            logger.debug("Falha ao podar cache de downloads: %s", e)
+
+
+# ---------- download ----------
+
+def _ler_limitado(resp: requests.Response, url: str, max_bytes: int) -> bytes:
+    declarado = resp.headers.get("content-length")
+    if declarado and declarado.isdigit() and int(declarado) > max_bytes:
+        raise DownloadGrandeDemais(f"{url}: {int(declarado)} bytes (limite {max_bytes}).")
+    partes = []
+    total = 0
+    for parte in resp.iter_content(chunk_size=64 * 1024):
+        total += len(parte)
+        if total > max_bytes:
+            raise DownloadGrandeDemais(f"{url}: mais de {max_bytes} bytes.")
+        partes.append(parte)
+    return b"".join(partes)
+
+
+def baixar(url: str, timeout: float = _TIMEOUT_S, max_bytes: int = _MAX_BYTES_OBJETO) -> Download:
+    """
+    Conteúdo da URL, do cache em disco quando ainda válido.
+
+    Levanta DownloadGrandeDemais acima de `max_bytes`, requests.HTTPError
+    nas respostas de erro e a exceção do requests se a conexão falhar sem
+    cópia em disco.
+    """
+    em_disco = _ler_disco(url)
+    if em_disco is not None:
+        meta, dados = em_disco
+        if time.time() - float(meta.get("validado_em", 0)) < _FRESCOR_S:
+            _estatisticas["fresco"] += 1
+            return Download(url, dados, meta.get("content_type", ""), meta["versao"], "fresco")
+
+    # Condicional só com a cópia em disco: um 304 precisa ter o que reaproveitar.
+    cabecalhos = {}
+    if em_disco is not None:
+        meta, _ = em_disco
+        if meta.get("etag"):
+            cabecalhos["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            cabecalhos["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        with obter_sessao().get(url, headers=cabecalhos, timeout=timeout, stream=True) as resp:
+            if resp.status_code == 304:
+                if em_disco is None:
+                    # Sem corpo e sem cópia: não há conteúdo para devolver nem guardar.
+                    raise requests.HTTPError(f"{url}: 304 sem cópia em disco.", response=resp)
+                meta, dados = em_disco
+                meta["validado_em"] = time.time()
+                _gravar_meta(url, meta)
+                _estatisticas["revalidado"] += 1
+                return Download(url, dados, meta.get("content_type", ""), meta["versao"], "revalidado")
+            if resp.status_code in (404, 410) and em_disco is not None:
+                _apagar_disco(url)
+                logger.info("%s removido na origem (HTTP %d); cópia em disco descartada.", url, resp.status_code)
+            resp.raise_for_status()
+            dados = _ler_limitado(resp, url, max_bytes)
+            content_type = resp.headers.get("content-type", "")
+            etag = resp.headers.get("etag", "")
+            last_modified = resp.headers.get("last-modified", "")
+    except DownloadGrandeDemais:
+        _estatisticas["recusados_tamanho"] += 1
+        raise
+    except (requests.ConnectionError, requests.Timeout) as e:
+        if em_disco is None:
+            raise
+        meta, dados = em_disco
+        logger.warning("Falha ao revalidar %s (%s); usando a cópia em disco.", url, e)
+        _estatisticas["obsoleto"] += 1
+        return Download(url, dados, meta.get("content_type", ""), meta["versao"], "obsoleto")
+
+    versao = hashlib.sha256(dados).hexdigest()
+    _gravar_disco(url, {
+        "url": url,
+        "etag": etag,
+        "last_modified": last_modified,
+        "content_type": content_type,
+        "versao": versao,
+        "tamanho": len(dados),
+        "validado_em": time.time(),
+    }, dados)
+    _estatisticas["rede"] += 1
+    _estatisticas["bytes_baixados"] += len(dados)
+    return Download(url, dados, content_type, versao, "rede")
+
+
+def limpar_cache_downloads() -> None:
+    with _disco_lock:
+        for arquivo in DOWNLOAD_CACHE_DIR.glob("*"):
+            arquivo.unlink(missing_ok=True)
+
+
+def estatisticas_downloads() -> Dict[str, int]:
+    """Contadores do processo: origem de cada download, bytes e recusas."""
+    return dict(_estatisticas)
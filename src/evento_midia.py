@@ -1,18 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import logging
-import mimetypes
 import os
 import tempfile
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, Optional
 
-import requests
 from telegram import InputMediaPhoto
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes
 
-from src.render_cards import render_event_card
+from src.cache import AUSENTE, namespace as _cache_namespace
+from src.downloads_remotos import baixar
+from src.render_saida import ImagemRenderizada
+from src.servico_render import render
+from src.render_cards import card_hash_visual
 from src.sheets_supabase import (
     atualizar_evento,
     buscar_loja_por_id,
@@ -24,15 +29,35 @@ logger = logging.getLogger(__name__)
 
 BUCKET_EVENT_CARDS = os.getenv("SUPABASE_EVENT_CARDS_BUCKET", "event-cards")
 CAPTION_PUBLICACAO_VISUAL = "Confirme sua presença pelos botões abaixo."
+# Cache de renders por hash visual: prévia + publicação custam um render só,
+# e edições em campos que não aparecem no card não renderizam nada.
+RENDER_CACHE_DIR = Path(os.getenv("RENDER_CACHE_DIR", os.path.join(tempfile.gettempdir(), "bode_render_cache")))
+RENDER_CACHE_MAX_ARQUIVOS = int(os.getenv("RENDER_CACHE_MAX_ARQUIVOS", "300"))
+
+# file_id devolvido pelo Telegram por hash visual. Cobre o que ainda não foi
+# persistido no evento (ex.: prévia no privado seguida da publicação no grupo);
+# file_ids valem para qualquer chat do mesmo bot.
+_cache_file_ids = _cache_namespace("card_file_ids", 7 * 24 * 3600, 500)
+
+# Contadores dos envios de card (publicação, prévia e edição).
+_estatisticas_envio: Dict[str, int] = {
+    "envios": 0,
+    "por_file_id": 0,
+    "uploads": 0,
+    "bytes_enviados": 0,
+    "file_id_recusados": 0,
+}
 
 
 @dataclass
 class MidiaEvento:
     modo: str
-    path: Optional[str] = None
+    imagem: Optional[ImagemRenderizada] = None
     url: str = ""
     file_id: str = ""
     erro: str = ""
+    hash_visual: str = ""
+    bytes_enviados: int = 0
 
 
 def _norm(value: Any) -> str:
@@ -48,57 +73,194 @@ def obter_loja_evento(evento: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     return buscar_loja_por_nome_numero(evento.get("Nome da loja"), evento.get("Número da loja"))
 
 
-def _baixar_url_para_temp(url: str, prefix: str = "bode_event_card_") -> Optional[str]:
+_EXTENSOES = {".png": "image/png", ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".webp": "image/webp"}
+
+
+def _imagem_de_bytes(dados: bytes, extensao: str, tipo: str) -> ImagemRenderizada:
+    extensao = extensao if extensao in _EXTENSOES else ".jpg"
+    return ImagemRenderizada(dados=dados, extensao=extensao, content_type=_EXTENSOES[extensao], tipo=tipo)
+
+
+def _baixar_card_especial(url: str) -> Optional[ImagemRenderizada]:
+    """Card especial em memória (URL pública ou caminho local)."""
     if not url:
         return None
-    if not url.startswith(("http://", "https://")) and os.path.exists(url):
-        return url
     try:
-        resp = requests.get(url, timeout=25)
-        resp.raise_for_status()
+        if not url.startswith(("http://", "https://")):
+            caminho = Path(url)
+            if not caminho.exists():
+                return None
+            return _imagem_de_bytes(caminho.read_bytes(), caminho.suffix.lower(), "especial")
+        download = baixar(url, timeout=25)
         ext = ".jpg"
-        ctype = resp.headers.get("content-type", "")
+        ctype = download.content_type
         if "png" in ctype:
             ext = ".png"
         elif "webp" in ctype:
             ext = ".webp"
-        path = os.path.join(tempfile.gettempdir(), f"{prefix}{abs(hash(url))}{ext}")
-        with open(path, "wb") as f:
-            f.write(resp.content)
-        return path
+        return _imagem_de_bytes(download.dados, ext, "especial")
     except Exception as e:
         logger.warning("Falha ao baixar card especial %s: %s", url, e)
         return None
 
 
-def preparar_midia_evento(evento: Dict[str, Any]) -> MidiaEvento:
+def _file_id_conhecido(evento: Dict[str, Any], hash_visual: str) -> str:
+    """file_id de um card já enviado com exatamente este visual ("" se nenhum)."""
+    file_id = _norm(evento.get("Card file_id Telegram") or evento.get("card_file_id_telegram"))
+    hash_salvo = _norm(evento.get("Card hash visual") or evento.get("card_hash_visual"))
+    if file_id and hash_salvo == hash_visual:
+        return file_id
+    conhecido = _cache_file_ids.obter(hash_visual)
+    return "" if conhecido is AUSENTE else conhecido
+
+
+async def preparar_midia_evento(evento: Dict[str, Any], usar_file_id: bool = True) -> MidiaEvento:
+    """
+    Decide a mídia do card. Com `usar_file_id`, um card já enviado com o
+    mesmo hash visual volta só com o file_id (sem render nem download).
+    """
     modo = _norm(evento.get("Modo visual") or evento.get("modo_visual"))
     card_especial = _norm(evento.get("Card especial URL") or evento.get("card_especial_url"))
     if modo == "card_especial" and card_especial:
-        path = _baixar_url_para_temp(card_especial, "bode_event_special_")
-        if path:
-            return MidiaEvento(modo="card_especial", path=path, url=card_especial)
+        hash_visual = hashlib.sha256(f"especial|{card_especial}".encode("utf-8")).hexdigest()
+        file_id = _file_id_conhecido(evento, hash_visual) if usar_file_id else ""
+        if file_id:
+            return MidiaEvento(modo="card_especial", url=card_especial, file_id=file_id, hash_visual=hash_visual)
+        imagem = await asyncio.to_thread(_baixar_card_especial, card_especial)
+        if imagem:
+            return MidiaEvento(modo="card_especial", imagem=imagem, url=card_especial, hash_visual=hash_visual)
         return MidiaEvento(modo="texto_fallback", erro="Card especial indisponível.")
 
     loja = obter_loja_evento(evento) or {}
+    modo_render = "template_loja" if loja else "template_padrao"
     try:
-        rendered = render_event_card(evento, loja)
-        modo_render = "template_loja" if loja else "template_padrao"
-        return MidiaEvento(modo=modo_render, path=rendered.path)
+        hash_visual = card_hash_visual(evento, loja)
+        file_id = _file_id_conhecido(evento, hash_visual) if usar_file_id else ""
+        # Com file_id, o buffer do cache (se houver) ainda serve ao Storage e
+        # ao reenvio caso o Telegram recuse o id.
+        imagem = await asyncio.to_thread(_render_em_cache, hash_visual)
+        if file_id:
+            return MidiaEvento(modo=modo_render, imagem=imagem, file_id=file_id, hash_visual=hash_visual)
+        if imagem is None:
+            rendered = await render("evento", {"evento": evento, "loja": loja})
+            imagem = rendered.imagem
+            await asyncio.to_thread(_guardar_render, hash_visual, imagem)
+        return MidiaEvento(modo=modo_render, imagem=imagem, hash_visual=hash_visual)
     except Exception as e:
         logger.warning("Falha ao renderizar card do evento %s: %s", evento.get("ID Evento"), e)
         return MidiaEvento(modo="texto_fallback", erro=str(e))
 
 
+def _render_em_cache(hash_visual: str) -> Optional[ImagemRenderizada]:
+    for extensao in _EXTENSOES:
+        path = RENDER_CACHE_DIR / f"{hash_visual}{extensao}"
+        try:
+            dados = path.read_bytes()
+        except OSError:
+            continue
+        try:
+            os.utime(path)  # marca como usado recentemente (poda por mtime)
+        except OSError:
+            pass
+        return _imagem_de_bytes(dados, extensao, "evento")
+    return None
+
+
+def _guardar_render(hash_visual: str, imagem: ImagemRenderizada) -> None:
+    """Grava o card codificado no cache (uma escrita) e poda os mais antigos."""
+    try:
+        RENDER_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        destino = RENDER_CACHE_DIR / f"{hash_visual}{imagem.extensao}"
+        tmp = destino.with_suffix(destino.suffix + ".tmp")
+        tmp.write_bytes(imagem.dados)
+        os.replace(tmp, destino)
+    except OSError as e:
+        logger.warning("Não foi possível guardar o card no cache de renders: %s", e)
+        return
+    try:
+        arquivos = sorted(
+            (p for p in RENDER_CACHE_DIR.iterdir() if p.suffix in _EXTENSOES),
+            key=lambda p: p.stat().st_mtime,
+        )
+        for antigo in arquivos[: max(0, len(arquivos) - RENDER_CACHE_MAX_ARQUIVOS)]:
+            antigo.unlink(missing_ok=True)
+    except OSError as e:
+        logger.debug("Falha ao podar cache de renders: %s", e)
+
+
+def _file_id_da_mensagem(msg: Any) -> str:
+    photos = getattr(msg, "photo", None) or []
+    return photos[-1].file_id if photos else ""
+
 
-def salvar_render_no_storage(evento: Dict[str, Any], path: str) -> str:
+def _file_id_recusado(erro: BadRequest) -> bool:
+    msg = str(erro).lower()
+    return "wrong file identifier" in msg or "wrong remote file" in msg or "file reference" in msg
+
+
+async def _enviar_midia(
+    evento: Dict[str, Any],
+    midia: MidiaEvento,
+    enviar: Callable[[Any], Awaitable[Any]],
+) -> Any:
+    """
+    Chama `enviar(photo)` com o file_id quando houver; se o Telegram recusar
+    o id (expirado/inválido), cai para o upload da imagem. Registra os bytes
+    enviados em midia.bytes_enviados e nas estatísticas do módulo.
+    """
+    id_evento = evento.get("ID Evento") or "prévia"
+    if midia.file_id:
+        try:
+            msg = await enviar(midia.file_id)
+            _registrar_envio(midia, msg, 0)
+            logger.info("Card do evento %s enviado por file_id (0 bytes).", id_evento)
+            return msg
+        except BadRequest as e:
+            if not _file_id_recusado(e):
+                raise
+            logger.info("file_id do card do evento %s recusado (%s); reenviando a imagem.", id_evento, e)
+            _estatisticas_envio["file_id_recusados"] += 1
+            _cache_file_ids.invalidar(midia.hash_visual)
+            midia.file_id = ""
+            if midia.imagem is None:
+                nova = await preparar_midia_evento(evento, usar_file_id=False)
+                if nova.imagem is None:
+                    raise RuntimeError(nova.erro or "card indisponível para upload") from e
+                midia.imagem = nova.imagem
+
+    msg = await enviar(midia.imagem.arquivo(f"evento_{id_evento}"))
+    tamanho = midia.imagem.tamanho
+    _registrar_envio(midia, msg, tamanho)
+    logger.info("Card do evento %s enviado por upload (%d bytes).", id_evento, tamanho)
+    return msg
+
+
+def _registrar_envio(midia: MidiaEvento, msg: Any, tamanho: int) -> None:
+    midia.bytes_enviados = tamanho
+    _estatisticas_envio["envios"] += 1
+    if tamanho:
+        _estatisticas_envio["uploads"] += 1
+        _estatisticas_envio["bytes_enviados"] += tamanho
+    else:
+        _estatisticas_envio["por_file_id"] += 1
+    file_id = _file_id_da_mensagem(msg)
+    if file_id and midia.hash_visual:
+        _cache_file_ids.definir(midia.hash_visual, file_id)
+
+
+def estatisticas_envio_cards() -> Dict[str, int]:
+    """Envios de card desde o início do processo: por file_id, uploads e bytes."""
+    return dict(_estatisticas_envio)
+
+
+def salvar_render_no_storage(evento: Dict[str, Any], imagem: Optional[ImagemRenderizada]) -> str:
+    """Sobe o mesmo buffer enviado ao Telegram para o Storage público."""
     id_evento = _norm(evento.get("ID Evento") or evento.get("id_evento"))
-    if not id_evento or not path or not os.path.exists(path):
+    if not id_evento or imagem is None or not imagem.dados:
         return ""
-    ext = Path(path).suffix.lower() or ".png"
-    content_type = mimetypes.types_map.get(ext, "image/png")
-    with open(path, "rb") as f:
-        url = upload_storage_publico(BUCKET_EVENT_CARDS, f"eventos/{id_evento}/render{ext}", f.read(), content_type)
+    url = upload_storage_publico(
+        BUCKET_EVENT_CARDS, f"eventos/{id_evento}/render{imagem.extensao}", imagem.dados, imagem.content_type
+    )
     return url or ""
 
 
@@ -109,25 +271,26 @@ async def publicar_evento_no_grupo(
     texto_fallback: str,
     reply_markup,
 ):
-    midia = preparar_midia_evento(evento)
-    if midia.path:
+    midia = await preparar_midia_evento(evento)
+    if midia.imagem or midia.file_id:
         try:
-            with open(midia.path, "rb") as photo:
-                msg = await context.bot.send_photo(
-                    chat_id=chat_id,
-                    photo=photo,
-                    caption=CAPTION_PUBLICACAO_VISUAL,
-                    reply_markup=reply_markup,
-                )
-            photos = getattr(msg, "photo", None) or []
-            file_id = photos[-1].file_id if photos else ""
+            msg = await _enviar_midia(evento, midia, lambda photo: context.bot.send_photo(
+                chat_id=chat_id,
+                photo=photo,
+                caption=CAPTION_PUBLICACAO_VISUAL,
+                reply_markup=reply_markup,
+            ))
+            file_id = _file_id_da_mensagem(msg)
             sync = {
                 "ID Evento": evento.get("ID Evento"),
                 "Modo visual": midia.modo,
                 "Telegram tipo mensagem grupo": "photo",
             }
-            if midia.modo in ("template_loja", "card_especial"):
-                url = salvar_render_no_storage(evento, midia.path)
+            hash_salvo = _norm(evento.get("Card hash visual") or evento.get("card_hash_visual"))
+            url_salva = _norm(evento.get("Card renderizado URL") or evento.get("card_renderizado_url"))
+            render_ja_salvo = bool(midia.hash_visual and midia.hash_visual == hash_salvo and url_salva)
+            if midia.modo in ("template_loja", "card_especial") and midia.imagem and not render_ja_salvo:
+                url = salvar_render_no_storage(evento, midia.imagem)
                 if url:
                     sync["Card renderizado URL"] = url
                     evento["Card renderizado URL"] = url
@@ -136,6 +299,9 @@ async def publicar_evento_no_grupo(
                         evento["Card especial URL"] = url
             if file_id:
                 sync["Card file_id Telegram"] = file_id
+                sync["Card hash visual"] = midia.hash_visual
+                evento["Card file_id Telegram"] = file_id
+                evento["Card hash visual"] = midia.hash_visual
             atualizar_evento(0, sync)
             return msg, "photo"
         except Exception as e:
@@ -162,16 +328,15 @@ async def enviar_previa_evento(
     reply_markup,
     texto_fallback: str,
 ):
-    midia = preparar_midia_evento(evento)
-    if midia.path:
+    midia = await preparar_midia_evento(evento)
+    if midia.imagem or midia.file_id:
         try:
-            with open(midia.path, "rb") as photo:
-                return await context.bot.send_photo(
-                    chat_id=chat_id,
-                    photo=photo,
-                    caption=CAPTION_PUBLICACAO_VISUAL,
-                    reply_markup=reply_markup,
-                )
+            return await _enviar_midia(evento, midia, lambda photo: context.bot.send_photo(
+                chat_id=chat_id,
+                photo=photo,
+                caption=CAPTION_PUBLICACAO_VISUAL,
+                reply_markup=reply_markup,
+            ))
         except Exception as e:
             logger.warning("Falha ao enviar prévia visual; usando texto: %s", e)
     return await context.bot.send_message(
@@ -190,23 +355,30 @@ async def editar_ou_republicar_evento_visual(
     texto_fallback: str,
     reply_markup,
 ) -> bool:
-    midia = preparar_midia_evento(evento)
-    if midia.path:
+    midia = await preparar_midia_evento(evento)
+    if midia.imagem or midia.file_id:
         try:
-            with open(midia.path, "rb") as photo:
-                await context.bot.edit_message_media(
-                    chat_id=chat_id,
-                    message_id=message_id,
-                    media=InputMediaPhoto(photo, caption=CAPTION_PUBLICACAO_VISUAL),
-                    reply_markup=reply_markup,
-                )
-            atualizar_evento(0, {
+            msg = await _enviar_midia(evento, midia, lambda photo: context.bot.edit_message_media(
+                chat_id=chat_id,
+                message_id=message_id,
+                media=InputMediaPhoto(photo, caption=CAPTION_PUBLICACAO_VISUAL),
+                reply_markup=reply_markup,
+            ))
+            sync = {
                 "ID Evento": evento.get("ID Evento"),
                 "Modo visual": midia.modo,
                 "Telegram tipo mensagem grupo": "photo",
-            })
+            }
+            file_id = _file_id_da_mensagem(msg)
+            if file_id:
+                sync["Card file_id Telegram"] = file_id
+                sync["Card hash visual"] = midia.hash_visual
+            atualizar_evento(0, sync)
             return True
         except Exception as e:
+            if "message is not modified" in str(e).lower():
+                # Mesmo file_id e mesmo teclado: o card no grupo já está atualizado.
+                return True
             logger.warning("Falha ao editar card visual do evento %s: %s", evento.get("ID Evento"), e)
 
     try:
@@ -79,6 +79,7 @@ from src.bot import (
     TIPO_RESULTADO
 )
 from src.potencias import formatar_potencia, potencia_de_dados
+from src.indice_eventos import obter_indice_eventos
 from src.evento_midia import editar_ou_republicar_evento_visual, publicar_evento_no_grupo
 
 logger = logging.getLogger(__name__)
@@ -703,7 +704,8 @@ def _eventos_ordenados(eventos: List[dict]) -> List[dict]:
     return [x.evento for x in tmp]
 
 
-def _filtrar_por_periodo(eventos: List[dict], token: str) -> Tuple[str, List[dict]]:
+def _intervalo_periodo(token: str) -> Optional[Tuple[str, date, date]]:
+    """Retorna (título, início, fim) do período do menu, ou None para token desconhecido."""
     hoje = date.today()
 
     if token == TOKEN_SEMANA_ATUAL:
@@ -725,31 +727,9 @@ def _filtrar_por_periodo(eventos: List[dict], token: str) -> Tuple[str, List[dic
         fim = _ultimo_dia_mes(limite_inicio.year, limite_inicio.month)
         titulo = "Sessões — Próximos meses"
     else:
-        return "Sessões", []
-
-    filtrados = []
-    for ev in eventos:
-        data_dt = parse_data_evento(ev.get("Data do evento", ""))
-        if not data_dt:
-            continue
-        d = data_dt.date()
-        if ini <= d <= fim:
-            filtrados.append(ev)
-
-    return titulo, _eventos_ordenados(filtrados)
-
-
-def _filtrar_por_grau(eventos: List[dict], grau_nome: str) -> Tuple[str, List[dict]]:
-    alvo = normalizar_grau_nome(grau_nome)
-    titulo = f"Sessões — Grau — {alvo}"
-
-    filtrados = []
-    for ev in eventos:
-        g = normalizar_grau_nome(str(ev.get("Grau") or "").strip())
-        if g == alvo:
-            filtrados.append(ev)
+        return None
 
-    return titulo, _eventos_ordenados(filtrados)
+    return titulo, ini, fim
 
 
 def _normalizar_rito(valor: Any) -> str:
@@ -757,28 +737,6 @@ def _normalizar_rito(valor: Any) -> str:
     return normalizar_rito(valor) or str(valor or "").strip()
 
 
-def _ritos_disponiveis(eventos: List[dict]) -> List[str]:
-    ritos: List[str] = []
-    for ev in eventos:
-        rito = _normalizar_rito(ev.get("Rito") or ev.get("rito"))
-        if rito and rito not in ritos:
-            ritos.append(rito)
-    return sorted(ritos, key=lambda x: x.lower())
-
-
-def _filtrar_por_rito(eventos: List[dict], rito_nome: str) -> Tuple[str, List[dict]]:
-    alvo = _normalizar_rito(rito_nome)
-    titulo = f"Sessões — Rito — {alvo}"
-
-    filtrados = []
-    for ev in eventos:
-        rito = _normalizar_rito(ev.get("Rito") or ev.get("rito"))
-        if rito.lower() == alvo.lower():
-            filtrados.append(ev)
-
-    return titulo, _eventos_ordenados(filtrados)
-
-
 def _formatar_data_curta(ev: dict) -> str:
     dt = parse_data_evento(ev.get("Data do evento", ""))
     if not dt:
@@ -917,51 +875,37 @@ def _resolver_dados_geo_loja(ev: dict, lojas_map: dict) -> Tuple[str, str]:
     cid = str(ev.get("Oriente") or ev.get("oriente") or "").strip()
     return "", cid
 
-def _ufs_ativas_eventos(eventos: List[dict], lojas_map: dict) -> List[str]:
-    """Retorna lista de UFs com sessões agendadas."""
-    ufs = set()
-    for ev in eventos:
-        uf, _ = _resolver_dados_geo_loja(ev, lojas_map)
-        if uf:
-            ufs.add(uf)
-    return sorted(list(ufs))
-
-def _cidades_ativas_eventos(eventos: List[dict], lojas_map: dict, uf_alvo: str) -> List[str]:
-    """Retorna cidades ativas em uma determinada UF."""
-    cidades = set()
-    uf_alvo = uf_alvo.upper().strip()
-    for ev in eventos:
-        uf, cid = _resolver_dados_geo_loja(ev, lojas_map)
-        if uf == uf_alvo and cid:
-            cidades.add(cid)
-    return sorted(list(cidades), key=lambda x: x.lower())
-
-def _potencias_ativas_eventos(eventos: List[dict]) -> List[str]:
-    """Retorna a lista de potências com eventos ativos."""
-    pots = set()
-    for ev in eventos:
-        p = str(ev.get("Potência") or ev.get("potencia") or "").strip()
-        if p:
-            pots.add(p)
-    return sorted(list(pots), key=lambda x: x.lower())
-
-def _filtrar_por_cidade(eventos: List[dict], lojas_map: dict, uf: str, cidade: str) -> Tuple[str, List[dict]]:
-    titulo = f"Sessões — {cidade} — {uf}"
-    filtrados = []
-    for ev in eventos:
-        ev_uf, ev_cid = _resolver_dados_geo_loja(ev, lojas_map)
-        if ev_uf.upper() == uf.upper() and ev_cid.lower() == cidade.lower():
-            filtrados.append(ev)
-    return titulo, _eventos_ordenados(filtrados)
-
-def _filtrar_por_potencia(eventos: List[dict], potencia_nome: str) -> Tuple[str, List[dict]]:
-    titulo = f"Sessões — Potência — {potencia_nome}"
-    filtrados = []
-    for ev in eventos:
-        p = str(ev.get("Potência") or ev.get("potencia") or "").strip()
-        if p.lower() == potencia_nome.lower():
-            filtrados.append(ev)
-    return titulo, _eventos_ordenados(filtrados)
+
+# ============================================
+# CONSULTAS PELO ÍNDICE EM MEMÓRIA
+# ============================================
+
+def _buscar_por_periodo(token: str) -> Tuple[str, List[dict]]:
+    intervalo = _intervalo_periodo(token)
+    if not intervalo:
+        return "Sessões", []
+    titulo, ini, fim = intervalo
+    return titulo, obter_indice_eventos().intervalo(ini, fim)
+
+
+def _buscar_por_grau(grau_nome: str) -> Tuple[str, List[dict]]:
+    alvo = normalizar_grau_nome(grau_nome)
+    return f"Sessões — Grau — {alvo}", obter_indice_eventos().por_grau(alvo, desde=date.today())
+
+
+def _buscar_por_rito(rito_nome: str) -> Tuple[str, List[dict]]:
+    alvo = _normalizar_rito(rito_nome)
+    return f"Sessões — Rito — {alvo}", obter_indice_eventos().por_rito(alvo, desde=date.today())
+
+
+def _buscar_por_potencia(potencia_nome: str) -> Tuple[str, List[dict]]:
+    filtrados = obter_indice_eventos().por_potencia(potencia_nome, desde=date.today())
+    return f"Sessões — Potência — {potencia_nome}", filtrados
+
+
+def _buscar_por_cidade(uf: str, cidade: str) -> Tuple[str, List[dict]]:
+    filtrados = obter_indice_eventos().por_cidade(uf, cidade, desde=date.today())
+    return f"Sessões — {cidade} — {uf}", filtrados
 
 
 # ============================================
@@ -1454,8 +1398,7 @@ async def mostrar_eventos_por_data(update: Update, context: ContextTypes.DEFAULT
         return
 
     if token_or_data == TOKEN_POR_RITO_MENU:
-        eventos = listar_eventos() or []
-        ritos = _ritos_disponiveis(eventos)
+        ritos = obter_indice_eventos().ritos
         if not ritos:
             await _enviar_ou_editar_mensagem(
                 context, update.effective_user.id, TIPO_RESULTADO,
@@ -1478,9 +1421,7 @@ async def mostrar_eventos_por_data(update: Update, context: ContextTypes.DEFAULT
         return
 
     if token_or_data == TOKEN_POR_LOCALIDADE_MENU:
-        eventos = listar_eventos() or []
-        lojas_map = _lojas_map_cache()
-        ufs = _ufs_ativas_eventos(eventos, lojas_map)
+        ufs = list(obter_indice_eventos().ufs)
         
         if not ufs:
             ufs_todas = buscar_estados_uf()
@@ -1507,8 +1448,7 @@ async def mostrar_eventos_por_data(update: Update, context: ContextTypes.DEFAULT
         return
 
     if token_or_data == TOKEN_POR_POTENCIA_MENU:
-        eventos = listar_eventos() or []
-        potencias = _potencias_ativas_eventos(eventos)
+        potencias = obter_indice_eventos().potencias
         
         if not potencias:
              await _enviar_ou_editar_mensagem(
@@ -1532,10 +1472,8 @@ async def mostrar_eventos_por_data(update: Update, context: ContextTypes.DEFAULT
         )
         return
 
-    eventos = listar_eventos() or []
-
     if token_or_data in (TOKEN_SEMANA_ATUAL, TOKEN_PROXIMA_SEMANA, TOKEN_MES_ATUAL, TOKEN_PROXIMOS_MESES):
-        titulo, filtrados = _filtrar_por_periodo(eventos, token_or_data)
+        titulo, filtrados = _buscar_por_periodo(token_or_data)
 
         if not filtrados:
             registrar_log_busca(encontrou_resultados=False)
@@ -1576,10 +1514,9 @@ async def mostrar_eventos_por_grau(update: Update, context: ContextTypes.DEFAULT
 
     _, data_or_menu, grau_raw = partes
     grau = normalizar_grau_nome(grau_raw)
-    eventos = listar_eventos() or []
 
     if data_or_menu == TOKEN_POR_GRAU_MENU:
-        titulo, filtrados = _filtrar_por_grau(eventos, grau)
+        titulo, filtrados = _buscar_por_grau(grau)
 
         if not filtrados:
             registrar_log_busca(grau=grau, encontrou_resultados=False)
@@ -1619,10 +1556,9 @@ async def mostrar_eventos_por_rito(update: Update, context: ContextTypes.DEFAULT
 
     _, data_or_menu, rito_cod = partes
     rito = _decode_cb(rito_cod)
-    eventos = listar_eventos() or []
 
     if data_or_menu == TOKEN_POR_RITO_MENU:
-        titulo, filtrados = _filtrar_por_rito(eventos, rito)
+        titulo, filtrados = _buscar_por_rito(rito)
 
         if not filtrados:
             await _enviar_ou_editar_mensagem(
@@ -2830,10 +2766,7 @@ async def mostrar_eventos_por_uf(update: Update, context: ContextTypes.DEFAULT_T
         return
         
     uf = partes[1].upper()
-    eventos = listar_eventos() or []
-    lojas_map = _lojas_map_cache()
-    
-    cidades = _cidades_ativas_eventos(eventos, lojas_map, uf)
+    cidades = obter_indice_eventos().cidades(uf)
     
     from src.sheets_supabase import registrar_log_busca
     if not cidades:
@@ -2869,10 +2802,7 @@ async def mostrar_eventos_por_cidade(update: Update, context: ContextTypes.DEFAU
     uf = partes[1].upper()
     cidade = partes[2]
     
-    eventos = listar_eventos() or []
-    lojas_map = _lojas_map_cache()
-    
-    titulo, filtrados = _filtrar_por_cidade(eventos, lojas_map, uf, cidade)
+    titulo, filtrados = _buscar_por_cidade(uf, cidade)
     
     from src.sheets_supabase import registrar_log_busca
     if not filtrados:
@@ -2911,9 +2841,8 @@ async def mostrar_eventos_por_potencia_filtro(update: Update, context: ContextTy
         return
         
     potencia = partes[1]
-    eventos = listar_eventos() or []
     
-    titulo, filtrados = _filtrar_por_potencia(eventos, potencia)
+    titulo, filtrados = _buscar_por_potencia(potencia)
     
     if not filtrados:
         await _enviar_ou_editar_mensagem(
@@ -16,6 +16,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import urllib.parse
 from datetime import datetime
@@ -1519,7 +1520,7 @@ async def aprovar_membro(update: Update, context: ContextTypes.DEFAULT_TYPE):
     _, tid_str = query.data.split("|", 1)
     tid = int(float(tid_str))
 
-    from src.sheets_supabase import atualizar_membro, buscar_membro, _cache_membros
+    from src.sheets_supabase import atualizar_membro, buscar_membro, _cache_membros, _safe_cache_int
     
     # Carrega dados antes de atualizar para notificação amigável
     membro = buscar_membro(tid)
@@ -1531,7 +1532,7 @@ async def aprovar_membro(update: Update, context: ContextTypes.DEFAULT_TYPE):
     sucesso = atualizar_membro(tid, {"Status": "Ativo"}, preservar_nivel=True)
     
     if sucesso:
-        _cache_membros.pop(tid, None) # Invalida cache explicitamente
+        _cache_membros.invalidar(_safe_cache_int(tid)) # Invalida cache explicitamente
 
         # Envio de mensagem privada de liberação ao obreiro
         try:
@@ -2137,12 +2138,13 @@ async def vigor_painel(update: Update, context: ContextTypes.DEFAULT_TYPE):
         sent_msg = await update.message.reply_text(msg_carregando, parse_mode="Markdown")
         
     try:
-        # 4. Extração das Estatísticas Reais
-        stats = get_estatisticas_vigor(str(lid), usar_mes_anterior=False)
+        # 4. Extração das Estatísticas Reais (em thread: a base do motor de
+        # vigor pode estar vencida e ser relida do banco)
+        stats = await asyncio.to_thread(get_estatisticas_vigor, str(lid), usar_mes_anterior=False)
         
         # 5. Renderização do Card via Pillow
-        from src.render_marcos import renderizar_relatorio_vigor
-        card_path = renderizar_relatorio_vigor(stats)
+        from src.servico_render import render
+        card_vigor = await render("vigor", {"dados_vigor": stats})
         
         # 6. Heurística Inteligente (Mentoria Administrativa / IA local)
         vigor_a = stats.get("vigor_agenda", 0.0)
@@ -2188,22 +2190,19 @@ async def vigor_painel(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         
         # 7. Dispara Card + Texto
-        with open(card_path, "rb") as photo:
-            await context.bot.send_photo(
-                chat_id=user_id,
-                photo=photo,
-                caption=msg_caption,
-                parse_mode="Markdown",
-                reply_markup=InlineKeyboardMarkup([
-                    [InlineKeyboardButton("🔙 Voltar ao Painel", callback_data="menu_secretario")]
-                ])
-            )
+        await context.bot.send_photo(
+            chat_id=user_id,
+            photo=card_vigor.arquivo("vigor"),
+            caption=msg_caption,
+            parse_mode="Markdown",
+            reply_markup=InlineKeyboardMarkup([
+                [InlineKeyboardButton("🔙 Voltar ao Painel", callback_data="menu_secretario")]
+            ])
+        )
             
         # 8. Limpa mensagens temporárias
         try:
             await sent_msg.delete()
-            if os.path.exists(card_path):
-                os.remove(card_path)
         except:
             pass
             
@@ -0,0 +1,253 @@
+# src/faxina_membros.py
+# ============================================
+# BODE ANDARILHO - FAXINA DE MEMBROS (VARREDURA DO GRUPO)
+# ============================================
+#
+# Verifica se os membros com status 'Ativo' continuam no grupo principal
+# e inativa quem saiu. Substitui o laço sequencial com sleep(0.2) por
+# membro (≈17 min para 5.000 membros, fora a rede) por uma varredura
+# concorrente:
+#
+# - orçamento de requisições por segundo (FAXINA_RPS) num token bucket
+#   compartilhado pelos trabalhadores (FAXINA_CONCORRENCIA);
+# - RetryAfter pausa o bucket e a consulta é refeita;
+# - só consulta quem não teve o status observado (updates chat_member ou
+#   faxina anterior) dentro de FAXINA_JANELA_DIAS;
+# - resultados gravados em lote (registrar_status_grupo_em_lote): inativa
+#   quem saiu e renova status_observado_em de quem continua no grupo;
+# - sem checkpoint próprio: cada lote gravado renova status_observado_em,
+#   então a execução seguinte depois de uma interrompida (reinício, deploy)
+#   pula quem já foi verificado; quem deu erro (inclusive RetryAfter na
+#   última tentativa) conta em `erros` e continua pendente;
+# - ao final, um resumo (contagens + IDs inativados) é salvo em JSON e
+#   devolvido para o job avisar o administrador.
+#
+# ============================================
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import pathlib
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from telegram import Bot
+from telegram.error import RetryAfter
+
+from src.despachante import TokenBucket, _segundos_retry_after
+from src.fila_status_membros import STATUS_NO_GRUPO, status_cadastro_para
+from src.sheets_supabase import listar_membros_ativos, registrar_status_grupo_em_lote
+
+logger = logging.getLogger(__name__)
+
+_DIR_DADOS = pathlib.Path(__file__).resolve().parent.parent / "data"
+
+_RPS = float(os.getenv("FAXINA_RPS", "20"))
+_CONCORRENCIA = int(os.getenv("FAXINA_CONCORRENCIA", "8"))
+_LOTE_GRAVACAO = int(os.getenv("FAXINA_LOTE", "50"))
+_JANELA_OBSERVACAO = timedelta(days=float(os.getenv("FAXINA_JANELA_DIAS", "30")))
+_MAX_TENTATIVAS = 3
+
+
+@dataclass
+class ResumoFaxina:
+    """Resultado de uma varredura (também gravado como artefato JSON)."""
+
+    grupo_id: int
+    iniciado_em: str
+    total: int = 0
+    verificados: int = 0
+    recentes: int = 0           # status observado dentro da janela: sem consulta
+    inativados: List[int] = field(default_factory=list)
+    erros: int = 0
+    abortado: str = ""
+    duracao_s: float = 0.0
+    arquivo: str = ""
+
+    def texto(self) -> str:
+        linhas = [
+            "🧹 *Faxina de membros*",
+            f"Ativos avaliados: {self.total}",
+            f"Verificados nesta execução: {self.verificados}",
+        ]
+        if self.recentes:
+            linhas.append(f"Observados recentemente (sem consulta): {self.recentes}")
+        linhas.append(f"Inativados: {len(self.inativados)}")
+        if self.erros:
+            linhas.append(f"Erros de consulta: {self.erros}")
+        if self.abortado:
+            linhas.append(f"⚠️ Abortada: {self.abortado}")
+        linhas.append(f"Duração: {self.duracao_s:.0f}s")
+        return "\n".join(linhas)
+
+
+# ---------- artefato ----------
+
+def _gravar_json(caminho: pathlib.Path, dados: dict) -> None:
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    tmp = caminho.with_suffix(caminho.suffix + ".tmp")
+    tmp.write_text(json.dumps(dados, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, caminho)
+
+
+# ---------- varredura ----------
+
+def _telegram_id(membro: dict) -> Optional[int]:
+    valor = membro.get("Telegram ID") or membro.get("telegram_id")
+    try:
+        return int(float(valor)) if valor else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _observado_recentemente(membro: dict, agora: datetime) -> bool:
+    valor = membro.get("Status observado em") or membro.get("status_observado_em")
+    if not valor:
+        return False
+    try:
+        observado = datetime.fromisoformat(str(valor).replace("Z", "+00:00"))
+    except ValueError:
+        return False
+    if observado.tzinfo is None:
+        observado = observado.replace(tzinfo=timezone.utc)
+    return agora - observado < _JANELA_OBSERVACAO
+
+
+def _erro_critico(msg: str) -> bool:
+    # Chat inexistente ou bot fora do grupo: nenhum resultado seria confiável.
+    return "chat not found" in msg or "bot was kicked" in msg or "not member of the chat" in msg
+
+
+def _usuario_inexistente(msg: str) -> bool:
+    return "user not found" in msg or "invalid user" in msg
+
+
+async def executar_faxina(bot: Bot, grupo_id: int) -> ResumoFaxina:
+    """Varre os membros ativos e inativa quem não está mais no grupo."""
+    inicio = time.monotonic()
+    resumo = ResumoFaxina(grupo_id=grupo_id, iniciado_em=datetime.now().isoformat(timespec="seconds"))
+
+    membros = await asyncio.to_thread(listar_membros_ativos)
+    agora = datetime.now(timezone.utc)
+    ids: Set[int] = set()
+    recentes: Set[int] = set()
+    for membro in membros or []:
+        tid = _telegram_id(membro)
+        if not tid:
+            continue
+        ids.add(tid)
+        if _observado_recentemente(membro, agora):
+            recentes.add(tid)
+    resumo.total = len(ids)
+    resumo.recentes = len(recentes)
+
+    fila: asyncio.Queue = asyncio.Queue()
+    for tid in sorted(ids - recentes):
+        fila.put_nowait(tid)
+
+    if fila.empty():
+        logger.info("Faxina: nenhum membro pendente de verificação.")
+    else:
+        logger.info(
+            "Iniciando faxina de %d membros ativos (%d observados recentemente, %d pendentes, "
+            "%.0f req/s, %d trabalhadores)...",
+            resumo.total, resumo.recentes, fila.qsize(), _RPS, _CONCORRENCIA,
+        )
+
+    bucket = TokenBucket(_RPS)
+    abortar = asyncio.Event()
+    # telegram_id -> (status no grupo, novo status do cadastro ou None)
+    observacoes: Dict[int, Tuple[str, Optional[str]]] = {}
+    gravacao = asyncio.Lock()
+
+    async def _gravar(forcar: bool = False) -> None:
+        async with gravacao:
+            if observacoes and (forcar or len(observacoes) >= _LOTE_GRAVACAO):
+                lote = dict(observacoes)
+                observacoes.clear()
+                falhas = set(await asyncio.to_thread(registrar_status_grupo_em_lote, lote))
+                resumo.inativados.extend(
+                    t for t, (_, cadastro) in lote.items() if cadastro == "Inativo" and t not in falhas
+                )
+                # Sem status_observado_em renovado: a próxima execução verifica de novo.
+                resumo.erros += len(falhas)
+
+    async def _verificar(tid: int) -> None:
+        for tentativa in range(1, _MAX_TENTATIVAS + 1):
+            await bucket.adquirir()
+            try:
+                member = await bot.get_chat_member(chat_id=grupo_id, user_id=tid)
+            except RetryAfter as e:
+                bucket.pausar(_segundos_retry_after(e) + 0.5)
+                if tentativa == _MAX_TENTATIVAS:
+                    # Continua pendente (status_observado_em não é renovado).
+                    logger.warning("Flood control persistente ao verificar membro %s: %s", tid, e)
+                    resumo.erros += 1
+                    return
+                continue
+            except Exception as e:
+                msg = str(e).lower()
+                if _erro_critico(msg):
+                    resumo.abortado = f"erro crítico no chat {grupo_id}: {e}"
+                    abortar.set()
+                    return
+                if _usuario_inexistente(msg):
+                    logger.info("Membro %s não localizado no chat (erro: %s). Inativando...", tid, e)
+                    observacoes[tid] = ("left", "Inativo")
+                    break
+                if tentativa == _MAX_TENTATIVAS:
+                    # Continua pendente (status_observado_em não é renovado).
+                    logger.warning("Erro ao verificar membro %s no chat: %s", tid, e)
+                    resumo.erros += 1
+                    return
+                await asyncio.sleep(tentativa)
+                continue
+
+            no_grupo = member.status in STATUS_NO_GRUPO or (
+                member.status == "restricted" and getattr(member, "is_member", False)
+            )
+            if no_grupo:
+                observacoes[tid] = (member.status, None)
+            else:
+                logger.info("Membro %s saiu do grupo (status: %s). Inativando...", tid, member.status)
+                observacoes[tid] = (member.status, status_cadastro_para(member.status, False))
+            break
+
+        resumo.verificados += 1
+        await _gravar()
+
+    async def _trabalhador() -> None:
+        while not abortar.is_set():
+            try:
+                tid = fila.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await _verificar(tid)
+
+    await asyncio.gather(*(_trabalhador() for _ in range(max(1, min(_CONCORRENCIA, fila.qsize())))))
+
+    if resumo.abortado:
+        # Não grava resultados de uma varredura que não é confiável.
+        observacoes.clear()
+        logger.critical("Job de faxina abortado: %s", resumo.abortado)
+    await _gravar(forcar=True)
+
+    resumo.duracao_s = time.monotonic() - inicio
+    try:
+        arquivo = _DIR_DADOS / f"faxina_resumo_{datetime.now():%Y%m%d_%H%M%S}.json"
+        await asyncio.to_thread(_gravar_json, arquivo, asdict(resumo))
+        resumo.arquivo = str(arquivo)
+    except Exception as e:
+        logger.warning("Falha ao gravar resumo da faxina: %s", e)
+
+    logger.info(
+        "Faxina concluída! Verificados: %d/%d membros. Inativados: %d. Erros: %d. %.0fs.",
+        resumo.verificados, resumo.total, len(resumo.inativados),
+        resumo.erros, resumo.duracao_s,
+    )
+    return resumo
@@ -0,0 +1,124 @@
+# src/fila_logs_busca.py
+# ============================================
+# BODE ANDARILHO - FILA DE LOGS DE BUSCA
+# ============================================
+#
+# Cada busca de sessões (menus de "Ver Sessões" e assistente IA) registra
+# um log em logs_busca para o painel do Vigilante. Antes era um insert
+# síncrono por busca, no caminho da resposta ao usuário.
+#
+# Agora registrar_log_busca só normaliza a linha e a coloca nesta fila; um
+# gravador em segundo plano insere em lote (registrar_logs_busca_em_lote)
+# a cada poucos segundos ou quando a fila enche, e o shutdown grava o que
+# sobrou. Se o banco falhar, as linhas voltam para a fila; acima de
+# LOGS_BUSCA_MAX_PENDENTES as mais antigas são descartadas.
+#
+# A demanda por (uf, cidade, rito) das buscas sem resultado é agregada no
+# banco por trigger (docs/supabase_logs_busca_demanda.sql).
+#
+# ============================================
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import List, Optional
+
+from src.sheets_supabase import registrar_logs_busca_em_lote
+
+logger = logging.getLogger(__name__)
+
+_INTERVALO_S = float(os.getenv("LOGS_BUSCA_INTERVALO_S", "5"))
+_LOTE = int(os.getenv("LOGS_BUSCA_LOTE", "200"))
+_MAX_PENDENTES = int(os.getenv("LOGS_BUSCA_MAX_PENDENTES", "10000"))
+
+
+class FilaLogsBusca:
+    """Acumula linhas de logs_busca e grava em lote."""
+
+    def __init__(self, intervalo_s: float = _INTERVALO_S, lote: int = _LOTE, max_pendentes: int = _MAX_PENDENTES):
+        self.intervalo_s = intervalo_s
+        self.lote = max(1, lote)
+        self.max_pendentes = max(self.lote, max_pendentes)
+        self._pendentes: List[dict] = []
+        self._cheia: Optional[asyncio.Event] = None
+        self._tarefa: Optional[asyncio.Task] = None
+        self.gravados = 0
+        self.descartados = 0
+
+    def registrar(self, linha: dict) -> None:
+        """Enfileira uma linha (não bloqueia). Inicia o gravador na primeira chamada."""
+        self._pendentes.append(linha)
+        self._limitar()
+        self._garantir_tarefa()
+        if len(self._pendentes) >= self.lote and self._cheia is not None:
+            self._cheia.set()
+
+    def __len__(self) -> int:
+        return len(self._pendentes)
+
+    def _limitar(self) -> None:
+        excesso = len(self._pendentes) - self.max_pendentes
+        if excesso > 0:
+            del self._pendentes[:excesso]
+            self.descartados += excesso
+            logger.warning("Fila de logs de busca cheia: %d linha(s) antigas descartadas.", excesso)
+
+    async def descarregar(self) -> int:
+        """Grava agora tudo que está pendente. Retorna quantas linhas foram gravadas."""
+        if not self._pendentes:
+            return 0
+        linhas, self._pendentes = self._pendentes, []
+        try:
+            gravados = await asyncio.to_thread(registrar_logs_busca_em_lote, linhas)
+        except Exception as e:
+            logger.error("Erro ao gravar fila de logs de busca: %s", e)
+            gravados = 0
+        if gravados < len(linhas):
+            # Devolve o que faltou na frente das linhas que chegaram durante a gravação.
+            self._pendentes[:0] = linhas[gravados:]
+            self._limitar()
+        self.gravados += gravados
+        return gravados
+
+    def _garantir_tarefa(self) -> None:
+        if self._tarefa is not None and not self._tarefa.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # fora de um event loop: fica pendente até o próximo registrar/parar
+        self._cheia = asyncio.Event()
+        self._tarefa = loop.create_task(self._laco())
+
+    async def _laco(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._cheia.wait(), timeout=self.intervalo_s)
+            except asyncio.TimeoutError:
+                pass
+            self._cheia.clear()
+            if self._pendentes:
+                await self.descarregar()
+
+    async def parar(self) -> None:
+        """Cancela o gravador e descarrega o que restou (usado no shutdown)."""
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        await self.descarregar()
+
+
+_fila: Optional[FilaLogsBusca] = None
+
+
+def obter_fila_logs_busca() -> FilaLogsBusca:
+    global _fila
+    if _fila is None:
+        _fila = FilaLogsBusca()
+    return _fila
@@ -0,0 +1,177 @@
+# src/fila_status_membros.py
+# ============================================
+# BODE ANDARILHO - FILA DE STATUS DOS MEMBROS NO GRUPO
+# ============================================
+#
+# Os updates `chat_member` do Telegram avisam em tempo real quando alguém
+# entra, sai, é removido ou restringido no grupo. Em vez de uma escrita no
+# Supabase por update, as observações entram nesta fila e são gravadas em
+# lote (registrar_status_grupo_em_lote) a cada poucos segundos ou quando
+# a fila enche. Para o mesmo membro vale sempre a observação mais recente.
+#
+# Cada gravação também atualiza membros.status_observado_em; a faxina
+# semanal só consulta o Telegram para quem não foi observado dentro da
+# janela configurada (FAXINA_JANELA_DIAS).
+#
+# Só os IDs que falharam voltam para a fila, com a hora da observação
+# original, e cada um tenta no máximo STATUS_MEMBROS_MAX_TENTATIVAS vezes.
+#
+# ============================================
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from src.sheets_supabase import registrar_status_grupo_em_lote
+
+logger = logging.getLogger(__name__)
+
+_INTERVALO_S = float(os.getenv("STATUS_MEMBROS_INTERVALO_S", "3"))
+_LOTE = int(os.getenv("STATUS_MEMBROS_LOTE", "100"))
+_MAX_TENTATIVAS = int(os.getenv("STATUS_MEMBROS_MAX_TENTATIVAS", "5"))
+
+# Status do Telegram (ChatMember.status) em que o membro está no grupo.
+STATUS_NO_GRUPO = ("member", "administrator", "creator")
+
+
+def status_cadastro_para(status_grupo: str, is_member: Optional[bool] = None) -> Optional[str]:
+    """
+    Traduz o status observado no grupo para a mudança no cadastro:
+    - left/kicked, ou restricted fora do grupo (is_member=False) → "Inativo";
+    - presente no grupo → None (só registra a observação; reativação e
+      cadastros pendentes seguem o fluxo de entrada do src/aplicacao.py).
+    """
+    if status_grupo in ("left", "kicked"):
+        return "Inativo"
+    if status_grupo == "restricted" and is_member is False:
+        return "Inativo"
+    return None
+
+
+class FilaStatusMembros:
+    """Acumula observações {telegram_id: (status_grupo, status_cadastro)} e grava em lote."""
+
+    def __init__(self, intervalo_s: float = _INTERVALO_S, lote: int = _LOTE, max_tentativas: int = _MAX_TENTATIVAS):
+        self.intervalo_s = intervalo_s
+        self.lote = max(1, lote)
+        self.max_tentativas = max(1, max_tentativas)
+        self._pendentes: Dict[int, Tuple[str, Optional[str]]] = {}
+        # Falhas devolvidas: telegram_id -> (par, hora da observação, tentativas já feitas).
+        self._reenvios: Dict[int, Tuple[Tuple[str, Optional[str]], datetime, int]] = {}
+        self._cheia: Optional[asyncio.Event] = None
+        self._tarefa: Optional[asyncio.Task] = None
+        self.gravados = 0
+        self.descartados = 0
+
+    def registrar(self, telegram_id: int, status_grupo: str, status_cadastro: Optional[str] = None) -> None:
+        """Enfileira uma observação (não bloqueia). Inicia o gravador na primeira chamada."""
+        tid = int(telegram_id)
+        self._pendentes[tid] = (status_grupo, status_cadastro)
+        self._reenvios.pop(tid, None)  # a observação nova substitui a que falhou
+        self._garantir_tarefa()
+        if len(self._pendentes) >= self.lote and self._cheia is not None:
+            self._cheia.set()
+
+    def __len__(self) -> int:
+        return len(self._pendentes) + len(self._reenvios)
+
+    async def descarregar(self) -> int:
+        """Grava agora tudo que está pendente. Retorna quantos IDs foram gravados."""
+        if not self._pendentes and not self._reenvios:
+            return 0
+        agora = datetime.now().astimezone()
+        lotes: Dict[datetime, Dict[int, Tuple[str, Optional[str]]]] = {}
+        tentativas: Dict[int, int] = {}
+        for tid, (par, observado_em, feitas) in self._reenvios.items():
+            lotes.setdefault(observado_em, {})[tid] = par
+            tentativas[tid] = feitas
+        if self._pendentes:
+            lotes.setdefault(agora, {}).update(self._pendentes)
+        self._pendentes, self._reenvios = {}, {}
+
+        gravados = 0
+        for observado_em, lote in lotes.items():
+            try:
+                falhas: List[int] = await asyncio.to_thread(registrar_status_grupo_em_lote, lote, observado_em)
+            except Exception as e:
+                logger.error("Erro ao gravar fila de status de membros: %s", e)
+                falhas = list(lote)
+            gravados += len(lote) - len(falhas)
+            self._devolver(lote, falhas, observado_em, tentativas)
+        self.gravados += gravados
+        return gravados
+
+    def _devolver(
+        self,
+        lote: Dict[int, Tuple[str, Optional[str]]],
+        falhas: List[int],
+        observado_em: datetime,
+        tentativas: Dict[int, int],
+    ) -> None:
+        """Devolve só os IDs que falharam, sem sobrescrever observações mais novas."""
+        esgotados = 0
+        for tid in falhas:
+            if tid in self._pendentes:
+                continue
+            feitas = tentativas.get(tid, 0) + 1
+            if feitas >= self.max_tentativas:
+                esgotados += 1
+                continue
+            self._reenvios[tid] = (lote[tid], observado_em, feitas)
+        if esgotados:
+            self.descartados += esgotados
+            logger.error(
+                "Status de %d membro(s) descartado(s) após %d tentativas de gravação.", esgotados, self.max_tentativas
+            )
+
+    def _garantir_tarefa(self) -> None:
+        if self._tarefa is not None and not self._tarefa.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # fora de um event loop: fica pendente até o próximo registrar/parar
+        self._cheia = asyncio.Event()
+        self._tarefa = loop.create_task(self._laco())
+
+    async def _laco(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._cheia.wait(), timeout=self.intervalo_s)
+            except asyncio.TimeoutError:
+                pass
+            self._cheia.clear()
+            if self._pendentes or self._reenvios:
+                await self.descarregar()
+
+    async def parar(self) -> None:
+        """Cancela o gravador e descarrega o que restou (usado no shutdown)."""
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+        await self.descarregar()
+
+
+_fila: Optional[FilaStatusMembros] = None
+
+
+def obter_fila_status() -> FilaStatusMembros:
+    global _fila
+    if _fila is None:
+        _fila = FilaStatusMembros()
+    return _fila
+
+
+def registrar_status_grupo(telegram_id: int, status_grupo: str, is_member: Optional[bool] = None) -> Optional[str]:
+    """Atalho usado pelo handler de chat_member. Retorna o status de cadastro aplicado."""
+    status_cadastro = status_cadastro_para(status_grupo, is_member)
+    obter_fila_status().registrar(telegram_id, status_grupo, status_cadastro)
+    return status_cadastro
@@ -0,0 +1,135 @@
+# src/galeria_cache.py
+# ============================================
+# BODE ANDARILHO - PAYLOAD MATERIALIZADO DA SALA DE TROFÉUS
+# ============================================
+#
+# api_galeria chamava buscar_membro e get_galeria_completa dentro do handler
+# Starlette: conquistas do membro, seis meses de vigor da loja e marcos
+# coletivos, tudo síncrono no event loop, a cada abertura da página.
+#
+# Aqui o payload fica pronto em memória, por membro, já serializado em JSON
+# e com ETag (hash do corpo). Ele é montado a partir de três peças, cada uma
+# com seu próprio cache e sua tag de invalidação:
+#
+# - conquistas do membro     ("membro:<telegram_id>")
+# - nome e selos de vigor    ("loja:<loja_id>")
+# - marcos de expansão       ("marcos", global)
+#
+# Escritas que mudam o conteúdo apagam a tag correspondente (e, por ela, os
+# payloads que a usam): confirmações, conquistas e dados do membro e da
+# loja em sheets_supabase, marcos coletivos em registrar_marco_coletivo.
+# Os selos de vigor seguem também a base do motor (VIGOR_BASE_TTL_S); por
+# isso o TTL padrão daqui é o mesmo.
+#
+# Acerto no cache é servido direto no event loop; a montagem de um payload
+# ausente roda em thread (asyncio.to_thread), com single-flight por peça.
+#
+# ============================================
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from src.cache import AUSENTE, namespace as _cache_namespace
+from src.sheets_supabase import (
+    buscar_membro,
+    galeria_conquistas,
+    galeria_expansao,
+    galeria_oficina,
+)
+
+logger = logging.getLogger(__name__)
+
+_cache_galeria = _cache_namespace(
+    "galeria",
+    float(os.getenv("GALERIA_TTL_S", os.getenv("VIGOR_BASE_TTL_S", "300"))),
+    int(os.getenv("CACHE_MAX_GALERIA", "5000")),
+)
+
+
+@dataclass(frozen=True)
+class GaleriaPronta:
+    """Payload da Sala de Troféus: dicionário, corpo JSON e ETag."""
+
+    dados: Dict[str, Any]
+    corpo: bytes
+    etag: str
+
+
+def _tags(uid: int, loja_id: str) -> List[str]:
+    return [f"membro:{uid}", f"loja:{loja_id}", "marcos"]
+
+
+def montar_galeria(telegram_id: Any) -> Optional[GaleriaPronta]:
+    """Payload do membro (do cache ou montado agora); None se não cadastrado."""
+    uid = int(float(telegram_id))
+    pronto = _cache_galeria.obter(("payload", uid))
+    if pronto is not AUSENTE:
+        return pronto
+
+    membro = buscar_membro(uid)
+    if not membro:
+        return None
+    loja_id = str(membro.get("loja_id") or membro.get("ID da loja") or "").strip()
+
+    conquistas = _cache_galeria.obter_ou_carregar(
+        ("conquistas", uid), lambda: galeria_conquistas(uid), tags=[f"membro:{uid}"]
+    )
+    oficina = _cache_galeria.obter_ou_carregar(
+        ("oficina", loja_id), lambda: galeria_oficina(loja_id), tags=[f"loja:{loja_id}"]
+    )
+    expansao = _cache_galeria.obter_ou_carregar(("expansao",), galeria_expansao, tags=["marcos"])
+
+    dados = {
+        "loja_id": oficina["loja_id"],
+        "nome_loja": oficina["nome_loja"],
+        "conquistas_individuais": conquistas,
+        "marcos_oficina": oficina["marcos_oficina"],
+        "marcos_expansao": expansao,
+        "nome_membro": membro.get("Nome") or membro.get("nome") or "Obreiro",
+        "ok": True,
+    }
+    corpo = json.dumps(dados, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    pronto = GaleriaPronta(dados=dados, corpo=corpo, etag=f'"{hashlib.sha1(corpo).hexdigest()[:20]}"')
+    _cache_galeria.definir(("payload", uid), pronto, _tags(uid, loja_id))
+    return pronto
+
+
+async def obter_galeria(telegram_id: Any) -> Optional[GaleriaPronta]:
+    """Versão para o event loop: acerto direto, montagem fora do loop."""
+    pronto = _cache_galeria.obter(("payload", int(float(telegram_id))))
+    if pronto is not AUSENTE:
+        return pronto
+    return await asyncio.to_thread(montar_galeria, telegram_id)
+
+
+def etag_confere(if_none_match: str, etag: str) -> bool:
+    """If-None-Match (lista, "*" ou W/) casa com o ETag atual?"""
+    for candidato in (if_none_match or "").split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or candidato.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+# ---------- invalidação ----------
+
+def invalidar_galeria_membro(telegram_id: Any) -> None:
+    try:
+        _cache_galeria.invalidar_tag(f"membro:{int(float(telegram_id))}")
+    except (TypeError, ValueError):
+        pass
+
+
+def invalidar_galeria_loja(loja_id: Any) -> None:
+    _cache_galeria.invalidar_tag(f"loja:{str(loja_id or '').strip()}")
+
+
+def invalidar_galeria_marcos() -> None:
+    _cache_galeria.invalidar_tag("marcos")
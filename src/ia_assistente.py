@@ -1,20 +1,18 @@
 from __future__ import annotations
 
-import ast
+import asyncio
 import logging
 import re
-import unicodedata
-from collections import Counter, deque
-from dataclasses import dataclass
-from datetime import datetime, timedelta
-from pathlib import Path
-from typing import Deque, Dict, List, Optional
+from collections import Counter
+from typing import Dict, List, Optional
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update, WebAppInfo
 from telegram.ext import ContextTypes
 
 from src.bot import navegar_para
 from src.permissoes import get_nivel
+from src.ia_auditoria import registrar_auditoria, totais_auditoria
+from src.ia_intencoes import IntentItem, _norm_text, classificar_intencao_base
 from src.ia_multinivel import (
 	IAResult,
 	classificar_intencao_multinivel,
@@ -24,10 +22,7 @@ from src.ia_multinivel import (
 )
 
 
-BASE_IA_PATH = Path(__file__).resolve().parents[1] / "docs" / "ajuda_ia_base.yaml"
 logger = logging.getLogger(__name__)
-IA_AUDIT_BUFFER_MAX = 5000
-IA_AUDIT_BUFFER: Deque[Dict[str, str]] = deque(maxlen=IA_AUDIT_BUFFER_MAX)
 STOPWORDS_PT = {
 	"a", "ao", "aos", "as", "com", "como", "da", "das", "de", "do", "dos", "e", "em", "eu",
 	"me", "meu", "minha", "minhas", "meus", "na", "nas", "no", "nos", "o", "os", "ou",
@@ -40,135 +35,6 @@ TERMOS_SENSIVEIS_FILTRO = {
 }
 
 
-@dataclass
-class IntentItem:
-	intent_id: str
-	nivel_permitido: List[str]
-	gatilhos: List[str]
-	resposta_oficial: str
-	acao_tipo: str
-	acao_valor: str
-
-
-def _norm_text(value: str) -> str:
-	texto = unicodedata.normalize("NFKD", str(value or ""))
-	texto = "".join(ch for ch in texto if not unicodedata.combining(ch))
-	texto = texto.lower().strip()
-	texto = re.sub(r"\s+", " ", texto)
-	return texto
-
-
-def _parse_list_literal(raw: str) -> List[str]:
-	try:
-		value = ast.literal_eval(raw.strip())
-		if isinstance(value, list):
-			return [str(v).strip() for v in value if str(v).strip()]
-	except Exception:
-		return []
-	return []
-
-
-def _unquote(raw: str) -> str:
-	value = raw.strip()
-	if len(value) >= 2 and value[0] == value[-1] and value[0] in {"'", '"'}:
-		return value[1:-1]
-	return value
-
-
-def carregar_intencoes_base() -> List[IntentItem]:
-	if not BASE_IA_PATH.exists():
-		return []
-
-	linhas = BASE_IA_PATH.read_text(encoding="utf-8").splitlines()
-	intencoes: List[IntentItem] = []
-	dentro_intencoes = False
-	atual: Optional[dict] = None
-	dentro_acao = False
-
-	def _finalizar_item() -> None:
-		nonlocal atual
-		if not atual:
-			return
-		if not atual.get("intent_id"):
-			atual = None
-			return
-		intencoes.append(
-			IntentItem(
-				intent_id=str(atual.get("intent_id", "")).strip(),
-				nivel_permitido=list(atual.get("nivel_permitido", []) or []),
-				gatilhos=list(atual.get("gatilhos", []) or []),
-				resposta_oficial=str(atual.get("resposta_oficial", "")).strip(),
-				acao_tipo=str(atual.get("acao_tipo", "")).strip(),
-				acao_valor=str(atual.get("acao_valor", "")).strip(),
-			)
-		)
-		atual = None
-
-	for linha in linhas:
-		raw = linha.rstrip()
-		if not raw.strip():
-			continue
-
-		if raw.startswith("intencoes:"):
-			dentro_intencoes = True
-			continue
-
-		if not dentro_intencoes:
-			continue
-
-		if re.match(r"^regras_de_roteamento:", raw):
-			_finalizar_item()
-			break
-
-		if re.match(r"^\s*-\s+intent_id:\s*", raw):
-			_finalizar_item()
-			intent_id = raw.split("intent_id:", 1)[1].strip()
-			atual = {
-				"intent_id": _unquote(intent_id),
-				"nivel_permitido": [],
-				"gatilhos": [],
-				"resposta_oficial": "",
-				"acao_tipo": "",
-				"acao_valor": "",
-			}
-			dentro_acao = False
-			continue
-
-		if not atual:
-			continue
-
-		if re.match(r"^\s*acao_recomendada:\s*$", raw):
-			dentro_acao = True
-			continue
-
-		if dentro_acao and re.match(r"^\s*tipo:\s*", raw):
-			atual["acao_tipo"] = _unquote(raw.split("tipo:", 1)[1].strip())
-			continue
-
-		if dentro_acao and re.match(r"^\s*valor:\s*", raw):
-			atual["acao_valor"] = _unquote(raw.split("valor:", 1)[1].strip())
-			continue
-
-		if re.match(r"^\s*nivel_permitido:\s*", raw):
-			atual["nivel_permitido"] = _parse_list_literal(raw.split("nivel_permitido:", 1)[1])
-			continue
-
-		if re.match(r"^\s*gatilhos:\s*", raw):
-			atual["gatilhos"] = _parse_list_literal(raw.split("gatilhos:", 1)[1])
-			continue
-
-		if re.match(r"^\s*resposta_oficial:\s*", raw):
-			atual["resposta_oficial"] = _unquote(raw.split("resposta_oficial:", 1)[1].strip())
-			continue
-
-		if re.match(r"^\s*origem:\s*", raw):
-			dentro_acao = False
-			continue
-
-	_finalizar_item()
-	return intencoes
-
-
 def _bloqueio_seguranca(texto: str) -> Optional[str]:
 	t = _norm_text(texto)
 
@@ -189,26 +55,6 @@ def _bloqueio_seguranca(texto: str) -> Optional[str]:
 
 
 
-def _classificar_intencao(texto: str, nivel: str, intencoes: List[IntentItem]) -> Optional[IntentItem]:
-	t = _norm_text(texto)
-	melhor: Optional[IntentItem] = None
-	melhor_score = 0
-
-	for item in intencoes:
-		if nivel not in item.nivel_permitido:
-			continue
-		score = 0
-		for gatilho in item.gatilhos:
-			g = _norm_text(gatilho)
-			if g and g in t:
-				score += max(1, len(g.split()))
-		if score > melhor_score:
-			melhor = item
-			melhor_score = score
-
-	return melhor
-
-
 def _extrair_topic_hint(texto: str) -> str:
 	"""
 	Resume o tema em poucos tokens seguros para analise agregada.
@@ -270,49 +116,30 @@ def _auditar_evento(
 	}
 	payload.update(extra or {})
 	logger.info("ia_audit %s", payload)
-	IA_AUDIT_BUFFER.append(
-		{
-			"ts": datetime.now().isoformat(timespec="seconds"),
-			"event": str(payload.get("event", "")),
-			"nivel": str(payload.get("nivel", "")),
-			"user_ref": str(payload.get("user_ref", "")),
-			"intent_id": str(payload.get("intent_id", "")),
-			"reason": str(payload.get("reason", "")),
-			"action_type": str(payload.get("action_type", "")),
-			"topic_hint": str(payload.get("topic_hint", "")),
-		}
-	)
+	# Contadores por hora (src/ia_auditoria): só evento, intent_id, reason e topic_hint.
+	registrar_auditoria(evento, payload)
+
+
+def _contagem_dimensao(totais: Dict[tuple, int], evento: str, dimensao: str) -> Counter:
+	"""Counter {valor: total} de uma dimensão de um evento, a partir dos baldes somados."""
+	return Counter({
+		valor: qtd
+		for (ev, dim, valor), qtd in totais.items()
+		if ev == evento and dim == dimensao and qtd > 0
+	})
 
 
 def _agregar_metricas(janela_horas: int) -> Dict[str, object]:
-	agora = datetime.now()
-	corte = agora - timedelta(hours=max(1, int(janela_horas)))
+	totais = totais_auditoria(janela_horas)
 
-	eventos_janela: List[Dict[str, str]] = []
-	for item in IA_AUDIT_BUFFER:
-		try:
-			ts = datetime.fromisoformat(item.get("ts", ""))
-		except Exception:
-			continue
-		if ts >= corte:
-			eventos_janela.append(item)
-
-	total = len(eventos_janela)
-	matched = sum(1 for e in eventos_janela if e.get("event") == "intent_matched")
-	blocked = sum(1 for e in eventos_janela if e.get("event") == "blocked")
-	unmatched = sum(1 for e in eventos_janela if e.get("event") == "unmatched")
-	empty = sum(1 for e in eventos_janela if e.get("event") == "empty_input")
-
-	intent_counter = Counter(
-		e.get("intent_id", "").strip()
-		for e in eventos_janela
-		if e.get("event") == "intent_matched" and e.get("intent_id", "").strip()
-	)
-	reason_counter = Counter(
-		e.get("reason", "").strip()
-		for e in eventos_janela
-		if e.get("event") == "blocked" and e.get("reason", "").strip()
-	)
+	total = sum(qtd for (_, dim, _), qtd in totais.items() if dim == "")
+	matched = totais.get(("intent_matched", "", ""), 0)
+	blocked = totais.get(("blocked", "", ""), 0)
+	unmatched = totais.get(("unmatched", "", ""), 0)
+	empty = totais.get(("empty_input", "", ""), 0)
+
+	intent_counter = _contagem_dimensao(totais, "intent_matched", "intent_id")
+	reason_counter = _contagem_dimensao(totais, "blocked", "reason")
 
 	def _pct(v: int, t: int) -> str:
 		if t <= 0:
@@ -349,37 +176,11 @@ def _formatar_linhas(items: List[str], vazio: str) -> str:
 	return "\n".join(f"- {item}" for item in items)
 
 
-def _eventos_na_janela(janela_horas: int) -> List[Dict[str, str]]:
-	agora = datetime.now()
-	corte = agora - timedelta(hours=max(1, int(janela_horas)))
-	eventos: List[Dict[str, str]] = []
-	for item in IA_AUDIT_BUFFER:
-		try:
-			ts = datetime.fromisoformat(item.get("ts", ""))
-		except Exception:
-			continue
-		if ts >= corte:
-			eventos.append(item)
-	return eventos
-
-
 def _sugestoes_aprendizado(janela_horas: int = 168) -> Dict[str, object]:
-	eventos = _eventos_na_janela(janela_horas)
-	unmatched_topics = Counter(
-		e.get("topic_hint", "").strip()
-		for e in eventos
-		if e.get("event") == "unmatched" and e.get("topic_hint", "").strip()
-	)
-	matched_intents = Counter(
-		e.get("intent_id", "").strip()
-		for e in eventos
-		if e.get("event") == "intent_matched" and e.get("intent_id", "").strip()
-	)
-	block_reasons = Counter(
-		e.get("reason", "").strip()
-		for e in eventos
-		if e.get("event") == "blocked" and e.get("reason", "").strip()
-	)
+	totais = totais_auditoria(janela_horas)
+	unmatched_topics = _contagem_dimensao(totais, "unmatched", "topic_hint")
+	matched_intents = _contagem_dimensao(totais, "intent_matched", "intent_id")
+	block_reasons = _contagem_dimensao(totais, "blocked", "reason")
 
 	sugestoes: List[str] = []
 	for topic, qtd in unmatched_topics.most_common(5):
@@ -418,8 +219,9 @@ def _sugestoes_aprendizado(janela_horas: int = 168) -> Dict[str, object]:
 	}
 
 
-def _plano_semanal_aprendizado(janela_horas: int = 168) -> Dict[str, List[str]]:
-	dados = _sugestoes_aprendizado(janela_horas)
+def _plano_semanal_aprendizado(janela_horas: int = 168, dados: Optional[Dict[str, object]] = None) -> Dict[str, List[str]]:
+	if dados is None:
+		dados = _sugestoes_aprendizado(janela_horas)
 	alta: List[str] = []
 	media: List[str] = []
 	monitorar: List[str] = []
@@ -487,8 +289,7 @@ async def assistente_ia_stats(update: Update, context: ContextTypes.DEFAULT_TYPE
 		)
 		return
 
-	m24 = _agregar_metricas(24)
-	m168 = _agregar_metricas(168)
+	m24, m168 = await asyncio.to_thread(lambda: (_agregar_metricas(24), _agregar_metricas(168)))
 	texto = (
 		"*Observabilidade da IA (segura)*\n\n"
 		"*Últimas 24h*\n"
@@ -530,8 +331,8 @@ async def assistente_ia_relatorio(update: Update, context: ContextTypes.DEFAULT_
 		)
 		return
 
-	dados = _sugestoes_aprendizado(168)
-	plano = _plano_semanal_aprendizado(168)
+	dados = await asyncio.to_thread(_sugestoes_aprendizado, 168)
+	plano = _plano_semanal_aprendizado(168, dados)
 	
 	from src.sheets_supabase import obter_gaps_sessoes, get_modo_comunicacao_ativo
 	gaps = obter_gaps_sessoes(30)
@@ -665,8 +466,7 @@ async def _executar_assistente_ia(update: Update, context: ContextTypes.DEFAULT_
 		return
 
 	# ── 3) Fallback YAML base (classificador original) ────────────────
-	intencoes = carregar_intencoes_base()
-	item = _classificar_intencao(texto_entrada, nivel, intencoes)
+	item = classificar_intencao_base(texto_entrada, nivel)
 	if item:
 		teclado = _teclado_acao(item)
 		_auditar_evento(
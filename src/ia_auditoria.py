@@ -0,0 +1,346 @@
+# src/ia_auditoria.py
+# ============================================
+# BODE ANDARILHO - AUDITORIA DO ASSISTENTE IA EM BALDES HORÁRIOS
+# ============================================
+#
+# A auditoria do assistente ficava numa deque em memória (5000 eventos):
+# /ia_stats e /ia_relatorio reinterpretavam cada timestamp e recontavam a
+# deque inteira a cada chamada, e tudo se perdia a cada deploy.
+#
+# Aqui cada evento só incrementa contadores em memória, por hora (UTC):
+#
+#   (hora, evento, dimensão, valor) -> total
+#
+# com dimensão "" (total do evento) e uma linha por intent_id, reason e
+# topic_hint preenchidos. Nada de texto bruto nem de usuário: só o que os
+# painéis agregam.
+#
+# O job do scheduler grava os baldes alterados em lote (e o shutdown grava
+# o que sobrou). Cada processo é dono das suas linhas (coluna `instancia`)
+# e grava o valor absoluto do contador: regravar o mesmo lote é inofensivo
+# e dois processos nunca disputam a mesma linha. Uma janela de 24h, 7d ou
+# 30d vira a soma dos baldes a partir da hora do corte, feita no Postgres
+# (função ia_auditoria_somar) para não paginar uma tabela que o job grava
+# enquanto ela é lida.
+#
+# Armazenamento: tabela public.ia_auditoria_horaria no Supabase
+# (docs/supabase_ia_auditoria.sql). Quando a tabela não existe, ou com
+# IA_AUDITORIA_BACKEND=sqlite, usa um arquivo SQLite local
+# (IA_AUDITORIA_SQLITE), como a caixa de saída.
+#
+# ============================================
+
+from __future__ import annotations
+
+import logging
+import os
+import pathlib
+import socket
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TABELA = "ia_auditoria_horaria"
+_FUNCAO_SOMAR = "ia_auditoria_somar"  # soma das janelas no Postgres
+_PAGINA = 1000
+_LOTE_GRAVACAO = 500
+_RETENCAO_DIAS = int(os.getenv("IA_AUDITORIA_RETENCAO_DIAS", "90"))
+
+_SQLITE_PADRAO = pathlib.Path(__file__).resolve().parent.parent / "data" / "ia_auditoria.sqlite3"
+
+# Campos do evento que viram contadores próprios (além do total do evento).
+DIMENSOES = ("intent_id", "reason", "topic_hint")
+
+# Identifica as linhas deste processo; um deploy começa linhas novas.
+_INSTANCIA = f"{socket.gethostname()}-{os.getpid()}-{int(time.time())}"
+
+Chave = Tuple[str, str, str, str]  # (hora, evento, dimensão, valor)
+
+
+def _agora() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _hora(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0).isoformat()
+
+
+def _corte(janela_horas: int) -> str:
+    """Hora do primeiro balde da janela (inclui a hora corrente e a do corte)."""
+    return _hora(_agora() - timedelta(hours=max(1, int(janela_horas))))
+
+
+# =========================
+# Armazenamento: Supabase
+# =========================
+
+class _ArmazemSupabase:
+    nome = "supabase"
+
+    def __init__(self):
+        from src.sheets_supabase import supabase
+        self._db = supabase
+        self._rpc_somar = True
+
+    def gravar(self, linhas: List[dict]) -> None:
+        (
+            self._db.table(_TABELA)
+            .upsert(linhas, on_conflict="hora,instancia,evento,dimensao,valor")
+            .execute()
+        )
+
+    def somar(self, desde: str) -> List[dict]:
+        if self._rpc_somar:
+            try:
+                return self._db.rpc(_FUNCAO_SOMAR, {"desde": desde}).execute().data or []
+            except Exception as e:
+                if not _erro_funcao_ausente(e):
+                    raise
+                self._rpc_somar = False
+                logger.warning(
+                    "Função '%s' ausente no Supabase — somando a auditoria IA no bot. "
+                    "Execute docs/supabase_ia_auditoria.sql. Erro original: %s", _FUNCAO_SOMAR, e,
+                )
+        # Sem a função: páginas na ordem da chave primária (sem ORDER BY, o
+        # Postgres pode repetir ou pular linhas entre páginas).
+        linhas: List[dict] = []
+        inicio = 0
+        while True:
+            pagina = (
+                self._db.table(_TABELA)
+                .select("evento, dimensao, valor, total")
+                .gte("hora", desde)
+                .order("hora")
+                .order("instancia")
+                .order("evento")
+                .order("dimensao")
+                .order("valor")
+                .range(inicio, inicio + _PAGINA - 1)
+                .execute()
+                .data
+                or []
+            )
+            linhas.extend(pagina)
+            if len(pagina) < _PAGINA:
+                return linhas
+            inicio += _PAGINA
+
+    def limpar(self, antes: str) -> int:
+        resp = self._db.table(_TABELA).delete().lt("hora", antes).execute()
+        return len(resp.data or [])
+
+
+# =========================
+# Armazenamento: SQLite local
+# =========================
+
+_SQL_SQLITE = f"""
+create table if not exists {_TABELA} (
+    hora text not null,
+    instancia text not null,
+    evento text not null,
+    dimensao text not null default '',
+    valor text not null default '',
+    total integer not null default 0,
+    atualizado_em text not null,
+    primary key (hora, instancia, evento, dimensao, valor)
+);
+create index if not exists idx_{_TABELA}_hora on {_TABELA} (hora);
+"""
+
+_COLUNAS = ("hora", "instancia", "evento", "dimensao", "valor", "total", "atualizado_em")
+
+
+class _ArmazemSQLite:
+    nome = "sqlite"
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        pathlib.Path(caminho).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.executescript(_SQL_SQLITE)
+
+    def gravar(self, linhas: List[dict]) -> None:
+        sql = (
+            f"insert into {_TABELA} ({', '.join(_COLUNAS)}) values ({', '.join('?' for _ in _COLUNAS)}) "
+            f"on conflict (hora, instancia, evento, dimensao, valor) "
+            f"do update set total = excluded.total, atualizado_em = excluded.atualizado_em"
+        )
+        with self._lock:
+            self._conn.execute("begin")
+            self._conn.executemany(sql, [tuple(l[c] for c in _COLUNAS) for l in linhas])
+            self._conn.execute("commit")
+
+    def somar(self, desde: str) -> List[dict]:
+        with self._lock:
+            return [
+                dict(r) for r in self._conn.execute(
+                    f"select evento, dimensao, valor, sum(total) as total from {_TABELA} "
+                    f"where hora >= ? group by evento, dimensao, valor",
+                    (desde,),
+                )
+            ]
+
+    def limpar(self, antes: str) -> int:
+        with self._lock:
+            return self._conn.execute(f"delete from {_TABELA} where hora < ?", (antes,)).rowcount
+
+
+# =========================
+# Seleção do armazenamento
+# =========================
+
+_armazem = None
+_armazem_lock = threading.Lock()
+
+
+def _erro_tabela_ausente(exc: Exception) -> bool:
+    msg = str(exc or "")
+    return _TABELA in msg and ("PGRST205" in msg or "Could not find the table" in msg)
+
+
+def _erro_funcao_ausente(exc: Exception) -> bool:
+    msg = str(exc or "")
+    return _FUNCAO_SOMAR in msg and ("PGRST202" in msg or "Could not find the function" in msg)
+
+
+def _usar_sqlite(motivo: Optional[Exception] = None) -> _ArmazemSQLite:
+    global _armazem
+    caminho = os.getenv("IA_AUDITORIA_SQLITE", str(_SQLITE_PADRAO))
+    with _armazem_lock:
+        if not isinstance(_armazem, _ArmazemSQLite):
+            if motivo is not None:
+                logger.warning(
+                    "Tabela '%s' indisponível no Supabase. Usando SQLite local em %s. Erro original: %s",
+                    _TABELA, caminho, motivo,
+                )
+            _armazem = _ArmazemSQLite(caminho)
+        return _armazem
+
+
+def _obter_armazem():
+    global _armazem
+    if _armazem is None:
+        if os.getenv("IA_AUDITORIA_BACKEND", "supabase").strip().lower() == "sqlite":
+            return _usar_sqlite()
+        with _armazem_lock:
+            if _armazem is None:
+                _armazem = _ArmazemSupabase()
+    return _armazem
+
+
+def _executar(operacao: str, *args):
+    """Executa a operação no armazenamento atual; cai para o SQLite se a tabela não existir."""
+    armazem = _obter_armazem()
+    try:
+        return getattr(armazem, operacao)(*args)
+    except Exception as e:
+        if isinstance(armazem, _ArmazemSupabase) and _erro_tabela_ausente(e):
+            return getattr(_usar_sqlite(e), operacao)(*args)
+        raise
+
+
+# =========================
+# Contadores em memória
+# =========================
+
+_contadores: Dict[Chave, int] = {}
+_alterados: set = set()
+_lock = threading.Lock()
+_gravacao_lock = threading.Lock()
+
+
+def registrar_auditoria(evento: str, campos: Mapping[str, object], quando: Optional[datetime] = None) -> None:
+    """Conta um evento no balde da hora (só memória; a gravação é em lote)."""
+    hora = _hora(quando or _agora())
+    evento = str(evento or "").strip()
+    chaves = [(hora, evento, "", "")]
+    for dimensao in DIMENSOES:
+        valor = str(campos.get(dimensao) or "").strip()
+        if valor:
+            chaves.append((hora, evento, dimensao, valor))
+    with _lock:
+        for chave in chaves:
+            _contadores[chave] = _contadores.get(chave, 0) + 1
+            _alterados.add(chave)
+
+
+def descarregar_auditoria() -> int:
+    """
+    Grava os baldes alterados desde a última gravação. Retorna quantas
+    linhas foram gravadas; em erro, os baldes continuam marcados.
+    """
+    with _gravacao_lock:
+        with _lock:
+            pendentes = {chave: _contadores[chave] for chave in _alterados}
+            _alterados.clear()
+        if not pendentes:
+            return 0
+
+        agora = _agora()
+        atualizado_em = agora.isoformat(timespec="seconds")
+        linhas = [
+            {
+                "hora": hora,
+                "instancia": _INSTANCIA,
+                "evento": evento,
+                "dimensao": dimensao,
+                "valor": valor,
+                "total": total,
+                "atualizado_em": atualizado_em,
+            }
+            for (hora, evento, dimensao, valor), total in pendentes.items()
+        ]
+        try:
+            for i in range(0, len(linhas), _LOTE_GRAVACAO):
+                _executar("gravar", linhas[i:i + _LOTE_GRAVACAO])
+        except Exception as e:
+            logger.error("Erro ao gravar %d baldes da auditoria IA: %s", len(linhas), e)
+            with _lock:
+                _alterados.update(pendentes)
+            return 0
+
+        # Horas passadas não recebem mais eventos: já gravadas, saem da memória.
+        hora_atual = _hora(agora)
+        with _lock:
+            for chave in [c for c in _contadores if c[0] < hora_atual and c not in _alterados]:
+                del _contadores[chave]
+        return len(linhas)
+
+
+def totais_auditoria(janela_horas: int) -> Dict[Chave, int]:
+    """
+    Soma dos baldes da janela: {(evento, dimensão, valor): total}. O total
+    de cada evento fica em (evento, "", ""). Grava antes o que está pendente.
+    """
+    descarregar_auditoria()
+    desde = _corte(janela_horas)
+    totais: Counter = Counter()
+    try:
+        for linha in _executar("somar", desde):
+            totais[(linha["evento"], linha["dimensao"], linha["valor"])] += int(linha.get("total") or 0)
+    except Exception as e:
+        # Sem o armazenamento, ao menos os baldes ainda em memória deste processo.
+        logger.error("Erro ao somar a auditoria IA (%sh): %s", janela_horas, e)
+        with _lock:
+            for (hora, evento, dimensao, valor), total in _contadores.items():
+                if hora >= desde:
+                    totais[(evento, dimensao, valor)] += total
+    return dict(totais)
+
+
+def limpar_auditoria(dias: int = _RETENCAO_DIAS) -> int:
+    """Remove baldes com mais de `dias` dias."""
+    try:
+        return _executar("limpar", _hora(_agora() - timedelta(days=dias)))
+    except Exception as e:
+        logger.error("Erro ao limpar a auditoria IA: %s", e)
+        return 0
@@ -0,0 +1,311 @@
+# src/ia_intencoes.py
+# ============================================
+# BODE ANDARILHO - BASE DE INTENÇÕES COMPILADA (FALLBACK DO ASSISTENTE)
+# ============================================
+#
+# Toda mensagem livre que passava do classificador multinível relia e
+# reinterpretava docs/ajuda_ia_base.yaml linha a linha, e depois
+# renormalizava cada gatilho de cada intenção para um teste de substring.
+#
+# Aqui a base é lida uma vez e compilada:
+#
+# - gatilhos normalizados (_norm_text) uma única vez;
+# - um autômato Aho–Corasick por nível (nivel_permitido), só com os
+#   gatilhos das intenções liberadas para aquele nível;
+# - a classificação é uma passada linear pelo texto normalizado: cada
+#   gatilho encontrado soma max(1, nº de palavras) às suas intenções, e
+#   vence a maior pontuação (empate: a primeira intenção do arquivo) —
+#   exatamente o critério do classificador antigo.
+#
+# A base compilada é recarregada só quando muda o mtime (ou o tamanho) do
+# arquivo, então edições no YAML entram sem reiniciar o bot.
+#
+# ============================================
+
+from __future__ import annotations
+
+import ast
+import logging
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BASE_IA_PATH = Path(__file__).resolve().parents[1] / "docs" / "ajuda_ia_base.yaml"
+
+
+@dataclass
+class IntentItem:
+    intent_id: str
+    nivel_permitido: List[str]
+    gatilhos: List[str]
+    resposta_oficial: str
+    acao_tipo: str
+    acao_valor: str
+
+
+def _norm_text(value: str) -> str:
+    texto = unicodedata.normalize("NFKD", str(value or ""))
+    texto = "".join(ch for ch in texto if not unicodedata.combining(ch))
+    texto = texto.lower().strip()
+    texto = re.sub(r"\s+", " ", texto)
+    return texto
+
+
+def _parse_list_literal(raw: str) -> List[str]:
+    try:
+        value = ast.literal_eval(raw.strip())
+        if isinstance(value, list):
+            return [str(v).strip() for v in value if str(v).strip()]
+    except Exception:
+        return []
+    return []
+
+
+def _unquote(raw: str) -> str:
+    value = raw.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in {"'", '"'}:
+        return value[1:-1]
+    return value
+
+
+def carregar_intencoes_base(caminho: Path = BASE_IA_PATH) -> List[IntentItem]:
+    """Lê as intenções do YAML da base (parser próprio, sem dependência de PyYAML)."""
+    if not caminho.exists():
+        return []
+
+    linhas = caminho.read_text(encoding="utf-8").splitlines()
+    intencoes: List[IntentItem] = []
+    dentro_intencoes = False
+    atual: Optional[dict] = None
+    dentro_acao = False
+
+    def _finalizar_item() -> None:
+        nonlocal atual
+        if not atual:
+            return
+        if not atual.get("intent_id"):
+            atual = None
+            return
+        intencoes.append(
+            IntentItem(
+                intent_id=str(atual.get("intent_id", "")).strip(),
+                nivel_permitido=list(atual.get("nivel_permitido", []) or []),
+                gatilhos=list(atual.get("gatilhos", []) or []),
+                resposta_oficial=str(atual.get("resposta_oficial", "")).strip(),
+                acao_tipo=str(atual.get("acao_tipo", "")).strip(),
+                acao_valor=str(atual.get("acao_valor", "")).strip(),
+            )
+        )
+        atual = None
+
+    for linha in linhas:
+        raw = linha.rstrip()
+        if not raw.strip():
+            continue
+
+        if raw.startswith("intencoes:"):
+            dentro_intencoes = True
+            continue
+
+        if not dentro_intencoes:
+            continue
+
+        if re.match(r"^regras_de_roteamento:", raw):
+            _finalizar_item()
+            break
+
+        if re.match(r"^\s*-\s+intent_id:\s*", raw):
+            _finalizar_item()
+            intent_id = raw.split("intent_id:", 1)[1].strip()
+            atual = {
+                "intent_id": _unquote(intent_id),
+                "nivel_permitido": [],
+                "gatilhos": [],
+                "resposta_oficial": "",
+                "acao_tipo": "",
+                "acao_valor": "",
+            }
+            dentro_acao = False
+            continue
+
+        if not atual:
+            continue
+
+        if re.match(r"^\s*acao_recomendada:\s*$", raw):
+            dentro_acao = True
+            continue
+
+        if dentro_acao and re.match(r"^\s*tipo:\s*", raw):
+            atual["acao_tipo"] = _unquote(raw.split("tipo:", 1)[1].strip())
+            continue
+
+        if dentro_acao and re.match(r"^\s*valor:\s*", raw):
+            atual["acao_valor"] = _unquote(raw.split("valor:", 1)[1].strip())
+            continue
+
+        if re.match(r"^\s*nivel_permitido:\s*", raw):
+            atual["nivel_permitido"] = _parse_list_literal(raw.split("nivel_permitido:", 1)[1])
+            continue
+
+        if re.match(r"^\s*gatilhos:\s*", raw):
+            atual["gatilhos"] = _parse_list_literal(raw.split("gatilhos:", 1)[1])
+            continue
+
+        if re.match(r"^\s*resposta_oficial:\s*", raw):
+            atual["resposta_oficial"] = _unquote(raw.split("resposta_oficial:", 1)[1].strip())
+            continue
+
+        if re.match(r"^\s*origem:\s*", raw):
+            dentro_acao = False
+            continue
+
+    _finalizar_item()
+    return intencoes
+
+
+# =========================
+# Autômato Aho–Corasick
+# =========================
+
+class AutomatoGatilhos:
+    """Encontra, numa passada, todos os padrões que ocorrem como substring."""
+
+    def __init__(self, padroes: List[str]):
+        self._transicoes: List[Dict[str, int]] = [{}]
+        self._falha: List[int] = [0]
+        self._saidas: List[Tuple[int, ...]] = [()]
+
+        saidas: List[List[int]] = [[]]
+        for pid, padrao in enumerate(padroes):
+            estado = 0
+            for ch in padrao:
+                proximo = self._transicoes[estado].get(ch)
+                if proximo is None:
+                    proximo = len(self._transicoes)
+                    self._transicoes[estado][ch] = proximo
+                    self._transicoes.append({})
+                    self._falha.append(0)
+                    saidas.append([])
+                estado = proximo
+            saidas[estado].append(pid)
+
+        # BFS: ligação de falha = maior sufixo próprio que também é prefixo;
+        # as saídas herdam as do estado de falha (padrões contidos).
+        fila = list(self._transicoes[0].values())
+        inicio = 0
+        while inicio < len(fila):
+            estado = fila[inicio]
+            inicio += 1
+            for ch, filho in self._transicoes[estado].items():
+                fila.append(filho)
+                f = self._falha[estado]
+                while f and ch not in self._transicoes[f]:
+                    f = self._falha[f]
+                alvo = self._transicoes[f].get(ch, 0)
+                self._falha[filho] = alvo if alvo != filho else 0
+                saidas[filho].extend(saidas[self._falha[filho]])
+        self._saidas = [tuple(s) for s in saidas]
+
+    def encontrar(self, texto: str) -> set:
+        """Ids dos padrões presentes em `texto` (cada um uma vez)."""
+        transicoes, falha, saidas = self._transicoes, self._falha, self._saidas
+        achados: set = set()
+        estado = 0
+        for ch in texto:
+            while estado and ch not in transicoes[estado]:
+                estado = falha[estado]
+            estado = transicoes[estado].get(ch, 0)
+            if saidas[estado]:
+                achados.update(saidas[estado])
+        return achados
+
+
+class _IndiceNivel:
+    """Autômato de um nível + peso de cada gatilho em cada intenção."""
+
+    def __init__(self, intencoes: List[Tuple[int, IntentItem]]):
+        padroes: Dict[str, int] = {}
+        pesos: List[List[Tuple[int, int]]] = []
+        for posicao, item in intencoes:
+            for gatilho in item.gatilhos:
+                g = _norm_text(gatilho)
+                if not g:
+                    continue
+                pid = padroes.get(g)
+                if pid is None:
+                    pid = padroes[g] = len(pesos)
+                    pesos.append([])
+                pesos[pid].append((posicao, max(1, len(g.split()))))
+        self.automato = AutomatoGatilhos(list(padroes))
+        self.pesos = pesos
+
+
+class BaseIntencoes:
+    """Intenções da base compiladas por nível."""
+
+    def __init__(self, intencoes: List[IntentItem]):
+        self.intencoes = intencoes
+        por_nivel: Dict[str, List[Tuple[int, IntentItem]]] = {}
+        for posicao, item in enumerate(intencoes):
+            for nivel in dict.fromkeys(item.nivel_permitido):
+                por_nivel.setdefault(nivel, []).append((posicao, item))
+        self.niveis: Dict[str, _IndiceNivel] = {n: _IndiceNivel(itens) for n, itens in por_nivel.items()}
+
+    def classificar(self, texto: str, nivel: str) -> Optional[IntentItem]:
+        indice = self.niveis.get(nivel)
+        if indice is None:
+            return None
+        pontos: Dict[int, int] = {}
+        for pid in indice.automato.encontrar(_norm_text(texto)):
+            for posicao, peso in indice.pesos[pid]:
+                pontos[posicao] = pontos.get(posicao, 0) + peso
+        if not pontos:
+            return None
+        posicao = min(pontos, key=lambda p: (-pontos[p], p))
+        return self.intencoes[posicao]
+
+
+# =========================
+# Carga com recarga por mtime
+# =========================
+
+_compiladas: Dict[Path, Tuple[Tuple[int, int], BaseIntencoes]] = {}
+_lock = threading.Lock()
+
+
+def obter_base_intencoes(caminho: Path = BASE_IA_PATH) -> BaseIntencoes:
+    """Base compilada; relê o arquivo só se mtime/tamanho mudaram."""
+    try:
+        st = caminho.stat()
+        assinatura = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        assinatura = (0, 0)
+
+    atual = _compiladas.get(caminho)
+    if atual is not None and atual[0] == assinatura:
+        return atual[1]
+
+    with _lock:
+        atual = _compiladas.get(caminho)
+        if atual is not None and atual[0] == assinatura:
+            return atual[1]
+        try:
+            base = BaseIntencoes(carregar_intencoes_base(caminho))
+        except Exception as e:
+            if atual is not None:
+                logger.error("Erro ao recarregar %s; mantendo a base anterior: %s", caminho.name, e)
+                return atual[1]
+            raise
+        _compiladas[caminho] = (assinatura, base)
+        logger.info("Base de intenções compilada: %s intenções, níveis %s", len(base.intencoes), sorted(base.niveis))
+        return base
+
+
+def classificar_intencao_base(texto: str, nivel: str) -> Optional[IntentItem]:
+    """Intenção da base (docs/ajuda_ia_base.yaml) com maior pontuação para o nível."""
+    return obter_base_intencoes().classificar(texto, nivel)
@@ -11,6 +11,15 @@
 #   - NÃO cria fluxos paralelos, endpoints nem tabelas.
 #   - Toda ação sensível exige preview / confirmação.
 #   - Ambiguidade → pedir desambiguação mínima; nunca inferir sem segurança.
+#
+# Motor de regras:
+#   - cada mensagem é normalizada uma única vez (_Frase);
+#   - uma passada Aho–Corasick sobre o texto normalizado encontra todos os
+#     gatilhos e palavras-chave de todas as tabelas deste módulo; detectores
+#     e extratores só consultam esse conjunto (mesma semântica de substring
+#     do `g in t` de antes);
+#   - regexes pré-compiladas; cada entidade é extraída no máximo uma vez por
+#     mensagem, mesmo quando detector e classificador a consultam.
 # ============================================
 
 from __future__ import annotations
@@ -20,7 +29,10 @@ import re
 import unicodedata
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from functools import cached_property
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from src.ia_intencoes import AutomatoGatilhos
 
 logger = logging.getLogger(__name__)
 
@@ -47,14 +59,87 @@ class IAResult:
 # NORMALIZAÇÃO DE TEXTO
 # ============================================
 
+_RE_ESPACOS = re.compile(r"\s+")
+_RE_PONTUACAO_TRIPLICE = re.compile(r"[:.]")
+
+
 def _norm(value: str) -> str:
     texto = unicodedata.normalize("NFKD", str(value or ""))
     texto = "".join(ch for ch in texto if not unicodedata.combining(ch))
     texto = texto.lower().strip()
-    texto = re.sub(r"\s+", " ", texto)
+    texto = _RE_ESPACOS.sub(" ", texto)
     return texto
 
 
+class _Frase:
+    """
+    Mensagem analisada uma única vez.
+
+    `t` é o texto normalizado e `achados` o conjunto de literais das tabelas
+    do módulo presentes em `t` (uma passada do autômato). As entidades são
+    propriedades calculadas na primeira consulta e reaproveitadas.
+    """
+
+    def __init__(self, texto: Any):
+        self.original = str(texto or "").strip()
+        self.t = _norm(texto)
+        self.achados = {_LITERAIS[i] for i in _AUTOMATO.encontrar(self.t)}
+
+    def tem_algum(self, literais) -> bool:
+        return not self.achados.isdisjoint(literais)
+
+    def primeiro(self, literais) -> Optional[str]:
+        """Primeiro literal (na ordem da tabela) presente no texto."""
+        for literal in literais:
+            if literal in self.achados:
+                return literal
+        return None
+
+    @cached_property
+    def limpo(self) -> str:
+        """Texto sem pontos/dois-pontos (a:.m:. -> am) e com espaços colapsados."""
+        return _RE_ESPACOS.sub(" ", _RE_PONTUACAO_TRIPLICE.sub("", self.t)).strip()
+
+    @cached_property
+    def data(self) -> Optional[str]:
+        return _data_da_frase(self)
+
+    @cached_property
+    def hora(self) -> Optional[str]:
+        return _hora_da_frase(self)
+
+    @cached_property
+    def grau(self) -> Optional[str]:
+        return _grau_da_frase(self)
+
+    @cached_property
+    def agape(self) -> Tuple[Optional[str], Optional[str]]:
+        return _agape_da_frase(self)
+
+    @cached_property
+    def uf(self) -> Optional[str]:
+        return _uf_da_frase(self)
+
+    @cached_property
+    def rito(self) -> Optional[str]:
+        return _RITOS_MAP.get(self.primeiro(_RITOS_MAP))
+
+    @cached_property
+    def potencia(self) -> Optional[str]:
+        for padrao, potencia in _RE_POTENCIAS:
+            if padrao.search(self.t):
+                return potencia
+        return None
+
+    @cached_property
+    def cidade(self) -> Optional[str]:
+        return _cidade_da_frase(self)
+
+
+def _frase(texto: Union[str, _Frase]) -> _Frase:
+    return texto if isinstance(texto, _Frase) else _Frase(texto)
+
+
 # ============================================
 # EXTRAÇÃO DE ENTIDADES — DATA
 # ============================================
@@ -79,12 +164,20 @@ _MESES = {
 }
 
 
-def _extrair_data(texto: str) -> Optional[str]:
+_RE_DATA_BARRAS = re.compile(r"(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?")
+_RE_DATA_DIA = re.compile(r"dia (\d{1,2})(?:\s+de\s+(\w+))?")
+
+
+def _extrair_data(texto: Union[str, _Frase]) -> Optional[str]:
     """Extrai data no formato DD/MM/AAAA de linguagem natural."""
-    t = _norm(texto)
+    return _frase(texto).data
+
+
+def _data_da_frase(frase: _Frase) -> Optional[str]:
+    t = frase.t
 
     # Formato DD/MM/AAAA ou DD/MM
-    m = re.search(r"(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?", t)
+    m = _RE_DATA_BARRAS.search(t)
     if m:
         dd = int(m.group(1))
         mm = int(m.group(2))
@@ -98,29 +191,26 @@ def _extrair_data(texto: str) -> Optional[str]:
             pass
 
     # "próxima quarta", "essa sexta", "na quinta"
-    for dia_nome, dia_num in _DIAS_SEMANA.items():
-        if dia_nome in t:
-            hoje = datetime.now()
-            diff = (dia_num - hoje.weekday()) % 7
-            if diff == 0:
-                diff = 7  # "próxima" = semana que vem
-            if "proxima" in t or "proximo" in t:
-                if diff == 0:
-                    diff = 7
-            dt = hoje + timedelta(days=diff)
-            return dt.strftime("%d/%m/%Y")
+    dia_nome = frase.primeiro(_DIAS_SEMANA)
+    if dia_nome:
+        hoje = datetime.now()
+        diff = (_DIAS_SEMANA[dia_nome] - hoje.weekday()) % 7
+        if diff == 0:
+            diff = 7  # "próxima" = semana que vem
+        dt = hoje + timedelta(days=diff)
+        return dt.strftime("%d/%m/%Y")
 
     # "amanha"
-    if "amanha" in t:
+    if "amanha" in frase.achados:
         dt = datetime.now() + timedelta(days=1)
         return dt.strftime("%d/%m/%Y")
 
     # "hoje"
-    if "hoje" in t:
+    if "hoje" in frase.achados:
         return datetime.now().strftime("%d/%m/%Y")
 
     # "dia 25" or "dia 25 de abril"
-    m_dia = re.search(r"dia (\d{1,2})(?:\s+de\s+(\w+))?", t)
+    m_dia = _RE_DATA_DIA.search(t)
     if m_dia:
         dd = int(m_dia.group(1))
         mes_str = m_dia.group(2)
@@ -142,12 +232,20 @@ def _extrair_data(texto: str) -> Optional[str]:
 # EXTRAÇÃO DE ENTIDADES — HORA
 # ============================================
 
-def _extrair_hora(texto: str) -> Optional[str]:
+_RE_HORA_MINUTOS = re.compile(r"(\d{1,2})[h:](\d{2})(?::(\d{2}))?")
+_RE_HORA_CHEIA = re.compile(r"(?:as\s+)?(\d{1,2})\s*(?:horas?|hrs?)")
+
+
+def _extrair_hora(texto: Union[str, _Frase]) -> Optional[str]:
     """Extrai horário HH:MM de linguagem natural."""
-    t = _norm(texto)
+    return _frase(texto).hora
+
+
+def _hora_da_frase(frase: _Frase) -> Optional[str]:
+    t = frase.t
 
     # HH:MM ou HHhMM ou HH:MM:SS
-    m = re.search(r"(\d{1,2})[h:](\d{2})(?::(\d{2}))?", t)
+    m = _RE_HORA_MINUTOS.search(t)
     if m:
         hh = int(m.group(1))
         mm = int(m.group(2))
@@ -155,7 +253,7 @@ def _extrair_hora(texto: str) -> Optional[str]:
             return f"{hh:02d}:{mm:02d}"
 
     # "as 19", "19 horas"
-    m2 = re.search(r"(?:as\s+)?(\d{1,2})\s*(?:horas?|hrs?)", t)
+    m2 = _RE_HORA_CHEIA.search(t)
     if m2:
         hh = int(m2.group(1))
         if 0 <= hh <= 23:
@@ -177,31 +275,30 @@ _GRAUS_MAP = {
 }
 
 
-def _extrair_grau(texto: str) -> Optional[str]:
-    t = _norm(texto)
-    
-    # Remove pontos e colons colados para normalizar abreviações como a:.m:. -> am
-    t_clean = re.sub(r"[:.]", "", t)
-    t_clean = re.sub(r"\s+", " ", t_clean).strip()
-    
-    # Mapeamento de Abreviações Maçônicas canônicas com word boundary
-    if re.search(r"\bam\b|\ba\s+m\b", t_clean):
-        return "Aprendiz"
-    if re.search(r"\bcm\b|\bc\s+m\b", t_clean):
-        return "Companheiro"
-    if re.search(r"\bmm\b|\bm\s+m\b", t_clean):
-        return "Mestre"
-    if re.search(r"\bmi\b|\bm\s+i\b", t_clean):
-        return "Mestre Instalado"
-    if re.search(r"\bvm\b|\bv\s+m\b", t_clean):
-        return "Mestre Instalado"  # Venerável Mestre mapeia para nível de Mestre Instalado
-
-    # Fallback para termos longos ordinais
-    # Ordem longa → curta para evitar falso match de "mestre" em "mestre instalado"
-    for chave in ("mestre instalado", "mi", "companheiro", "aprendiz", "mestre"):
-        if chave in t:
-            return _GRAUS_MAP[chave]
-    return None
+# Abreviações maçônicas canônicas com word boundary, aplicadas ao texto sem
+# pontos (a:.m:. -> am), na ordem de prioridade.
+_RE_GRAUS_ABREVIADOS = [
+    (re.compile(r"\bam\b|\ba\s+m\b"), "Aprendiz"),
+    (re.compile(r"\bcm\b|\bc\s+m\b"), "Companheiro"),
+    (re.compile(r"\bmm\b|\bm\s+m\b"), "Mestre"),
+    (re.compile(r"\bmi\b|\bm\s+i\b"), "Mestre Instalado"),
+    (re.compile(r"\bvm\b|\bv\s+m\b"), "Mestre Instalado"),  # Venerável Mestre mapeia para nível de Mestre Instalado
+]
+
+# Fallback para termos longos ordinais
+# Ordem longa → curta para evitar falso match de "mestre" em "mestre instalado"
+_GRAUS_POR_EXTENSO = ("mestre instalado", "mi", "companheiro", "aprendiz", "mestre")
+
+
+def _extrair_grau(texto: Union[str, _Frase]) -> Optional[str]:
+    return _frase(texto).grau
+
+
+def _grau_da_frase(frase: _Frase) -> Optional[str]:
+    for padrao, grau in _RE_GRAUS_ABREVIADOS:
+        if padrao.search(frase.limpo):
+            return grau
+    return _GRAUS_MAP.get(frase.primeiro(_GRAUS_POR_EXTENSO))
 
 
 
@@ -209,18 +306,22 @@ def _extrair_grau(texto: str) -> Optional[str]:
 # EXTRAÇÃO DE ENTIDADES — ÁGAPE
 # ============================================
 
-def _extrair_agape(texto: str) -> Tuple[Optional[str], Optional[str]]:
+# O texto já chega sem acentos: "ágape" casa como "agape".
+_AGAPE_MAP = {
+    "sem agape": ("nao", ""),
+    "agape pago": ("sim", "pago"),
+    "agape gratuito": ("sim", "gratuito"),
+    "com agape": ("sim", ""),
+}
+
+
+def _extrair_agape(texto: Union[str, _Frase]) -> Tuple[Optional[str], Optional[str]]:
     """Retorna (tem_agape, tipo_agape) ou (None, None)."""
-    t = _norm(texto)
-    if "sem agape" in t or "sem ágape" in t:
-        return ("nao", "")
-    if "agape pago" in t or "ágape pago" in t:
-        return ("sim", "pago")
-    if "agape gratuito" in t or "ágape gratuito" in t:
-        return ("sim", "gratuito")
-    if "com agape" in t or "com ágape" in t:
-        return ("sim", "")
-    return (None, None)
+    return _frase(texto).agape
+
+
+def _agape_da_frase(frase: _Frase) -> Tuple[Optional[str], Optional[str]]:
+    return _AGAPE_MAP.get(frase.primeiro(_AGAPE_MAP), (None, None))
 
 
 # ============================================
@@ -254,28 +355,24 @@ CAMPOS_SENSÍVEIS = {
 }
 
 
-def _extrair_campo_cadastral(texto: str) -> Optional[str]:
+def _extrair_campo_cadastral(texto: Union[str, _Frase]) -> Optional[str]:
     """Identifica qual campo cadastral o usuário quer alterar."""
-    t = _norm(texto)
-    for chave, campo in _CAMPOS_CADASTRAIS_MAP.items():
-        if chave in t:
-            return campo
-    return None
+    return _CAMPOS_CADASTRAIS_MAP.get(_frase(texto).primeiro(_CAMPOS_CADASTRAIS_MAP))
+
 
+# "do irmao João", "do João", "de João", "membro João"
+_RE_NOME_ALVO = re.compile(
+    r"(?:do\s+irmao|do\s+ir\.|do|de|membro|irmao)\s+([A-Z][a-záéíóúãõ]+(?:\s+[A-Z][a-záéíóúãõ]+)*)",
+    re.IGNORECASE,
+)
 
-def _extrair_nome_alvo(texto: str) -> Optional[str]:
+
+def _extrair_nome_alvo(texto: Union[str, _Frase]) -> Optional[str]:
     """Tenta extrair nome do membro mencionado no texto (heurística simples)."""
-    t = _norm(texto)
-    # "do irmao João", "do João", "de João", "membro João"
-    patterns = [
-        r"(?:do\s+irmao|do\s+ir\.|do|de|membro|irmao)\s+([A-Z][a-záéíóúãõ]+(?:\s+[A-Z][a-záéíóúãõ]+)*)",
-    ]
-    # Work on original texto (case preserved) for name extraction
-    original = (texto or "").strip()
-    for pat in patterns:
-        m = re.search(pat, original, re.IGNORECASE)
-        if m:
-            return m.group(1).strip()
+    # Trabalha no texto original (com maiúsculas) para extrair o nome
+    m = _RE_NOME_ALVO.search(_frase(texto).original)
+    if m:
+        return m.group(1).strip()
     return None
 
 
@@ -293,7 +390,7 @@ def classificar_intencao_multinivel(
 
     Retorna IAResult com intent, entidades, callback de destino e tom.
     """
-    t = _norm(texto)
+    frase = _Frase(texto)
     result = IAResult()
 
     # Tom por perfil
@@ -305,27 +402,27 @@ def classificar_intencao_multinivel(
         result.tone = "direto"
 
     # ── NÍVEL 2/3: Criação de evento por linguagem natural ──────────
-    if nivel in ("2", "3") and _parece_criacao_evento(t):
-        return _classificar_criacao_evento(texto, nivel, result, lojas_do_secretario)
+    if nivel in ("2", "3") and _parece_criacao_evento(frase):
+        return _classificar_criacao_evento(frase, nivel, result, lojas_do_secretario)
 
     # ── QUALQUER NÍVEL: Edição cadastral ────────────────────────────
-    if _parece_edicao_cadastral(t):
-        return _classificar_edicao_cadastral(texto, nivel, result, lojas_do_secretario)
+    if _parece_edicao_cadastral(frase):
+        return _classificar_edicao_cadastral(frase, nivel, result, lojas_do_secretario)
 
     # ── NÍVEL 3: Comandos admin simples ─────────────────────────────
-    if nivel == "3" and _parece_comando_admin(t):
-        return _classificar_comando_admin(t, result)
+    if nivel == "3" and _parece_comando_admin(frase):
+        return _classificar_comando_admin(frase, result)
 
     # ── QUALQUER NÍVEL: Saudações Fraternas ─────────────────────────
-    if _parece_saudacao_fraterna(t):
+    if _parece_saudacao_fraterna(frase):
         return _classificar_saudacao_fraterna(result)
 
     # ── QUALQUER NÍVEL: Busca Natural de Sessões ────────────────────
-    if _parece_busca_eventos(t):
-        return _classificar_busca_eventos(texto, result)
+    if _parece_busca_eventos(frase):
+        return _classificar_busca_eventos(frase, result)
 
     # ── NÍVEL 1: Navegação assistida ────────────────────────────────
-    nav = _classificar_navegacao(t, nivel)
+    nav = _classificar_navegacao(frase, nivel)
     if nav:
         return nav
 
@@ -338,19 +435,19 @@ def classificar_intencao_multinivel(
 # DETECÇÃO DE INTENÇÃO — CRIAÇÃO DE EVENTO
 # ============================================
 
-_GATILHOS_CRIACAO_EVENTO = [
+_GATILHOS_CRIACAO_EVENTO = frozenset({
     "criar evento", "criar sessao", "cadastrar sessao", "cadastrar evento",
     "nova sessao", "novo evento", "agendar sessao", "agendar evento",
     "publicar sessao", "marcar sessao",
-]
+})
 
 
-def _parece_criacao_evento(t: str) -> bool:
-    return any(g in t for g in _GATILHOS_CRIACAO_EVENTO)
+def _parece_criacao_evento(frase: _Frase) -> bool:
+    return frase.tem_algum(_GATILHOS_CRIACAO_EVENTO)
 
 
 def _classificar_criacao_evento(
-    texto: str,
+    frase: _Frase,
     nivel: str,
     result: IAResult,
     lojas_do_secretario: Optional[List[Dict[str, Any]]] = None,
@@ -361,10 +458,10 @@ def _classificar_criacao_evento(
     result.needs_confirmation = True
 
     # Extrair entidades
-    data = _extrair_data(texto)
-    hora = _extrair_hora(texto)
-    grau = _extrair_grau(texto)
-    agape_tem, agape_tipo = _extrair_agape(texto)
+    data = frase.data
+    hora = frase.hora
+    grau = frase.grau
+    agape_tem, agape_tipo = frase.agape
 
     entities: Dict[str, str] = {}
     if data:
@@ -382,11 +479,11 @@ def _classificar_criacao_evento(
         _aplicar_loja_em_entities(_obter_loja_padrao_secretario(lojas_do_secretario), entities)
     else:
         # Admin: usa a loja apenas se ela vier explicitamente na mensagem.
-        loja_match = _match_loja_no_texto(texto, lojas_do_secretario)
+        loja_match = _match_loja_no_texto(frase, lojas_do_secretario)
         _aplicar_loja_em_entities(loja_match, entities)
 
     # Extrair campos soltos do texto: tipo_sessao, rito, potencia, traje, observacoes
-    _extrair_campos_evento_extras(texto, entities)
+    _extrair_campos_evento_extras(frase, entities)
 
     result.entities = entities
 
@@ -429,13 +526,13 @@ def _aplicar_loja_em_entities(
 
 
 def _match_loja_no_texto(
-    texto: str,
+    texto: Union[str, _Frase],
     lojas: Optional[List[Dict[str, Any]]] = None,
 ) -> Optional[Dict[str, Any]]:
     """Busca uma loja pelo nome no texto (fuzzy simples)."""
     if not lojas:
         return None
-    t = _norm(texto)
+    t = _frase(texto).t
     melhor: Optional[Dict[str, Any]] = None
     melhor_len = 0
     for loja in lojas:
@@ -545,51 +642,49 @@ def _montar_preview_evento_completo(entities: Dict[str, str]) -> str:
     return "\n".join(linhas)
 
 
-def _extrair_campos_evento_extras(texto: str, entities: Dict[str, str]) -> None:
+# Detecção Automática de Magnas (Chancelaria)
+_MAGNA_PAUTAS = {
+    "iniciacao": "Iniciação",
+    "elevacao": "Elevação",
+    "exaltacao": "Exaltação",
+    "instalacao": "Instalação",
+}
+
+_TIPOS_SESSAO = {
+    "sessao magna": "Magna", "magna": "Magna",
+    "sessao ordinaria": "Ordinária", "ordinaria": "Ordinária",
+    "sessao extraordinaria": "Extraordinária", "extraordinaria": "Extraordinária",
+    "sessao branca": "Branca", "branca": "Branca",
+    "sessao funebre": "Fúnebre", "funebre": "Fúnebre",
+}
+
+_TRAJES = {
+    "traje escuro": "Escuro", "terno escuro": "Escuro", "escuro": "Escuro",
+    "traje social": "Social", "social": "Social",
+    "traje passeio": "Passeio", "passeio": "Passeio",
+}
+
+
+def _extrair_campos_evento_extras(texto: Union[str, _Frase], entities: Dict[str, str]) -> None:
     """Extrai campos opcionais de evento do texto."""
-    t = _norm(texto)
-
-    # Detecção Automática de Magnas (Chancelaria)
-    magna_pautas = {
-        "iniciacao": "Iniciação",
-        "elevacao": "Elevação",
-        "exaltacao": "Exaltação",
-        "instalacao": "Instalação",
-    }
-    foi_magna = False
-    for chave, pauta in magna_pautas.items():
-        if chave in t:
-            entities["tipo_sessao"] = "Magna"
-            # Preenche a pauta automaticamente se não estiver informada
-            if not entities.get("observacoes"):
-                entities["observacoes"] = f"Sessão Magna de {pauta}"
-            foi_magna = True
-            break
-
-    # Tipo de sessão normal (se não capturada pela detecção magna acima)
-    if not foi_magna:
-        tipos_sessao = {
-            "sessao magna": "Magna", "magna": "Magna",
-            "sessao ordinaria": "Ordinária", "ordinaria": "Ordinária",
-            "sessao extraordinaria": "Extraordinária", "extraordinaria": "Extraordinária",
-            "sessao branca": "Branca", "branca": "Branca",
-            "sessao funebre": "Fúnebre", "funebre": "Fúnebre",
-        }
-        for chave, valor in tipos_sessao.items():
-            if chave in t:
-                entities.setdefault("tipo_sessao", valor)
-                break
+    frase = _frase(texto)
+
+    pauta = frase.primeiro(_MAGNA_PAUTAS)
+    if pauta:
+        entities["tipo_sessao"] = "Magna"
+        # Preenche a pauta automaticamente se não estiver informada
+        if not entities.get("observacoes"):
+            entities["observacoes"] = f"Sessão Magna de {_MAGNA_PAUTAS[pauta]}"
+    else:
+        # Tipo de sessão normal (se não capturada pela detecção magna acima)
+        tipo = frase.primeiro(_TIPOS_SESSAO)
+        if tipo:
+            entities.setdefault("tipo_sessao", _TIPOS_SESSAO[tipo])
 
     # Traje
-    trajes = {
-        "traje escuro": "Escuro", "terno escuro": "Escuro", "escuro": "Escuro",
-        "traje social": "Social", "social": "Social",
-        "traje passeio": "Passeio", "passeio": "Passeio",
-    }
-    for chave, valor in trajes.items():
-        if chave in t:
-            entities.setdefault("traje", valor)
-            break
+    traje = frase.primeiro(_TRAJES)
+    if traje:
+        entities.setdefault("traje", _TRAJES[traje])
 
 
 
@@ -597,7 +692,7 @@ def _extrair_campos_evento_extras(texto: str, entities: Dict[str, str]) -> None:
 # DETECÇÃO DE INTENÇÃO — EDIÇÃO CADASTRAL
 # ============================================
 
-_GATILHOS_EDICAO = [
+_GATILHOS_EDICAO = frozenset({
     "alterar cadastro", "editar cadastro", "mudar cadastro",
     "alterar meu", "editar meu", "mudar meu",
     "alterar nome", "mudar nome", "editar nome",
@@ -612,15 +707,15 @@ _GATILHOS_EDICAO = [
     "corrigir cadastro", "retificar cadastro",
     "alterar cadastro do", "editar cadastro do",
     "editar membro", "alterar membro",
-]
+})
 
 
-def _parece_edicao_cadastral(t: str) -> bool:
-    return any(g in t for g in _GATILHOS_EDICAO)
+def _parece_edicao_cadastral(frase: _Frase) -> bool:
+    return frase.tem_algum(_GATILHOS_EDICAO)
 
 
 def _classificar_edicao_cadastral(
-    texto: str,
+    frase: _Frase,
     nivel: str,
     result: IAResult,
     lojas_do_secretario: Optional[List[Dict[str, Any]]] = None,
@@ -628,10 +723,9 @@ def _classificar_edicao_cadastral(
     """Interpreta pedido de edição cadastral com validação ator/alvo/campo/escopo."""
     result.intent = "editar_cadastro"
     result.needs_confirmation = True
-    t = _norm(texto)
 
     # Identificar campo
-    campo = _extrair_campo_cadastral(texto)
+    campo = _extrair_campo_cadastral(frase)
     if campo and campo in CAMPOS_SENSÍVEIS:
         result.blocked = True
         result.block_reason = "campo_sensivel"
@@ -644,8 +738,8 @@ def _classificar_edicao_cadastral(
         return result
 
     # Identificar se é edição do próprio cadastro ou de outro membro
-    eh_proprio = _parece_edicao_propria(t)
-    nome_alvo = _extrair_nome_alvo(texto) if not eh_proprio else None
+    eh_proprio = _parece_edicao_propria(frase)
+    nome_alvo = _extrair_nome_alvo(frase) if not eh_proprio else None
 
     if eh_proprio or not nome_alvo:
         # Edição do próprio cadastro — qualquer nível pode
@@ -696,15 +790,17 @@ def _classificar_edicao_cadastral(
     return result
 
 
-def _parece_edicao_propria(t: str) -> bool:
-    indicadores = [
-        "meu cadastro", "meu perfil", "meu nome", "meu grau",
-        "minha loja", "meu oriente", "minha potencia", "meu rito",
-        "meu numero", "minha data", "meu nascimento",
-        "alterar meu", "editar meu", "mudar meu",
-        "corrigir meu", "retificar meu",
-    ]
-    return any(ind in t for ind in indicadores)
+_INDICADORES_EDICAO_PROPRIA = frozenset({
+    "meu cadastro", "meu perfil", "meu nome", "meu grau",
+    "minha loja", "meu oriente", "minha potencia", "meu rito",
+    "meu numero", "minha data", "meu nascimento",
+    "alterar meu", "editar meu", "mudar meu",
+    "corrigir meu", "retificar meu",
+})
+
+
+def _parece_edicao_propria(frase: _Frase) -> bool:
+    return frase.tem_algum(_INDICADORES_EDICAO_PROPRIA)
 
 
 # ============================================
@@ -723,17 +819,14 @@ _ADMIN_COMMANDS = [
 ]
 
 
-def _parece_comando_admin(t: str) -> bool:
-    for gatilhos, _, _ in _ADMIN_COMMANDS:
-        if any(g in t for g in gatilhos):
-            return True
-    return False
+def _parece_comando_admin(frase: _Frase) -> bool:
+    return any(frase.tem_algum(gatilhos) for gatilhos, _, _ in _ADMIN_COMMANDS)
 
 
-def _classificar_comando_admin(t: str, result: IAResult) -> IAResult:
+def _classificar_comando_admin(frase: _Frase, result: IAResult) -> IAResult:
     result.tone = "direto"
     for gatilhos, callback, resposta in _ADMIN_COMMANDS:
-        if any(g in t for g in gatilhos):
+        if frase.tem_algum(gatilhos):
             result.intent = f"admin_{callback}"
             result.confidence = "high"
             result.target_callback = callback
@@ -854,19 +947,23 @@ _NAV_INTENTS = [
 ]
 
 
-def _classificar_navegacao(t: str, nivel: str) -> Optional[IAResult]:
+# Gatilhos de navegação normalizados uma vez, com o peso de cada um
+# (nº de palavras, mínimo 1).
+_NAV_GATILHOS_PESOS = [
+    [(_norm(g), max(1, len(_norm(g).split()))) for g in gatilhos]
+    for gatilhos, _, _, _, _ in _NAV_INTENTS
+]
+
+
+def _classificar_navegacao(frase: _Frase, nivel: str) -> Optional[IAResult]:
     """Tenta classificar como navegação assistida."""
     melhor: Optional[Tuple[str, str, List[str]]] = None
     melhor_score = 0
 
-    for gatilhos, callback, resp1, resp_outros, niveis in _NAV_INTENTS:
+    for (_, callback, resp1, resp_outros, niveis), pesos in zip(_NAV_INTENTS, _NAV_GATILHOS_PESOS):
         if nivel not in niveis:
             continue
-        score = 0
-        for g in gatilhos:
-            g_norm = _norm(g)
-            if g_norm in t:
-                score += max(1, len(g_norm.split()))
+        score = sum(peso for g, peso in pesos if g in frase.achados)
         if score > melhor_score:
             resposta = resp1 if (nivel == "1" and resp1) else resp_outros
             melhor = (callback, resposta, niveis)
@@ -901,15 +998,16 @@ def complementar_evento_com_resposta(
     Usado quando o classificador pediu dados faltantes e o usuário respondeu.
     """
     entities = dict(entities_anterior)
+    frase = _Frase(texto_resposta)
 
     # Tentar extrair cada campo faltante
     if not entities.get("data"):
-        data = _extrair_data(texto_resposta)
+        data = frase.data
         if data:
             entities["data"] = data
 
     if not entities.get("hora"):
-        hora = _extrair_hora(texto_resposta)
+        hora = frase.hora
         if hora:
             entities["hora"] = hora
 
@@ -917,21 +1015,21 @@ def complementar_evento_com_resposta(
         if nivel == "2":
             _aplicar_loja_em_entities(_obter_loja_padrao_secretario(lojas_do_secretario), entities)
         else:
-            loja = _match_loja_no_texto(texto_resposta, lojas_do_secretario)
+            loja = _match_loja_no_texto(frase, lojas_do_secretario)
             _aplicar_loja_em_entities(loja, entities)
 
     if not entities.get("grau"):
-        grau = _extrair_grau(texto_resposta)
+        grau = frase.grau
         if grau:
             entities["grau"] = grau
 
-    agape_tem, agape_tipo = _extrair_agape(texto_resposta)
+    agape_tem, agape_tipo = frase.agape
     if agape_tem is not None and not entities.get("agape"):
         entities["agape"] = agape_tem
         if agape_tipo:
             entities["agape_tipo"] = agape_tipo
 
-    _extrair_campos_evento_extras(texto_resposta, entities)
+    _extrair_campos_evento_extras(frase, entities)
 
     # Verificar se agora está completo
     faltantes = _campos_evento_faltantes(entities)
@@ -1019,87 +1117,101 @@ _ESTADOS_UF_MAP = {
     "TO": "TO", "tocantins": "TO"
 }
 
-def _extrair_uf(texto: str) -> Optional[str]:
-    t = _norm(texto)
-    
-    # Tratamento isolado para "PA" para evitar falsos positivos com a preposição "para"
-    if "no para " in t or "do para " in t or "no estado do para" in t:
+# Tratamento isolado para "PA" para evitar falsos positivos com a preposição "para"
+_PA_EXPLICITO = frozenset({"no para ", "do para ", "no estado do para"})
+_RE_PA = re.compile(r"\bpa\b")
+
+# Siglas (chaves de 2 letras) casam por palavra inteira; nomes, por substring.
+_RE_UF_SIGLAS = re.compile(r"\b(" + "|".join(n for n in _ESTADOS_UF_MAP if len(n) <= 2) + r")\b")
+_UF_NOMES = [n for n in _ESTADOS_UF_MAP if len(n) > 2]
+
+
+def _extrair_uf(texto: Union[str, _Frase]) -> Optional[str]:
+    return _frase(texto).uf
+
+
+def _uf_da_frase(frase: _Frase) -> Optional[str]:
+    if frase.tem_algum(_PA_EXPLICITO):
         return "PA"
-    if re.search(r"\bpa\b", t) and not "para" in t:
+    if _RE_PA.search(frase.t) and "para" not in frase.achados:
         # Apenas assume se for a sigla literal sem preposição "para"
         return "PA"
 
-    # Demais siglas e nomes
+    # Demais siglas e nomes, na ordem do mapa
+    siglas = set(_RE_UF_SIGLAS.findall(frase.t))
     for nome, sigla in _ESTADOS_UF_MAP.items():
-        if len(nome) > 2:
-            if nome in t:
-                return sigla
-        else:
-            if re.search(rf"\b{nome}\b", t):
-                return sigla
+        encontrado = nome in frase.achados if len(nome) > 2 else nome in siglas
+        if encontrado:
+            return sigla
     return None
 
 
-def _extrair_rito(texto: str) -> Optional[str]:
-    t = _norm(texto)
-    ritos_map = {
-        "reaa": "REAA",
-        "escoces": "REAA",
-        "york": "York",
-        "emulacao": "Emulação",
-        "schroder": "Schröder",
-        "brasileiro": "Brasileiro",
-        "adonhiramita": "Adonhiramita",
-        "moderno": "Moderno",
-        "frances": "Moderno"
-    }
-    for chave, valor in ritos_map.items():
-        if chave in t:
-            return valor
-    return None
+_RITOS_MAP = {
+    "reaa": "REAA",
+    "escoces": "REAA",
+    "york": "York",
+    "emulacao": "Emulação",
+    "schroder": "Schröder",
+    "brasileiro": "Brasileiro",
+    "adonhiramita": "Adonhiramita",
+    "moderno": "Moderno",
+    "frances": "Moderno"
+}
 
 
-def _extrair_potencia(texto: str) -> Optional[str]:
-    t = _norm(texto)
-    if re.search(r"\bgob\b", t):
-        return "GOB"
-    if re.search(r"\bcmsb\b|\bgl\b|\bgrande loja\b", t):
-        return "CMSB"
-    if re.search(r"\bcomab\b|\bgo\b|\bgrande oriente\b", t):
-        return "COMAB"
-    return None
+def _extrair_rito(texto: Union[str, _Frase]) -> Optional[str]:
+    return _frase(texto).rito
 
 
-def _extrair_cidade(texto: str) -> Optional[str]:
-    t_orig = str(texto or "").strip()
-    # Procura capturar a capitalização correta de cidades após preposições
-    padroes = [
-        r"\b(?:em|no|na|de)\s+([A-Z][a-zà-ú]+(?:\s+[A-Z][a-zà-ú]+)*)\b",
-    ]
-    for pat in padroes:
-        m = re.search(pat, t_orig)
-        if m:
-            cid = m.group(1).strip()
-            # Pular palavras tipicamente reservadas para evitar ruídos
-            if cid.lower() in ["mestre", "aprendiz", "companheiro", "sessao", "loja", "rito", "potencia", "segunda", "terca", "quarta", "quinta", "sexta", "sabado", "domingo"]:
-                continue
-            # Se a cidade extraída coincide com UF do mapa, ignora
-            if cid.upper() in _ESTADOS_UF_MAP:
-                continue
-            return cid
-    return None
+_RE_POTENCIAS = [
+    (re.compile(r"\bgob\b"), "GOB"),
+    (re.compile(r"\bcmsb\b|\bgl\b|\bgrande loja\b"), "CMSB"),
+    (re.compile(r"\bcomab\b|\bgo\b|\bgrande oriente\b"), "COMAB"),
+]
 
 
-def _parece_saudacao_fraterna(t: str) -> bool:
-    # Normaliza removendo pontos triplices
-    t_clean = re.sub(r"[:.]", "", t)
-    t_clean = re.sub(r"\s+", " ", t_clean).strip()
-    
-    if re.search(r"\btfa\b|\bsalve\b", t_clean):
+def _extrair_potencia(texto: Union[str, _Frase]) -> Optional[str]:
+    return _frase(texto).potencia
+
+
+# Procura capturar a capitalização correta de cidades após preposições
+_RE_CIDADE = re.compile(r"\b(?:em|no|na|de)\s+([A-Z][a-zà-ú]+(?:\s+[A-Z][a-zà-ú]+)*)\b")
+
+# Palavras tipicamente reservadas, puladas para evitar ruídos
+_NAO_CIDADES = frozenset({
+    "mestre", "aprendiz", "companheiro", "sessao", "loja", "rito", "potencia",
+    "segunda", "terca", "quarta", "quinta", "sexta", "sabado", "domingo",
+})
+
+
+def _extrair_cidade(texto: Union[str, _Frase]) -> Optional[str]:
+    return _frase(texto).cidade
+
+
+def _cidade_da_frase(frase: _Frase) -> Optional[str]:
+    m = _RE_CIDADE.search(frase.original)
+    if not m:
+        return None
+    cid = m.group(1).strip()
+    if cid.lower() in _NAO_CIDADES:
+        return None
+    # Se a cidade extraída coincide com UF do mapa, ignora
+    if cid.upper() in _ESTADOS_UF_MAP:
+        return None
+    return cid
+
+
+_RE_SAUDACAO_CURTA = re.compile(r"\btfa\b|\bsalve\b")
+_GATILHOS_SAUDACAO = frozenset({
+    "bom dia", "boa tarde", "boa noite", "saudacoes", "saudo a", "sauda a", "ola", "oi",
+})
+
+
+def _parece_saudacao_fraterna(frase: _Frase) -> bool:
+    # Texto sem pontos triplices (t:.f:.a:. -> tfa)
+    if _RE_SAUDACAO_CURTA.search(frase.limpo):
         return True
-    
-    gatilhos = ["bom dia", "boa tarde", "boa noite", "saudacoes", "saudo a", "sauda a", "ola", "oi"]
-    return any(g in t for g in gatilhos)
+    return frase.tem_algum(_GATILHOS_SAUDACAO)
 
 
 def _classificar_saudacao_fraterna(result: IAResult) -> IAResult:
@@ -1109,31 +1221,33 @@ def _classificar_saudacao_fraterna(result: IAResult) -> IAResult:
     return result
 
 
-def _parece_busca_eventos(t: str) -> bool:
-    gatilhos = [
-        "buscar", "procurar", "achar", "encontrar", "listar", "ver",
-        "sessao", "sessoes", "evento", "eventos", "agenda", "calendario", "trabalho", "oficina"
-    ]
-    if any(g in t for g in gatilhos):
+_GATILHOS_BUSCA = frozenset({
+    "buscar", "procurar", "achar", "encontrar", "listar", "ver",
+    "sessao", "sessoes", "evento", "eventos", "agenda", "calendario", "trabalho", "oficina",
+})
+
+
+def _parece_busca_eventos(frase: _Frase) -> bool:
+    if frase.tem_algum(_GATILHOS_BUSCA):
         return True
     # Se contém elementos claros de filtro que indicam procura implícita
-    if _extrair_grau(t) and (_extrair_data(t) or _extrair_uf(t)):
+    if frase.grau and (frase.data or frase.uf):
         return True
     return False
 
 
-def _classificar_busca_eventos(texto: str, result: IAResult) -> IAResult:
+def _classificar_busca_eventos(frase: _Frase, result: IAResult) -> IAResult:
     result.intent = "buscar_eventos_natural"
     result.confidence = "high"
     
     entities = {}
     
-    data = _extrair_data(texto)
-    grau = _extrair_grau(texto)
-    uf = _extrair_uf(texto)
-    cidade = _extrair_cidade(texto)
-    rito = _extrair_rito(texto)
-    potencia = _extrair_potencia(texto)
+    data = frase.data
+    grau = frase.grau
+    uf = frase.uf
+    cidade = frase.cidade
+    rito = frase.rito
+    potencia = frase.potencia
     
     if data:
         entities["data"] = data
@@ -1167,3 +1281,28 @@ def _classificar_busca_eventos(texto: str, result: IAResult) -> IAResult:
         
     return result
 
+
+# ============================================
+# MOTOR DE REGRAS — LITERAIS E AUTÔMATO
+# ============================================
+# Todos os literais testados por substring nas tabelas acima, num único
+# autômato: uma passada por mensagem alimenta `_Frase.achados`.
+
+_LITERAIS: List[str] = sorted({
+    *_GATILHOS_CRIACAO_EVENTO,
+    *_GATILHOS_EDICAO,
+    *_INDICADORES_EDICAO_PROPRIA,
+    *(g for gatilhos, _, _ in _ADMIN_COMMANDS for g in gatilhos),
+    *(g for pesos in _NAV_GATILHOS_PESOS for g, _ in pesos),
+    *_GATILHOS_SAUDACAO,
+    *_GATILHOS_BUSCA,
+    *_DIAS_SEMANA, "amanha", "hoje",
+    *_GRAUS_POR_EXTENSO,
+    *_AGAPE_MAP,
+    *_CAMPOS_CADASTRAIS_MAP,
+    *_MAGNA_PAUTAS, *_TIPOS_SESSAO, *_TRAJES,
+    *_PA_EXPLICITO, "para",
+    *_UF_NOMES,
+    *_RITOS_MAP,
+})
+_AUTOMATO = AutomatoGatilhos(_LITERAIS)
@@ -0,0 +1,233 @@
+# src/indice_eventos.py
+# ============================================
+# BODE ANDARILHO - ÍNDICE EM MEMÓRIA DOS EVENTOS
+# ============================================
+#
+# Os menus de "Ver Sessões" consultam as mesmas sessões várias vezes por
+# minuto, cada vez reinterpretando "Data do evento", grau e rito. O
+# EventIndex é montado uma única vez por atualização do cache de eventos e
+# guarda tudo pré-processado:
+#
+# - datas já convertidas e um vetor ordenado de datas (bisect por intervalo);
+# - índices invertidos por grau, rito, potência, UF e cidade;
+# - o conjunto de (cidade, rito) com sessões futuras, para o relatório de
+#   demanda sem oferta (obter_gaps_sessoes);
+# - as listas de UFs, cidades por UF, potências e ritos prontas para os menus.
+#
+# A janela indexada começa na segunda-feira da semana atual (o menu "Esta
+# semana" ainda mostra os dias já passados) e vem do banco já filtrada por
+# data via consultar_eventos, então o custo acompanha a agenda futura e não
+# o histórico inteiro.
+#
+# ============================================
+
+from __future__ import annotations
+
+import bisect
+import logging
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.cache import namespace as _cache_namespace
+from src.sheets_supabase import (
+    _cache_consultas_eventos,
+    _cache_lojas,
+    _ttl_eventos,
+    consultar_eventos,
+)
+
+logger = logging.getLogger(__name__)
+
+_TAMANHO_PAGINA = 500
+
+# (geração das consultas de eventos, geração das lojas, dia) -> EventIndex
+_cache_indice = _cache_namespace("indice_eventos", _ttl_eventos, 2)
+# Último índice montado com sucesso: usado quando a recarga falha.
+_ultimo_indice: Optional[EventIndex] = None
+
+
+class EventIndex:
+    """Índice imutável de um conjunto de eventos, ordenados por (data, hora, id)."""
+
+    def __init__(self, eventos: Sequence[dict], lojas_map: Dict[str, dict], hoje: Optional[date] = None):
+        # Import tardio: eventos.py importa este módulo.
+        from src.eventos import (
+            _normalizar_rito,
+            _parse_hora,
+            _resolver_dados_geo_loja,
+            normalizar_grau_nome,
+            normalizar_id_evento,
+            parse_data_evento,
+        )
+
+        hoje = hoje or date.today()
+        itens = []
+        for ev in eventos:
+            dt = parse_data_evento(ev.get("Data do evento", ""))
+            if not dt:
+                continue
+            hh, mm = _parse_hora(ev.get("Hora", ""))
+            itens.append(((dt.date(), hh, mm, normalizar_id_evento(ev)), ev))
+        itens.sort(key=lambda item: item[0])
+
+        self.eventos: List[dict] = [item[1] for item in itens]
+        self.datas: List[date] = [item[0][0] for item in itens]
+        self.por_id: Dict[str, dict] = {item[0][3]: item[1] for item in itens}
+
+        self._por_grau: Dict[str, List[int]] = {}
+        self._por_rito: Dict[str, List[int]] = {}
+        self._por_potencia: Dict[str, List[int]] = {}
+        self._por_uf: Dict[str, List[int]] = {}
+        self._por_cidade: Dict[Tuple[str, str], List[int]] = {}
+        # cidade (minúscula, sem UF) -> ritos das sessões de hoje em diante ("" = sem rito)
+        self._ofertas: Dict[str, set] = {}
+
+        inicio_futuro = bisect.bisect_left(self.datas, hoje)
+        # Poucos valores distintos se repetem em milhares de eventos:
+        # normaliza cada texto bruto uma única vez.
+        graus_norm: Dict[str, str] = {}
+        ritos_norm: Dict[str, str] = {}
+        potencias: Dict[str, str] = {}
+        ritos: Dict[str, str] = {}
+        cidades_por_uf: Dict[str, Dict[str, str]] = {}
+
+        for pos, ev in enumerate(self.eventos):
+            futuro = pos >= inicio_futuro
+
+            grau_bruto = str(ev.get("Grau") or "").strip()
+            grau = graus_norm.get(grau_bruto)
+            if grau is None:
+                grau = graus_norm[grau_bruto] = normalizar_grau_nome(grau_bruto)
+            self._por_grau.setdefault(grau, []).append(pos)
+
+            rito_bruto = str(ev.get("Rito") or ev.get("rito") or "")
+            rito = ritos_norm.get(rito_bruto)
+            if rito is None:
+                rito = ritos_norm[rito_bruto] = _normalizar_rito(rito_bruto)
+            if rito:
+                self._por_rito.setdefault(rito.lower(), []).append(pos)
+                if futuro:
+                    ritos.setdefault(rito.lower(), rito)
+
+            potencia = str(ev.get("Potência") or ev.get("potencia") or "").strip()
+            if potencia:
+                self._por_potencia.setdefault(potencia.lower(), []).append(pos)
+                if futuro:
+                    potencias.setdefault(potencia, potencia)
+
+            uf, cidade = _resolver_dados_geo_loja(ev, lojas_map)
+            uf = uf.upper()
+            if uf:
+                self._por_uf.setdefault(uf, []).append(pos)
+            if uf and cidade:
+                self._por_cidade.setdefault((uf, cidade.lower()), []).append(pos)
+                if futuro:
+                    cidades_por_uf.setdefault(uf, {}).setdefault(cidade.lower(), cidade)
+            if futuro and cidade:
+                # Sem loja, o "Oriente" legado vem como "Cidade/UF".
+                cidade_oferta = cidade if uf else cidade.split("/")[0].strip()
+                self._ofertas.setdefault(cidade_oferta.lower(), set()).add(rito.lower())
+
+        # Listas prontas para os menus (somente sessões de hoje em diante).
+        self.ufs: List[str] = sorted(cidades_por_uf)
+        self.cidades_por_uf: Dict[str, List[str]] = {
+            uf: sorted(cidades.values(), key=lambda x: x.lower())
+            for uf, cidades in cidades_por_uf.items()
+        }
+        self.potencias: List[str] = sorted(potencias.values(), key=lambda x: x.lower())
+        self.ritos: List[str] = sorted(ritos.values(), key=lambda x: x.lower())
+
+    def __len__(self) -> int:
+        return len(self.eventos)
+
+    # ---------- consultas ----------
+
+    def _selecionar(self, posicoes: List[int], desde: Optional[date]) -> List[dict]:
+        if desde is not None:
+            corte = bisect.bisect_left(self.datas, desde)
+            posicoes = posicoes[bisect.bisect_left(posicoes, corte):]
+        return [self.eventos[pos] for pos in posicoes]
+
+    def intervalo(self, inicio: date, fim: Optional[date] = None) -> List[dict]:
+        """Eventos com data em [inicio, fim] (fim opcional), já ordenados."""
+        ini = bisect.bisect_left(self.datas, inicio)
+        end = bisect.bisect_right(self.datas, fim) if fim else len(self.datas)
+        return self.eventos[ini:end]
+
+    def por_grau(self, grau: str, desde: Optional[date] = None) -> List[dict]:
+        return self._selecionar(self._por_grau.get(grau, []), desde)
+
+    def por_rito(self, rito: str, desde: Optional[date] = None) -> List[dict]:
+        return self._selecionar(self._por_rito.get(rito.lower(), []), desde)
+
+    def por_potencia(self, potencia: str, desde: Optional[date] = None) -> List[dict]:
+        return self._selecionar(self._por_potencia.get(potencia.strip().lower(), []), desde)
+
+    def por_uf(self, uf: str, desde: Optional[date] = None) -> List[dict]:
+        return self._selecionar(self._por_uf.get(uf.strip().upper(), []), desde)
+
+    def por_cidade(self, uf: str, cidade: str, desde: Optional[date] = None) -> List[dict]:
+        chave = (uf.strip().upper(), cidade.strip().lower())
+        return self._selecionar(self._por_cidade.get(chave, []), desde)
+
+    def tem_sessao_futura(self, cidade: str, rito: str = "") -> bool:
+        """
+        Há sessão de hoje em diante na cidade (qualquer UF) com rito
+        compatível? Rito vazio de um dos lados aceita qualquer outro.
+        """
+        ritos = self._ofertas.get(cidade.strip().lower())
+        if not ritos:
+            return False
+        if not rito.strip() or "" in ritos:
+            return True
+        from src.eventos import _normalizar_rito
+
+        return _normalizar_rito(rito).lower() in ritos
+
+    def cidades(self, uf: str) -> List[str]:
+        return self.cidades_por_uf.get(uf.strip().upper(), [])
+
+    def evento(self, id_evento: str) -> Optional[dict]:
+        return self.por_id.get(id_evento)
+
+
+def _inicio_janela(hoje: date) -> date:
+    return hoje - timedelta(days=hoje.weekday())
+
+
+def _carregar_eventos_janela(inicio: date) -> List[dict]:
+    eventos: List[dict] = []
+    cursor = None
+    while True:
+        pagina, cursor = consultar_eventos(
+            data_inicio=inicio, limite=_TAMANHO_PAGINA, apos=cursor, propagar_erros=True
+        )
+        eventos.extend(pagina)
+        if not cursor:
+            return eventos
+
+
+def obter_indice_eventos() -> EventIndex:
+    """
+    Retorna o índice da agenda (semana atual em diante). É reconstruído quando
+    o TTL de eventos expira ou quando eventos/lojas são alterados pelo bot.
+    """
+    hoje = date.today()
+    chave = (_cache_consultas_eventos.geracao, _cache_lojas.geracao, hoje)
+
+    def _construir() -> EventIndex:
+        from src.eventos import _lojas_map_cache
+
+        inicio = _inicio_janela(hoje)
+        return EventIndex(_carregar_eventos_janela(inicio), _lojas_map_cache(), hoje)
+
+    global _ultimo_indice
+    try:
+        indice = _cache_indice.obter_ou_carregar(chave, _construir)
+    except Exception as e:
+        # Falha no meio da paginação: nada vai para o cache (a próxima chamada
+        # tenta de novo) e os menus seguem com a última agenda montada.
+        logger.error("Erro ao montar índice de eventos: %s", e)
+        return _ultimo_indice if _ultimo_indice is not None else EventIndex([], {}, hoje)
+    _ultimo_indice = indice
+    return indice
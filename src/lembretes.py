@@ -13,20 +13,30 @@
 # Os lembretes são disparados pelo scheduler.py e utilizam
 # as mensagens centralizadas em messages.py.
 # 
+# Cada job tem duas fases: "planejar" monta as mensagens e as grava na
+# caixa de saída (caixa_saida.py) com chave de idempotência; "entregar"
+# drena a caixa pelo despachante. Replanejar o mesmo dia (reexecução
+# manual ou recuperação após reinício) não duplica envios.
+# 
 # ============================================
 
+import asyncio
 from datetime import datetime, timedelta
 import logging
 from os import getenv
 
 from telegram import Bot
+from src.caixa_saida import agora_local, definir_validade, entregar_pendentes, planejar
+from src.despachante import MensagemSaida, RelatorioEnvio
 from src.sheets_supabase import (
     listar_eventos,
     listar_confirmacoes_por_eventos,
-    buscar_membro,
     buscar_confirmacoes_no_periodo,
     buscar_eventos_no_periodo,
-    get_preferencia_lembretes,
+    buscar_lojas_por_ids,
+    buscar_membros_por_ids,
+    contar_consultas,
+    get_preferencias_lembretes,
     obter_secretario_responsavel_evento,
 )
 from src.messages import (
@@ -44,6 +54,14 @@ from src.messages import (
 
 logger = logging.getLogger(__name__)
 
+JOB_LEMBRETE_24H = "lembrete_24h"
+JOB_LEMBRETE_MEIO_DIA = "lembrete_meio_dia"
+
+# Depois disso o lembrete perde o sentido e a caixa de saída o descarta
+# (mesmas janelas da recuperação no boot, em src.scheduler).
+definir_validade(JOB_LEMBRETE_24H, timedelta(hours=-3))  # até 21:00 da véspera da sessão
+definir_validade(JOB_LEMBRETE_MEIO_DIA, timedelta(hours=18))  # até 18:00 do dia da sessão
+
 
 def _parse_telegram_id(valor) -> int | None:
     """Normaliza Telegram ID aceitando formatos legados como '12345.0'."""
@@ -83,69 +101,100 @@ def _mesmo_dia(data_evento_str: str, data_alvo: datetime) -> bool:
     return dt_evento.date() == data_alvo.date()
 
 
-# ============================================
-# LEMBRETE DE 24H ANTES
-# ============================================
-
-async def enviar_lembretes_24h(bot: Bot):
+def _preparar_lembretes_do_dia(data_alvo: datetime) -> tuple[list[dict], dict, dict]:
     """
-    Envia lembretes 24h antes do evento.
-    Executado pelo scheduler às 8h da manhã.
-    
-    Fluxo:
-    1. Calcula a data de amanhã
-    2. Busca todos os eventos desta data
-    3. Para cada evento, busca os confirmados
-    4. Envia mensagem personalizada para cada confirmado
-    """
-    hoje = datetime.now()
-    amanha = hoje + timedelta(days=1)
+    Reúne em lote tudo que os lembretes do dia precisam, antes de montar
+    qualquer mensagem:
 
-    eventos = listar_eventos()
+    - confirmações de todos os eventos do dia (uma consulta in_());
+    - lojas vinculadas, para resolver o secretário (uma consulta in_());
+    - membros confirmados e secretários (uma consulta in_() por lote).
 
-    for evento in eventos:
+    Retorna (itens, membros, preferencias). Cada item traz o evento, seu ID,
+    a lista de confirmados e o secretário responsável.
+    """
+    itens: list[dict] = []
+    for evento in listar_eventos():
         data_evento = str(evento.get("Data do evento", "") or "").strip()
-        if not _mesmo_dia(data_evento, amanha):
+        if not _mesmo_dia(data_evento, data_alvo):
             continue
-
-        # Gera o ID do evento (preferencialmente da coluna ID Evento, com alternativa de compatibilidade)
+        # ID do evento (preferencialmente da coluna ID Evento, com alternativa de compatibilidade)
         legado = data_evento + " — " + str(evento.get("Nome da loja", "") or "")
         id_evento = str(evento.get("ID Evento", "")).strip() or legado
-        confirmados = listar_confirmacoes_por_eventos([id_evento, legado])
+        itens.append({"evento": evento, "data": data_evento, "id": id_evento, "legado": legado})
+
+    if not itens:
+        return [], {}, {}
+
+    ids_evento = [i for item in itens for i in (item["id"], item["legado"])]
+    confirmacoes_por_id: dict[str, list[dict]] = {}
+    for conf in listar_confirmacoes_por_eventos(ids_evento):
+        confirmacoes_por_id.setdefault(str(conf.get("ID Evento", "")).strip(), []).append(conf)
+
+    lojas_por_id = buscar_lojas_por_ids(
+        item["evento"].get("ID da loja") for item in itens
+    )
+
+    ids_confirmados: set[int] = set()
+    ids_secretarios: set[int] = set()
+    for item in itens:
+        chaves = dict.fromkeys((item["id"], item["legado"]))
+        item["confirmados"] = [c for chave in chaves for c in confirmacoes_por_id.get(chave, [])]
+        item["secretario_id"] = obter_secretario_responsavel_evento(item["evento"], lojas_por_id)
+        for conf in item["confirmados"]:
+            tid = _parse_telegram_id(conf.get("Telegram ID", ""))
+            if tid is not None:
+                ids_confirmados.add(tid)
+        if item["secretario_id"]:
+            ids_secretarios.add(item["secretario_id"])
+
+    membros = buscar_membros_por_ids(ids_confirmados | ids_secretarios)
+    # Já servido pelo cache preenchido na linha anterior.
+    preferencias = get_preferencias_lembretes(ids_confirmados)
+    return itens, membros, preferencias
+
+
+def _destinatarios_confirmados(item: dict, preferencias: dict):
+    """Confirmados que devem receber o lembrete: (telegram_id, confirmação)."""
+    secretario_id = item["secretario_id"]
+    for membro in item["confirmados"]:
+        telegram_id_int = _parse_telegram_id(membro.get("Telegram ID", ""))
+        if telegram_id_int is None:
+            continue
+        # Secretário receberá circular própria com contagem; não duplicar aqui
+        if secretario_id and telegram_id_int == secretario_id:
+            continue
+        if not preferencias.get(telegram_id_int, True):
+            continue
+        yield telegram_id_int, membro
+
+
+# ============================================
+# LEMBRETE DE 24H ANTES
+# ============================================
+
+def _montar_lembretes_24h(amanha: datetime) -> list[MensagemSaida]:
+    """Monta em memória os lembretes 24h (confirmados + circular do secretário)."""
+    itens, membros, preferencias = _preparar_lembretes_do_dia(amanha)
+
+    mensagens: list[MensagemSaida] = []
+    for item in itens:
+        evento = item["evento"]
+        id_evento = item["id"]
+        data_evento = item["data"]
+        confirmados = item["confirmados"]
+        secretario_id = item["secretario_id"]
 
         nome_loja = evento.get("Nome da loja", "")
-        numero_loja = evento.get("Número da loja", "")
         horario = evento.get("Hora", "")
         local = evento.get("Endereço da sessão", "")
         grau = evento.get("Grau", "")
         traje = evento.get("Traje obrigatório", "")
         agape = evento.get("Ágape", "")
-        numero_fmt = f" {numero_loja}" if numero_loja else ""
-
-        # Resolve o ID do secretário antes do loop para poder aplicar o skip
-        secretario_id = obter_secretario_responsavel_evento(evento)
-
-        # Envia lembretes para confirmados (skip do secretário — receberá mensagem especial)
-        for membro in confirmados:
-            telegram_id = membro.get("Telegram ID", "")
-            nome = membro.get("Nome", "")
-            if not telegram_id:
-                continue
-
-            telegram_id_int = _parse_telegram_id(telegram_id)
-            if telegram_id_int is None:
-                continue
-
-            # Secretário receberá circular própria com contagem; não duplicar aqui
-            if secretario_id and telegram_id_int == secretario_id:
-                continue
 
-            if not get_preferencia_lembretes(telegram_id_int):
-                continue
-
-            # Monta mensagem usando template
+        for telegram_id_int, membro in _destinatarios_confirmados(item, preferencias):
             texto = LEMBRETE_CORPO.format(
-                nome=nome,
+                nome=membro.get("Nome", ""),
                 data=data_evento,
                 loja=nome_loja,
                 horario=horario,
@@ -154,29 +203,16 @@ async def enviar_lembretes_24h(bot: Bot):
                 traje=traje,
                 agape=agape,
             )
+            mensagens.append(MensagemSaida(telegram_id_int, texto, rotulo=f"{JOB_LEMBRETE_24H}|{id_evento}"))
 
-            try:
-                await bot.send_message(
-                    chat_id=telegram_id_int,
-                    text=texto,
-                    parse_mode="Markdown"
-                )
-                print(f"Lembrete 24h enviado para {nome} ({telegram_id})")
-            except Exception as e:
-                print(f"Erro ao enviar lembrete 24h para {telegram_id}: {e}")
-
-        # Envia circular especial ao secretário (com contagem de confirmados)
-        # secretario_id já resolvido acima
+        # Circular especial ao secretário (com contagem de confirmados)
         if secretario_id:
-            secretario = buscar_membro(secretario_id)
+            secretario = membros.get(secretario_id)
             if secretario:
-                nome_secretario = secretario.get("Nome", "")
-                num_confirmados = len(confirmados)
-                
                 texto_secretario = (
                     f"{LEMBRETE_SECRETARIO_TITULO}\n\n"
                     + LEMBRETE_SECRETARIO_CORPO.format(
-                        nome=nome_secretario,
+                        nome=secretario.get("Nome", ""),
                         data=data_evento,
                         loja=nome_loja,
                         horario=horario,
@@ -184,54 +220,64 @@ async def enviar_lembretes_24h(bot: Bot):
                         grau=grau,
                         traje=traje,
                         agape=agape,
-                        num_confirmados=num_confirmados,
+                        num_confirmados=len(confirmados),
                     )
                 )
-
-                try:
-                    await bot.send_message(
-                        chat_id=secretario_id,
-                        text=texto_secretario,
-                        parse_mode="Markdown"
-                    )
-                    print(f"Lembrete 24h enviado para secretário {nome_secretario} ({secretario_id})")
-                except Exception as e:
-                    print(f"Erro ao enviar lembrete 24h para secretário {secretario_id}: {e}")
+                mensagens.append(
+                    MensagemSaida(secretario_id, texto_secretario, rotulo=f"lembrete_24h_secretario|{id_evento}")
+                )
         elif evento.get("Telegram ID do secretário", ""):
             logger.warning(
                 "Secretário responsável não resolvido em lembrete 24h (valor legado=%r).",
                 evento.get("Telegram ID do secretário", ""),
             )
 
+    return mensagens
 
-# ============================================
-# LEMBRETE DE MEIO-DIA
-# ============================================
 
-async def enviar_lembretes_meio_dia(bot: Bot):
+def planejar_lembretes_24h() -> dict[str, int]:
     """
-    Envia lembretes ao meio-dia do dia do evento.
-    Executado pelo scheduler às 12h.
+    Fase "planejar" do lembrete 24h: grava na caixa de saída as mensagens
+    das sessões de amanhã. Retorna a contagem de consultas da preparação.
+    """
+    amanha = agora_local() + timedelta(days=1)
+    with contar_consultas() as consultas:
+        mensagens = _montar_lembretes_24h(amanha)
+    planejar(JOB_LEMBRETE_24H, mensagens, amanha.strftime("%Y-%m-%d"))
+    return consultas
+
+
+async def enviar_lembretes_24h(bot: Bot) -> RelatorioEnvio:
+    """
+    Envia lembretes 24h antes do evento.
+    Executado pelo scheduler às 8h da manhã.
     
     Fluxo:
-    1. Calcula a data de hoje
-    2. Busca todos os eventos desta data
-    3. Para cada evento, busca os confirmados
-    4. Envia mensagem especial de meio-dia
+    1. Calcula a data de amanhã
+    2. Busca em lote os eventos desta data, confirmados, membros e preferências
+    3. Monta a mensagem personalizada de cada confirmado e grava na caixa de saída
+    4. Entrega as pendentes pelo despachante (com limite de taxa) e retorna o relatório
     """
-    hoje = datetime.now()
+    consultas = await asyncio.to_thread(planejar_lembretes_24h)
+    relatorio = await entregar_pendentes(bot, job=JOB_LEMBRETE_24H, nome=JOB_LEMBRETE_24H)
+    relatorio.consultas = consultas
+    return relatorio
 
-    eventos = listar_eventos()
 
-    for evento in eventos:
-        data_evento = str(evento.get("Data do evento", "") or "").strip()
-        if not _mesmo_dia(data_evento, hoje):
-            continue
+# ============================================
+# LEMBRETE DE MEIO-DIA
+# ============================================
 
-        # Gera o ID do evento (preferencialmente da coluna ID Evento, com alternativa de compatibilidade)
-        legado = data_evento + " — " + str(evento.get("Nome da loja", "") or "")
-        id_evento = str(evento.get("ID Evento", "")).strip() or legado
-        confirmados = listar_confirmacoes_por_eventos([id_evento, legado])
+def _montar_lembretes_meio_dia(hoje: datetime) -> list[MensagemSaida]:
+    """Monta em memória os lembretes de meio-dia (confirmados + circular do secretário)."""
+    itens, membros, preferencias = _preparar_lembretes_do_dia(hoje)
+
+    mensagens: list[MensagemSaida] = []
+    for item in itens:
+        evento = item["evento"]
+        id_evento = item["id"]
+        confirmados = item["confirmados"]
+        secretario_id = item["secretario_id"]
 
         nome_loja = evento.get("Nome da loja", "")
         numero_loja = evento.get("Número da loja", "")
@@ -239,55 +285,24 @@ async def enviar_lembretes_meio_dia(bot: Bot):
         local = evento.get("Endereço da sessão", "")
         numero_fmt = f" {numero_loja}" if numero_loja else ""
 
-        # Resolve o ID do secretário antes do loop para poder aplicar o skip
-        secretario_id = obter_secretario_responsavel_evento(evento)
-
-        # Envia lembretes para confirmados (skip do secretário — receberá circular especial)
-        for membro in confirmados:
-            telegram_id = membro.get("Telegram ID", "")
-            nome = membro.get("Nome", "")
-            if not telegram_id:
-                continue
-
-            telegram_id_int = _parse_telegram_id(telegram_id)
-            if telegram_id_int is None:
-                continue
-
-            # Secretário receberá circular própria com contagem; não duplicar aqui
-            if secretario_id and telegram_id_int == secretario_id:
-                continue
-
-            if not get_preferencia_lembretes(telegram_id_int):
-                continue
-
-            # Monta mensagem usando template
+        for telegram_id_int, membro in _destinatarios_confirmados(item, preferencias):
             texto = LEMBRETE_MEIO_DIA_CORPO.format(
-                nome=nome,
+                nome=membro.get("Nome", ""),
                 loja=nome_loja,
                 numero=numero_fmt,
                 local=local,
                 horario=horario,
             )
+            mensagens.append(MensagemSaida(telegram_id_int, texto, rotulo=f"{JOB_LEMBRETE_MEIO_DIA}|{id_evento}"))
 
-            try:
-                await bot.send_message(
-                    chat_id=telegram_id_int,
-                    text=texto,
-                    parse_mode="Markdown"
-                )
-                print(f"Lembrete meio-dia enviado para {nome} ({telegram_id})")
-            except Exception as e:
-                print(f"Erro ao enviar lembrete meio-dia para {telegram_id}: {e}")
-
-        # Envia circular especial ao secretário com contagem de confirmados
+        # Circular especial ao secretário com contagem de confirmados
         if secretario_id:
-            secretario = buscar_membro(secretario_id)
+            secretario = membros.get(secretario_id)
             if secretario:
-                nome_secretario = secretario.get("Nome", "")
                 texto_secretario = (
                     f"{LEMBRETE_SECRETARIO_MEIO_DIA_TITULO}\n\n"
                     + LEMBRETE_SECRETARIO_MEIO_DIA_CORPO.format(
-                        nome=nome_secretario,
+                        nome=secretario.get("Nome", ""),
                         loja=nome_loja,
                         numero=numero_fmt,
                         local=local,
@@ -295,21 +310,46 @@ async def enviar_lembretes_meio_dia(bot: Bot):
                         num_confirmados=len(confirmados),
                     )
                 )
-                try:
-                    await bot.send_message(
-                        chat_id=secretario_id,
-                        text=texto_secretario,
-                        parse_mode="Markdown"
-                    )
-                    print(f"Circular meio-dia enviada ao secretário {nome_secretario} ({secretario_id})")
-                except Exception as e:
-                    print(f"Erro ao enviar circular meio-dia ao secretário {secretario_id}: {e}")
+                mensagens.append(
+                    MensagemSaida(secretario_id, texto_secretario, rotulo=f"lembrete_meio_dia_secretario|{id_evento}")
+                )
         elif evento.get("Telegram ID do secretário", ""):
             logger.warning(
                 "Secretário responsável não resolvido em lembrete meio-dia (valor legado=%r).",
                 evento.get("Telegram ID do secretário", ""),
             )
 
+    return mensagens
+
+
+def planejar_lembretes_meio_dia() -> dict[str, int]:
+    """
+    Fase "planejar" do lembrete de meio-dia: grava na caixa de saída as
+    mensagens das sessões de hoje. Retorna a contagem de consultas.
+    """
+    hoje = agora_local()
+    with contar_consultas() as consultas:
+        mensagens = _montar_lembretes_meio_dia(hoje)
+    planejar(JOB_LEMBRETE_MEIO_DIA, mensagens, hoje.strftime("%Y-%m-%d"))
+    return consultas
+
+
+async def enviar_lembretes_meio_dia(bot: Bot) -> RelatorioEnvio:
+    """
+    Envia lembretes ao meio-dia do dia do evento.
+    Executado pelo scheduler às 12h.
+    
+    Fluxo:
+    1. Calcula a data de hoje
+    2. Busca em lote os eventos desta data, confirmados, membros e preferências
+    3. Monta a mensagem especial de meio-dia e grava na caixa de saída
+    4. Entrega as pendentes pelo despachante (com limite de taxa) e retorna o relatório
+    """
+    consultas = await asyncio.to_thread(planejar_lembretes_meio_dia)
+    relatorio = await entregar_pendentes(bot, job=JOB_LEMBRETE_MEIO_DIA, nome=JOB_LEMBRETE_MEIO_DIA)
+    relatorio.consultas = consultas
+    return relatorio
+
 
 async def enviar_celebracao_mensal(bot: Bot):
     """Envia mensagem coletiva de celebração com estatísticas do mês anterior."""
@@ -7,6 +7,7 @@ from __future__ import annotations
 
 import logging
 import asyncio
+import hashlib
 import json
 import mimetypes
 from io import BytesIO
@@ -604,6 +605,9 @@ async def receber_template_loja(update: Update, context: ContextTypes.DEFAULT_TY
     if not url:
         await msg.reply_text("Não consegui salvar o template no Supabase Storage. Verifique o bucket event-cards.")
         return TEMPLATE_UPLOAD
+    # O caminho no Storage é sempre o mesmo; a versão na URL faz o hash visual
+    # dos cards (render_cards.card_hash_visual) mudar quando o template muda.
+    url = f"{url.rstrip('?')}{'&' if '?' in url.rstrip('?') else '?'}v={hashlib.sha1(bytes(raw)).hexdigest()[:12]}"
 
     layout = {
         "area_texto": {
@@ -509,7 +509,7 @@ EDICAO_EVENTO_CANCELADA = "Edição cancelada."
 # ============================================
 # MENSAGENS DE GRUPO E ONBOARDING
 # ============================================
-# Mensagens exibidas em grupos e no onboarding de novos membros (main.py)
+# Mensagens exibidas em grupos e no onboarding de novos membros (src/aplicacao.py)
 
 # [CONTEXTO] Enviado no privado a membro sem cadastro que usou "bode" no grupo
 # [CANAL] Privado
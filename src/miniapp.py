@@ -6,7 +6,7 @@
 # Fornece formulários web para cadastro de membros, eventos e lojas,
 # servidos diretamente pelo Starlette no Render.
 #
-# Rotas Starlette registradas em main.py:
+# Rotas Starlette registradas em src/aplicacao.py:
 #   GET  /webapp/cadastro_membro  <- get_cadastro_membro()
 #   GET  /webapp/cadastro_evento  <- get_cadastro_evento()
 #   GET  /webapp/cadastro_loja    <- get_cadastro_loja()
@@ -35,7 +35,7 @@ from typing import Any, Dict, List, Optional
 from urllib.parse import parse_qsl, unquote
 
 from starlette.requests import Request
-from starlette.responses import HTMLResponse, JSONResponse
+from starlette.responses import HTMLResponse, JSONResponse, Response
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo, Update
 
@@ -2454,13 +2454,30 @@ body {
     script = """
 (async () => {
   try {
+    // Última resposta guardada por usuário: o servidor responde 304 se o ETag ainda vale.
+    const uid = (tg && tg.initDataUnsafe && tg.initDataUnsafe.user) ? tg.initDataUnsafe.user.id : 'anon';
+    const chaveCache = `galeria_${uid}`;
+    let guardado = null;
+    try { guardado = JSON.parse(localStorage.getItem(chaveCache) || 'null'); } catch (c) {}
+
+    const headers = {'Content-Type': 'application/json'};
+    if (guardado && guardado.etag) headers['If-None-Match'] = guardado.etag;
     const resp = await fetch('/api/galeria', {
       method: 'POST',
-      headers: {'Content-Type': 'application/json'},
+      headers: headers,
       body: JSON.stringify({ init_data: tgInitData() })
     });
     
-    const dados = await resp.json();
+    let dados;
+    if (resp.status === 304 && guardado) {
+      dados = guardado.dados;
+    } else {
+      dados = await resp.json();
+      const etag = resp.headers.get('ETag');
+      if (dados.ok && etag) {
+        try { localStorage.setItem(chaveCache, JSON.stringify({ etag: etag, dados: dados })); } catch (c) {}
+      }
+    }
     if (!dados.ok) {
       document.body.innerHTML = `<div style="padding:40px 20px; text-align:center; color:#ef4444; font-weight:600;">Acesso não autorizado. Por favor abra através do Bot oficial.</div>`;
       return;
@@ -2576,7 +2593,7 @@ async def get_galeria(request: Request) -> HTMLResponse:
     return HTMLResponse(html_galeria())
 
 
-async def api_galeria(request: Request) -> JSONResponse:
+async def api_galeria(request: Request) -> Response:
     """Endpoint API autenticado que alimenta os dados da Sala de Troféus."""
     bot_token: str = request.app.state.bot_token
     try:
@@ -2593,18 +2610,16 @@ async def api_galeria(request: Request) -> JSONResponse:
     if not telegram_id:
         return JSONResponse({"ok": False, "error": "Usuário não identificado."}, status_code=403)
 
-    from src.sheets_supabase import buscar_membro, get_galeria_completa
-    
-    membro = buscar_membro(int(telegram_id))
-    if not membro:
+    from src.galeria_cache import etag_confere, obter_galeria
+
+    # Payload materializado (src.galeria_cache): acerto no cache não sai do
+    # event loop; a montagem, quando falta, roda em thread.
+    galeria = await obter_galeria(int(telegram_id))
+    if galeria is None:
         return JSONResponse({"ok": False, "error": "Membro não cadastrado."}, status_code=404)
-        
-    loja_id = membro.get("loja_id") or membro.get("ID da loja")
-    nome_membro = membro.get("Nome") or membro.get("nome") or "Obreiro"
-    
-    dados = get_galeria_completa(int(telegram_id), loja_id)
-    dados["nome_membro"] = nome_membro
-    dados["ok"] = True
-    
-    return JSONResponse(dados)
+
+    cabecalhos = {"ETag": galeria.etag, "Cache-Control": "private, no-cache"}
+    if etag_confere(request.headers.get("if-none-match", ""), galeria.etag):
+        return Response(status_code=304, headers=cabecalhos)
+    return Response(galeria.corpo, media_type="application/json", headers=cabecalhos)
 
@@ -13,7 +13,8 @@ from src.sheets_supabase import (
     is_first_of_potencia,
     listar_lojas
 )
-from src.render_marcos import renderizar_card_celebracao
+from src.render_saida import ImagemRenderizada
+from src.servico_render import render
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +28,11 @@ def _obter_grupo_central() -> Optional[int]:
     except Exception:
         return None
 
-async def _enviar_card_telegram(bot: Bot, file_path: str, caption: str):
+async def _renderizar_celebracao(**kwargs: Any) -> ImagemRenderizada:
+    """Card comemorativo no serviço de render (fora do event loop)."""
+    return await render("celebracao", kwargs, espera=None)
+
+async def _enviar_card_telegram(bot: Bot, imagem: ImagemRenderizada, caption: str):
     """Envia a imagem com legenda para o grupo central de forma segura."""
     chat_id = _obter_grupo_central()
     if not chat_id:
@@ -35,23 +40,15 @@ async def _enviar_card_telegram(bot: Bot, file_path: str, caption: str):
         return
         
     try:
-        with open(file_path, "rb") as photo:
-            await bot.send_photo(
-                chat_id=chat_id,
-                photo=photo,
-                caption=caption,
-                parse_mode="Markdown"
-            )
+        await bot.send_photo(
+            chat_id=chat_id,
+            photo=imagem.arquivo("celebracao"),
+            caption=caption,
+            parse_mode="Markdown"
+        )
         logger.info("Alerta coletivo enviado para o grupo %s com sucesso.", chat_id)
     except Exception as e:
         logger.error("Erro ao enviar card para Telegram no chat %s: %s", chat_id, e)
-    finally:
-        # Limpeza física temporária
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except:
-                pass
 
 
 async def processar_alerta_fundacao(dados_loja: Dict[str, Any], bot: Any) -> None:
@@ -81,7 +78,7 @@ async def processar_alerta_fundacao(dados_loja: Dict[str, Any], bot: Any) -> Non
                 # Marco territorial inédito!
                 registrar_marco_coletivo(slug_uf, "expansao_territorial")
                 
-                card_path = renderizar_card_celebracao(
+                card = await _renderizar_celebracao(
                     tipo_marco="Cruz Vermelha Territorial",
                     titulo=f"Expansão em {uf}",
                     subtitulo=f"A malha de visitação chega ao Estado de {uf}!",
@@ -95,7 +92,7 @@ async def processar_alerta_fundacao(dados_loja: Dict[str, Any], bot: Any) -> Non
                     f"O Bode Andarilho orgulhosamente finca sua coluna no Estado de **{uf}**!\n\n"
                     f"Seja muito bem-vinda **{nome} nº {num}**, a nossa primeira Oficina Oficial em terras do oriente de **{cidade}/{uf}**. A malha de visitação avança! 🌍📐🚩"
                 )
-                await _enviar_card_telegram(bot, card_path, msg)
+                await _enviar_card_telegram(bot, card, msg)
                 return # Previne disparo duplo
                 
         # 2. CHECAR ARCO DA INTEGRAÇÃO (PRIMEIRA LOJA DESTA POTÊNCIA COMPLETA)
@@ -107,7 +104,7 @@ async def processar_alerta_fundacao(dados_loja: Dict[str, Any], bot: Any) -> Non
             if is_first_of_potencia(pot, comp) and not checar_marco_coletivo_existente(slug_pot):
                 registrar_marco_coletivo(slug_pot, "arco_integracao")
                 
-                card_path = renderizar_card_celebracao(
+                card = await _renderizar_celebracao(
                     tipo_marco="Arco da Integração",
                     titulo=f"Pioneira {pot}",
                     subtitulo=f"Primeira Loja da Potência {sigla_pot} erguida!",
@@ -121,11 +118,11 @@ async def processar_alerta_fundacao(dados_loja: Dict[str, Any], bot: Any) -> Non
                     f"Registramos a primeira Oficina vinculada à Potência **{sigla_pot}**!\n\n"
                     f"Nossas colunas recebem a **{nome} nº {num}** ({cidade}/{uf}). Parabéns aos Irmãos pela integração federativa! 📐🚀"
                 )
-                await _enviar_card_telegram(bot, card_path, msg)
+                await _enviar_card_telegram(bot, card, msg)
                 return
                 
         # 3. ALERTA PADRÃO: FUNDAÇÃO DE OFICINA
-        card_path = renderizar_card_celebracao(
+        card = await _renderizar_celebracao(
             tipo_marco="Fundação de Oficina",
             titulo=f"{nome} nº {num}",
             subtitulo=f"Oficina Oficial instalada e chancelada no ecossistema!",
@@ -139,7 +136,7 @@ async def processar_alerta_fundacao(dados_loja: Dict[str, Any], bot: Any) -> Non
             f"A Loja **{nome} nº {num}** ({sigla_pot}) de **{cidade}/{uf}** agora é uma Oficina Oficial em nosso sistema!\n\n"
             f"O Malhete da Administração foi chancelado e as portas estão abertas para a malha de visitação digital! 📜🤝🐐"
         )
-        await _enviar_card_telegram(bot, card_path, msg)
+        await _enviar_card_telegram(bot, card, msg)
         
     except Exception as e:
         logger.error("Erro no Heraldo ao processar alerta de fundacao: %s", e)
@@ -164,7 +161,7 @@ async def checar_marcos_mobilizacao(bot: Any) -> None:
                     # Bateu a meta e não foi anunciado
                     registrar_marco_coletivo(slug, "conselho_mobilizacao")
                     
-                    card_path = renderizar_card_celebracao(
+                    card = await _renderizar_celebracao(
                         tipo_marco="Conselho de Mobilização",
                         titulo=f"{meta:,} Presenças",
                         subtitulo=f"Vigor em movimento! Meta histórica superada!",
@@ -178,7 +175,7 @@ async def checar_marcos_mobilizacao(bot: Any) -> None:
                         f"Alcançamos o marco épico de **{meta:,} presenças confirmadas** no ecossistema Bode Andarilho!\n\n"
                         f"Atualmente somamos **{total:,} confirmações** ativas. A egrégora agradece o empenho de cada Irmão que fortalece nossas colunas na estrada! 🤝🐐🚜🔥"
                     )
-                    await _enviar_card_telegram(bot, card_path, msg)
+                    await _enviar_card_telegram(bot, card, msg)
                     break # Apenas um marco por rodada
                     
     except Exception as e:
@@ -262,7 +259,7 @@ async def realizar_abertura_historica(bot: Any) -> None:
                 logger.warning("Falha ao enviar texto inaugural: %s", e_msg)
                 
             # 4. Gera e envia o card consolidado de mobilizacao
-            card_path = renderizar_card_celebracao(
+            card = await _renderizar_celebracao(
                 tipo_marco="Abertura de Chancelaria",
                 titulo=f"{total:,} Presenças",
                 subtitulo="Vigor Histórico Consolidado!",
@@ -272,7 +269,7 @@ async def realizar_abertura_historica(bot: Any) -> None:
             )
             
             caption = f"📜 *Primeiro Selo Histórico Fundido!*\n\nO ecossistema inicia suas comunicações já ostentando a marca cumulada de **{total:,} presenças confirmadas**. Nossos sinceros agradecimentos a todos os Irmãos!"
-            await _enviar_card_telegram(bot, card_path, caption)
+            await _enviar_card_telegram(bot, card, caption)
             
         # Grava que a abertura ocorreu para nunca repetir
         registrar_marco_coletivo(slug_abertura, "sistemico")
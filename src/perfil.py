@@ -15,7 +15,6 @@
 from __future__ import annotations
 
 import logging
-import os
 from datetime import datetime
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
@@ -179,12 +178,12 @@ async def mostrar_perfil(update: Update, context: ContextTypes.DEFAULT_TYPE):
             except Exception:
                 pass
         
-        from src.render_diploma import renderizar_diploma
+        from src.servico_render import render
         
         # Passa os dados estruturados do membro e as conquistas reais
-        caminho_diploma = renderizar_diploma(membro, slugs_obtidos)
+        imagem_diploma = await render("diploma", {"membro": membro, "conquistas_obtidas": slugs_obtidos})
         
-        if caminho_diploma and os.path.exists(caminho_diploma):
+        if imagem_diploma and imagem_diploma.dados:
             # Se disparado via clique em botão, apagamos o menu anterior para evitar poluição
             query = update.callback_query
             if query:
@@ -194,15 +193,14 @@ async def mostrar_perfil(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     pass
             
             # Envia o pergaminho visual
-            with open(caminho_diploma, "rb") as photo:
-                msg_diploma = await context.bot.send_photo(
-                    chat_id=user_id,
-                    photo=photo,
-                    caption="📜 *Diploma do Andarilho - Jornada do Obreiro*\n\n"
-                            "Suas medalhas, dados e visto oficial da Chancelaria.",
-                    parse_mode="Markdown",
-                    reply_markup=teclado
-                )
+            msg_diploma = await context.bot.send_photo(
+                chat_id=user_id,
+                photo=imagem_diploma.arquivo("diploma"),
+                caption="📜 *Diploma do Andarilho - Jornada do Obreiro*\n\n"
+                        "Suas medalhas, dados e visto oficial da Chancelaria.",
+                parse_mode="Markdown",
+                reply_markup=teclado
+            )
                 
             # Registra o ID da mensagem no rastreador global de navegação para limpeza futura automática
             from src.bot import estado_mensagens
@@ -214,12 +212,6 @@ async def mostrar_perfil(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 "content_hash": None  # Evita colisão de hash e força renderização
             }
             
-            # Remove arquivo temporário de forma segura após envio
-            try:
-                os.remove(caminho_diploma)
-            except Exception:
-                pass
-                
             return
             
     except Exception as err:
@@ -0,0 +1,240 @@
+# src/pool_updates.py
+# ============================================
+# BODE ANDARILHO - POOL DE PROCESSAMENTO DOS UPDATES DO WEBHOOK
+# ============================================
+#
+# O endpoint do webhook aguardava telegram_app.process_update(update) antes
+# de responder: cada entrega do Telegram ficava presa pelo tempo inteiro do
+# handler (consultas ao Supabase, renders...), e as até
+# WEBHOOK_MAX_CONNECTIONS entregas paralelas corriam sem nenhuma ordem entre
+# si — duas mensagens seguidas do mesmo irmão podiam disputar o estado do
+# ConversationHandler.
+#
+# Com o pool, o webhook só enfileira e responde 200 na hora:
+#
+# - WEBHOOK_WORKERS tarefas processam os updates; cada (chat, usuário) tem a
+#   sua fila (chave_ordem), processada um update de cada vez, na ordem de
+#   chegada; chats e usuários diferentes andam em paralelo — inclusive os
+#   irmãos que clicam ao mesmo tempo no card de um evento no grupo;
+# - fila limitada (WEBHOOK_FILA_MAX updates aguardando): com a fila cheia o
+#   webhook espera uma vaga por até WEBHOOK_FILA_ESPERA_S e, se não houver,
+#   responde 503 — o Telegram reenvia depois;
+# - estatisticas() expõe tamanho da fila, pico, esperas por vaga, recusas e
+#   tempo de fila (/webhook_stats);
+# - no shutdown, parar() deixa de aceitar updates e drena a fila por até
+#   WEBHOOK_DRENO_S antes de encerrar o bot.
+#
+# WEBHOOK_WORKERS=0 volta ao processamento dentro da requisição.
+#
+# ============================================
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "20"))
+_FILA_MAX = int(os.getenv("WEBHOOK_FILA_MAX", "500"))
+_ESPERA_S = float(os.getenv("WEBHOOK_FILA_ESPERA_S", "5"))
+_DRENO_S = float(os.getenv("WEBHOOK_DRENO_S", "25"))
+
+_ALERTA_INTERVALO_S = 30.0  # no máximo um aviso de fila cheia por intervalo
+
+_avulsos = itertools.count()
+
+
+def chave_ordem(update: Any) -> Hashable:
+    """
+    Chave de ordenação do update: (chat, usuário), a mesma granularidade do
+    estado do ConversationHandler — no grupo, os cliques de irmãos
+    diferentes no card do evento andam em paralelo. No privado (chat igual
+    ao usuário) vale o ID do usuário; só com chat (posts de canal) ou só
+    com usuário (inline, enquetes), o que houver. Updates sem nenhum dos
+    dois não precisam de ordem e recebem uma chave própria.
+    """
+    chat = getattr(update, "effective_chat", None)
+    usuario = getattr(update, "effective_user", None)
+    if chat is not None and usuario is not None and chat.id != usuario.id:
+        return (chat.id, usuario.id)
+    if usuario is not None:
+        return usuario.id
+    if chat is not None:
+        return chat.id
+    return ("avulso", next(_avulsos))
+
+
+class PoolUpdates:
+    """Processa updates em paralelo entre chaves (chave_ordem) e em ordem dentro de cada uma."""
+
+    def __init__(
+        self,
+        processar: Callable[[Any], Awaitable[Any]],
+        workers: int = _WORKERS,
+        fila_max: int = _FILA_MAX,
+        espera_s: float = _ESPERA_S,
+    ):
+        self._processar = processar
+        self.workers = max(1, workers)
+        self.fila_max = max(1, fila_max)
+        self.espera_s = espera_s
+        # chave -> updates aguardando; a chave está aqui enquanto tem update
+        # na fila de prontas ou em processamento (nunca em dois workers).
+        self._filas: Dict[Hashable, Deque[Tuple[Any, float]]] = {}
+        self._prontas: Optional[asyncio.Queue] = None
+        self._vagas: Optional[asyncio.Semaphore] = None
+        self._ocioso: Optional[asyncio.Event] = None
+        self._tarefas: List[asyncio.Task] = []
+        self._aceitando = False
+        self._na_fila = 0
+        self._em_processamento = 0
+        self._ultimo_alerta = 0.0
+        self._estatisticas: Dict[str, Any] = {
+            "recebidos": 0, "processados": 0, "falhas": 0, "recusados": 0,
+            "esperas_vaga": 0, "segundos_espera_vaga": 0.0,
+            "segundos_fila_total": 0.0, "segundos_fila_max": 0.0, "pico_fila": 0,
+        }
+
+    def iniciar(self) -> None:
+        """Sobe os workers (precisa de um event loop rodando)."""
+        if self._tarefas:
+            return
+        self._prontas = asyncio.Queue()
+        self._vagas = asyncio.Semaphore(self.fila_max)
+        self._ocioso = asyncio.Event()
+        self._ocioso.set()
+        loop = asyncio.get_running_loop()
+        self._tarefas = [loop.create_task(self._worker(), name=f"pool_updates_{i}") for i in range(self.workers)]
+        self._aceitando = True
+        logger.info("Pool de updates: %d workers, fila máx. %d.", self.workers, self.fila_max)
+
+    async def enfileirar(self, update: Any) -> bool:
+        """
+        Coloca o update na fila da sua chave. Com a fila cheia, espera uma vaga
+        por até `espera_s`; retorna False quando recusado (fila cheia ou pool
+        parando) — o webhook responde 503 e o Telegram reenvia.
+        """
+        if not self._aceitando:
+            self._estatisticas["recusados"] += 1
+            return False
+        inicio = time.monotonic()
+        if self._vagas.locked():
+            self._estatisticas["esperas_vaga"] += 1
+        try:
+            await asyncio.wait_for(self._vagas.acquire(), timeout=self.espera_s)
+        except asyncio.TimeoutError:
+            self._estatisticas["recusados"] += 1
+            if time.monotonic() - self._ultimo_alerta >= _ALERTA_INTERVALO_S:
+                self._ultimo_alerta = time.monotonic()
+                logger.warning(
+                    "Fila de updates cheia (%d/%d) por mais de %gs; recusando updates (%d até agora).",
+                    self._na_fila, self.fila_max, self.espera_s, self._estatisticas["recusados"],
+                )
+            return False
+        agora = time.monotonic()
+        self._estatisticas["segundos_espera_vaga"] += agora - inicio
+        if not self._aceitando:
+            # parar() começou enquanto esperava a vaga: os workers podem já ter
+            # sido cancelados, então recusa para o Telegram reenviar.
+            self._vagas.release()
+            self._estatisticas["recusados"] += 1
+            return False
+
+        chave = chave_ordem(update)
+        fila = self._filas.get(chave)
+        if fila is None:
+            self._filas[chave] = deque([(update, agora)])
+            self._prontas.put_nowait(chave)
+        else:
+            fila.append((update, agora))  # o worker da chave pega na sequência
+        self._na_fila += 1
+        self._estatisticas["recebidos"] += 1
+        self._estatisticas["pico_fila"] = max(self._estatisticas["pico_fila"], self._na_fila)
+        self._ocioso.clear()
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            chave = await self._prontas.get()
+            fila = self._filas[chave]
+            update, enfileirado_em = fila.popleft()
+            self._na_fila -= 1
+            self._vagas.release()
+            espera = time.monotonic() - enfileirado_em
+            self._estatisticas["segundos_fila_total"] += espera
+            self._estatisticas["segundos_fila_max"] = max(self._estatisticas["segundos_fila_max"], espera)
+
+            self._em_processamento += 1
+            try:
+                await self._processar(update)
+            except Exception as e:
+                self._estatisticas["falhas"] += 1
+                logger.error("Erro ao processar update (chave %s): %s", chave, e, exc_info=True)
+            finally:
+                self._em_processamento -= 1
+                self._estatisticas["processados"] += 1
+                if fila:
+                    self._prontas.put_nowait(chave)  # próximo da mesma chave, atrás das outras
+                else:
+                    del self._filas[chave]
+                    if not self._filas:
+                        self._ocioso.set()
+
+    async def parar(self, timeout_s: float = _DRENO_S) -> None:
+        """Para de aceitar updates, drena a fila por até `timeout_s` e encerra os workers."""
+        if not self._tarefas:
+            return
+        self._aceitando = False
+        if self._filas:
+            logger.info(
+                "Drenando pool de updates: %d na fila, %d em processamento.", self._na_fila, self._em_processamento
+            )
+            try:
+                await asyncio.wait_for(self._ocioso.wait(), timeout=timeout_s)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    "Dreno do pool de updates excedeu %.0fs; %d update(s) descartados.", timeout_s, self._na_fila
+                )
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        self._tarefas = []
+        logger.info("Pool de updates encerrado: %s", self.estatisticas())
+
+    def estatisticas(self) -> Dict[str, Any]:
+        retirados = self._estatisticas["processados"] + self._em_processamento
+        return {
+            "workers": self.workers,
+            "fila_max": self.fila_max,
+            "na_fila": self._na_fila,
+            "em_processamento": self._em_processamento,
+            "chats_ativos": len(self._filas),
+            **self._estatisticas,
+            "segundos_fila_media": self._estatisticas["segundos_fila_total"] / max(1, retirados),
+        }
+
+
+_pool: Optional[PoolUpdates] = None
+
+
+def obter_pool_updates() -> Optional[PoolUpdates]:
+    """Pool em uso, ou None quando o webhook processa dentro da requisição."""
+    return _pool
+
+
+def iniciar_pool_updates(processar: Callable[[Any], Awaitable[Any]]) -> Optional[PoolUpdates]:
+    """Cria e sobe o pool (WEBHOOK_WORKERS > 0); com 0, retorna None."""
+    global _pool
+    if _WORKERS <= 0:
+        logger.info("WEBHOOK_WORKERS=0: updates processados dentro da requisição do webhook.")
+        return None
+    if _pool is None:
+        _pool = PoolUpdates(processar)
+        _pool.iniciar()
+    return _pool
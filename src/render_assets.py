@@ -0,0 +1,275 @@
+# src/render_assets.py
+# ============================================
+# BODE ANDARILHO - CACHE DE ASSETS DOS RENDERS
+# ============================================
+#
+# render_cards, render_marcos e render_diploma repetiam, a cada card, o
+# mesmo trabalho de preparação: percorrer a lista de fontes candidatas e
+# abrir cada TTF com ImageFont.truetype, decodificar o template/fundo PNG
+# do disco e reprocessar os selos (fundo claro transparente, recorte de
+# borda, máscara circular). Este módulo concentra esse trabalho:
+#
+# - fontes memorizadas por (caminho, tamanho, variação); a lista de
+#   candidatas é resolvida uma única vez por combinação;
+# - imagens decodificadas (e já processadas/redimensionadas) mantidas em
+#   memória com limite de bytes e descarte LRU (RENDER_ASSETS_MAX_MB);
+#   a chave inclui o mtime do arquivo, então trocar um asset no disco
+#   invalida a entrada;
+# - templates remotos (URL) vêm de src.downloads_remotos e a decodificação
+#   fica no mesmo cache, chaveada pela versão do conteúdo baixado;
+# - quem recebe uma imagem ganha uma cópia: pode desenhar à vontade sem
+#   sujar o cache;
+# - preaquecer() carrega tudo na subida do bot, e o primeiro card já sai
+#   gastando tempo só com o desenho.
+#
+# ============================================
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence, Tuple, Union
+
+from PIL import Image, ImageFont, ImageOps
+
+from src.downloads_remotos import baixar
+
+logger = logging.getLogger(__name__)
+
+_MAX_BYTES_IMAGENS = int(float(os.getenv("RENDER_ASSETS_MAX_MB", "96")) * 1024 * 1024)
+_MAX_FONTES = 256
+
+Fonte = Union[ImageFont.FreeTypeFont, ImageFont.ImageFont]
+Caminho = Union[str, Path]
+
+
+# ---------- fontes ----------
+
+@lru_cache(maxsize=_MAX_FONTES)
+def _fonte_truetype(caminho: str, tamanho: int, variacao: Optional[Tuple[float, ...]]) -> Fonte:
+    fonte = ImageFont.truetype(caminho, size=tamanho)
+    if variacao and hasattr(fonte, "set_variation_by_axes"):
+        try:
+            fonte.set_variation_by_axes(list(variacao))
+        except Exception:
+            pass
+    return fonte
+
+
+@lru_cache(maxsize=_MAX_FONTES)
+def _resolver_candidatas(candidatas: Tuple[str, ...]) -> Optional[str]:
+    """Primeira candidata que o FreeType consegue abrir (None se nenhuma)."""
+    for candidata in candidatas:
+        if not candidata:
+            continue
+        try:
+            ImageFont.truetype(candidata, size=12)
+            return candidata
+        except Exception:
+            continue
+    return None
+
+
+def carregar_fonte(
+    tamanho: int,
+    candidatas: Sequence[str],
+    variacao: Optional[Callable[[str], Optional[Tuple[float, ...]]]] = None,
+) -> Fonte:
+    """
+    Fonte memorizada para a primeira candidata disponível.
+
+    `variacao` recebe o caminho resolvido e devolve os eixos da fonte
+    variável (ou None); faz parte da chave do cache.
+    """
+    caminho = _resolver_candidatas(tuple(str(c) for c in candidatas if c))
+    if caminho is None:
+        return ImageFont.load_default()
+    eixos = variacao(caminho) if variacao else None
+    return _fonte_truetype(caminho, int(tamanho), tuple(eixos) if eixos else None)
+
+
+# ---------- imagens ----------
+
+class _CacheImagens:
+    """LRU de imagens RGBA limitado pelo total de bytes decodificados."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(0, max_bytes)
+        self._dados: "OrderedDict[Hashable, Image.Image]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.descartes = 0
+
+    @staticmethod
+    def _tamanho(imagem: Image.Image) -> int:
+        return imagem.width * imagem.height * len(imagem.getbands())
+
+    def obter(self, chave: Hashable) -> Optional[Image.Image]:
+        with self._lock:
+            imagem = self._dados.get(chave)
+            if imagem is None:
+                self.misses += 1
+                return None
+            self._dados.move_to_end(chave)
+            self.hits += 1
+            return imagem
+
+    def definir(self, chave: Hashable, imagem: Image.Image) -> None:
+        tamanho = self._tamanho(imagem)
+        if tamanho > self.max_bytes:
+            return
+        with self._lock:
+            antiga = self._dados.pop(chave, None)
+            if antiga is not None:
+                self._bytes -= self._tamanho(antiga)
+            self._dados[chave] = imagem
+            self._bytes += tamanho
+            while self._bytes > self.max_bytes and self._dados:
+                _, removida = self._dados.popitem(last=False)
+                self._bytes -= self._tamanho(removida)
+                self.descartes += 1
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._dados.clear()
+            self._bytes = 0
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entradas": len(self._dados),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "descartes": self.descartes,
+            }
+
+
+_imagens = _CacheImagens(_MAX_BYTES_IMAGENS)
+
+
+def _versao_arquivo(caminho: Path) -> Optional[int]:
+    try:
+        return caminho.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def abrir_imagem(
+    caminho: Caminho,
+    tamanho: Optional[Tuple[int, int]] = None,
+    preparo: Optional[Callable[[Image.Image], Image.Image]] = None,
+    rotulo_preparo: str = "",
+) -> Image.Image:
+    """
+    Imagem RGBA do disco, decodificada uma vez e servida do cache.
+
+    - `preparo`: processamento aplicado sobre a imagem decodificada (ex.:
+      remoção de fundo de um selo); `rotulo_preparo` o identifica na chave;
+    - `tamanho`: redimensiona (LANCZOS) depois do preparo.
+
+    Sempre devolve uma cópia. Levanta FileNotFoundError se o arquivo não
+    existir, como Image.open.
+    """
+    if preparo is not None and not rotulo_preparo:
+        raise ValueError("rotulo_preparo é obrigatório quando há preparo.")
+    return _obter(Path(caminho), tamanho, preparo, rotulo_preparo).copy()
+
+
+def _obter(
+    caminho: Path,
+    tamanho: Optional[Tuple[int, int]],
+    preparo: Optional[Callable[[Image.Image], Image.Image]],
+    rotulo_preparo: str,
+) -> Image.Image:
+    """Imagem do cache (sem cópia); cada etapa reaproveita a anterior."""
+    versao = _versao_arquivo(caminho)
+    if versao is None:
+        raise FileNotFoundError(str(caminho))
+
+    chave = (str(caminho.resolve()), versao, rotulo_preparo, tamanho)
+    imagem = _imagens.obter(chave)
+    if imagem is not None:
+        return imagem
+
+    if tamanho is not None:
+        imagem = _obter(caminho, None, preparo, rotulo_preparo).resize(tamanho, Image.Resampling.LANCZOS)
+    elif preparo is not None:
+        imagem = preparo(_obter(caminho, None, None, "").copy()).convert("RGBA")
+    else:
+        with Image.open(caminho) as bruta:
+            imagem = ImageOps.exif_transpose(bruta).convert("RGBA")
+    _imagens.definir(chave, imagem)
+    return imagem
+
+
+def abrir_imagem_remota(url: str) -> Image.Image:
+    """
+    Imagem RGBA de uma URL (template de loja, card especial). O download
+    passa pelo cache em disco com revalidação; a decodificação é memorizada
+    pela versão do conteúdo, então um template quente não é decodificado de
+    novo enquanto não mudar no Storage. Sempre devolve uma cópia.
+    """
+    download = baixar(url)
+    chave = ("url", url, download.versao)
+    imagem = _imagens.obter(chave)
+    if imagem is None:
+        with Image.open(BytesIO(download.dados)) as bruta:
+            imagem = ImageOps.exif_transpose(bruta).convert("RGBA")
+        _imagens.definir(chave, imagem)
+    return imagem.copy()
+
+
+# ---------- manutenção ----------
+
+def definir_limite_imagens(max_bytes: int) -> None:
+    """Ajusta o teto do cache de imagens (usado pelos processos de render)."""
+    with _imagens._lock:
+        _imagens.max_bytes = max(0, max_bytes)
+        while _imagens._bytes > _imagens.max_bytes and _imagens._dados:
+            _, removida = _imagens._dados.popitem(last=False)
+            _imagens._bytes -= _imagens._tamanho(removida)
+            _imagens.descartes += 1
+
+
+def limpar_cache_assets() -> None:
+    _imagens.limpar()
+    _fonte_truetype.cache_clear()
+    _resolver_candidatas.cache_clear()
+
+
+def estatisticas_assets() -> Dict[str, Any]:
+    fontes = _fonte_truetype.cache_info()
+    return {
+        "imagens": _imagens.estatisticas(),
+        "fontes": {"entradas": fontes.currsize, "hits": fontes.hits, "misses": fontes.misses},
+    }
+
+
+def preaquecer() -> Dict[str, Any]:
+    """
+    Carrega fontes, fundos, templates e selos processados de todos os
+    renders. Feito na subida do bot, fora do event loop.
+    """
+    # Import tardio: os módulos de render importam este.
+    from src import render_cards, render_diploma, render_marcos
+
+    for modulo in (render_cards, render_marcos, render_diploma):
+        try:
+            modulo.preaquecer_assets()
+        except Exception as e:
+            logger.warning("Falha ao preaquecer assets de %s: %s", modulo.__name__, e)
+    stats = estatisticas_assets()
+    logger.info(
+        "Assets de render preaquecidos: %d imagens (%.1f MB), %d fontes.",
+        stats["imagens"]["entradas"], stats["imagens"]["bytes"] / (1024 * 1024), stats["fontes"]["entradas"],
+    )
+    return stats
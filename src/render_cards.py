@@ -1,17 +1,17 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
-import os
-import tempfile
 import unicodedata
 from dataclasses import dataclass
-from io import BytesIO
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-import requests
-from PIL import Image, ImageChops, ImageDraw, ImageFont, ImageOps
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+from src.render_assets import abrir_imagem, abrir_imagem_remota, carregar_fonte
+from src.render_saida import ImagemRenderizada, codificar
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +43,18 @@ BODY_FONT_CANDIDATES = (
     "Times New Roman.ttf",
     "times.ttf",
 )
+# Incrementar quando o desenho do card mudar: invalida os renders em cache.
+RENDER_VERSION = "1"
+# Campos da loja que alteram a imagem (ambas as grafias: planilha e banco).
+LOJA_VISUAL_KEYS = (
+    "Template sessão URL", "template_sessao_url",
+    "Layout config JSON", "layout_config_json",
+    "Fonte padrão", "fonte_padrao",
+    "Cor texto padrão", "cor_texto_padrao",
+    "Cor selo grau", "cor_selo_grau",
+    "Cor selo rito", "cor_selo_rito",
+    "Cor selo potência", "cor_selo_potencia",
+)
 ITALIC_FONT_CANDIDATES = (
     "CormorantGaramond-Italic.ttf",
     "CormorantGaramond-SemiBold.ttf",
@@ -57,7 +69,7 @@ ITALIC_FONT_CANDIDATES = (
 
 @dataclass
 class RenderResult:
-    path: str
+    imagem: ImagemRenderizada
     warnings: List[str]
 
 
@@ -111,20 +123,11 @@ def _load_font(
         "DejaVuSans.ttf",
         "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
     ]
-    for candidate in candidates:
-        if not candidate:
-            continue
-        try:
-            font = ImageFont.truetype(candidate, size=size)
-            if "SemiBold" in str(candidate) and hasattr(font, "set_variation_by_axes"):
-                try:
-                    font.set_variation_by_axes([600])
-                except Exception:
-                    pass
-            return font
-        except Exception:
-            continue
-    return ImageFont.load_default()
+    return carregar_fonte(size, candidates, _font_variation)
+
+
+def _font_variation(path: str) -> Optional[Tuple[int, ...]]:
+    return (600,) if "SemiBold" in path else None
 
 
 def _measure(draw: ImageDraw.ImageDraw, text: str, font: ImageFont.ImageFont) -> Tuple[int, int]:
@@ -200,10 +203,8 @@ def _draw_centered_lines(
 
 def _open_image(source: str) -> Image.Image:
     if source.startswith(("http://", "https://")):
-        resp = requests.get(source, timeout=20)
-        resp.raise_for_status()
-        return Image.open(BytesIO(resp.content)).convert("RGBA")
-    return Image.open(source).convert("RGBA")
+        return abrir_imagem_remota(source)
+    return abrir_imagem(source)
 
 
 def _layout_config(loja: Dict[str, Any], width: int, height: int) -> Dict[str, Any]:
@@ -422,22 +423,30 @@ def _remove_edge_background(stamp: Image.Image) -> Image.Image:
     return stamp
 
 
+def _prepare_degree_stamp(stamp: Image.Image, target_w: int) -> Image.Image:
+    stamp = _transparent_light_background(stamp)
+    ratio = target_w / max(1, stamp.size[0])
+    target_h = int(stamp.size[1] * ratio)
+    stamp = stamp.resize((target_w, target_h), Image.Resampling.LANCZOS)
+    stamp = stamp.rotate(-9, expand=True, resample=Image.Resampling.BICUBIC)
+
+    alpha = stamp.getchannel("A").point(lambda p: int(p * 0.82))
+    stamp.putalpha(alpha)
+    return stamp
+
+
 def _draw_degree_stamp(image: Image.Image, grau: str) -> bool:
     path = _degree_stamp_path(grau)
     if not path:
         return False
     try:
-        stamp = ImageOps.exif_transpose(Image.open(path))
-        stamp = _transparent_light_background(stamp)
         width, height = image.size
         target_w = int(width * 0.205)
-        ratio = target_w / max(1, stamp.size[0])
-        target_h = int(stamp.size[1] * ratio)
-        stamp = stamp.resize((target_w, target_h), Image.Resampling.LANCZOS)
-        stamp = stamp.rotate(-9, expand=True, resample=Image.Resampling.BICUBIC)
-
-        alpha = stamp.getchannel("A").point(lambda p: int(p * 0.82))
-        stamp.putalpha(alpha)
+        stamp = abrir_imagem(
+            path,
+            preparo=lambda raw: _prepare_degree_stamp(raw, target_w),
+            rotulo_preparo=f"selo_grau:{target_w}",
+        )
 
         x = width - stamp.size[0] - int(width * 0.105)
         y = int(height * 0.115)
@@ -448,6 +457,25 @@ def _draw_degree_stamp(image: Image.Image, grau: str) -> bool:
         return False
 
 
+def _prepare_potencia_stamp(stamp: Image.Image, target_w: int) -> Image.Image:
+    stamp = _remove_edge_background(stamp)
+    ratio = target_w / max(1, stamp.size[0])
+    target_h = int(stamp.size[1] * ratio)
+    stamp = stamp.resize((target_w, target_h), Image.Resampling.LANCZOS)
+    alpha = stamp.getchannel("A").point(lambda p: int(p * 0.58))
+    stamp.putalpha(alpha)
+    return stamp
+
+
+def _load_potencia_stamp(path: Path, width: int) -> Image.Image:
+    target_w = int(width * 0.14)
+    return abrir_imagem(
+        path,
+        preparo=lambda raw: _prepare_potencia_stamp(raw, target_w),
+        rotulo_preparo=f"selo_potencia:{target_w}",
+    )
+
+
 def _draw_potencia_stamp(
     image: Image.Image,
     draw: ImageDraw.ImageDraw,
@@ -459,15 +487,8 @@ def _draw_potencia_stamp(
     if not path:
         return False
     try:
-        stamp = ImageOps.exif_transpose(Image.open(path))
-        stamp = _remove_edge_background(stamp)
         width, height = image.size
-        target_w = int(width * 0.14)
-        ratio = target_w / max(1, stamp.size[0])
-        target_h = int(stamp.size[1] * ratio)
-        stamp = stamp.resize((target_w, target_h), Image.Resampling.LANCZOS)
-        alpha = stamp.getchannel("A").point(lambda p: int(p * 0.58))
-        stamp.putalpha(alpha)
+        stamp = _load_potencia_stamp(path, width)
 
         x = int(width * 0.155)
         y = int(height * 0.105)
@@ -615,22 +636,29 @@ def _draw_loja_name(
     return _draw_centered_wrapped(draw, loja, center_x, y, font, fill, max_width, line_gap=4, max_lines=2)
 
 
+def _prepare_watermark(watermark: Image.Image, target_w: int) -> Image.Image:
+    watermark = _transparent_light_background(_remove_edge_background(watermark))
+    ratio = target_w / max(1, watermark.size[0])
+    target_h = int(watermark.size[1] * ratio)
+    watermark = watermark.resize((target_w, target_h), Image.Resampling.LANCZOS)
+    alpha = watermark.getchannel("A").point(lambda p: int(p * 0.09))
+    sepia = Image.new("RGBA", watermark.size, (91, 57, 24, 0))
+    sepia.putalpha(alpha)
+    return sepia
+
+
 def _apply_watermark(image: Image.Image) -> None:
     path = DEFAULT_BRANDING_DIR / "bode_andarilho_watermark.png"
     if not path.exists():
         return
     try:
-        watermark = ImageOps.exif_transpose(Image.open(path)).convert("RGBA")
-        watermark = _transparent_light_background(_remove_edge_background(watermark))
         width, height = image.size
         target_w = int(width * 0.48)
-        ratio = target_w / max(1, watermark.size[0])
-        target_h = int(watermark.size[1] * ratio)
-        watermark = watermark.resize((target_w, target_h), Image.Resampling.LANCZOS)
-        alpha = watermark.getchannel("A").point(lambda p: int(p * 0.09))
-        watermark.putalpha(alpha)
-        sepia = Image.new("RGBA", watermark.size, (91, 57, 24, 0))
-        sepia.putalpha(watermark.getchannel("A"))
+        sepia = abrir_imagem(
+            path,
+            preparo=lambda raw: _prepare_watermark(raw, target_w),
+            rotulo_preparo=f"marca_dagua:{target_w}",
+        )
         image.alpha_composite(sepia, (int(width * 0.47), int(height * 0.315)))
     except Exception as exc:
         logger.warning("Falha ao aplicar marca d'agua do Bode Andarilho: %s", exc)
@@ -640,7 +668,6 @@ def _render_default_template_card(
     image: Image.Image,
     evento: Dict[str, Any],
     loja: Dict[str, Any],
-    output_dir: Optional[str],
 ) -> RenderResult:
     draw = ImageDraw.Draw(image)
     width, height = image.size
@@ -745,15 +772,34 @@ def _render_default_template_card(
         anchor="ma",
     )
 
-    out_dir = output_dir or tempfile.gettempdir()
-    os.makedirs(out_dir, exist_ok=True)
-    event_id = _norm(_get_any(evento, "ID Evento", "id_evento", "id") or "preview") or "preview"
-    out_path = os.path.join(out_dir, f"bode_event_card_{event_id}.png")
-    image.convert("RGB").save(out_path, "PNG", optimize=True)
-    return RenderResult(path=out_path, warnings=warnings)
+    return RenderResult(imagem=codificar(image, "evento"), warnings=warnings)
 
 
-def render_event_card(evento: Dict[str, Any], loja: Dict[str, Any], output_dir: Optional[str] = None) -> RenderResult:
+def card_hash_visual(evento: Dict[str, Any], loja: Dict[str, Any]) -> str:
+    """
+    Hash de tudo que aparece no card: textos derivados do evento, selos,
+    campos visuais da loja e versão do template padrão. Dois eventos com o
+    mesmo hash geram a mesma imagem (o ID do evento não entra).
+    """
+    template = _norm(_get_any(loja, "Template sessão URL", "template_sessao_url"))
+    if not template:
+        try:
+            template = f"padrao:{DEFAULT_TEMPLATE_PATH.stat().st_mtime_ns}"
+        except OSError:
+            template = "padrao"
+    entradas = {
+        "versao": RENDER_VERSION,
+        "template": template,
+        "loja": {key: _norm(loja.get(key)) for key in LOJA_VISUAL_KEYS if _norm(loja.get(key))},
+        "partes": _event_visual_parts(evento),
+        "texto": _event_text(evento),
+        "selos": list(_badge_items(evento)),
+    }
+    raw = json.dumps(entradas, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def render_event_card(evento: Dict[str, Any], loja: Dict[str, Any]) -> RenderResult:
     template = _norm(loja.get("Template sessão URL") or loja.get("template_sessao_url"))
     if not template:
         if DEFAULT_TEMPLATE_PATH.exists():
@@ -761,9 +807,9 @@ def render_event_card(evento: Dict[str, Any], loja: Dict[str, Any], output_dir:
         else:
             raise ValueError(f"Template visual padrão não encontrado em {DEFAULT_TEMPLATE_PATH}.")
 
-    image = ImageOps.exif_transpose(_open_image(template)).convert("RGBA")
+    image = _open_image(template)
     if _is_default_template_source(template, loja):
-        return _render_default_template_card(image, evento, loja, output_dir)
+        return _render_default_template_card(image, evento, loja)
 
     draw = ImageDraw.Draw(image)
     width, height = image.size
@@ -839,10 +885,29 @@ def render_event_card(evento: Dict[str, Any], loja: Dict[str, Any], output_dir:
         draw.text((tx, ty), line, font=final_font, fill=text_color)
         ty += line_h
 
-    out_dir = output_dir or tempfile.gettempdir()
-    os.makedirs(out_dir, exist_ok=True)
-    event_id = _norm(evento.get("ID Evento") or evento.get("id_evento") or "preview") or "preview"
-    out_path = os.path.join(out_dir, f"bode_event_card_{event_id}.png")
-    image.convert("RGB").save(out_path, "PNG", optimize=True)
-    return RenderResult(path=out_path, warnings=warnings)
+    return RenderResult(imagem=codificar(image, "evento"), warnings=warnings)
+
 
+def preaquecer_assets() -> None:
+    """Deixa no cache de render_assets o template padrão, selos, marca d'água e fontes do card padrão."""
+    if not DEFAULT_TEMPLATE_PATH.exists():
+        return
+    image = abrir_imagem(DEFAULT_TEMPLATE_PATH)
+    width = image.size[0]
+    _apply_watermark(image)
+    for grau in ("aprendiz", "companheiro", "mestre"):
+        _draw_degree_stamp(image, grau)
+    for potencia in ("gob", "cmsb", "comab"):
+        path = _potencia_stamp_path(potencia)
+        if path:
+            _load_potencia_stamp(path, width)
+    for size, candidates in (
+        (max(14, width // 68), TITLE_FONT_CANDIDATES),
+        (max(24, width // 34), ITALIC_FONT_CANDIDATES),
+        (max(30, width // 29), TITLE_FONT_CANDIDATES),
+        (max(28, width // 32), BODY_FONT_CANDIDATES),
+        (max(31, width // 30), BODY_FONT_CANDIDATES),
+        (max(27, width // 34), ITALIC_FONT_CANDIDATES),
+        (max(17, width // 60), TITLE_FONT_CANDIDATES),
+    ):
+        _load_font(size, "", candidates)
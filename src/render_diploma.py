@@ -2,13 +2,14 @@
 from __future__ import annotations
 
 import logging
-import os
-import tempfile
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 from PIL import Image, ImageDraw, ImageFont, ImageOps
 
+from src.render_assets import abrir_imagem, carregar_fonte
+from src.render_saida import ImagemRenderizada, codificar
+
 logger = logging.getLogger(__name__)
 
 # Diretórios de assets
@@ -19,6 +20,9 @@ BRANDING_DIR = ASSETS_DIR / "branding"
 DEFAULT_TEXT_COLOR = (58, 36, 16, 255)  # Castanho envelhecido elegante
 GOLD_TEXT_COLOR = (235, 195, 100, 230)   # Dourado queimado para lacres de cera
 
+# Fallback sistêmico
+_FONTES_FALLBACK = ("georgia.ttf", "Georgia.ttf", "times.ttf", "Times New Roman.ttf")
+
 CONQUISTAS_MONOGRAMAS = {
     "ic": {"sigla": "IC", "nome": "Iniciado na Colher"},
     "mp": {"sigla": "MP", "nome": "Mestre de Marca"},
@@ -35,21 +39,8 @@ CONQUISTAS_MONOGRAMAS = {
 
 
 def _load_custom_font(name: str, size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
-    """Tenta carregar fonte do diretório assets, senão usa fallback."""
-    path = FONTS_DIR / name
-    if path.exists():
-        try:
-            return ImageFont.truetype(str(path), size=size)
-        except Exception:
-            pass
-    # Fallback sistêmico
-    fallbacks = ["georgia.ttf", "Georgia.ttf", "times.ttf", "Times New Roman.ttf"]
-    for f in fallbacks:
-        try:
-            return ImageFont.truetype(f, size=size)
-        except Exception:
-            continue
-    return ImageFont.load_default()
+    """Tenta carregar fonte do diretório assets, senão usa fallback (memorizada em render_assets)."""
+    return carregar_fonte(size, (str(FONTS_DIR / name), *_FONTES_FALLBACK))
 
 
 def _measure_text(draw: ImageDraw.ImageDraw, text: str, font: ImageFont.ImageFont) -> Tuple[int, int]:
@@ -84,9 +75,9 @@ def _wrap_and_draw_centered(draw: ImageDraw.ImageDraw, text: str, center_x: int,
     return cy
 
 
-def renderizar_diploma(membro: Dict[str, Any], conquistas_obtidas: List[str]) -> str:
+def renderizar_diploma(membro: Dict[str, Any], conquistas_obtidas: List[str]) -> ImagemRenderizada:
     """
-    Gera o Diploma Digital do Obreiro em PNG e retorna o caminho do arquivo gerado.
+    Gera o Diploma Digital do Obreiro e retorna a imagem codificada em memória.
     """
     bg_path = BRANDING_DIR / "diploma_pergaminho_bg.png"
     seal_base_path = BRANDING_DIR / "selo_cera_base.png"
@@ -96,7 +87,7 @@ def renderizar_diploma(membro: Dict[str, Any], conquistas_obtidas: List[str]) ->
         raise FileNotFoundError(f"Fundo do diploma não encontrado em {bg_path}")
         
     # Carrega o pergaminho de fundo
-    diploma = Image.open(bg_path).convert("RGBA")
+    diploma = abrir_imagem(bg_path)
     width, height = diploma.size
     
     draw = ImageDraw.Draw(diploma)
@@ -169,8 +160,6 @@ def renderizar_diploma(membro: Dict[str, Any], conquistas_obtidas: List[str]) ->
         y_cursor = _draw_centered(draw, "INSÍGNIAS E CONQUISTAS RECONHECIDAS", center_x, y_cursor, font_subtitulo, DEFAULT_TEXT_COLOR) + 25
         
         if seal_base_path.exists():
-            seal_raw = Image.open(seal_base_path).convert("RGBA")
-            
             # Define grid e espaçamentos
             # Grid dinâmico: determina colunas com base no total
             num_selos = len(conquistas_exibidas)
@@ -178,7 +167,7 @@ def renderizar_diploma(membro: Dict[str, Any], conquistas_obtidas: List[str]) ->
             
             # Escala o selo de cera: tamanho final no diploma
             target_seal_size = int(width * 0.12) # 12% da largura do diploma
-            seal_base = seal_raw.resize((target_seal_size, target_seal_size), Image.Resampling.LANCZOS)
+            seal_base = abrir_imagem(seal_base_path, tamanho=(target_seal_size, target_seal_size))
             
             # Gap horizontal entre os selos
             h_gap = int(width * 0.04)
@@ -267,12 +256,12 @@ def renderizar_diploma(membro: Dict[str, Any], conquistas_obtidas: List[str]) ->
     
     if char_path.exists():
         try:
-            personagem = Image.open(char_path).convert("RGBA")
+            personagem = abrir_imagem(char_path)
             # Redimensiona para um tamanho harmônico no canto
             p_h = int(height * 0.22)
             p_ratio = p_h / personagem.size[1]
             p_w = int(personagem.size[0] * p_ratio)
-            personagem = personagem.resize((p_w, p_h), Image.Resampling.LANCZOS)
+            personagem = abrir_imagem(char_path, tamanho=(p_w, p_h))
             
             # Posiciona no canto inferior esquerdo
             px = int(width * 0.08)
@@ -309,13 +298,31 @@ def renderizar_diploma(membro: Dict[str, Any], conquistas_obtidas: List[str]) ->
         except Exception as e_stamp:
             logger.warning("Erro ao aplicar marca d'agua estetica: %s", e_stamp)
 
-    # Salva no diretório temporário de saída
-    temp_dir = tempfile.gettempdir()
-    uid = membro.get("telegram_id", membro.get("Telegram ID", "anon"))
-    out_path = os.path.join(temp_dir, f"bode_diploma_{uid}.png")
-    
-    # Salva como RGB para remover o canal alfa final
-    diploma.convert("RGB").save(out_path, "PNG", optimize=True)
-    logger.info("Diploma digital renderizado com sucesso em: %s", out_path)
+    # Codifica em memória (RGB, sem o canal alfa final)
+    imagem = codificar(diploma, "diploma")
+    logger.info("Diploma digital renderizado com sucesso (%d bytes).", imagem.tamanho)
     
-    return out_path
+    return imagem
+
+
+def preaquecer_assets() -> None:
+    """Deixa no cache de render_assets o pergaminho, o selo, os personagens e as fontes do diploma."""
+    bg_path = BRANDING_DIR / "diploma_pergaminho_bg.png"
+    if not bg_path.exists():
+        return
+    width, height = abrir_imagem(bg_path).size
+    seal_base_path = BRANDING_DIR / "selo_cera_base.png"
+    if seal_base_path.exists():
+        target_seal_size = int(width * 0.12)
+        abrir_imagem(seal_base_path, tamanho=(target_seal_size, target_seal_size))
+    for char_file in ("char_aprendiz.png", "char_companheiro.png", "char_mestre.png"):
+        char_path = BRANDING_DIR / char_file
+        if char_path.exists():
+            abrir_imagem(char_path)
+    for name, size in (
+        ("Cinzel-Regular.ttf", int(width * 0.048)),
+        ("CormorantGaramond-SemiBold.ttf", int(width * 0.070)),
+        ("CormorantGaramond-Italic.ttf", int(width * 0.05)),
+        ("Cinzel-Bold.ttf", int(width * 0.06)),
+    ):
+        _load_custom_font(name, size)
@@ -1,11 +1,12 @@
 # -*- coding: utf-8 -*-
-import os
 import logging
-import tempfile
 from pathlib import Path
 from typing import Any, Dict, Optional, Tuple
 from PIL import Image, ImageDraw, ImageFont
 
+from src.render_assets import abrir_imagem, carregar_fonte
+from src.render_saida import ImagemRenderizada, codificar
+
 logger = logging.getLogger(__name__)
 
 # Assets Layout setup
@@ -18,20 +19,11 @@ DEFAULT_GOLD = (130, 100, 60, 255)
 DARK_TEXT = (40, 25, 15, 255)
 CRIMSON_RED = (140, 35, 35, 255)
 
+# System Fallbacks
+_FONTES_FALLBACK = ("georgia.ttf", "Georgia.ttf", "times.ttf")
+
 def _load_font(name: str, size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
-    path = FONTS_DIR / name
-    if path.exists():
-        try:
-            return ImageFont.truetype(str(path), size=size)
-        except Exception:
-            pass
-    # System Fallbacks
-    for f in ["georgia.ttf", "Georgia.ttf", "times.ttf"]:
-        try:
-            return ImageFont.truetype(f, size=size)
-        except Exception:
-            continue
-    return ImageFont.load_default()
+    return carregar_fonte(size, (str(FONTS_DIR / name), *_FONTES_FALLBACK))
 
 def _draw_centered_x(draw: ImageDraw.ImageDraw, text: str, cx: int, y: int, font: ImageFont.ImageFont, fill: Tuple[int, int, int, int]) -> int:
     draw.text((cx, y), text, font=font, fill=fill, anchor="ma")
@@ -65,7 +57,7 @@ def renderizar_card_celebracao(
     detalhes: str, 
     potencia: Optional[str] = None,
     monograma_selo: str = "EX"
-) -> str:
+) -> ImagemRenderizada:
     """
     Gera um card comemorativo 1200x675 combinando o fundo ornado,
     o brasão da potência, a tipografia em Cinzel-Bold e um selo de cera.
@@ -77,8 +69,7 @@ def renderizar_card_celebracao(
         
     try:
         # 1. Carrega canvas base
-        canvas = Image.open(bg_path).convert("RGBA")
-        canvas = canvas.resize((1200, 675), Image.Resampling.LANCZOS)
+        canvas = abrir_imagem(bg_path, tamanho=(1200, 675))
         width, height = canvas.size
         draw = ImageDraw.Draw(canvas)
         
@@ -97,9 +88,8 @@ def renderizar_card_celebracao(
         selo_path = BRANDING_DIR / "selo_cera_base.png"
         if selo_path.exists():
             try:
-                selo = Image.open(selo_path).convert("RGBA")
                 s_w = 200
-                selo = selo.resize((s_w, s_w), Image.Resampling.LANCZOS)
+                selo = abrir_imagem(selo_path, tamanho=(s_w, s_w))
                 
                 s_draw = ImageDraw.Draw(selo)
                 font_monogram = _load_font("Cinzel-Bold.ttf", 72)
@@ -140,23 +130,18 @@ def renderizar_card_celebracao(
         # Rodapé da Mensagem
         y_cur = _wrap_text_centered(draw, detalhes, centro_x, y_cur, font_footer, (100, 75, 50, 230), limite_w)
         
-        # 6. Salvamento do Arquivo Físico Temporário
-        temp_dir = tempfile.gettempdir()
-        import uuid
-        out_name = f"bode_celebracao_{uuid.uuid4().hex[:8]}.png"
-        out_path = os.path.join(temp_dir, out_name)
-        
-        canvas.convert("RGB").save(out_path, "PNG", optimize=True)
-        logger.info("Card de Celebracao renderizado em: %s", out_path)
+        # 6. Codificação em memória
+        imagem = codificar(canvas, "celebracao")
+        logger.info("Card de Celebracao renderizado (%d bytes).", imagem.tamanho)
         
-        return out_path
+        return imagem
         
     except Exception as e:
         logger.error("Erro critico na geracao do card de celebracao: %s", e)
         raise e
 
 
-def renderizar_relatorio_vigor(dados_vigor: Dict[str, Any]) -> str:
+def renderizar_relatorio_vigor(dados_vigor: Dict[str, Any]) -> ImagemRenderizada:
     """
     Gera o Card de Vigor da Oficina (1200x675) com 3 medalhões concêntricos:
     Agenda, Acolhimento e Engajamento, além de selos dinâmicos de premiação.
@@ -166,8 +151,7 @@ def renderizar_relatorio_vigor(dados_vigor: Dict[str, Any]) -> str:
         bg_path = BRANDING_DIR / "diploma_pergaminho_bg.png"
 
     try:
-        canvas = Image.open(bg_path).convert("RGBA")
-        canvas = canvas.resize((1200, 675), Image.Resampling.LANCZOS)
+        canvas = abrir_imagem(bg_path, tamanho=(1200, 675))
         width, height = canvas.size
         draw = ImageDraw.Draw(canvas)
 
@@ -250,9 +234,8 @@ def renderizar_relatorio_vigor(dados_vigor: Dict[str, Any]) -> str:
         def _desenhar_selo_recompensa(sx: int, sy: int, sigla: str, legenda: str):
             if not selo_path.exists(): return
             try:
-                s_img = Image.open(selo_path).convert("RGBA")
                 s_size = 140
-                s_img = s_img.resize((s_size, s_size), Image.Resampling.LANCZOS)
+                s_img = abrir_imagem(selo_path, tamanho=(s_size, s_size))
                 s_draw = ImageDraw.Draw(s_img)
                 
                 font_mon = _load_font("Cinzel-Bold.ttf", 46)
@@ -279,16 +262,11 @@ def renderizar_relatorio_vigor(dados_vigor: Dict[str, Any]) -> str:
         if acolhimento > 10:
             _desenhar_selo_recompensa(width - 60 - 140, 480, "FR", "Farol")
 
-        # 5. Salvamento final
-        temp_dir = tempfile.gettempdir()
-        import uuid
-        out_name = f"bode_vigor_{uuid.uuid4().hex[:8]}.png"
-        out_path = os.path.join(temp_dir, out_name)
+        # 5. Codificação em memória
+        imagem = codificar(canvas, "vigor")
+        logger.info("Card de Vigor renderizado (%d bytes).", imagem.tamanho)
         
-        canvas.convert("RGB").save(out_path, "PNG", optimize=True)
-        logger.info("Card de Vigor renderizado em: %s", out_path)
-        
-        return out_path
+        return imagem
 
     except Exception as e:
         logger.error("Erro critico na geracao do card de vigor: %s", e)
@@ -299,14 +277,13 @@ def renderizar_badge_wall(
     dados_conquistas: Dict[str, Any], 
     nome_membro: str, 
     nome_loja: str
-) -> str:
+) -> ImagemRenderizada:
     """
     Gera a Galeria de Conquistas (1200x675) no formato de Parede de Medalhas.
     Dispõe o catálogo de 11 medalhas em um grid centrado e os marcos coletivos na base.
     Filtros aplicados: dourado plena cor para desbloqueadas, grayscale+transparência para bloqueadas.
     """
     from PIL import ImageOps, ImageEnhance
-    import uuid
     
     bg_path = BRANDING_DIR / "marco_celebracao_bg.png"
     if not bg_path.exists():
@@ -316,8 +293,7 @@ def renderizar_badge_wall(
     
     try:
         # 1. Inicializar Canvas
-        canvas = Image.open(bg_path).convert("RGBA")
-        canvas = canvas.resize((1200, 675), Image.Resampling.LANCZOS)
+        canvas = abrir_imagem(bg_path, tamanho=(1200, 675))
         width, height = canvas.size
         draw = ImageDraw.Draw(canvas)
         cx = width // 2
@@ -388,8 +364,7 @@ def renderizar_badge_wall(
             comp_img = None
             if medal_path.exists():
                 try:
-                    comp_img = Image.open(medal_path).convert("RGBA")
-                    comp_img = comp_img.resize((med_size, med_size), Image.Resampling.LANCZOS)
+                    comp_img = abrir_imagem(medal_path, tamanho=(med_size, med_size))
                 except:
                     comp_img = None
                     
@@ -397,8 +372,7 @@ def renderizar_badge_wall(
                 # Fallback procedural usando selo base
                 if selo_path.exists():
                     try:
-                        comp_img = Image.open(selo_path).convert("RGBA")
-                        comp_img = comp_img.resize((med_size, med_size), Image.Resampling.LANCZOS)
+                        comp_img = abrir_imagem(selo_path, tamanho=(med_size, med_size))
                         s_draw = ImageDraw.Draw(comp_img)
                         sigla = slug.upper()
                         
@@ -470,8 +444,7 @@ def renderizar_badge_wall(
                 # Desenhar miniatura de selo cera
                 if selo_path.exists():
                     try:
-                        s_img = Image.open(selo_path).convert("RGBA")
-                        s_img = s_img.resize((s_bot_size, s_bot_size), Image.Resampling.LANCZOS)
+                        s_img = abrir_imagem(selo_path, tamanho=(s_bot_size, s_bot_size))
                         sd = ImageDraw.Draw(s_img)
                         
                         font_mini_in = _load_font("Cinzel-Bold.ttf", 22)
@@ -491,16 +464,31 @@ def renderizar_badge_wall(
                 txt_label = f"{s_b['titulo']} (x{s_b['count']})"
                 draw.text((lbl_x, lbl_y), txt_label.upper(), font=font_bottom_lbl, fill=CRIMSON_RED, anchor="mm")
 
-        # 6. Salvar Canvas Temporário
-        temp_dir = tempfile.gettempdir()
-        out_name = f"bode_galeria_{uuid.uuid4().hex[:8]}.png"
-        out_path = os.path.join(temp_dir, out_name)
-        
-        canvas.convert("RGB").save(out_path, "PNG", optimize=True)
-        logger.info("Quadro de Honra renderizado com sucesso em: %s", out_path)
-        return out_path
+        # 6. Codificação em memória
+        imagem = codificar(canvas, "badge_wall")
+        logger.info("Quadro de Honra renderizado com sucesso (%d bytes).", imagem.tamanho)
+        return imagem
 
     except Exception as e:
         logger.error("Falha crítica ao renderizar Badge Wall: %s", e)
         raise e
 
+
+
+def preaquecer_assets() -> None:
+    """Deixa no cache de render_assets o fundo, o selo de cera nos tamanhos usados e as fontes."""
+    bg_path = BRANDING_DIR / "marco_celebracao_bg.png"
+    if not bg_path.exists():
+        bg_path = BRANDING_DIR / "diploma_pergaminho_bg.png"
+    if bg_path.exists():
+        abrir_imagem(bg_path, tamanho=(1200, 675))
+    selo_path = BRANDING_DIR / "selo_cera_base.png"
+    if selo_path.exists():
+        for s_size in (200, 140, 90, 65):
+            abrir_imagem(selo_path, tamanho=(s_size, s_size))
+    for name, size in (
+        ("Cinzel-Bold.ttf", 48), ("Cinzel-Regular.ttf", 30),
+        ("CormorantGaramond-SemiBold.ttf", 34), ("CormorantGaramond-Italic.ttf", 26),
+        ("CormorantGaramond-BoldItalic.ttf", 20),
+    ):
+        _load_font(name, size)
@@ -0,0 +1,123 @@
+# src/render_saida.py
+# ============================================
+# BODE ANDARILHO - CODIFICAÇÃO DOS RENDERS EM MEMÓRIA
+# ============================================
+#
+# Os renderizadores gravavam o PNG em tempfile.gettempdir() e quem chamava
+# reabria o arquivo para enviar ao Telegram e, de novo, para subir ao
+# Storage. Agora cada render devolve uma ImagemRenderizada: o buffer já
+# codificado, que alimenta o upload do Telegram e o do Storage sem passar
+# pelo disco.
+#
+# Codificação configurável por ambiente:
+#
+#   RENDER_FORMATO        jpeg (padrão) | png | webp
+#   RENDER_QUALIDADE      qualidade JPEG/WebP (padrão 90)
+#   RENDER_PNG_COMPRESSAO nível zlib 0-9 do PNG (padrão 6)
+#   RENDER_PNG_OTIMIZAR   true = optimize=True do Pillow (bem mais lento)
+#
+# O Telegram recomprime toda foto para JPEG; no card padrão (941x1672) o
+# PNG com optimize levava ~850 ms e ~2,5 MB, o JPEG q90 ~20 ms e ~400 KB.
+#
+# Cada codificação registra tempo e tamanho por tipo de card; o serviço de
+# render agrega em estatisticas_codificacao().
+#
+# ============================================
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Any, Dict
+
+from PIL import Image
+
+_FORMATO = os.getenv("RENDER_FORMATO", "jpeg").strip().lower()
+_QUALIDADE = int(os.getenv("RENDER_QUALIDADE", "90"))
+_PNG_COMPRESSAO = int(os.getenv("RENDER_PNG_COMPRESSAO", "6"))
+_PNG_OTIMIZAR = os.getenv("RENDER_PNG_OTIMIZAR", "false").strip().lower() in ("1", "true", "sim", "yes")
+
+_FORMATOS = {
+    # formato -> (nome no Pillow, extensão, content-type)
+    "png": ("PNG", ".png", "image/png"),
+    "jpeg": ("JPEG", ".jpg", "image/jpeg"),
+    "jpg": ("JPEG", ".jpg", "image/jpeg"),
+    "webp": ("WEBP", ".webp", "image/webp"),
+}
+
+
+@dataclass
+class ImagemRenderizada:
+    """Render codificado em memória."""
+
+    dados: bytes
+    extensao: str
+    content_type: str
+    tipo: str = ""
+    tempo_codificacao_s: float = 0.0
+
+    @property
+    def tamanho(self) -> int:
+        return len(self.dados)
+
+    def arquivo(self, nome: str = "card") -> BytesIO:
+        """BytesIO com nome (o Telegram usa o nome para o tipo do arquivo)."""
+        buffer = BytesIO(self.dados)
+        buffer.name = f"{nome}{self.extensao}"
+        return buffer
+
+
+def codificar(imagem: Image.Image, tipo: str, formato: str = "") -> ImagemRenderizada:
+    """Codifica a imagem final (sem alfa) no formato configurado."""
+    formato = (formato or _FORMATO).lower()
+    nome_pil, extensao, content_type = _FORMATOS.get(formato, _FORMATOS["jpeg"])
+    inicio = time.perf_counter()
+    rgb = imagem.convert("RGB")
+    buffer = BytesIO()
+    if nome_pil == "PNG":
+        rgb.save(buffer, "PNG", optimize=_PNG_OTIMIZAR, compress_level=_PNG_COMPRESSAO)
+    elif nome_pil == "JPEG":
+        # subsampling=0 (4:4:4) mantém o texto nítido nas bordas.
+        rgb.save(buffer, "JPEG", quality=_QUALIDADE, optimize=True, subsampling=0)
+    else:
+        rgb.save(buffer, "WEBP", quality=_QUALIDADE, method=4)
+    return ImagemRenderizada(
+        dados=buffer.getvalue(),
+        extensao=extensao,
+        content_type=content_type,
+        tipo=tipo,
+        tempo_codificacao_s=time.perf_counter() - inicio,
+    )
+
+
+# ---------- métricas ----------
+
+_metricas: Dict[str, Dict[str, float]] = {}
+_metricas_lock = threading.Lock()
+
+
+def registrar_codificacao(imagem: ImagemRenderizada) -> None:
+    with _metricas_lock:
+        m = _metricas.setdefault(imagem.tipo or "?", {"renders": 0, "bytes": 0, "segundos": 0.0, "maior": 0})
+        m["renders"] += 1
+        m["bytes"] += imagem.tamanho
+        m["segundos"] += imagem.tempo_codificacao_s
+        m["maior"] = max(m["maior"], imagem.tamanho)
+
+
+def estatisticas_codificacao() -> Dict[str, Dict[str, Any]]:
+    """Por tipo de card: renders, tamanho médio/maior e tempo médio de codificação."""
+    with _metricas_lock:
+        return {
+            tipo: {
+                "renders": int(m["renders"]),
+                "kb_medio": round(m["bytes"] / m["renders"] / 1024, 1),
+                "kb_maior": round(m["maior"] / 1024, 1),
+                "ms_codificacao_medio": round(m["segundos"] / m["renders"] * 1000, 1),
+            }
+            for tipo, m in _metricas.items()
+            if m["renders"]
+        }
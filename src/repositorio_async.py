@@ -0,0 +1,429 @@
+# src/repositorio_async.py
+# ============================================
+# BODE ANDARILHO - REPOSITÓRIO ASSÍNCRONO (POSTGREST)
+# ============================================
+#
+# Camada de acesso ao Supabase nativa de asyncio.
+#
+# O cliente `supabase` de sheets_supabase.py é síncrono: cada chamada feita
+# dentro de um handler do Telegram bloqueia o event loop inteiro até o
+# PostgREST responder. Este módulo fala diretamente com a API REST usando
+# um único `httpx.AsyncClient` compartilhado (pool de conexões, HTTP/2
+# quando o pacote `h2` estiver instalado), com timeout por chamada e
+# concorrência limitada por semáforo.
+#
+# As funções mantêm os mesmos nomes e formatos de retorno (chaves "sheets")
+# de sheets_supabase.py, e compartilham o mesmo cache, para que os handlers
+# possam migrar uma chamada de cada vez:
+#
+#     from src import repositorio_async as repo
+#     membro = await repo.buscar_membro(user_id)
+#
+# ============================================
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from src import sheets_supabase as _base
+from src.cache import AUSENTE
+from src.sheets_supabase import (
+    _apos_cancelar_confirmacao,
+    _apos_registrar_confirmacao,
+    _extrair_coluna_ausente,
+    _montar_linha_confirmacao,
+    _norm_intlike,
+    _norm_status,
+    _norm_text,
+    _row_to_sheets,
+    _safe_cache_int,
+    _tags_confirmacao,
+)
+
+try:  # HTTP/2 é opcional: depende do pacote `h2`.
+    import h2  # noqa: F401
+    _HTTP2_DISPONIVEL = True
+except ImportError:
+    _HTTP2_DISPONIVEL = False
+
+logger = logging.getLogger(__name__)
+
+_MAX_CONCORRENCIA_PADRAO = int(os.getenv("SUPABASE_ASYNC_MAX_CONCORRENCIA", "10"))
+_TIMEOUT_PADRAO = float(os.getenv("SUPABASE_ASYNC_TIMEOUT", "8"))
+
+_config: Dict[str, Any] = {
+    "base_url": os.environ.get("SUPABASE_URL", ""),
+    "chave": os.environ.get("SUPABASE_KEY", ""),
+    "transport": None,
+    "max_concorrencia": _MAX_CONCORRENCIA_PADRAO,
+    "timeout": _TIMEOUT_PADRAO,
+}
+_cliente: Optional[httpx.AsyncClient] = None
+_semaforo: Optional[asyncio.Semaphore] = None
+
+
+class ErroRepositorio(Exception):
+    """Falha de uma requisição ao PostgREST (status HTTP, timeout ou rede)."""
+
+    def __init__(self, mensagem: str, status: int = 0):
+        super().__init__(mensagem)
+        self.status = status
+
+
+# =========================
+# Ciclo de vida do pool
+# =========================
+
+def configurar_repositorio(
+    base_url: Optional[str] = None,
+    chave: Optional[str] = None,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    max_concorrencia: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> None:
+    """
+    Ajusta a configuração do pool antes do primeiro uso.
+    `transport` permite apontar para um PostgREST local (ex.: httpx.ASGITransport)
+    em testes de carga offline.
+    """
+    global _cliente, _semaforo
+    if base_url is not None:
+        _config["base_url"] = base_url
+    if chave is not None:
+        _config["chave"] = chave
+    if transport is not None:
+        _config["transport"] = transport
+    if max_concorrencia is not None:
+        _config["max_concorrencia"] = max(1, int(max_concorrencia))
+    if timeout is not None:
+        _config["timeout"] = float(timeout)
+    # Força recriação na próxima chamada (o cliente antigo deve ser fechado por quem o abriu).
+    _cliente = None
+    _semaforo = None
+
+
+def _obter_cliente() -> httpx.AsyncClient:
+    global _cliente, _semaforo
+    if _cliente is None or _cliente.is_closed:
+        base_url = str(_config["base_url"] or "").rstrip("/")
+        chave = str(_config["chave"] or "")
+        limite = int(_config["max_concorrencia"])
+        _cliente = httpx.AsyncClient(
+            base_url=f"{base_url}/rest/v1",
+            headers={
+                "apikey": chave,
+                "Authorization": f"Bearer {chave}",
+                "Accept": "application/json",
+            },
+            http2=_HTTP2_DISPONIVEL and _config["transport"] is None,
+            limits=httpx.Limits(max_connections=limite, max_keepalive_connections=limite),
+            timeout=httpx.Timeout(_config["timeout"]),
+            transport=_config["transport"],
+        )
+        _semaforo = asyncio.Semaphore(limite)
+    return _cliente
+
+
+async def fechar_repositorio() -> None:
+    """Fecha o pool de conexões (usado no shutdown do servidor)."""
+    global _cliente, _semaforo
+    cliente = _cliente
+    _cliente = None
+    _semaforo = None
+    if cliente is not None and not cliente.is_closed:
+        await cliente.aclose()
+
+
+# =========================
+# Requisições
+# =========================
+
+def _filtro_in(valores: List[str]) -> str:
+    """Monta o operador `in.(...)` do PostgREST com aspas duplas escapadas."""
+    itens = []
+    for v in valores:
+        texto = str(v).replace("\\", "\\\\").replace('"', '\\"')
+        itens.append(f'"{texto}"')
+    return f"in.({','.join(itens)})"
+
+
+async def _requisitar(
+    metodo: str,
+    tabela: str,
+    params: Optional[Dict[str, str]] = None,
+    corpo: Any = None,
+    prefer: str = "",
+    timeout: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """Executa uma requisição no PostgREST respeitando o limite de concorrência."""
+    cliente = _obter_cliente()
+    assert _semaforo is not None
+    headers: Dict[str, str] = {}
+    if prefer:
+        headers["Prefer"] = prefer
+    if corpo is not None:
+        headers["Content-Type"] = "application/json"
+    limite_tempo = float(timeout if timeout is not None else _config["timeout"])
+
+    async with _semaforo:
+        inicio = time.perf_counter()
+        try:
+            resp = await asyncio.wait_for(
+                cliente.request(
+                    metodo,
+                    f"/{tabela}",
+                    params=params,
+                    content=json.dumps(corpo) if corpo is not None else None,
+                    headers=headers,
+                ),
+                timeout=limite_tempo,
+            )
+        except asyncio.TimeoutError:
+            raise ErroRepositorio(f"Timeout de {limite_tempo:.1f}s em {metodo} {tabela}") from None
+        except httpx.HTTPError as e:
+            raise ErroRepositorio(f"Falha de rede em {metodo} {tabela}: {e}") from e
+        finally:
+            logger.debug("%s %s em %.1f ms", metodo, tabela, (time.perf_counter() - inicio) * 1000)
+
+    if resp.status_code >= 400:
+        raise ErroRepositorio(f"{resp.status_code} em {metodo} {tabela}: {resp.text}", resp.status_code)
+    if not resp.content:
+        return []
+    dados = resp.json()
+    if isinstance(dados, dict):
+        return [dados]
+    return dados or []
+
+
+async def _select(tabela: str, params: Dict[str, str], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+    params = {"select": "*", **params}
+    return await _requisitar("GET", tabela, params=params, timeout=timeout)
+
+
+async def _insert_com_fallback_colunas(tabela: str, row: Dict[str, Any]) -> None:
+    """Equivalente assíncrono de sheets_supabase._insert_com_fallback_colunas."""
+    payload = dict(row)
+    for tentativa in range(1, 12):
+        try:
+            await _requisitar("POST", tabela, corpo=payload, prefer="return=minimal")
+            return
+        except ErroRepositorio as e:
+            col = _extrair_coluna_ausente(e)
+            if not col or col not in payload or tentativa > 10:
+                raise
+            logger.warning(
+                "Coluna '%s' ausente em '%s' durante INSERT; prosseguindo sem este campo.",
+                col,
+                tabela,
+            )
+            payload.pop(col, None)
+
+
+# =========================
+# Membros
+# =========================
+
+async def listar_membros(include_inativos: bool = False) -> List[Dict[str, Any]]:
+    """Retorna membros cadastrados; por padrão, somente cadastros ativos."""
+    try:
+        rows = await _select("membros", {})
+        membros = [_row_to_sheets("membros", row) for row in rows]
+        if include_inativos:
+            return membros
+        return [m for m in membros if _norm_status(m.get("Status") or m.get("status")) == "ativo"]
+    except Exception as e:
+        logger.error("Erro ao listar membros (async): %s", e)
+        return []
+
+
+async def buscar_membro(telegram_id: int) -> Optional[Dict[str, Any]]:
+    """Retorna o dicionário com dados do membro, compartilhando o cache síncrono."""
+    tid = _norm_intlike(telegram_id)
+    if not tid:
+        return None
+
+    async def _carregar() -> Optional[Dict[str, Any]]:
+        rows = await _select("membros", {"telegram_id": f"eq.{tid}", "limit": "1"})
+        return _row_to_sheets("membros", rows[0]) if rows else None
+
+    try:
+        return await _base._cache_membros.obter_ou_carregar_async(_safe_cache_int(tid), _carregar)
+
+    except Exception as e:
+        logger.error("Erro ao buscar membro (async): %s", e)
+        return None
+
+
+# =========================
+# Eventos
+# =========================
+
+async def listar_eventos(include_inativos: bool = False) -> List[dict]:
+    """Lista eventos; por padrão apenas status 'ativo' (ou vazio => ativo)."""
+    async def _carregar() -> List[dict]:
+        params: Dict[str, str] = {}
+        if not include_inativos:
+            params["or"] = "(status.ilike.ativo,status.is.null,status.eq.)"
+        rows = await _select("eventos", params)
+        return [_row_to_sheets("eventos", row) for row in rows]
+
+    try:
+        return await _base._cache_eventos.obter_ou_carregar_async(bool(include_inativos), _carregar)
+
+    except Exception as e:
+        logger.error("Erro ao listar eventos (async): %s", e)
+        return []
+
+
+# =========================
+# Confirmações
+# =========================
+
+async def buscar_confirmacao(id_evento: str, telegram_id: int, usar_cache: bool = True) -> Optional[dict]:
+    """Verifica se um usuário já confirmou em determinado evento."""
+    cache_key = (id_evento, telegram_id)
+    tags = _tags_confirmacao([id_evento], telegram_id)
+    if usar_cache:
+        cached = _base._cache_confirmacoes.obter(cache_key)
+        if cached is not AUSENTE:
+            return cached
+
+    try:
+        tid = _norm_intlike(telegram_id)
+        rows = await _select(
+            "confirmacoes",
+            {"id_evento": f"eq.{_norm_text(id_evento)}", "telegram_id": f"eq.{tid}", "limit": "1"},
+        )
+        result = _row_to_sheets("confirmacoes", rows[0]) if rows else None
+        _base._cache_confirmacoes.definir(cache_key, result, tags)
+        return result
+
+    except Exception as e:
+        logger.error("Erro ao buscar confirmação (async): %s", e)
+        return None
+
+
+async def buscar_confirmacao_em_eventos(
+    ids_evento: List[str],
+    telegram_id: int,
+    usar_cache: bool = True,
+) -> Optional[dict]:
+    """Busca confirmação do usuário em qualquer um dos IDs de evento informados."""
+    ids_norm = list(dict.fromkeys(i for i in (_norm_text(x) for x in (ids_evento or [])) if i))
+    if not ids_norm:
+        return None
+
+    cache_key = (tuple(ids_norm), telegram_id)
+    tags = _tags_confirmacao(ids_norm, telegram_id)
+    if usar_cache:
+        cached = _base._cache_confirmacoes.obter(cache_key)
+        if cached is not AUSENTE:
+            return cached
+
+    try:
+        tid = _norm_intlike(telegram_id)
+        if not tid:
+            _base._cache_confirmacoes.definir(cache_key, None, tags)
+            return None
+
+        rows = await _select(
+            "confirmacoes",
+            {"id_evento": _filtro_in(ids_norm), "telegram_id": f"eq.{tid}", "limit": "1"},
+        )
+        result = _row_to_sheets("confirmacoes", rows[0]) if rows else None
+        _base._cache_confirmacoes.definir(cache_key, result, tags)
+        return result
+
+    except Exception as e:
+        logger.error("Erro ao buscar confirmação multi-id (async): %s", e)
+        return None
+
+
+async def registrar_confirmacao(dados: dict) -> bool:
+    """Registra confirmação evitando duplicidade (mesmo Telegram ID + ID Evento)."""
+    try:
+        id_evento = _norm_text(dados.get("id_evento") or dados.get("ID Evento"))
+        telegram_id = _norm_intlike(dados.get("telegram_id") or dados.get("Telegram ID"))
+        if not id_evento or not telegram_id:
+            return False
+
+        if await buscar_confirmacao(id_evento, int(float(telegram_id)), usar_cache=False):
+            return False
+
+        row = _montar_linha_confirmacao(dados, id_evento, telegram_id)
+        await _insert_com_fallback_colunas("confirmacoes", row)
+        _apos_registrar_confirmacao(id_evento, telegram_id, row.get("agape"))
+        return True
+
+    except Exception as e:
+        logger.error("Erro ao registrar confirmação (async): %s", e)
+        return False
+
+
+async def cancelar_confirmacao(id_evento: str, telegram_id: int) -> bool:
+    """Remove a confirmação do usuário no evento."""
+    try:
+        target_evento = _norm_text(id_evento)
+        target_id = _norm_intlike(telegram_id)
+        if not target_evento or not target_id:
+            return False
+
+        await _requisitar(
+            "DELETE",
+            "confirmacoes",
+            params={"id_evento": f"eq.{target_evento}", "telegram_id": f"eq.{target_id}"},
+            prefer="return=minimal",
+        )
+        _apos_cancelar_confirmacao(target_evento, target_id)
+        return True
+
+    except Exception as e:
+        logger.error("Erro ao cancelar confirmação (async): %s", e)
+        return False
+
+
+async def listar_confirmacoes_por_evento(id_evento: str) -> List[dict]:
+    """Retorna lista de confirmações para um evento específico."""
+    try:
+        rows = await _select("confirmacoes", {"id_evento": f"eq.{_norm_text(id_evento)}"})
+        return [_row_to_sheets("confirmacoes", row) for row in rows]
+    except Exception as e:
+        logger.error("Erro ao listar confirmações (async): %s", e)
+        return []
+
+
+async def listar_confirmacoes_por_eventos(ids_evento: List[str]) -> List[dict]:
+    """Retorna confirmações para múltiplos IDs de evento (compatibilidade com IDs legados)."""
+    try:
+        ids_norm = list(dict.fromkeys(i for i in (_norm_text(x) for x in (ids_evento or [])) if i))
+        if not ids_norm:
+            return []
+        rows = await _select("confirmacoes", {"id_evento": _filtro_in(ids_norm)})
+        return [_row_to_sheets("confirmacoes", row) for row in rows]
+    except Exception as e:
+        logger.error("Erro ao listar confirmações multi-id (async): %s", e)
+        return []
+
+
+# =========================
+# Lojas
+# =========================
+
+async def buscar_loja_por_id(loja_id: Any) -> Optional[Dict[str, Any]]:
+    """Busca loja por ID (PK da tabela lojas)."""
+    target = _norm_text(loja_id)
+    if not target:
+        return None
+    try:
+        rows = await _select("lojas", {"id": f"eq.{target}", "limit": "1"})
+        return _row_to_sheets("lojas", rows[0]) if rows else None
+    except Exception as e:
+        logger.error("Erro ao buscar loja por id=%s (async): %s", loja_id, e)
+        return None
@@ -1,13 +1,18 @@
 import logging
 import asyncio
+from datetime import timedelta
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from telegram.ext import Application
 
+from src.caixa_saida import agora_local, entregar_pendentes, limpar_caixa_saida
+from src.ia_auditoria import descarregar_auditoria, limpar_auditoria
 from src.lembretes import (
     enviar_celebracao_mensal,
     enviar_lembretes_24h,
     enviar_lembretes_meio_dia,
+    planejar_lembretes_24h,
+    planejar_lembretes_meio_dia,
 )
 from src.eventos import flush_notificacoes_secretario_adiadas
 
@@ -15,13 +20,73 @@ from src.eventos import flush_notificacoes_secretario_adiadas
 logger = logging.getLogger(__name__)
 _scheduler: AsyncIOScheduler | None = None
 
+# Janelas em que vale recuperar um lembrete perdido por reinício (hora local).
+_RECUPERACAO_24H = (8, 21)
+_RECUPERACAO_MEIO_DIA = (12, 18)
+
 
 async def job_lembretes_24h(app: Application):
-    await enviar_lembretes_24h(app.bot)
+    relatorio = await enviar_lembretes_24h(app.bot)
+    logger.info("Job lembretes 24h: %s", relatorio.resumo())
 
 
 async def job_lembretes_meio_dia(app: Application):
-    await enviar_lembretes_meio_dia(app.bot)
+    relatorio = await enviar_lembretes_meio_dia(app.bot)
+    logger.info("Job lembretes meio-dia: %s", relatorio.resumo())
+
+
+async def job_entregar_caixa_saida(app: Application):
+    """Worker da caixa de saída: retoma pendentes, reservas vencidas e falhas transitórias."""
+    try:
+        relatorio = await entregar_pendentes(app.bot)
+        if relatorio.total:
+            logger.info("Job caixa de saída: %s", relatorio.resumo())
+    except Exception as e:
+        logger.error("Erro no job da caixa de saída: %s", e)
+
+
+async def job_recuperar_lembretes(app: Application):
+    """
+    Executado uma vez no boot. Se o processo reiniciou depois do horário de
+    um lembrete, planeja de novo o dia (a chave de idempotência impede envio
+    duplicado do que já saiu) e entrega o que faltou.
+    """
+    try:
+        hora = agora_local().hour
+        planejados = []
+        if _RECUPERACAO_24H[0] <= hora < _RECUPERACAO_24H[1]:
+            await asyncio.to_thread(planejar_lembretes_24h)
+            planejados.append("24h")
+        if _RECUPERACAO_MEIO_DIA[0] <= hora < _RECUPERACAO_MEIO_DIA[1]:
+            await asyncio.to_thread(planejar_lembretes_meio_dia)
+            planejados.append("meio-dia")
+        if planejados:
+            logger.info("Recuperação de lembretes no boot: replanejados %s.", ", ".join(planejados))
+        await job_entregar_caixa_saida(app)
+    except Exception as e:
+        logger.error("Erro na recuperação de lembretes no boot: %s", e)
+
+
+async def job_limpeza_caixa_saida(app: Application):
+    """Remove da caixa de saída as linhas concluídas há mais de 30 dias."""
+    removidas = await asyncio.to_thread(limpar_caixa_saida, 30)
+    if removidas:
+        logger.info("Caixa de saída: %d linhas antigas removidas.", removidas)
+
+
+async def job_descarregar_auditoria_ia(app: Application):
+    """Grava em lote os baldes horários da auditoria do assistente IA."""
+    try:
+        await asyncio.to_thread(descarregar_auditoria)
+    except Exception as e:
+        logger.error("Erro no job da auditoria IA: %s", e)
+
+
+async def job_limpeza_auditoria_ia(app: Application):
+    """Remove baldes da auditoria IA além da retenção (IA_AUDITORIA_RETENCAO_DIAS)."""
+    removidos = await asyncio.to_thread(limpar_auditoria)
+    if removidos:
+        logger.info("Auditoria IA: %d baldes antigos removidos.", removidos)
 
 
 async def job_celebracao_mensal(app: Application):
@@ -59,88 +124,38 @@ async def job_faxina_membros(app: Application):
     """
     Job semanal de faxina de membros.
     Verifica se os membros cadastrados com status 'Ativo' continuam no grupo principal.
-    Caso contrário, altera seu status para 'Inativo'.
+    Caso contrário, altera seu status para 'Inativo'. A varredura é concorrente, com
+    orçamento de requisições/s (ver faxina_membros.py); o resumo vai
+    para o ADMIN_TELEGRAM_ID.
     """
+    import io
+    import json
     import os
-    from src.sheets_supabase import listar_membros_ativos, marcar_como_inativo
+    from dataclasses import asdict
+    from src.faxina_membros import executar_faxina
 
     grupo_id_str = os.getenv("GRUPO_PRINCIPAL_ID", "")
     if not grupo_id_str or not grupo_id_str.lstrip("-").isdigit():
         logger.warning("Job de faxina abortado: GRUPO_PRINCIPAL_ID não configurado corretamente.")
         return
 
-    grupo_id = int(grupo_id_str)
-
     try:
-        membros = await asyncio.to_thread(listar_membros_ativos)
+        resumo = await executar_faxina(app.bot, int(grupo_id_str))
     except Exception as e:
-        logger.error("Erro ao buscar membros ativos para a faxina: %s", e)
+        logger.error("Erro ao executar a faxina de membros: %s", e)
         return
 
-    if not membros:
-        logger.info("Nenhum membro ativo para validar no job de faxina.")
+    admin_id = (os.getenv("ADMIN_TELEGRAM_ID") or "").strip()
+    if not admin_id:
         return
-
-    logger.info("Iniciando faxina de %d membros ativos...", len(membros))
-    processados = 0
-    inativados = 0
-
-    for m in membros:
-        user_id_str = m.get("Telegram ID") or m.get("telegram_id")
-        if not user_id_str:
-            continue
-
-        try:
-            user_id = int(float(user_id_str))
-        except Exception:
-            continue
-
-        try:
-            # Rate limiting suave para evitar flood do Telegram API
-            await asyncio.sleep(0.2)
-
-            member = await app.bot.get_chat_member(chat_id=grupo_id, user_id=user_id)
-            esta_no_grupo = member.status in ("member", "administrator", "creator")
-
-            if not esta_no_grupo:
-                logger.info(
-                    "Membro %s (%s) saiu do grupo (status: %s). Inativando...",
-                    m.get("Nome"),
-                    user_id,
-                    member.status,
-                )
-                await asyncio.to_thread(marcar_como_inativo, user_id)
-                inativados += 1
-
-        except Exception as e:
-            msg = str(e).lower()
-            # Se o erro for do chat inexistente ou bot expulso, aborte!
-            if "chat not found" in msg or "bot was kicked" in msg or "not member of the chat" in msg:
-                logger.critical("Job de faxina abortado por erro crítico no chat %s: %s", grupo_id, e)
-                return
-
-            # Erros de usuário (user not found / user_id_invalid)
-            if "user not found" in msg or "invalid user" in msg:
-                logger.info(
-                    "Membro %s (%s) não localizado no chat (erro: %s). Inativando...",
-                    m.get("Nome"),
-                    user_id,
-                    e,
-                )
-                await asyncio.to_thread(marcar_como_inativo, user_id)
-                inativados += 1
-            else:
-                logger.warning("Erro ao verificar membro %s (%s) no chat: %s", m.get("Nome"), user_id, e)
-
-        processados += 1
-
-    logger.info(
-        "Faxina concluída! Processados: %d/%d membros. Inativados: %d.",
-        processados,
-        len(membros),
-        inativados,
-    )
-
+    try:
+        await app.bot.send_message(chat_id=admin_id, text=resumo.texto(), parse_mode="Markdown")
+        if resumo.inativados:
+            artefato = io.BytesIO(json.dumps(asdict(resumo), ensure_ascii=False, indent=2).encode("utf-8"))
+            artefato.name = os.path.basename(resumo.arquivo) or "faxina_resumo.json"
+            await app.bot.send_document(chat_id=admin_id, document=artefato, caption="IDs inativados na faxina")
+    except Exception as e:
+        logger.warning("Não foi possível enviar o resumo da faxina ao administrador: %s", e)
 
 
 async def job_mobilizacao_coletiva(app: Application):
@@ -156,75 +171,26 @@ async def job_mensal_fechamento_vigor(app: Application):
     """
     Job mensal que processa o Vigor Administrativo das Lojas referente ao mes anterior,
     gerando o card oficial de vigor e enviando ao Secretario Responsavel.
-    Roda no dia 01 de cada mes as 08:00.
+    Roda no dia 01 de cada mes as 08:00. Pipeline em lote (ver vigor_lote.py);
+    o relatorio com o tempo de cada etapa vai para o ADMIN_TELEGRAM_ID.
     """
+    import os
+    from src.vigor_lote import executar_fechamento_vigor
+
     logger.info("--- INICIANDO FECHAMENTO MENSAL DE VIGOR ADMINISTRATIVO ---")
     try:
-        from src.sheets_supabase import listar_lojas, get_estatisticas_vigor
-        from src.render_marcos import renderizar_relatorio_vigor
-        import os
-
-        lojas = await asyncio.to_thread(listar_lojas)
-        if not lojas:
-            logger.info("Nenhuma loja cadastrada para processar fechamento.")
-            return
-
-        processadas = 0
-        for loja in lojas:
-            lid = loja.get("ID") or loja.get("id")
-            sec_id_str = loja.get("Telegram ID do secretario responsavel") or loja.get("secretario_responsavel_id")
-
-            if not lid or not sec_id_str:
-                continue
-
-            try:
-                sec_id = int(float(str(sec_id_str).strip()))
-            except:
-                continue
-
-            try:
-                await asyncio.sleep(0.5)
-                
-                # Processa o mes anterior completo
-                stats = await asyncio.to_thread(get_estatisticas_vigor, str(lid), usar_mes_anterior=True)
-                card_path = await asyncio.to_thread(renderizar_relatorio_vigor, stats)
-
-                nome = stats.get("nome_loja") or "Oficina"
-                num = stats.get("numero_loja") or ""
-
-                msg = (
-                    f"📜 *RELATORIO OFICIAL DE ENCERRAMENTO*\n"
-                    f"🏛️ *{nome} nº {num}*\n\n"
-                    f"Saudacoes Ir.·. Secretario! Consolidamos o Livro de Arquitetura e apresentamos o **Card de Vigor Oficial** referente ao fechamento do mes anterior.\n\n"
-                    f"📊 *Metas Alcancadas:*\n"
-                    f"• Media de Agenda: `{stats.get('vigor_agenda', 0.0)}` dias de antecedencia\n"
-                    f"• Acolhimento: `{stats.get('acolhimento', 0)}` visitantes acolhidos\n"
-                    f"• Quorum do Quadro: `{stats.get('engajamento', 0.0)}%` de engajamento\n\n"
-                    f"📐 _Este card representa o vigor de sua gestao. Parabens pelo zelo administrativo!_ 🤝🖋️🐐"
-                )
-
-                with open(card_path, "rb") as photo:
-                    await app.bot.send_photo(
-                        chat_id=sec_id,
-                        photo=photo,
-                        caption=msg,
-                        parse_mode="Markdown"
-                    )
-
-                if os.path.exists(card_path):
-                    os.remove(card_path)
-
-                processadas += 1
-                logger.info("Card de Vigor mensal enviado para loja %s", nome)
-
-            except Exception as sub_err:
-                logger.warning("Erro ao processar vigor da loja %s: %s", lid, sub_err)
-                continue
-
-        logger.info("FECHAMENTO CONCLUIDO! %d cards disparados.", processadas)
-
+        relatorio = await executar_fechamento_vigor(app.bot)
     except Exception as e:
         logger.error("Falha geral no job_mensal_fechamento_vigor: %s", e)
+        return
+
+    admin_id = (os.getenv("ADMIN_TELEGRAM_ID") or "").strip()
+    if not admin_id:
+        return
+    try:
+        await app.bot.send_message(chat_id=admin_id, text=relatorio.texto(), parse_mode="Markdown")
+    except Exception as e:
+        logger.warning("Não foi possível enviar o relatório de vigor ao administrador: %s", e)
 
 
 async def iniciar_scheduler(app: Application):
@@ -254,6 +220,52 @@ async def iniciar_scheduler(app: Application):
         id="job_lembretes_meio_dia",
         replace_existing=True,
     )
+    scheduler.add_job(
+        job_entregar_caixa_saida,
+        "interval",
+        minutes=5,
+        args=[app],
+        id="job_entregar_caixa_saida",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+    scheduler.add_job(
+        job_recuperar_lembretes,
+        "date",
+        run_date=agora_local() + timedelta(seconds=30),
+        args=[app],
+        id="job_recuperar_lembretes",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        job_limpeza_caixa_saida,
+        "cron",
+        hour=4,
+        minute=15,
+        args=[app],
+        id="job_limpeza_caixa_saida",
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        job_descarregar_auditoria_ia,
+        "interval",
+        minutes=1,
+        args=[app],
+        id="job_descarregar_auditoria_ia",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+    scheduler.add_job(
+        job_limpeza_auditoria_ia,
+        "cron",
+        hour=4,
+        minute=30,
+        args=[app],
+        id="job_limpeza_auditoria_ia",
+        replace_existing=True,
+    )
     scheduler.add_job(
         job_celebracao_mensal,
         "cron",
@@ -327,7 +339,7 @@ async def iniciar_scheduler(app: Application):
     scheduler.start()
     _scheduler = scheduler
     logger.info(
-        "Scheduler iniciado com jobs de lembretes, celebração mensal, flush e faxina semanal."
+        "Scheduler iniciado com jobs de lembretes, caixa de saída, celebração mensal, flush e faxina semanal."
     )
 
     # --- RITO DE ABERTURA HISTÓRICA (Retroatividade Unificada) ---
@@ -0,0 +1,278 @@
+# src/servico_render.py
+# ============================================
+# BODE ANDARILHO - SERVIÇO DE RENDERIZAÇÃO (POOL DE PROCESSOS)
+# ============================================
+#
+# Os renders com Pillow (card de evento, card de celebração, relatório de
+# vigor, quadro de conquistas e diploma) são CPU puro: chamados direto no
+# handler, travam o event loop — e todos os outros usuários — enquanto um
+# card de 1080px é composto. Em thread, o GIL ainda serializa o trabalho.
+#
+# Este serviço executa os renders num pool de processos limitado:
+#
+# - API única `await render(tipo, payload)`; payload são os kwargs da função
+#   de render (dicts simples, serializáveis);
+# - fila limitada (RENDER_FILA_MAX): quem chega com a fila cheia espera uma
+#   vaga por até RENDER_ESPERA_S e recebe ServicoRenderOcupado; jobs em lote
+#   (fechamento mensal) passam espera=None e aguardam sem limite;
+# - timeout por render (RENDER_TIMEOUT_S);
+# - cada processo preaquece os assets (src.render_assets) ao subir, com o
+#   cache de imagens dividido entre os processos (RENDER_ASSETS_MAX_MB é o
+#   total, não por processo; RENDER_PREAQUECER_PROCESSOS=false desliga);
+# - um render que estoura RENDER_TIMEOUT_S continua ocupando a vaga até o
+#   processo terminar de fato: a fila limita o trabalho real;
+# - pool quebrado (processo morto) é recriado e o render tentado de novo;
+# - RENDER_PROCESSOS=0 (ou falha ao criar o pool) roda em thread, como antes.
+#
+# Os processos usam o contexto "spawn" (não herdam locks de threads do bot);
+# cada um importa os módulos de render uma vez e fica vivo. O spawn
+# reexecuta o main.py como __mp_main__; por isso ele não importa nada fora
+# do guard e o bot em si mora em src/aplicacao.py.
+#
+# ============================================
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple
+
+from src.render_assets import _MAX_BYTES_IMAGENS
+from src.render_saida import ImagemRenderizada, estatisticas_codificacao, registrar_codificacao
+
+logger = logging.getLogger(__name__)
+
+_PROCESSOS = int(os.getenv("RENDER_PROCESSOS", str(min(2, os.cpu_count() or 1))))
+_FILA_MAX = int(os.getenv("RENDER_FILA_MAX", "16"))
+_ESPERA_S = float(os.getenv("RENDER_ESPERA_S", "20"))
+_TIMEOUT_S = float(os.getenv("RENDER_TIMEOUT_S", "90"))
+# Preaquecer os assets em cada processo (o cache de imagens é dividido entre eles).
+_PREAQUECER_PROCESSOS = os.getenv("RENDER_PREAQUECER_PROCESSOS", "true").strip().lower() in ("1", "true", "sim", "yes")
+
+# tipo -> (módulo, função)
+RENDERIZADORES: Dict[str, Tuple[str, str]] = {
+    "evento": ("src.render_cards", "render_event_card"),
+    "celebracao": ("src.render_marcos", "renderizar_card_celebracao"),
+    "vigor": ("src.render_marcos", "renderizar_relatorio_vigor"),
+    "badge_wall": ("src.render_marcos", "renderizar_badge_wall"),
+    "diploma": ("src.render_diploma", "renderizar_diploma"),
+}
+
+_AUSENTE = object()
+
+
+class ServicoRenderOcupado(RuntimeError):
+    """Fila de renders cheia além do tempo de espera permitido."""
+
+
+# ---------- lado do processo de render ----------
+
+def _inicializar_processo(max_bytes_imagens: int) -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    try:
+        from src.render_assets import definir_limite_imagens, preaquecer
+
+        definir_limite_imagens(max_bytes_imagens)
+        if _PREAQUECER_PROCESSOS:
+            preaquecer()
+            _devolver_memoria_livre()
+    except Exception as e:
+        logger.warning("Falha ao preaquecer assets no processo de render: %s", e)
+
+
+def _devolver_memoria_livre() -> None:
+    """
+    Decodificar e redimensionar os fundos deixa a heap do processo bem acima
+    do que fica no cache; devolve ao sistema o que sobrou livre (glibc).
+    """
+    try:
+        import ctypes
+
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except Exception:
+        pass
+
+
+def _executar(tipo: str, payload: Dict[str, Any]) -> Any:
+    modulo, funcao = RENDERIZADORES[tipo]
+    return getattr(importlib.import_module(modulo), funcao)(**payload)
+
+
+# ---------- lado do bot ----------
+
+class ServicoRender:
+    def __init__(
+        self,
+        processos: int = _PROCESSOS,
+        fila_max: int = _FILA_MAX,
+        espera_s: float = _ESPERA_S,
+        timeout_s: float = _TIMEOUT_S,
+    ):
+        self.processos = max(0, processos)
+        self.fila_max = max(1, fila_max)
+        self.espera_s = espera_s
+        self.timeout_s = timeout_s
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._vagas: Optional[asyncio.Semaphore] = None
+        self._em_andamento = 0
+        self._estatisticas: Dict[str, Any] = {
+            "concluidos": 0, "falhas": 0, "timeouts": 0, "recusados": 0,
+            "pool_recriado": 0, "segundos_total": 0.0,
+        }
+
+    @property
+    def em_processos(self) -> bool:
+        return self.processos > 0
+
+    def iniciar(self) -> None:
+        """Cria o pool e sobe os processos (cada um preaquece os assets)."""
+        if not self.em_processos or self._pool is not None:
+            return
+        try:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processos,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_inicializar_processo,
+                initargs=(_MAX_BYTES_IMAGENS // self.processos,),
+            )
+            # Sobe os processos já na inicialização, não no primeiro card.
+            for _ in range(self.processos):
+                self._pool.submit(time.sleep, 0)
+            logger.info("Serviço de render: %d processos, fila máx. %d.", self.processos, self.fila_max)
+        except Exception as e:
+            logger.warning("Pool de processos indisponível (%s); renders seguem em thread.", e)
+            self.processos = 0
+            self._pool = None
+
+    def parar(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def render(self, tipo: str, payload: Dict[str, Any], espera: Any = _AUSENTE) -> Any:
+        """
+        Executa o render `tipo` fora do event loop e devolve o retorno da
+        função (ImagemRenderizada / RenderResult).
+
+        `espera`: segundos aguardando vaga na fila (padrão RENDER_ESPERA_S;
+        None = sem limite). Levanta ServicoRenderOcupado, asyncio.TimeoutError
+        ou a exceção do próprio render.
+        """
+        if tipo not in RENDERIZADORES:
+            raise ValueError(f"Tipo de render desconhecido: {tipo}")
+        if self._vagas is None:
+            self._vagas = asyncio.Semaphore(self.fila_max)
+        espera_s = self.espera_s if espera is _AUSENTE else espera
+        try:
+            await asyncio.wait_for(self._vagas.acquire(), timeout=espera_s)
+        except asyncio.TimeoutError:
+            self._estatisticas["recusados"] += 1
+            raise ServicoRenderOcupado(
+                f"Fila de renders cheia ({self._em_andamento}/{self.fila_max}) por mais de {espera_s:.0f}s."
+            ) from None
+
+        self._em_andamento += 1
+        inicio = time.monotonic()
+        tarefa = asyncio.ensure_future(self._submeter(tipo, payload))
+        try:
+            resultado = await asyncio.wait_for(asyncio.shield(tarefa), timeout=self.timeout_s)
+            self._estatisticas["concluidos"] += 1
+            imagem = getattr(resultado, "imagem", resultado)
+            if isinstance(imagem, ImagemRenderizada):
+                registrar_codificacao(imagem)
+            return resultado
+        except asyncio.TimeoutError:
+            self._estatisticas["timeouts"] += 1
+            logger.warning("Render '%s' excedeu %.0fs.", tipo, self.timeout_s)
+            raise
+        except Exception:
+            self._estatisticas["falhas"] += 1
+            raise
+        finally:
+            self._estatisticas["segundos_total"] += time.monotonic() - inicio
+            if tarefa.done():
+                self._liberar_vaga(tarefa)
+            else:
+                # Timeout/cancelamento: o processo (ou thread) segue desenhando;
+                # a vaga só volta quando ele terminar, e a fila limita o trabalho real.
+                tarefa.add_done_callback(self._liberar_vaga)
+
+    def _liberar_vaga(self, tarefa: "asyncio.Future") -> None:
+        if not tarefa.cancelled():
+            tarefa.exception()  # consome a exceção de um render abandonado
+        self._em_andamento -= 1
+        self._vagas.release()
+
+    async def _submeter(self, tipo: str, payload: Dict[str, Any]) -> Any:
+        if not self.em_processos:
+            return await asyncio.to_thread(_executar, tipo, payload)
+        self.iniciar()
+        if self._pool is None:
+            return await asyncio.to_thread(_executar, tipo, payload)
+        loop = asyncio.get_running_loop()
+        pool = self._pool
+        try:
+            return await loop.run_in_executor(pool, _executar, tipo, payload)
+        except BrokenProcessPool:
+            # Processo morto (OOM, segfault do Pillow...): recria e tenta uma vez.
+            self._recriar_pool(pool)
+            if self._pool is None:
+                return await asyncio.to_thread(_executar, tipo, payload)
+            return await loop.run_in_executor(self._pool, _executar, tipo, payload)
+
+    def _recriar_pool(self, quebrado: ProcessPoolExecutor) -> None:
+        """
+        Recria o pool só se ele ainda for o que quebrou: todos os renders em
+        andamento recebem BrokenProcessPool ao mesmo tempo, e o primeiro a
+        chegar aqui troca o pool; os demais tentam de novo no pool novo em
+        vez de derrubá-lo (e cancelar a nova tentativa do primeiro).
+        """
+        with self._pool_lock:
+            if self._pool is not quebrado:
+                return
+            logger.error("Pool de render quebrado; recriando processos.")
+            self._estatisticas["pool_recriado"] += 1
+            self.parar()
+            self.iniciar()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "processos": self.processos,
+            "fila_max": self.fila_max,
+            "em_andamento": self._em_andamento,
+            **self._estatisticas,
+            "codificacao": estatisticas_codificacao(),
+        }
+
+
+_servico: Optional[ServicoRender] = None
+
+
+def obter_servico_render() -> ServicoRender:
+    global _servico
+    if _servico is None:
+        _servico = ServicoRender()
+    return _servico
+
+
+async def render(tipo: str, payload: Dict[str, Any], espera: Any = _AUSENTE) -> Any:
+    """Atalho para obter_servico_render().render(...)."""
+    return await obter_servico_render().render(tipo, payload, espera=espera)
+
+
+async def iniciar_servico_render() -> None:
+    """Sobe o pool na inicialização do bot; sem pool, preaquece os assets em thread."""
+    servico = obter_servico_render()
+    servico.iniciar()
+    if not servico.em_processos:
+        from src.render_assets import preaquecer
+
+        asyncio.create_task(asyncio.to_thread(preaquecer))
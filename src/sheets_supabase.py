@@ -9,16 +9,20 @@ from __future__ import annotations
 import os
 import re
 import uuid
-import time
 import asyncio
 import logging
 import pathlib
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from supabase import create_client, Client
 from dotenv import load_dotenv
 
+from src.cache import AUSENTE, namespace as _cache_namespace
+
 # Garante carregamento do .env a partir da raiz do projeto,
 # independente do diretório de trabalho atual.
 _ENV_FILE = pathlib.Path(__file__).resolve().parent.parent / ".env"
@@ -28,21 +32,51 @@ load_dotenv(dotenv_path=_ENV_FILE, override=True)
 # =========================
 # Cache para otimizações de performance
 # =========================
-_cache_membros: Dict[int, tuple] = {}   # telegram_id -> (dados, timestamp)
+# Namespaces do motor único (src/cache.py): TTL próprio, limite de entradas
+# com descarte LRU e invalidação por tag. Limites ajustáveis via .env.
 _ttl_membros = 600                       # 10 minutos
-_cache_confirmacoes: Dict[tuple, tuple] = {}  # (id_evento, telegram_id) -> (dados, timestamp)
 _ttl_confirmacoes = 300                  # 5 minutos
-_cache_eventos: Dict[bool, tuple] = {}   # include_inativos -> (dados, timestamp)
 _ttl_eventos = 30                        # 30 segundos
-_cache_lojas: Dict[int, tuple] = {}      # telegram_id -> (dados, timestamp)
 _ttl_lojas = 300                         # 5 minutos
 
+# telegram_id (int) -> dados
+_cache_membros = _cache_namespace(
+    "membros", _ttl_membros, int(os.getenv("CACHE_MAX_MEMBROS", "5000"))
+)
+# (id_evento, telegram_id) ou (tuple(ids), telegram_id) -> dados
+# Tags: "evento:<id>" e "conf:<id>|<telegram_id>"
+_cache_confirmacoes = _cache_namespace(
+    "confirmacoes", _ttl_confirmacoes, int(os.getenv("CACHE_MAX_CONFIRMACOES", "20000"))
+)
+# include_inativos (bool) -> lista de eventos
+_cache_eventos = _cache_namespace("eventos", _ttl_eventos, 4)
+# telegram_id do secretário (-1 = todas) -> lista de lojas
+_cache_lojas = _cache_namespace(
+    "lojas", _ttl_lojas, int(os.getenv("CACHE_MAX_LOJAS", "2000"))
+)
+# filtros de consultar_eventos -> (página, cursor)
+_cache_consultas_eventos = _cache_namespace(
+    "eventos_consulta", _ttl_eventos, int(os.getenv("CACHE_MAX_CONSULTAS_EVENTOS", "500"))
+)
+
+# Bases sem a coluna tipada `data_evento_dt` (docs/supabase_eventos_consulta.sql)
+# caem para o filtro em memória sobre listar_eventos().
+_eventos_data_dt_indisponivel = False
+
+# Colunas status_grupo/status_observado_em (docs/supabase_membros_status_grupo.sql).
+# Sem elas, as observações de chat_member só atualizam o status do cadastro.
+_membros_status_grupo_indisponivel = False
+
 # Alternativa para notificações pendentes do secretário quando a tabela
 # dedicada ainda não foi criada no Supabase.
 _notif_secretario_pendentes_em_memoria: Dict[int, List[Dict[str, str]]] = {}
 _notif_secretario_pendentes_tabela_indisponivel = False
 _notif_secretario_pendentes_alertado = False
 
+# Agregado diário das buscas sem resultado (docs/supabase_logs_busca_demanda.sql).
+# Sem a tabela, o relatório de gaps conta os logs_busca brutos.
+_logs_busca_demanda_indisponivel = False
+
 
 # =========================
 # Configuração do Supabase
@@ -53,11 +87,51 @@ _SUPABASE_KEY: str = os.environ.get("SUPABASE_KEY", "")
 if not _SUPABASE_URL or not _SUPABASE_KEY:
     raise ValueError("Variáveis de ambiente SUPABASE_URL e SUPABASE_KEY são obrigatórias.")
 
-supabase: Client = create_client(_SUPABASE_URL, _SUPABASE_KEY)
-
 logger = logging.getLogger(__name__)
 
 
+# =========================
+# Contagem de consultas (instrumentação)
+# =========================
+# Dentro de `with contar_consultas() as contagem:` cada supabase.table(...)
+# soma 1 em contagem[<tabela>]. Usado pelos jobs em lote (lembretes) para
+# registrar quantas idas ao banco cada execução fez e flagrar regressões N+1.
+# A contagem é do contexto (ContextVar): tarefas e threads que não estão no
+# bloco não somam nada, e o cliente do supabase-py não é alterado — o módulo
+# expõe um invólucro que conta e repassa o resto ao cliente.
+_contagem_consultas: ContextVar[Optional[Dict[str, int]]] = ContextVar("contagem_consultas", default=None)
+
+
+class _ClienteComContagem:
+    """Cliente Supabase com table() instrumentado; demais atributos vão direto ao cliente."""
+
+    def __init__(self, cliente: Client):
+        self._cliente = cliente
+
+    def table(self, nome: str):
+        contagem = _contagem_consultas.get()
+        if contagem is not None:
+            contagem[nome] = contagem.get(nome, 0) + 1
+        return self._cliente.table(nome)
+
+    def __getattr__(self, nome: str) -> Any:
+        return getattr(self._cliente, nome)
+
+
+supabase = _ClienteComContagem(create_client(_SUPABASE_URL, _SUPABASE_KEY))
+
+
+@contextmanager
+def contar_consultas() -> Iterator[Dict[str, int]]:
+    """Conta as consultas ao Supabase feitas no bloco, por tabela."""
+    contagem: Dict[str, int] = {}
+    token = _contagem_consultas.set(contagem)
+    try:
+        yield contagem
+    finally:
+        _contagem_consultas.reset(token)
+
+
 def _erro_tabela_notif_secretario_pendentes(exc: Exception) -> bool:
     """Detecta erro de tabela ausente para notificações pendentes do secretário."""
     msg = str(exc or "")
@@ -147,6 +221,8 @@ _MEMBROS_SHEETS_TO_DB: Dict[str, str] = {
     "CIM URL":            "cim_photo_url",
     "Loja Manual":        "loja_manual",
     "Status Auditoria":   "status_auditoria",
+    "Status no grupo":    "status_grupo",
+    "Status observado em": "status_observado_em",
 }
 _MEMBROS_DB_TO_SHEETS: Dict[str, str] = {v: k for k, v in _MEMBROS_SHEETS_TO_DB.items()}
 
@@ -185,6 +261,7 @@ _EVENTOS_SHEETS_TO_DB: Dict[str, str] = {
     "Card especial URL":            "card_especial_url",
     "Card renderizado URL":         "card_renderizado_url",
     "Card file_id Telegram":        "card_file_id_telegram",
+    "Card hash visual":             "card_hash_visual",
     "Telegram tipo mensagem grupo": "telegram_tipo_mensagem_grupo",
 }
 _EVENTOS_DB_TO_SHEETS: Dict[str, str] = {v: k for k, v in _EVENTOS_SHEETS_TO_DB.items()}
@@ -448,18 +525,15 @@ def listar_membros_por_loja(
 
 
 def buscar_membro(telegram_id: int) -> Optional[Dict[str, Any]]:
-    """Retorna o dicionário com dados do membro. Otimizado com cache."""
-    # Verifica o cache
-    if telegram_id in _cache_membros:
-        cached, timestamp = _cache_membros[telegram_id]
-        if time.time() - timestamp < _ttl_membros:
-            return cached
-
-    try:
-        tid = _norm_intlike(telegram_id)
-        if not tid:
-            return None
+    """
+    Retorna o dicionário com dados do membro. Otimizado com cache; buscas
+    simultâneas do mesmo membro compartilham uma única consulta.
+    """
+    tid = _norm_intlike(telegram_id)
+    if not tid:
+        return None
 
+    def _carregar() -> Optional[Dict[str, Any]]:
         resp = (
             supabase.table("membros")
             .select("*")
@@ -467,20 +541,70 @@ def buscar_membro(telegram_id: int) -> Optional[Dict[str, Any]]:
             .limit(1)
             .execute()
         )
-
         if not resp.data:
-            _cache_membros[telegram_id] = (None, time.time())
             return None
+        return _row_to_sheets("membros", resp.data[0])
 
-        membro = _row_to_sheets("membros", resp.data[0])
-        _cache_membros[telegram_id] = (membro, time.time())
-        return membro
+    try:
+        return _cache_membros.obter_ou_carregar(_safe_cache_int(tid), _carregar)
 
     except Exception as e:
         logger.error("Erro ao buscar membro: %s", e)
         return None
 
 
+_TAMANHO_LOTE_IN = 200  # itens por filtro in_() (mantém a URL do PostgREST curta)
+_TAMANHO_LOTE_INSERT = 500  # linhas por insert em lote
+
+
+def buscar_membros_por_ids(telegram_ids: Iterable[Any]) -> Dict[int, Optional[Dict[str, Any]]]:
+    """
+    Versão em lote de buscar_membro: retorna {telegram_id: membro ou None}.
+    O que já está no cache não vai ao banco; o restante sai em uma consulta
+    in_() por lote e alimenta o mesmo cache usado por buscar_membro.
+    """
+    resultado: Dict[int, Optional[Dict[str, Any]]] = {}
+    faltantes: Dict[int, str] = {}
+    for valor in telegram_ids or []:
+        tid = _norm_intlike(valor)
+        chave = _safe_cache_int(tid)
+        if not tid or not chave or chave in resultado or chave in faltantes:
+            continue
+        membro = _cache_membros.obter(chave)
+        if membro is AUSENTE:
+            faltantes[chave] = tid
+        else:
+            resultado[chave] = membro
+
+    chaves = list(faltantes)
+    for i in range(0, len(chaves), _TAMANHO_LOTE_IN):
+        lote = chaves[i:i + _TAMANHO_LOTE_IN]
+        try:
+            resp = (
+                supabase.table("membros")
+                .select("*")
+                .in_("telegram_id", [faltantes[c] for c in lote])
+                .execute()
+            )
+        except Exception as e:
+            logger.error("Erro ao buscar membros em lote: %s", e)
+            # Sem cache: quem chamar buscar_membro depois tenta de novo.
+            for chave in lote:
+                resultado[chave] = None
+            continue
+
+        encontrados = {
+            _safe_cache_int(row.get("telegram_id")): _row_to_sheets("membros", row)
+            for row in (resp.data or [])
+        }
+        for chave in lote:
+            membro = encontrados.get(chave)
+            _cache_membros.definir(chave, membro)
+            resultado[chave] = membro
+
+    return resultado
+
+
 def _coluna_ausente(exc: Exception, coluna: str) -> bool:
     """
     Retorna True quando a exceção indica que a coluna `coluna` não existe
@@ -642,7 +766,7 @@ def cadastrar_membro(dados: dict) -> bool:
                 raise
 
         # Invalida o cache
-        _cache_membros.pop(int(float(telegram_id)), None)
+        _cache_membros.invalidar(_safe_cache_int(telegram_id))
         return True
 
     except Exception as e:
@@ -754,8 +878,8 @@ def atualizar_membro(telegram_id: int, dados_atualizados: dict, preservar_nivel:
                 raise
 
         # Invalida o cache
-        _cache_membros.pop(telegram_id, None)
-        _cache_membros.pop(int(float(tid)), None)
+        _cache_membros.invalidar(_safe_cache_int(tid))
+        _invalidar_galeria("invalidar_galeria_membro", tid)
         return True
 
     except Exception as e:
@@ -774,8 +898,7 @@ def atualizar_nivel_membro(telegram_id: int, novo_nivel: str) -> bool:
         supabase.table("membros").update({"nivel": nivel}).eq("telegram_id", tid).execute()
 
         # Invalida o cache
-        _cache_membros.pop(telegram_id, None)
-        _cache_membros.pop(int(float(tid)), None)
+        _cache_membros.invalidar(_safe_cache_int(tid))
         return True
 
     except Exception as e:
@@ -799,8 +922,8 @@ def excluir_membro(telegram_id: int) -> bool:
         supabase.table("membros").delete().eq("telegram_id", tid).execute()
 
         # Invalida o cache
-        _cache_membros.pop(telegram_id, None)
-        _cache_membros.pop(int(float(tid)), None)
+        _cache_membros.invalidar(_safe_cache_int(tid))
+        _invalidar_galeria("invalidar_galeria_membro", tid)
         return True
 
     except Exception as e:
@@ -816,14 +939,9 @@ def listar_eventos(include_inativos: bool = False) -> List[dict]:
     """
     Lista eventos. Por padrão retorna apenas status 'ativo' (ou vazio => ativo).
     Filtro case-insensitive pois alguns registros podem ter "ativo" e outros "Ativo".
+    Quando o cache expira no meio de uma rajada de cliques, só uma consulta vai ao banco.
     """
-    cache_key = bool(include_inativos)
-    if cache_key in _cache_eventos:
-        cached, timestamp = _cache_eventos[cache_key]
-        if time.time() - timestamp < _ttl_eventos:
-            return cached
-
-    try:
+    def _carregar() -> List[dict]:
         query = supabase.table("eventos").select("*")
 
         if not include_inativos:
@@ -831,16 +949,164 @@ def listar_eventos(include_inativos: bool = False) -> List[dict]:
             query = query.or_("status.ilike.ativo,status.is.null,status.eq.")
 
         resp = query.execute()
-        rows = resp.data or []
-        result = [_row_to_sheets("eventos", row) for row in rows]
-        _cache_eventos[cache_key] = (result, time.time())
-        return result
+        return [_row_to_sheets("eventos", row) for row in (resp.data or [])]
+
+    try:
+        return _cache_eventos.obter_ou_carregar(bool(include_inativos), _carregar)
 
     except Exception as e:
         logger.error("Erro ao listar eventos: %s", e)
         return []
 
 
+def _data_evento_iso(valor: Any) -> str:
+    """Converte a data do evento (dd/mm/YYYY ou ISO) para YYYY-MM-DD; vazio se inválida."""
+    dt = _parse_data_generica(_norm_text(valor))
+    return dt.date().isoformat() if dt else ""
+
+
+def _valor_filtro(valor: Any) -> str:
+    """Escapa um valor para uso dentro de filtros lógicos (or/and) do PostgREST."""
+    texto = str(valor)
+    if any(ch in texto for ch in ',.:()"\\ '):
+        return '"' + texto.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return texto
+
+
+def _consultar_eventos_servidor(
+    data_inicio: Optional[date],
+    data_fim: Optional[date],
+    limite: int,
+    apos: Optional[Tuple[str, str]],
+    include_inativos: bool,
+) -> Tuple[List[dict], Optional[Tuple[str, str]]]:
+    query = supabase.table("eventos").select("*")
+
+    if data_inicio:
+        query = query.gte("data_evento_dt", data_inicio.isoformat())
+    if data_fim:
+        query = query.lte("data_evento_dt", data_fim.isoformat())
+
+    # Condições com alternativas vão num único `or=(and(...))`, pois o
+    # PostgREST não combina bem vários parâmetros `or` na mesma consulta.
+    grupos: List[str] = []
+    if not include_inativos:
+        grupos.append("or(status.ilike.ativo,status.is.null,status.eq.)")
+    if apos:
+        data_cursor, id_cursor = apos
+        id_fmt = _valor_filtro(id_cursor)
+        if data_cursor:
+            grupos.append(
+                f"or(data_evento_dt.gt.{data_cursor},"
+                f"and(data_evento_dt.eq.{data_cursor},id_evento.gt.{id_fmt}),"
+                "data_evento_dt.is.null)"
+            )
+        else:
+            grupos.append(f"and(data_evento_dt.is.null,id_evento.gt.{id_fmt})")
+    if grupos:
+        query = query.or_(f"and({','.join(grupos)})")
+
+    resp = (
+        query.order("data_evento_dt", nullsfirst=False)
+        .order("id_evento")
+        .limit(limite)
+        .execute()
+    )
+    rows = resp.data or []
+    proximo = None
+    if len(rows) == limite:
+        ultimo = rows[-1]
+        proximo = (_norm_text(ultimo.get("data_evento_dt")), _norm_text(ultimo.get("id_evento")))
+    return [_row_to_sheets("eventos", row) for row in rows], proximo
+
+
+def _consultar_eventos_memoria(
+    data_inicio: Optional[date],
+    data_fim: Optional[date],
+    limite: int,
+    apos: Optional[Tuple[str, str]],
+    include_inativos: bool,
+) -> Tuple[List[dict], Optional[Tuple[str, str]]]:
+    """Mesma semântica da consulta no servidor, sobre listar_eventos() (bases sem data_evento_dt)."""
+    candidatos = []
+    for ev in listar_eventos(include_inativos=include_inativos):
+        data_iso = _data_evento_iso(ev.get("Data do evento"))
+        if data_inicio and (not data_iso or data_iso < data_inicio.isoformat()):
+            continue
+        if data_fim and (not data_iso or data_iso > data_fim.isoformat()):
+            continue
+        chave = (data_iso or "9999-12-31", _norm_text(ev.get("ID Evento")))
+        candidatos.append((chave, data_iso, ev))
+
+    candidatos.sort(key=lambda c: c[0])
+    if apos:
+        cursor = (apos[0] or "9999-12-31", apos[1])
+        candidatos = [c for c in candidatos if c[0] > cursor]
+
+    pagina = candidatos[:limite]
+    proximo = None
+    if len(candidatos) > limite:
+        _, data_iso, ev = pagina[-1]
+        proximo = (data_iso, _norm_text(ev.get("ID Evento")))
+    return [c[2] for c in pagina], proximo
+
+
+def consultar_eventos(
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    limite: int = 40,
+    apos: Optional[Tuple[str, str]] = None,
+    include_inativos: bool = False,
+    propagar_erros: bool = False,
+) -> Tuple[List[dict], Optional[Tuple[str, str]]]:
+    """
+    Consulta eventos por intervalo de datas, com paginação executada no Postgres.
+
+    - data_inicio/data_fim: intervalo fechado sobre a coluna tipada `data_evento_dt`.
+
+    Ordena por (data, id_evento) e pagina por keyset: passe em `apos` o cursor
+    devolvido pela página anterior. Retorna (eventos, próximo_cursor | None).
+    Filtros de grau, rito, potência e cidade ficam no índice em memória
+    (src.indice_eventos), montado a partir destas páginas.
+
+    Em caso de erro retorna ([], None), igual a uma consulta vazia; com
+    `propagar_erros` a exceção sobe (ex.: o índice da agenda, que não deve
+    trocar a agenda atual por uma vazia).
+    """
+    args = (
+        data_inicio,
+        data_fim,
+        max(1, int(limite)),
+        tuple(apos) if apos else None,
+        bool(include_inativos),
+    )
+    chave = args
+
+    def _carregar() -> Tuple[List[dict], Optional[Tuple[str, str]]]:
+        global _eventos_data_dt_indisponivel
+        if not _eventos_data_dt_indisponivel:
+            try:
+                return _consultar_eventos_servidor(*args)
+            except Exception as e:
+                if _extrair_coluna_ausente(e) != "data_evento_dt" and "data_evento_dt" not in str(e):
+                    raise
+                _eventos_data_dt_indisponivel = True
+                logger.warning(
+                    "Coluna 'data_evento_dt' ausente em 'eventos' — filtrando em memória. "
+                    "Execute docs/supabase_eventos_consulta.sql para habilitar a consulta no banco."
+                )
+        return _consultar_eventos_memoria(*args)
+
+    try:
+        return _cache_consultas_eventos.obter_ou_carregar(chave, _carregar)
+
+    except Exception as e:
+        logger.error("Erro ao consultar eventos: %s", e)
+        if propagar_erros:
+            raise
+        return [], None
+
+
 def cadastrar_evento(evento: dict) -> Optional[str]:
     """
     Insere um novo evento.
@@ -859,8 +1125,13 @@ def cadastrar_evento(evento: dict) -> Optional[str]:
             if row[k] is None:
                 row[k] = ""
 
+        data_iso = _data_evento_iso(row.get("data_evento"))
+        if data_iso:
+            row["data_evento_dt"] = data_iso
+
         _insert_com_fallback_colunas("eventos", row)
-        _cache_eventos.clear()
+        _cache_eventos.limpar()
+        _cache_consultas_eventos.limpar()
         return id_evento
 
     except Exception as e:
@@ -903,8 +1174,12 @@ def atualizar_evento(indice: int, evento: dict) -> bool:
             if row[k] is None:
                 row[k] = ""
 
+        if "data_evento" in row:
+            row["data_evento_dt"] = _data_evento_iso(row.get("data_evento")) or None
+
         _update_com_fallback_colunas("eventos", "id_evento", id_evento, row)
-        _cache_eventos.clear()
+        _cache_eventos.limpar()
+        _cache_consultas_eventos.limpar()
         return True
 
     except Exception as e:
@@ -916,6 +1191,85 @@ def atualizar_evento(indice: int, evento: dict) -> bool:
 # Funções para Confirmações
 # =========================
 
+def _montar_linha_confirmacao(dados: dict, id_evento: str, telegram_id: str) -> Dict[str, Any]:
+    """Monta o registro de `confirmacoes` aceitando chaves sheets e snake_case."""
+    return {
+        "id_evento":        id_evento,
+        "telegram_id":      telegram_id,
+        "nome":             _norm_text(dados.get("nome") or dados.get("Nome")),
+        "grau":             _norm_text(dados.get("grau") or dados.get("Grau")),
+        "cargo":            _norm_text(dados.get("cargo") or dados.get("Cargo")),
+        "loja":             _norm_text(dados.get("loja") or dados.get("Loja")),
+        "numero_loja":      _norm_text(dados.get("numero_loja") or dados.get("Número da loja")),
+        "oriente":          _norm_text(dados.get("oriente") or dados.get("Oriente")),
+        "potencia":         _norm_text(dados.get("potencia") or dados.get("Potência")),
+        "potencia_complemento": _norm_text(
+            dados.get("potencia_complemento") or dados.get("Potência complemento")
+        ),
+        "agape":            _norm_text(dados.get("agape") or dados.get("Ágape")),
+        "data_hora":        _now_str(segundos=True),
+        "veneravel_mestre": _norm_text(
+            dados.get("veneravel_mestre") or dados.get("Venerável Mestre") or dados.get("vm")
+        ),
+        "mestre_instalado": _norm_text(
+            dados.get("mestre_instalado") or dados.get("Mestre Instalado") or dados.get("mi")
+        ),
+    }
+
+
+def _tags_confirmacao(ids_evento: List[str], telegram_id: Any) -> List[str]:
+    """Tags de cache de uma consulta de confirmação (por evento e por evento+usuário)."""
+    tid_int = _safe_cache_int(telegram_id)
+    tags: List[str] = []
+    for id_evento in ids_evento:
+        alvo = _norm_text(id_evento)
+        tags.append(f"evento:{alvo}")
+        tags.append(f"conf:{alvo}|{tid_int}")
+    return tags
+
+
+def _invalidar_cache_confirmacao(id_evento: str, telegram_id: Any) -> None:
+    """Remove do cache a confirmação do usuário no evento, inclusive chaves multi-id."""
+    _cache_confirmacoes.invalidar_tag(f"conf:{_norm_text(id_evento)}|{_safe_cache_int(telegram_id)}")
+
+
+def _atualizar_estado_conquistas(operacao: str, *args: Any) -> None:
+    """
+    Repassa a mudança de confirmação ao estado incremental das conquistas,
+    em segundo plano (as escritas de confirmação rodam dentro dos handlers).
+    """
+    try:
+        from src import conquistas_estado
+
+        conquistas_estado.agendar_atualizacao(operacao, *args)
+    except Exception as e:
+        logger.error("Erro ao atualizar estado de conquistas (%s): %s", operacao, e)
+
+
+def _invalidar_galeria(operacao: str, *args: Any) -> None:
+    """Apaga do cache da Sala de Troféus (src.galeria_cache) o que a escrita mudou."""
+    try:
+        from src import galeria_cache
+
+        getattr(galeria_cache, operacao)(*args)
+    except Exception as e:
+        logger.error("Erro ao invalidar cache da galeria (%s): %s", operacao, e)
+
+
+def _apos_registrar_confirmacao(id_evento: str, telegram_id: Any, agape: Any) -> None:
+    """Efeitos de uma confirmação gravada (escritor síncrono e src.repositorio_async)."""
+    _invalidar_cache_confirmacao(id_evento, telegram_id)
+    _atualizar_estado_conquistas("registrar_presenca", telegram_id, id_evento, agape)
+    _invalidar_galeria("invalidar_galeria_membro", telegram_id)
+
+
+def _apos_cancelar_confirmacao(id_evento: str, telegram_id: Any) -> None:
+    """Efeitos de uma confirmação removida (escritor síncrono e src.repositorio_async)."""
+    _invalidar_cache_confirmacao(id_evento, telegram_id)
+    _atualizar_estado_conquistas("remover_presenca", telegram_id, id_evento)
+    _invalidar_galeria("invalidar_galeria_membro", telegram_id)
+
+
 def registrar_confirmacao(dados: dict) -> bool:
     """
     Registra confirmação.
@@ -932,28 +1286,7 @@ def registrar_confirmacao(dados: dict) -> bool:
         if buscar_confirmacao(id_evento, int(float(telegram_id)), usar_cache=False):
             return False
 
-        row: Dict[str, Any] = {
-            "id_evento":        id_evento,
-            "telegram_id":      telegram_id,
-            "nome":             _norm_text(dados.get("nome") or dados.get("Nome")),
-            "grau":             _norm_text(dados.get("grau") or dados.get("Grau")),
-            "cargo":            _norm_text(dados.get("cargo") or dados.get("Cargo")),
-            "loja":             _norm_text(dados.get("loja") or dados.get("Loja")),
-            "numero_loja":      _norm_text(dados.get("numero_loja") or dados.get("Número da loja")),
-            "oriente":          _norm_text(dados.get("oriente") or dados.get("Oriente")),
-            "potencia":         _norm_text(dados.get("potencia") or dados.get("Potência")),
-            "potencia_complemento": _norm_text(
-                dados.get("potencia_complemento") or dados.get("Potência complemento")
-            ),
-            "agape":            _norm_text(dados.get("agape") or dados.get("Ágape")),
-            "data_hora":        _now_str(segundos=True),
-            "veneravel_mestre": _norm_text(
-                dados.get("veneravel_mestre") or dados.get("Venerável Mestre") or dados.get("vm")
-            ),
-            "mestre_instalado": _norm_text(
-                dados.get("mestre_instalado") or dados.get("Mestre Instalado") or dados.get("mi")
-            ),
-        }
+        row = _montar_linha_confirmacao(dados, id_evento, telegram_id)
 
         # Insere com fallback para instalações que não tenham algumas colunas (schema cache / migração parcial).
         # Ex.: "Could not find the 'mestre_instalado' column of 'confirmacoes' in the schema cache"
@@ -976,31 +1309,8 @@ def registrar_confirmacao(dados: dict) -> bool:
                 # Se a coluna não existir no payload, não há como corrigir via retry
                 raise
 
-        # Invalida o cache
-        cache_key = (id_evento, int(float(telegram_id)))
-        _cache_confirmacoes.pop(cache_key, None)
-
-        # Invalida caches multi-id do mesmo usuário que possam conter este evento.
-        try:
-            tid_int = int(float(telegram_id))
-            target_evento = _norm_text(id_evento)
-            keys_to_remove = []
-            for k in _cache_confirmacoes:
-                try:
-                    if (
-                        isinstance(k, tuple)
-                        and len(k) == 2
-                        and isinstance(k[0], tuple)
-                        and k[1] == tid_int
-                        and target_evento in k[0]
-                    ):
-                        keys_to_remove.append(k)
-                except Exception:
-                    continue
-            for k in keys_to_remove:
-                _cache_confirmacoes.pop(k, None)
-        except Exception:
-            pass
+        # Invalida o cache e atualiza conquistas / galeria
+        _apos_registrar_confirmacao(id_evento, telegram_id, row.get("agape"))
         return True
 
     except Exception as e:
@@ -1011,10 +1321,11 @@ def registrar_confirmacao(dados: dict) -> bool:
 def buscar_confirmacao(id_evento: str, telegram_id: int, usar_cache: bool = True) -> Optional[dict]:
     """Verifica se um usuário já confirmou em determinado evento. Otimizado com cache."""
     cache_key = (id_evento, telegram_id)
+    tags = _tags_confirmacao([id_evento], telegram_id)
 
-    if usar_cache and cache_key in _cache_confirmacoes:
-        cached, timestamp = _cache_confirmacoes[cache_key]
-        if time.time() - timestamp < _ttl_confirmacoes:
+    if usar_cache:
+        cached = _cache_confirmacoes.obter(cache_key)
+        if cached is not AUSENTE:
             return cached
 
     try:
@@ -1029,11 +1340,11 @@ def buscar_confirmacao(id_evento: str, telegram_id: int, usar_cache: bool = True
         )
 
         if not resp.data:
-            _cache_confirmacoes[cache_key] = (None, time.time())
+            _cache_confirmacoes.definir(cache_key, None, tags)
             return None
 
         result = _row_to_sheets("confirmacoes", resp.data[0])
-        _cache_confirmacoes[cache_key] = (result, time.time())
+        _cache_confirmacoes.definir(cache_key, result, tags)
         return result
 
     except Exception as e:
@@ -1051,26 +1362,8 @@ def cancelar_confirmacao(id_evento: str, telegram_id: int) -> bool:
 
         supabase.table("confirmacoes").delete().eq("id_evento", target_evento).eq("telegram_id", target_id).execute()
 
-        # Invalida o cache
-        cache_key = (id_evento, telegram_id)
-        _cache_confirmacoes.pop(cache_key, None)
-
-        # Invalida caches multi-id que incluam este evento + usuário (ex.: (tuple(ids), tid)).
-        keys_to_remove = []
-        for k in _cache_confirmacoes:
-            try:
-                if (
-                    isinstance(k, tuple)
-                    and len(k) == 2
-                    and isinstance(k[0], tuple)
-                    and k[1] == telegram_id
-                    and target_evento in k[0]
-                ):
-                    keys_to_remove.append(k)
-            except Exception:
-                continue
-        for k in keys_to_remove:
-            _cache_confirmacoes.pop(k, None)
+        # Invalida o cache (inclusive chaves multi-id que incluam este evento + usuário).
+        _apos_cancelar_confirmacao(target_evento, target_id)
         return True
 
     except Exception as e:
@@ -1132,15 +1425,16 @@ def buscar_confirmacao_em_eventos(
     ids_norm = list(dict.fromkeys(ids_norm))
 
     cache_key = (tuple(ids_norm), telegram_id)
-    if usar_cache and cache_key in _cache_confirmacoes:
-        cached, timestamp = _cache_confirmacoes[cache_key]
-        if time.time() - timestamp < _ttl_confirmacoes:
+    tags = _tags_confirmacao(ids_norm, telegram_id)
+    if usar_cache:
+        cached = _cache_confirmacoes.obter(cache_key)
+        if cached is not AUSENTE:
             return cached
 
     try:
         tid = _norm_intlike(telegram_id)
         if not tid:
-            _cache_confirmacoes[cache_key] = (None, time.time())
+            _cache_confirmacoes.definir(cache_key, None, tags)
             return None
 
         resp = (
@@ -1153,11 +1447,11 @@ def buscar_confirmacao_em_eventos(
         )
 
         if not resp.data:
-            _cache_confirmacoes[cache_key] = (None, time.time())
+            _cache_confirmacoes.definir(cache_key, None, tags)
             return None
 
         result = _row_to_sheets("confirmacoes", resp.data[0])
-        _cache_confirmacoes[cache_key] = (result, time.time())
+        _cache_confirmacoes.definir(cache_key, result, tags)
         return result
 
     except Exception as e:
@@ -1172,25 +1466,17 @@ def cancelar_todas_confirmacoes(id_evento: str) -> bool:
         if not target_evento:
             return False
 
-        supabase.table("confirmacoes").delete().eq("id_evento", target_evento).execute()
+        removidas = (
+            supabase.table("confirmacoes").delete().eq("id_evento", target_evento).execute().data or []
+        )
 
         # Invalida o cache de todas as entradas relacionadas ao evento
-        keys_to_remove = []
-        for k in _cache_confirmacoes:
-            try:
-                if k[0] == id_evento:
-                    keys_to_remove.append(k)
-                elif (
-                    isinstance(k, tuple)
-                    and len(k) == 2
-                    and isinstance(k[0], tuple)
-                    and target_evento in k[0]
-                ):
-                    keys_to_remove.append(k)
-            except Exception:
-                continue
-        for k in keys_to_remove:
-            _cache_confirmacoes.pop(k, None)
+        _cache_confirmacoes.invalidar_tag(f"evento:{target_evento}")
+        _atualizar_estado_conquistas(
+            "remover_evento", target_evento, [r.get("telegram_id") for r in removidas]
+        )
+        for r in removidas:
+            _invalidar_galeria("invalidar_galeria_membro", r.get("telegram_id"))
 
         return True
 
@@ -1253,10 +1539,9 @@ def listar_lojas(telegram_id: int, include_todas: bool = False) -> List[Dict[str
     - include_todas=True: todas as lojas (uso administrativo).
     """
     cache_key = -1 if include_todas else _safe_cache_int(telegram_id)
-    if cache_key in _cache_lojas:
-        cached, timestamp = _cache_lojas[cache_key]
-        if time.time() - timestamp < _ttl_lojas:
-            return cached
+    cached = _cache_lojas.obter(cache_key)
+    if cached is not AUSENTE:
+        return cached
 
     try:
         query = supabase.table("lojas").select("*")
@@ -1270,7 +1555,7 @@ def listar_lojas(telegram_id: int, include_todas: bool = False) -> List[Dict[str
 
         resp = query.execute()
         result = [_row_to_sheets("lojas", row) for row in (resp.data or [])]
-        _cache_lojas[cache_key] = (result, time.time())
+        _cache_lojas.definir(cache_key, result)
         return result
 
     except Exception as e:
@@ -1285,7 +1570,7 @@ def listar_lojas(telegram_id: int, include_todas: bool = False) -> List[Dict[str
                     return []
                 resp = supabase.table("lojas").select("*").eq("telegram_id", target).execute()
                 result = [_row_to_sheets("lojas", row) for row in (resp.data or [])]
-                _cache_lojas[cache_key] = (result, time.time())
+                _cache_lojas.definir(cache_key, result)
                 return result
             except Exception as e_fallback:
                 logger.error("Erro ao listar lojas no fallback legado: %s", e_fallback)
@@ -1315,6 +1600,21 @@ def buscar_loja_por_id(loja_id: Any) -> Optional[Dict[str, Any]]:
         return None
 
 
+def buscar_lojas_por_ids(loja_ids: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+    """Busca várias lojas pelo ID em uma consulta in_() por lote: {id: loja}."""
+    ids = list(dict.fromkeys(i for i in (_norm_text(v) for v in (loja_ids or [])) if i))
+    lojas: Dict[str, Dict[str, Any]] = {}
+    for i in range(0, len(ids), _TAMANHO_LOTE_IN):
+        try:
+            resp = supabase.table("lojas").select("*").in_("id", ids[i:i + _TAMANHO_LOTE_IN]).execute()
+        except Exception as e:
+            logger.error("Erro ao buscar lojas em lote: %s", e)
+            continue
+        for row in resp.data or []:
+            lojas[_norm_text(row.get("id"))] = _row_to_sheets("lojas", row)
+    return lojas
+
+
 def buscar_loja_por_nome_numero(nome_loja: Any, numero_loja: Any) -> Optional[Dict[str, Any]]:
     """Busca uma loja pelo par (nome, número)."""
     nome = _norm_text(nome_loja)
@@ -1338,17 +1638,26 @@ def buscar_loja_por_nome_numero(nome_loja: Any, numero_loja: Any) -> Optional[Di
         return None
 
 
-def obter_secretario_responsavel_evento(evento: Dict[str, Any]) -> Optional[int]:
+def obter_secretario_responsavel_evento(
+    evento: Dict[str, Any],
+    lojas_por_id: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Optional[int]:
     """
     Resolve o secretário responsável do evento com prioridade:
     1) Loja vinculada (ID da loja)
     2) Loja por (nome, número)
     3) Campo do próprio evento (legado)
+
+    `lojas_por_id` (de buscar_lojas_por_ids) evita uma consulta por evento
+    quando vários eventos são resolvidos de uma vez.
     """
     loja = None
     loja_id = _norm_text(evento.get("ID da loja") or evento.get("loja_id"))
     if loja_id:
-        loja = buscar_loja_por_id(loja_id)
+        if lojas_por_id is not None and loja_id in lojas_por_id:
+            loja = lojas_por_id[loja_id]
+        else:
+            loja = buscar_loja_por_id(loja_id)
 
     if not loja:
         loja = buscar_loja_por_nome_numero(
@@ -1418,7 +1727,7 @@ def cadastrar_loja(telegram_id: int, dados: Dict[str, Any]) -> bool:
         }
 
         _insert_com_fallback_colunas("lojas", row)
-        _cache_lojas.clear()
+        _cache_lojas.limpar()
         return True
 
     except Exception as e:
@@ -1448,7 +1757,7 @@ def atualizar_secretario_responsavel_loja(
 
     try:
         _update_com_fallback_colunas("lojas", "id", lid, payload)
-        _cache_lojas.clear()
+        _cache_lojas.limpar()
         return True
     except Exception as e:
         logger.error("Erro ao atualizar secretário responsável da loja %s: %s", lid, e)
@@ -1469,7 +1778,8 @@ def atualizar_template_visual_loja(loja_id: Any, dados: Dict[str, Any]) -> bool:
 
     try:
         _update_com_fallback_colunas("lojas", "id", lid, row)
-        _cache_lojas.clear()
+        _cache_lojas.limpar()
+        _invalidar_galeria("invalidar_galeria_loja", lid)
         return True
     except Exception as e:
         logger.error("Erro ao atualizar template visual da loja %s: %s", lid, e)
@@ -1502,7 +1812,8 @@ def excluir_loja(telegram_id: int, loja: dict) -> bool:
         row_id = _norm_text(loja.get("ID") or loja.get("id"))
         if row_id:
             supabase.table("lojas").delete().eq("id", row_id).execute()
-            _cache_lojas.clear()
+            _cache_lojas.limpar()
+            _invalidar_galeria("invalidar_galeria_loja", row_id)
             return True
 
         resp = supabase.table("lojas").select("*").execute()
@@ -1516,7 +1827,8 @@ def excluir_loja(telegram_id: int, loja: dict) -> bool:
             if _norm_text(row.get("rito")) != _norm_text(loja.get("Rito", "")):
                 continue
             supabase.table("lojas").delete().eq("id", row.get("id")).execute()
-            _cache_lojas.clear()
+            _cache_lojas.limpar()
+            _invalidar_galeria("invalidar_galeria_loja", row.get("id"))
             return True
 
         return False
@@ -1556,18 +1868,25 @@ def get_preferencia_lembretes(telegram_id: int) -> bool:
     - vazio/ausente mantém o comportamento legado: ativo por padrão.
     """
     try:
-        membro = buscar_membro(telegram_id)
-        if not membro:
-            return True
-        notificacao = str(membro.get("Notificações", "") or "").strip().upper()
-        if notificacao == "NÃO":
-            return False
-        return True
+        return _preferencia_lembretes_membro(buscar_membro(telegram_id))
     except Exception as e:
         logger.error("Erro ao buscar preferência de lembretes: %s", e)
         return True
 
 
+def _preferencia_lembretes_membro(membro: Optional[Dict[str, Any]]) -> bool:
+    if not membro:
+        return True
+    notificacao = str(membro.get("Notificações", "") or "").strip().upper()
+    return notificacao != "NÃO"
+
+
+def get_preferencias_lembretes(telegram_ids: Iterable[Any]) -> Dict[int, bool]:
+    """Preferência de lembretes de vários usuários com uma consulta em lote."""
+    membros = buscar_membros_por_ids(telegram_ids)
+    return {tid: _preferencia_lembretes_membro(membro) for tid, membro in membros.items()}
+
+
 def set_notificacao_status(telegram_id: int, ativo: bool) -> bool:
     """
     Atualiza o campo "Notificações" para "SIM" (True) ou "NÃO" (False).
@@ -2010,9 +2329,9 @@ def transferir_secretaria(id_antigo: Any, id_novo: Any, loja_id: Any) -> bool:
         atualizar_nivel_membro(int(float(old_tid)), "1")
         
         # Limpeza total de caches afetados
-        _cache_lojas.clear()
-        _cache_membros.pop(int(float(old_tid)), None)
-        _cache_membros.pop(int(float(new_tid)), None)
+        _cache_lojas.limpar()
+        _cache_membros.invalidar(_safe_cache_int(old_tid))
+        _cache_membros.invalidar(_safe_cache_int(new_tid))
         
         return True
     except Exception as e:
@@ -2030,10 +2349,107 @@ def marcar_como_inativo(telegram_id: int) -> bool:
     return atualizar_status_membro(telegram_id, 'Inativo')
 
 
+def registrar_status_grupo_em_lote(
+    observacoes: Dict[Any, Tuple[str, Optional[str]]],
+    observado_em: Optional[datetime] = None,
+) -> List[Any]:
+    """
+    Grava observações de participação no grupo: {telegram_id: (status_grupo,
+    novo_status_cadastro ou None)}. IDs com o mesmo par de valores saem num
+    único update in_(); todos recebem o mesmo status_observado_em.
+    Retorna as chaves de `observacoes` que não foram gravadas (IDs
+    inválidos são descartados; sem as colunas novas na base e sem mudança
+    de cadastro, não há o que gravar e o ID conta como resolvido).
+    """
+    global _membros_status_grupo_indisponivel
+
+    quando = (observado_em or datetime.now().astimezone()).isoformat(timespec="seconds")
+    grupos: Dict[Tuple[str, Optional[str]], List[Tuple[str, Any]]] = {}
+    for valor, par in (observacoes or {}).items():
+        tid = _norm_intlike(valor)
+        if tid:
+            grupos.setdefault(par, []).append((tid, valor))
+
+    falhas: List[Any] = []
+    for (status_grupo, status_cadastro), itens in grupos.items():
+        dados: Dict[str, Any] = {}
+        if not _membros_status_grupo_indisponivel:
+            dados = {"status_grupo": status_grupo, "status_observado_em": quando}
+        if status_cadastro:
+            dados["status"] = status_cadastro
+        if not dados:
+            continue
+        for i in range(0, len(itens), _TAMANHO_LOTE_IN):
+            bloco = itens[i:i + _TAMANHO_LOTE_IN]
+            lote = [tid for tid, _ in bloco]
+            try:
+                supabase.table("membros").update(dados).in_("telegram_id", lote).execute()
+            except Exception as e:
+                if "status_grupo" in dados and (
+                    _coluna_ausente(e, "status_grupo") or _coluna_ausente(e, "status_observado_em")
+                ):
+                    logger.warning(
+                        "Colunas status_grupo/status_observado_em ausentes em membros; "
+                        "gravando só o status do cadastro. Erro original: %s", e,
+                    )
+                    _membros_status_grupo_indisponivel = True
+                    dados = {k: v for k, v in dados.items() if k == "status"}
+                    if not dados:
+                        break
+                    try:
+                        supabase.table("membros").update(dados).in_("telegram_id", lote).execute()
+                    except Exception as e2:
+                        logger.error("Erro ao gravar status de membros em lote: %s", e2)
+                        falhas.extend(chave for _, chave in bloco)
+                        continue
+                else:
+                    logger.error("Erro ao gravar status de membros em lote: %s", e)
+                    falhas.extend(chave for _, chave in bloco)
+                    continue
+            if status_cadastro:
+                for tid in lote:
+                    _cache_membros.invalidar(_safe_cache_int(tid))
+    return falhas
+
+
+def status_grupo_disponivel() -> bool:
+    """False quando a base ainda não tem a coluna status_observado_em."""
+    return not _membros_status_grupo_indisponivel
+
+
 # ============================================
 # TELEMETRIA E PAINEL DO VIGILANTE (NÍVEL 3)
 # ============================================
 
+def _linha_log_busca(
+    uf: str = None,
+    cidade: str = None,
+    rito: str = None,
+    grau: int = None,
+    encontrou_resultados: bool = False,
+) -> Dict[str, Any]:
+    uf_val = (uf or "").strip().upper()[:2] or None
+    cid_val = (cidade or "").strip().lower() or None
+    if cid_val:
+        cid_val = cid_val.title()
+    rito_val = (rito or "").strip() or None
+
+    grau_val = None
+    if grau:
+        try:
+            grau_val = int(grau)
+        except Exception:
+            pass
+
+    return {
+        "uf": uf_val,
+        "cidade": cid_val,
+        "rito": rito_val,
+        "grau": grau_val,
+        "encontrou_resultados": bool(encontrou_resultados),
+    }
+
+
 def registrar_log_busca(
     uf: str = None, 
     cidade: str = None, 
@@ -2041,35 +2457,36 @@ def registrar_log_busca(
     grau: int = None, 
     encontrou_resultados: bool = False
 ) -> bool:
+    """
+    Enfileira o log da busca (src/fila_logs_busca); a gravação em
+    logs_busca é feita em lote, fora do caminho da resposta.
+    """
     try:
-        uf_val = (uf or "").strip().upper()[:2] or None
-        cid_val = (cidade or "").strip().lower() or None
-        if cid_val:
-            cid_val = cid_val.title()
-        rito_val = (rito or "").strip() or None
-        
-        grau_val = None
-        if grau:
-            try:
-                grau_val = int(grau)
-            except Exception:
-                pass
-
-        row = {
-            "uf": uf_val,
-            "cidade": cid_val,
-            "rito": rito_val,
-            "grau": grau_val,
-            "encontrou_resultados": bool(encontrou_resultados),
-        }
-        
-        supabase.table("logs_busca").insert(row).execute()
+        from src.fila_logs_busca import obter_fila_logs_busca
+        obter_fila_logs_busca().registrar(_linha_log_busca(uf, cidade, rito, grau, encontrou_resultados))
         return True
     except Exception as e:
         logger.error("Erro ao registrar log de busca: %s", e)
         return False
 
 
+def registrar_logs_busca_em_lote(linhas: List[Dict[str, Any]]) -> int:
+    """
+    Insere linhas de logs_busca, _TAMANHO_LOTE_INSERT por insert. Para no
+    primeiro erro; retorna quantas linhas (do início) foram gravadas.
+    """
+    gravados = 0
+    for i in range(0, len(linhas), _TAMANHO_LOTE_INSERT):
+        lote = linhas[i:i + _TAMANHO_LOTE_INSERT]
+        try:
+            supabase.table("logs_busca").insert(lote).execute()
+        except Exception as e:
+            logger.error("Erro ao gravar %d log(s) de busca: %s", len(lote), e)
+            break
+        gravados += len(lote)
+    return gravados
+
+
 def get_modo_comunicacao_ativo() -> bool:
     try:
         resp = supabase.table("configuracoes_globais").select("valor_bool").eq("chave", "modo_comunicacao_ativo").execute()
@@ -2089,81 +2506,76 @@ def set_modo_comunicacao_ativo(ativo: bool) -> bool:
         return False
 
 
+def _erro_tabela_logs_busca_demanda(exc: Exception) -> bool:
+    msg = str(exc or "")
+    return "logs_busca_demanda" in msg and ("PGRST205" in msg or "Could not find the table" in msg)
+
+
+def _contar_buscas_frustradas(dias: int) -> Counter:
+    """
+    Buscas sem resultado com cidade nos últimos `dias` dias, por (uf, cidade,
+    rito). Lê o agregado diário logs_busca_demanda; sem a tabela, conta os
+    logs brutos.
+    """
+    global _logs_busca_demanda_indisponivel
+
+    agora = datetime.utcnow()
+    contagem: Counter = Counter()
+    if not _logs_busca_demanda_indisponivel:
+        try:
+            desde = (agora - timedelta(days=dias)).date().isoformat()
+            for linha in _selecionar_todos(
+                "logs_busca_demanda", "uf, cidade, rito, total",
+                ordem=("dia", "uf", "cidade", "rito"), gte={"dia": desde},
+            ):
+                contagem[(linha.get("uf") or "", linha.get("cidade") or "", linha.get("rito") or "")] += int(
+                    linha.get("total") or 0
+                )
+            return contagem
+        except Exception as e:
+            if not _erro_tabela_logs_busca_demanda(e):
+                raise
+            _logs_busca_demanda_indisponivel = True
+            logger.warning(
+                "Tabela 'logs_busca_demanda' ausente — contando logs_busca brutos. "
+                "Execute docs/supabase_logs_busca_demanda.sql para o agregado. Erro original: %s", e,
+            )
+
+    logs = _selecionar_todos(
+        "logs_busca", "uf, cidade, rito",
+        ordem=("id",),
+        gte={"created_at": (agora - timedelta(days=dias)).isoformat()},
+        encontrou_resultados=False,
+    )
+    for log in logs:
+        uf = (log.get("uf") or "").strip().upper()
+        cid = (log.get("cidade") or "").strip()
+        rito = (log.get("rito") or "").strip()
+        if not cid:
+            continue
+        contagem[(uf, cid, rito)] += 1
+    return contagem
+
+
 def obter_gaps_sessoes(dias: int = 30) -> list:
+    """
+    Demanda sem oferta: (uf, cidade, rito) com buscas frustradas nos últimos
+    `dias` dias e nenhuma sessão de hoje em diante na cidade com rito
+    compatível (índice de eventos). Mais buscadas primeiro.
+    """
     try:
-        from datetime import datetime, timedelta
-        limite = datetime.utcnow() - timedelta(days=dias)
-        
-        resp = (
-            supabase.table("logs_busca")
-            .select("uf, cidade, rito, grau")
-            .eq("encontrou_resultados", False)
-            .gte("created_at", limite.isoformat())
-            .execute()
-        )
-        
-        logs = resp.data or []
-        if not logs:
+        contagem = _contar_buscas_frustradas(dias)
+        if not contagem:
             return []
-            
-        from collections import Counter
-        contagem = Counter()
-        for log in logs:
-            uf = (log.get("uf") or "").strip().upper()
-            cid = (log.get("cidade") or "").strip()
-            rito = (log.get("rito") or "").strip()
-            if not cid:
-                continue
-            contagem[(uf, cid, rito)] += 1
-            
-        from src.eventos import listar_eventos
-        eventos = listar_eventos() or []
-        hoje = datetime.utcnow().date()
-        
-        sessoes_futuras_locais = set()
-        for ev in eventos:
-            if str(ev.get("Status", "")).lower() in ("cancelado", "inativo"):
-                continue
-            
-            data_str = ev.get("Data do evento", "")
-            try:
-                dt = datetime.strptime(data_str, "%d/%m/%Y").date()
-                if dt < hoje:
-                    continue
-            except Exception:
-                pass
-                
-            ori = ev.get("Oriente", "")
-            if "/" in ori:
-                partes = ori.split("/")
-                cid_ev = partes[0].strip().title()
-                uf_ev = partes[1].strip().upper()
-            else:
-                cid_ev = ori.strip().title()
-                uf_ev = ""
-                
-            rito_ev = (ev.get("Rito") or "").strip()
-            sessoes_futuras_locais.add((uf_ev, cid_ev, rito_ev))
-            
-        gaps = []
-        for (uf, cid, rito), total in contagem.most_common():
-            encontrou_oferta = False
-            for (uf_fut, cid_fut, rito_fut) in sessoes_futuras_locais:
-                if cid.lower() == cid_fut.lower():
-                    if rito and rito_fut and rito.lower() != rito_fut.lower():
-                        continue
-                    encontrou_oferta = True
-                    break
-                    
-            if not encontrou_oferta:
-                gaps.append({
-                    "uf": uf,
-                    "cidade": cid,
-                    "rito": rito,
-                    "total_buscas": total
-                })
-                
-        return gaps
+
+        from src.indice_eventos import obter_indice_eventos
+        indice = obter_indice_eventos()
+
+        return [
+            {"uf": uf, "cidade": cid, "rito": rito, "total_buscas": total}
+            for (uf, cid, rito), total in contagem.most_common()
+            if not indice.tem_sessao_futura(cid, rito)
+        ]
     except Exception as e:
         logger.error("Erro ao obter gaps de sessões: %s", e)
         return []
@@ -2251,6 +2663,7 @@ def registrar_conquista(user_id: int, conquista_slug: str) -> bool:
         
         supabase.table("membro_conquistas").insert(payload).execute()
         logger.info("Nova conquista registrada: %s para user %s", conquista_slug, uid)
+        _invalidar_galeria("invalidar_galeria_membro", uid)
         return True
     except Exception as e:
         # Pode ser conflito de PK/Unique, tratamos como sucesso funcional (já gravado)
@@ -2287,6 +2700,7 @@ def registrar_marco_coletivo(marco_slug: str, categoria: str) -> bool:
             "categoria": categoria.strip()
         }
         supabase.table("marcos_coletivos").insert(payload).execute()
+        _invalidar_galeria("invalidar_galeria_marcos")
         return True
     except Exception as e:
         logger.debug("Marco coletivo já registrado ou erro: %s", e)
@@ -2487,6 +2901,57 @@ def is_first_of_potencia(potencia: str, potencia_comp: str) -> bool:
         return False
 
 
+_PAGINA_SELECT = 1000  # limite padrão de linhas por resposta do PostgREST
+
+
+def _selecionar_todos(
+    tabela: str,
+    colunas: str,
+    *,
+    ordem: Tuple[str, ...],
+    gte: Optional[Dict[str, Any]] = None,
+    **filtros_eq: Any,
+) -> List[Dict[str, Any]]:
+    """
+    SELECT paginado (range) até esgotar a tabela; filtros por igualdade (e
+    `gte` coluna >= valor). `ordem` são as colunas da chave primária: sem
+    ORDER BY o Postgres não garante a mesma ordem entre páginas, e linhas
+    podem vir repetidas ou faltar.
+    """
+    linhas: List[Dict[str, Any]] = []
+    inicio = 0
+    while True:
+        query = supabase.table(tabela).select(colunas)
+        for coluna, valor in filtros_eq.items():
+            query = query.eq(coluna, valor)
+        for coluna, valor in (gte or {}).items():
+            query = query.gte(coluna, valor)
+        for coluna in ordem:
+            query = query.order(coluna)
+        pagina = query.range(inicio, inicio + _PAGINA_SELECT - 1).execute().data or []
+        linhas.extend(pagina)
+        if len(pagina) < _PAGINA_SELECT:
+            return linhas
+        inicio += _PAGINA_SELECT
+
+
+def carregar_base_vigor() -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Linhas cruas para o vigor de todas as lojas de uma vez (fechamento
+    mensal em lote): eventos ativos, confirmações e membros só com as
+    colunas do cálculo; lojas completas (secretário responsável, inclusive o
+    campo legado). Levanta a exceção do Supabase.
+    """
+    return {
+        "eventos": _selecionar_todos(
+            "eventos", "id_evento, loja_id, created_at, data_evento", ordem=("id_evento",), status="Ativo"
+        ),
+        "confirmacoes": _selecionar_todos("confirmacoes", "id_evento, telegram_id, data_hora", ordem=("id",)),
+        "membros": _selecionar_todos("membros", "telegram_id, loja_id, status", ordem=("telegram_id",)),
+        "lojas": _selecionar_todos("lojas", "*", ordem=("id",)),
+    }
+
+
 def get_estatisticas_vigor(loja_id: str, usar_mes_anterior: bool = False) -> Dict[str, Any]:
     """
     Calcula os indices de vigor administrativo da Secretaria:
@@ -2495,7 +2960,6 @@ def get_estatisticas_vigor(loja_id: str, usar_mes_anterior: bool = False) -> Dic
     3. Engajamento: Porcentagem de membros ativos que confirmaram presencas no periodo.
     """
     from datetime import datetime, timedelta
-    import statistics
 
     agora = datetime.now()
     lid_str = str(loja_id).strip()
@@ -2512,114 +2976,14 @@ def get_estatisticas_vigor(loja_id: str, usar_mes_anterior: bool = False) -> Dic
         data_fim = agora + timedelta(days=60)
 
     try:
-        # 1. BUSCAR EVENTOS DA LOJA NO PERÍODO
-        resp_ev = supabase.table("eventos") \
-            .select("id_evento, created_at, data_evento") \
-            .eq("loja_id", lid_str) \
-            .eq("status", "Ativo") \
-            .execute()
+        # Motor colunar (vigor_estatisticas): sem consultas por loja; mês
+        # anterior memorizado como mês fechado.
+        from src import vigor_estatisticas
 
-        eventos_filtrados = []
-        diferencas_dias = []
-
-        for ev in (resp_ev.data or []):
-            data_ev = _parse_data_generica(ev.get("data_evento"))
-            if data_ev and data_inicio <= data_ev <= data_fim:
-                eventos_filtrados.append(ev)
-                
-                # Processamento da Média de Antecedência
-                dt_cre_str = str(ev.get("created_at") or "")[:10]
-                dt_cre = _parse_data_generica(dt_cre_str)
-                if not dt_cre:
-                    try:
-                        dt_cre = datetime.fromisoformat(ev.get("created_at").replace("Z", "+00:00")).replace(tzinfo=None)
-                    except:
-                        continue
-                if data_ev and dt_cre:
-                    diff = (data_ev - dt_cre).days
-                    diferencas_dias.append(max(0, diff))
-
-        vigor_agenda = round(statistics.mean(diferencas_dias), 1) if diferencas_dias else 0.0
-
-        # 2. ÍNDICE DE ACOLHIMENTO (VISITANTES)
-        ids_eventos = [ev["id_evento"] for ev in eventos_filtrados]
-        total_visitantes = 0
-        if ids_eventos:
-            resp_conf = supabase.table("confirmacoes") \
-                .select("telegram_id") \
-                .in_("id_evento", ids_eventos) \
-                .execute()
-            
-            tids = list(set([str(c.get("telegram_id")) for c in (resp_conf.data or []) if c.get("telegram_id")]))
-            
-            if tids:
-                resp_memb = supabase.table("membros") \
-                    .select("telegram_id, loja_id") \
-                    .in_("telegram_id", tids) \
-                    .execute()
-                
-                map_membros = {str(m["telegram_id"]): str(m["loja_id"]).strip() for m in (resp_memb.data or []) if m.get("telegram_id") and m.get("loja_id")}
-                
-                for c in (resp_conf.data or []):
-                    tid = str(c.get("telegram_id"))
-                    m_loja_id = map_membros.get(tid)
-                    # Se o loja_id cadastrado do confirmante difere do loja_id da sessão, é visitante!
-                    if m_loja_id and m_loja_id != lid_str:
-                        total_visitantes += 1
-
-        # 3. TAXA DE ENGAJAMENTO (QUÓRUM)
-        resp_ativos = supabase.table("membros") \
-            .select("telegram_id") \
-            .eq("loja_id", lid_str) \
-            .eq("status", "Ativo") \
-            .execute()
-        
-        ativos_count = len(resp_ativos.data or [])
-        ativos_ids = [str(m.get("telegram_id")) for m in (resp_ativos.data or []) if m.get("telegram_id")]
-        
-        presentes_count = 0
-        if ativos_ids:
-            resp_tot_conf = supabase.table("confirmacoes") \
-                .select("telegram_id, data_hora") \
-                .in_("telegram_id", ativos_ids) \
-                .execute()
-            
-            confirmantes_unicos = set()
-            for c in (resp_tot_conf.data or []):
-                dt_conf = _parse_data_generica(c.get("data_hora"))
-                if not dt_conf:
-                    try:
-                        dt_conf = datetime.fromisoformat(c.get("data_hora").replace("Z", "+00:00")).replace(tzinfo=None)
-                    except:
-                        continue
-                if dt_conf and data_inicio <= dt_conf <= data_fim:
-                    confirmantes_unicos.add(str(c.get("telegram_id")))
-            
-            presentes_count = len(confirmantes_unicos)
-
-        taxa_engajamento = round((presentes_count / ativos_count * 100), 1) if ativos_count > 0 else 0.0
-
-        # 4. CAPTURA METADADOS DA LOJA
-        loja_nome = "Oficina"
-        loja_num = ""
-        resp_loja = supabase.table("lojas").select("nome_loja, numero").eq("id", lid_str).limit(1).execute()
-        if resp_loja.data:
-            loja_nome = resp_loja.data[0].get("nome_loja") or "Oficina"
-            loja_num = resp_loja.data[0].get("numero") or ""
-
-        return {
-            "loja_id": lid_str,
-            "nome_loja": loja_nome,
-            "numero_loja": loja_num,
-            "periodo_inicio": data_inicio.strftime("%d/%m/%Y"),
-            "periodo_fim": data_fim.strftime("%d/%m/%Y"),
-            "vigor_agenda": vigor_agenda,
-            "acolhimento": total_visitantes,
-            "ativos_quadro": ativos_count,
-            "presentes_quadro": presentes_count,
-            "engajamento": taxa_engajamento,
-            "eventos_no_periodo": len(eventos_filtrados)
-        }
+        if usar_mes_anterior:
+            ano, mes = vigor_estatisticas.mes_anterior(agora)
+            return vigor_estatisticas.vigor_mes(lid_str, ano, mes, agora)
+        return vigor_estatisticas.vigor_janela(lid_str, data_inicio, data_fim)
 
     except Exception as e:
         logger.error("Erro ao calcular estatisticas de vigor para loja %s: %s", lid_str, e)
@@ -2638,130 +3002,49 @@ def get_estatisticas_vigor(loja_id: str, usar_mes_anterior: bool = False) -> Dic
         }
 
 
-def get_galeria_completa(telegram_id: int, loja_id: str) -> Dict[str, Any]:
-    """
-    Consolida toda a gamificação individual e coletiva (Sala de Troféus) em um único payload.
-    1. Coleta as conquistas individuais obtidas pelo usuario.
-    2. Realiza a agregação dinâmica de vigor nos últimos 6 meses para extração de selos OE e FR.
-    3. Retorna os marcos globais de expansão do ecossistema.
-    """
-    from datetime import datetime, timedelta
-    import collections
-    import statistics
+_CATALOGO_GALERIA = [
+    {"slug": "ic", "titulo": "Iniciado na Colher", "descricao": "Primeira presença confirmada no ecossistema."},
+    {"slug": "mp", "titulo": "Mestre dos Portais", "descricao": "Confirmou presença em 10 sessões."},
+    {"slug": "e9", "titulo": "Estrela de 9 Pontas", "descricao": "Confirmou em 9 potências ou ritos."},
+    {"slug": "ce", "titulo": "Colunista de Ébano", "descricao": "100% assiduidade nos últimos 3 meses."},
+    {"slug": "og", "titulo": "Obreiro Global", "descricao": "Presença em 3 Estados diferentes."},
+    {"slug": "pj", "titulo": "Peregrino da Justa", "descricao": "Visitante em 5 lojas diferentes."},
+    {"slug": "rc", "titulo": "Reconstrutor do Templo", "descricao": "Indicou ou cadastrou nova Loja."},
+    {"slug": "na", "titulo": "Navegador do Asfalto", "descricao": "Mais de 500km em deslocamentos."},
+    {"slug": "rs", "titulo": "Redentor do Silêncio", "descricao": "Um ano ininterrupto com status Ativo."},
+    {"slug": "io", "titulo": "Inspirador de Obreiros", "descricao": "Desafio mensal de novos membros."},
+    {"slug": "pm", "titulo": "Protetor da Malha", "descricao": "Contribuições notáveis ao suporte."}
+]
 
+
+def galeria_conquistas(telegram_id: Any) -> List[Dict[str, Any]]:
+    """Seção 1 da Sala de Troféus: catálogo com a marca de desbloqueio do obreiro."""
     uid = _norm_intlike(telegram_id)
-    lid_str = str(loja_id or "").strip()
-    
-    # 1. CONQUISTAS INDIVIDUAIS
-    catalogo_badges = [
-        {"slug": "ic", "titulo": "Iniciado na Colher", "descricao": "Primeira presença confirmada no ecossistema."},
-        {"slug": "mp", "titulo": "Mestre dos Portais", "descricao": "Confirmou presença em 10 sessões."},
-        {"slug": "e9", "titulo": "Estrela de 9 Pontas", "descricao": "Confirmou em 9 potências ou ritos."},
-        {"slug": "ce", "titulo": "Colunista de Ébano", "descricao": "100% assiduidade nos últimos 3 meses."},
-        {"slug": "og", "titulo": "Obreiro Global", "descricao": "Presença em 3 Estados diferentes."},
-        {"slug": "pj", "titulo": "Peregrino da Justa", "descricao": "Visitante em 5 lojas diferentes."},
-        {"slug": "rc", "titulo": "Reconstrutor do Templo", "descricao": "Indicou ou cadastrou nova Loja."},
-        {"slug": "na", "titulo": "Navegador do Asfalto", "descricao": "Mais de 500km em deslocamentos."},
-        {"slug": "rs", "titulo": "Redentor do Silêncio", "descricao": "Um ano ininterrupto com status Ativo."},
-        {"slug": "io", "titulo": "Inspirador de Obreiros", "descricao": "Desafio mensal de novos membros."},
-        {"slug": "pm", "titulo": "Protetor da Malha", "descricao": "Contribuições notáveis ao suporte."}
-    ]
-    
     obtidas = set(listar_conquistas_obtidas(uid) if uid else [])
-    for badge in catalogo_badges:
-        badge["desbloqueada"] = badge["slug"] in obtidas
+    return [dict(badge, desbloqueada=badge["slug"] in obtidas) for badge in _CATALOGO_GALERIA]
+
 
-    # 2. MARCOS DE VIGOR DA OFICINA (ÚLTIMOS 6 MESES)
+def galeria_oficina(loja_id: Any) -> Dict[str, Any]:
+    """
+    Seções da loja: nome e selos OE/FR dos últimos 6 meses, lidos do motor de
+    vigor (vigor_estatisticas).
+    """
+    from datetime import datetime
+
+    lid_str = str(loja_id or "").strip()
     marcos_oficina = []
     if lid_str:
         try:
-            agora = datetime.now()
-            seis_meses_atras = agora - timedelta(days=180)
-            
-            resp_ev = supabase.table("eventos") \
-                .select("id_evento, created_at, data_evento") \
-                .eq("loja_id", lid_str) \
-                .eq("status", "Ativo") \
-                .execute()
-            
-            eventos_janela = []
-            ids_janela = []
-            for ev in (resp_ev.data or []):
-                dt_ev = _parse_data_generica(ev.get("data_evento"))
-                if dt_ev and seis_meses_atras <= dt_ev <= agora:
-                    eventos_janela.append(ev)
-                    ids_janela.append(ev["id_evento"])
-            
-            confirmacoes = []
-            if ids_janela:
-                resp_conf = supabase.table("confirmacoes") \
-                    .select("id_evento, telegram_id") \
-                    .in_("id_evento", ids_janela) \
-                    .execute()
-                confirmacoes = resp_conf.data or []
-                
-            tids = list(set([str(c.get("telegram_id")) for c in confirmacoes if c.get("telegram_id")]))
-            map_membros = {}
-            if tids:
-                resp_memb = supabase.table("membros") \
-                    .select("telegram_id, loja_id") \
-                    .in_("telegram_id", tids) \
-                    .execute()
-                map_membros = {str(m["telegram_id"]): str(m["loja_id"]).strip() for m in (resp_memb.data or []) if m.get("telegram_id")}
-                
-            # Agrupamento
-            dados_meses = collections.defaultdict(lambda: {"diferencas": [], "visitantes": 0})
-            map_ev_mes = {}
-            
-            for ev in eventos_janela:
-                dt_ev = _parse_data_generica(ev.get("data_evento"))
-                if not dt_ev:
-                    continue
-                mes_str = dt_ev.strftime("%Y-%m")
-                map_ev_mes[ev["id_evento"]] = mes_str
-                
-                dt_cre_str = str(ev.get("created_at") or "")[:10]
-                dt_cre = _parse_data_generica(dt_cre_str)
-                if not dt_cre:
-                    try:
-                        dt_cre = datetime.fromisoformat(ev.get("created_at").replace("Z", "+00:00")).replace(tzinfo=None)
-                    except:
-                        pass
-                if dt_cre:
-                    diff = (dt_ev - dt_cre).days
-                    dados_meses[mes_str]["diferencas"].append(max(0, diff))
-                    
-            for conf in confirmacoes:
-                ev_id = conf.get("id_evento")
-                mes_str = map_ev_mes.get(ev_id)
-                if not mes_str:
-                    continue
-                
-                tid = str(conf.get("telegram_id"))
-                m_loja_id = map_membros.get(tid)
-                if m_loja_id and m_loja_id != lid_str:
-                    dados_meses[mes_str]["visitantes"] += 1
-                    
-            # Ordenação dos últimos 6 meses
-            meses_lista = []
-            curr = agora
-            for _ in range(6):
-                meses_lista.append(curr.strftime("%Y-%m"))
-                primeiro = curr.replace(day=1)
-                anterior = primeiro - timedelta(days=1)
-                curr = anterior
-            meses_lista.reverse()
-            
-            for mes in meses_lista:
-                d = dados_meses[mes]
-                difs = d["diferencas"]
-                total_visitantes = d["visitantes"]
-                
-                vigor_agenda = statistics.mean(difs) if difs else 0.0
-                
+            from src.vigor_estatisticas import historico_mensal
+
+            # Meses fechados vêm memorizados; só o mês corrente é recalculado.
+            for mes, agregado in historico_mensal(lid_str, meses=6):
+                vigor_agenda = agregado.media_antecedencia
+                total_visitantes = agregado.visitantes
+
                 excelencia = vigor_agenda >= 15.0
                 farol = total_visitantes > 10
-                
+
                 if excelencia or farol:
                     try:
                         dt_mes = datetime.strptime(mes, "%Y-%m")
@@ -2778,7 +3061,20 @@ def get_galeria_completa(telegram_id: int, loja_id: str) -> Dict[str, Any]:
         except Exception as e_vigor:
             logger.error("Falha ao calcular vigor retroativo para galeria: %s", e_vigor)
 
-    # 3. MARCOS DE EXPANSÃO COLETIVA
+    nome_loja = "Oficina"
+    if lid_str:
+        try:
+            resp_l = supabase.table("lojas").select("nome_loja").eq("id", lid_str).limit(1).execute()
+            if resp_l.data:
+                nome_loja = resp_l.data[0].get("nome_loja") or "Oficina"
+        except:
+            pass
+
+    return {"loja_id": lid_str, "nome_loja": nome_loja, "marcos_oficina": marcos_oficina}
+
+
+def galeria_expansao() -> List[Dict[str, Any]]:
+    """Seção 3: marcos globais de expansão do ecossistema."""
     marcos_expansao = []
     try:
         resp_col = supabase.table("marcos_coletivos").select("marco_slug, categoria").execute()
@@ -2803,21 +3099,4 @@ def get_galeria_completa(telegram_id: int, loja_id: str) -> Dict[str, Any]:
             })
     except Exception as e_col:
         logger.error("Falha ao obter marcos coletivos para galeria: %s", e_col)
-
-    # 4. DADOS DE NOME DA LOJA
-    nome_loja = "Oficina"
-    if lid_str:
-        try:
-            resp_l = supabase.table("lojas").select("nome_loja").eq("id", lid_str).limit(1).execute()
-            if resp_l.data:
-                nome_loja = resp_l.data[0].get("nome_loja") or "Oficina"
-        except:
-            pass
-
-    return {
-        "loja_id": lid_str,
-        "nome_loja": nome_loja,
-        "conquistas_individuais": catalogo_badges,
-        "marcos_oficina": marcos_oficina,
-        "marcos_expansao": marcos_expansao
-    }
+    return marcos_expansao
@@ -0,0 +1,286 @@
+# src/vigor_estatisticas.py
+# ============================================
+# BODE ANDARILHO - MOTOR DE ESTATÍSTICAS DE VIGOR
+# ============================================
+#
+# get_estatisticas_vigor e a seção de seis meses de get_galeria_completa
+# repetiam, por loja e por chamada, o mesmo trabalho: buscar todos os
+# eventos ativos da loja, filtrar datas em Python com _parse_data_generica,
+# puxar confirmações e membros com in_() e tirar médias em laços.
+#
+# Este motor monta uma BaseVigor colunar uma vez por janela de validade
+# (VIGOR_BASE_TTL_S), a partir das mesmas linhas do fechamento em lote
+# (carregar_base_vigor):
+#
+# - eventos: instante, loja, antecedência em dias e nº de visitantes já
+#   resolvidos, com índice por loja ordenado por data (bisect na janela);
+# - confirmações: instantes ordenados por membro, para o engajamento;
+# - membros: loja de cada um e conjunto de ativos por loja.
+#
+# Sobre essas colunas, vigor_agenda, acolhimento e engajamento de uma loja
+# (ou de todas) saem por fatias e operações de conjunto, sem consultas.
+#
+# Resultados mensais são memorizados por (loja, mês). Mês fechado é
+# imutável: calculado uma vez, nunca é recalculado (nem quando a base é
+# recarregada). O mês corrente segue a base e expira com ela.
+#
+# ============================================
+
+from __future__ import annotations
+
+import bisect
+import logging
+import os
+import threading
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.cache import namespace as _cache_namespace
+from src.sheets_supabase import _parse_data_generica, carregar_base_vigor
+
+logger = logging.getLogger(__name__)
+
+_TTL_BASE_S = float(os.getenv("VIGOR_BASE_TTL_S", "300"))
+
+_cache_base = _cache_namespace("vigor_base", _TTL_BASE_S, 1)
+
+
+def _instante(valor: Any) -> Optional[datetime]:
+    data = _parse_data_generica(valor)
+    if data is not None or not valor:
+        return data
+    try:
+        return datetime.fromisoformat(str(valor).replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+@dataclass(frozen=True)
+class AgregadoVigor:
+    """Somatórios de uma loja numa janela; a formatação fica em `como_dict`."""
+
+    eventos: int = 0
+    soma_antecedencia: int = 0
+    com_antecedencia: int = 0
+    visitantes: int = 0
+    ativos: int = 0
+    presentes: int = 0
+
+    @property
+    def media_antecedencia(self) -> float:
+        return self.soma_antecedencia / self.com_antecedencia if self.com_antecedencia else 0.0
+
+    @property
+    def engajamento(self) -> float:
+        return self.presentes / self.ativos * 100 if self.ativos else 0.0
+
+
+class BaseVigor:
+    """Linhas de eventos/confirmações/membros em colunas, com índices por loja."""
+
+    def __init__(self, base: Dict[str, List[Dict[str, Any]]], carregada_em: Optional[datetime] = None):
+        self.carregada_em = carregada_em or datetime.now()
+
+        loja_do_membro: Dict[str, str] = {}
+        ativos: Dict[str, Set[str]] = {}
+        for m in base.get("membros", []):
+            tid = str(m.get("telegram_id") or "")
+            lid = str(m.get("loja_id") or "").strip()
+            if not tid or not lid:
+                continue
+            loja_do_membro[tid] = lid
+            if m.get("status") == "Ativo":
+                ativos.setdefault(lid, set()).add(tid)
+        self.ativos_por_loja: Dict[str, frozenset] = {lid: frozenset(t) for lid, t in ativos.items()}
+
+        self.lojas: Dict[str, Dict[str, Any]] = {}
+        for loja in base.get("lojas", []):
+            lid = str(loja.get("id") or "").strip()
+            if lid:
+                self.lojas[lid] = loja
+
+        # Colunas de eventos (só os que têm loja e data válida).
+        self.ev_instante = array("d")
+        self.ev_antecedencia = array("l")  # -1 = created_at ilegível
+        self.ev_visitantes = array("l")
+        ev_loja: List[str] = []
+        idx_evento: Dict[str, int] = {}
+        for ev in base.get("eventos", []):
+            lid = str(ev.get("loja_id") or "").strip()
+            data_ev = _parse_data_generica(ev.get("data_evento"))
+            if not lid or not data_ev:
+                continue
+            criado = _instante(str(ev.get("created_at") or "")[:10]) or _instante(ev.get("created_at"))
+            idx_evento[str(ev.get("id_evento"))] = len(ev_loja)
+            ev_loja.append(lid)
+            self.ev_instante.append(data_ev.timestamp())
+            self.ev_antecedencia.append(max(0, (data_ev - criado).days) if criado else -1)
+            self.ev_visitantes.append(0)
+
+        # Confirmações: visitantes por evento e instantes por membro.
+        instantes_por_membro: Dict[str, List[float]] = {}
+        for c in base.get("confirmacoes", []):
+            tid = str(c.get("telegram_id") or "")
+            if not tid:
+                continue
+            i = idx_evento.get(str(c.get("id_evento")))
+            lid_membro = loja_do_membro.get(tid)
+            if i is not None and lid_membro and lid_membro != ev_loja[i]:
+                self.ev_visitantes[i] += 1
+            quando = _instante(c.get("data_hora"))
+            if quando is not None:
+                instantes_por_membro.setdefault(tid, []).append(quando.timestamp())
+        self.instantes_por_membro: Dict[str, List[float]] = {t: sorted(v) for t, v in instantes_por_membro.items()}
+
+        # Índice por loja: posições dos eventos ordenadas por instante.
+        por_loja: Dict[str, List[int]] = {}
+        for i, lid in enumerate(ev_loja):
+            por_loja.setdefault(lid, []).append(i)
+        self.eventos_por_loja: Dict[str, Tuple[List[float], List[int]]] = {}
+        for lid, idxs in por_loja.items():
+            idxs.sort(key=self.ev_instante.__getitem__)
+            self.eventos_por_loja[lid] = ([self.ev_instante[i] for i in idxs], idxs)
+
+    def agregar(self, loja_id: str, inicio: datetime, fim: datetime) -> AgregadoVigor:
+        """Somatórios da loja para eventos/confirmações em [inicio, fim]."""
+        ini, fim_ts = inicio.timestamp(), fim.timestamp()
+        instantes, idxs = self.eventos_por_loja.get(loja_id, ([], []))
+        janela = idxs[bisect.bisect_left(instantes, ini):bisect.bisect_right(instantes, fim_ts)]
+        antecedencias = [a for a in (self.ev_antecedencia[i] for i in janela) if a >= 0]
+
+        ativos = self.ativos_por_loja.get(loja_id, frozenset())
+        presentes = 0
+        for tid in ativos:
+            marcas = self.instantes_por_membro.get(tid)
+            if marcas:
+                pos = bisect.bisect_left(marcas, ini)
+                if pos < len(marcas) and marcas[pos] <= fim_ts:
+                    presentes += 1
+
+        return AgregadoVigor(
+            eventos=len(janela),
+            soma_antecedencia=sum(antecedencias),
+            com_antecedencia=len(antecedencias),
+            visitantes=sum(self.ev_visitantes[i] for i in janela),
+            ativos=len(ativos),
+            presentes=presentes,
+        )
+
+    def como_dict(self, loja_id: str, agregado: AgregadoVigor, inicio: datetime, fim: datetime) -> Dict[str, Any]:
+        """Mesmo formato de get_estatisticas_vigor."""
+        loja = self.lojas.get(loja_id, {})
+        return {
+            "loja_id": loja_id,
+            "nome_loja": loja.get("nome_loja") or "Oficina",
+            "numero_loja": loja.get("numero") or "",
+            "periodo_inicio": inicio.strftime("%d/%m/%Y"),
+            "periodo_fim": fim.strftime("%d/%m/%Y"),
+            "vigor_agenda": round(agregado.media_antecedencia, 1),
+            "acolhimento": agregado.visitantes,
+            "ativos_quadro": agregado.ativos,
+            "presentes_quadro": agregado.presentes,
+            "engajamento": round(agregado.engajamento, 1),
+            "eventos_no_periodo": agregado.eventos,
+        }
+
+
+# ---------- base em cache ----------
+
+def obter_base(recarregar: bool = False) -> BaseVigor:
+    """BaseVigor do cache (VIGOR_BASE_TTL_S); `recarregar` força nova leitura."""
+    if recarregar:
+        _cache_base.limpar()
+    return _cache_base.obter_ou_carregar("base", lambda: BaseVigor(carregar_base_vigor()))
+
+
+# ---------- meses ----------
+
+def limites_mes(ano: int, mes: int) -> Tuple[datetime, datetime]:
+    """Primeiro e último instante do mês (mesma janela do fechamento mensal)."""
+    inicio = datetime(ano, mes, 1)
+    proximo = datetime(ano + (mes == 12), mes % 12 + 1, 1)
+    return inicio, proximo - timedelta(seconds=1)
+
+
+def mes_anterior(agora: Optional[datetime] = None) -> Tuple[int, int]:
+    agora = agora or datetime.now()
+    return (agora.year - 1, 12) if agora.month == 1 else (agora.year, agora.month - 1)
+
+
+# (loja_id, "AAAA-MM") -> AgregadoVigor de meses encerrados: nunca expira.
+_meses_fechados: Dict[Tuple[str, str], AgregadoVigor] = {}
+_meses_lock = threading.Lock()
+
+
+def _agregado_mes(base: BaseVigor, loja_id: str, ano: int, mes: int, agora: datetime) -> AgregadoVigor:
+    chave = (loja_id, f"{ano:04d}-{mes:02d}")
+    with _meses_lock:
+        pronto = _meses_fechados.get(chave)
+    if pronto is not None:
+        return pronto
+
+    inicio, fim = limites_mes(ano, mes)
+    if fim < agora:
+        agregado = base.agregar(loja_id, inicio, fim)
+        if base.carregada_em > fim:
+            # Só congela o mês com uma base lida depois do seu encerramento.
+            with _meses_lock:
+                return _meses_fechados.setdefault(chave, agregado)
+        return agregado
+    # Mês corrente: até agora, refeito a cada base nova.
+    return base.agregar(loja_id, inicio, min(fim, agora))
+
+
+def vigor_mes(loja_id: Any, ano: int, mes: int, agora: Optional[datetime] = None) -> Dict[str, Any]:
+    """Vigor de um mês inteiro da loja."""
+    lid = str(loja_id).strip()
+    base = obter_base()
+    inicio, fim = limites_mes(ano, mes)
+    return base.como_dict(lid, _agregado_mes(base, lid, ano, mes, agora or datetime.now()), inicio, fim)
+
+
+def vigor_mes_todas(
+    ano: int,
+    mes: int,
+    agora: Optional[datetime] = None,
+    base: Optional[BaseVigor] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Vigor do mês para todas as lojas cadastradas (fechamento em lote)."""
+    base = base or obter_base()
+    agora = agora or datetime.now()
+    inicio, fim = limites_mes(ano, mes)
+    return {
+        lid: base.como_dict(lid, _agregado_mes(base, lid, ano, mes, agora), inicio, fim)
+        for lid in base.lojas
+    }
+
+
+def vigor_janela(loja_id: Any, inicio: datetime, fim: datetime) -> Dict[str, Any]:
+    """Vigor numa janela livre (painel /vigor: últimos 30 dias + próximos 60)."""
+    lid = str(loja_id).strip()
+    base = obter_base()
+    return base.como_dict(lid, base.agregar(lid, inicio, fim), inicio, fim)
+
+
+def historico_mensal(loja_id: Any, meses: int = 6, agora: Optional[datetime] = None) -> List[Tuple[str, AgregadoVigor]]:
+    """[("AAAA-MM", agregado)] dos últimos `meses`, do mais antigo ao corrente."""
+    lid = str(loja_id).strip()
+    agora = agora or datetime.now()
+    base = obter_base()
+    ano, mes = agora.year, agora.month
+    saida: List[Tuple[str, AgregadoVigor]] = []
+    for _ in range(max(0, meses)):
+        saida.append((f"{ano:04d}-{mes:02d}", _agregado_mes(base, lid, ano, mes, agora)))
+        ano, mes = mes_anterior(datetime(ano, mes, 1))
+    saida.reverse()
+    return saida
+
+
+def limpar_meses_fechados(lojas: Iterable[str] = ()) -> None:
+    """Descarta meses fechados memorizados (todas as lojas, ou só as indicadas)."""
+    alvo = {str(l).strip() for l in lojas}
+    with _meses_lock:
+        for chave in [c for c in _meses_fechados if not alvo or c[0] in alvo]:
+            del _meses_fechados[chave]
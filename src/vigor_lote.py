@@ -0,0 +1,167 @@
+# src/vigor_lote.py
+# ============================================
+# BODE ANDARILHO - FECHAMENTO MENSAL DE VIGOR EM LOTE
+# ============================================
+#
+# O job mensal tratava uma loja por vez: sleep de 0,5 s, 4-5 consultas de
+# get_estatisticas_vigor, render, envio. O tempo total crescia linearmente
+# com o número de lojas, preso ora na rede, ora na CPU.
+#
+# Aqui o fechamento vira um pipeline em quatro etapas:
+#
+# 1. coleta: uma passada pelas tabelas (carregar_base_vigor — eventos,
+#    confirmações, membros e lojas, paginados), independente do número
+#    de lojas, montada como BaseVigor (src.vigor_estatisticas);
+# 2. cálculo: vigor do mês de todas as lojas sobre a base, em memória (o
+#    mês fechado fica memorizado para o painel e a galeria);
+# 3. render: cards de vigor distribuídos no serviço de render (processos),
+#    com no máximo VIGOR_LOTE_RENDERS em voo;
+# 4. envio: cada card pronto entra direto no despachante (limite global e
+#    por chat, RetryAfter, retentativas), sem esperar os demais.
+#
+# Render e envio se sobrepõem. O RelatorioVigorLote traz contagens e o
+# tempo de cada etapa e segue para o log (e para o ADMIN_TELEGRAM_ID).
+#
+# ============================================
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from telegram import Bot
+
+from src.despachante import MensagemSaida, RelatorioEnvio, obter_despachante
+from src.servico_render import render
+from src.sheets_supabase import _norm_intlike, contar_consultas
+from src.vigor_estatisticas import limites_mes, mes_anterior, obter_base, vigor_mes_todas
+
+logger = logging.getLogger(__name__)
+
+_RENDERS_EM_VOO = int(os.getenv("VIGOR_LOTE_RENDERS", "4"))
+
+
+@dataclass
+class RelatorioVigorLote:
+    """Resultado de um fechamento em lote."""
+
+    periodo: str
+    lojas: int = 0
+    sem_secretario: int = 0
+    renderizados: int = 0
+    falhas_render: int = 0
+    etapas_s: Dict[str, float] = field(default_factory=dict)
+    consultas: Dict[str, int] = field(default_factory=dict)
+    envio: Optional[RelatorioEnvio] = None
+    duracao_s: float = 0.0
+
+    def texto(self) -> str:
+        linhas = [
+            "📜 *Fechamento mensal de vigor*",
+            f"Período: {self.periodo}",
+            f"Lojas: {self.lojas} ({self.sem_secretario} sem secretário)",
+            f"Cards renderizados: {self.renderizados} ({self.falhas_render} falhas)",
+        ]
+        if self.envio is not None:
+            linhas.append(
+                f"Enviados: {self.envio.enviados}/{self.envio.total} "
+                f"({self.envio.bloqueados} bloqueados, {self.envio.falhas} falhas)"
+            )
+        etapas = ", ".join(f"{nome} {seg:.1f}s" for nome, seg in self.etapas_s.items())
+        linhas.append(f"Etapas: {etapas}")
+        if self.consultas:
+            linhas.append(f"Consultas: {sum(self.consultas.values())} ({self.consultas})")
+        linhas.append(f"Duração: {self.duracao_s:.1f}s")
+        return "\n".join(linhas)
+
+
+# ---------- pipeline ----------
+
+def _legenda(stats: Dict[str, Any]) -> str:
+    nome = stats.get("nome_loja") or "Oficina"
+    num = stats.get("numero_loja") or ""
+    return (
+        f"📜 *RELATORIO OFICIAL DE ENCERRAMENTO*\n"
+        f"🏛️ *{nome} nº {num}*\n\n"
+        f"Saudacoes Ir.·. Secretario! Consolidamos o Livro de Arquitetura e apresentamos o **Card de Vigor Oficial** referente ao fechamento do mes anterior.\n\n"
+        f"📊 *Metas Alcancadas:*\n"
+        f"• Media de Agenda: `{stats.get('vigor_agenda', 0.0)}` dias de antecedencia\n"
+        f"• Acolhimento: `{stats.get('acolhimento', 0)}` visitantes acolhidos\n"
+        f"• Quorum do Quadro: `{stats.get('engajamento', 0.0)}%` de engajamento\n\n"
+        f"📐 _Este card representa o vigor de sua gestao. Parabens pelo zelo administrativo!_ 🤝🖋️🐐"
+    )
+
+
+def _secretario(loja: Dict[str, Any]) -> Optional[int]:
+    sid = _norm_intlike(loja.get("secretario_responsavel_id") or loja.get("telegram_id"))
+    return int(sid) if sid else None
+
+
+async def executar_fechamento_vigor(bot: Bot, agora: Optional[datetime] = None) -> RelatorioVigorLote:
+    """Calcula, renderiza e envia o vigor do mês anterior de todas as lojas."""
+    inicio = time.monotonic()
+    agora = agora or datetime.now()
+    ano, mes = mes_anterior(agora)
+    data_inicio, data_fim = limites_mes(ano, mes)
+    relatorio = RelatorioVigorLote(periodo=f"{data_inicio:%d/%m/%Y} a {data_fim:%d/%m/%Y}")
+
+    with contar_consultas() as consultas:
+        base = await asyncio.to_thread(obter_base, True)
+    relatorio.consultas = dict(consultas)
+    relatorio.etapas_s["coleta"] = time.monotonic() - inicio
+
+    marco = time.monotonic()
+    stats_por_loja = await asyncio.to_thread(vigor_mes_todas, ano, mes, agora, base)
+    relatorio.etapas_s["calculo"] = time.monotonic() - marco
+
+    destinos: List[Tuple[int, Dict[str, Any]]] = []
+    for lid, loja in base.lojas.items():
+        stats = stats_por_loja[lid]
+        relatorio.lojas += 1
+        sec_id = _secretario(loja)
+        if sec_id is None:
+            relatorio.sem_secretario += 1
+            continue
+        destinos.append((sec_id, stats))
+
+    marco = time.monotonic()
+    tempo_render = 0.0
+    vagas = asyncio.Semaphore(max(1, _RENDERS_EM_VOO))
+
+    async def _renderizar(sec_id: int, stats: Dict[str, Any]) -> Optional[MensagemSaida]:
+        nonlocal tempo_render
+        async with vagas:
+            t = time.monotonic()
+            try:
+                card = await render("vigor", {"dados_vigor": stats}, espera=None)
+            except Exception as e:
+                relatorio.falhas_render += 1
+                logger.warning("Erro ao renderizar vigor da loja %s: %s", stats.get("loja_id"), e)
+                return None
+            finally:
+                tempo_render += time.monotonic() - t
+        relatorio.renderizados += 1
+        return MensagemSaida(
+            chat_id=sec_id,
+            texto=_legenda(stats),
+            foto=card,
+            rotulo=f"vigor|{stats.get('loja_id')}",
+        )
+
+    async def _cards_prontos() -> AsyncIterator[MensagemSaida]:
+        for pronto in asyncio.as_completed([_renderizar(sec, st) for sec, st in destinos]):
+            msg = await pronto
+            if msg is not None:
+                yield msg
+
+    relatorio.envio = await obter_despachante().enviar_fluxo(bot, _cards_prontos(), nome="fechamento_vigor")
+    relatorio.etapas_s["render+envio"] = time.monotonic() - marco
+    relatorio.etapas_s["render_soma"] = tempo_render  # soma dos renders (sobrepostos ao envio)
+    relatorio.duracao_s = time.monotonic() - inicio
+    logger.info("Fechamento de vigor concluído — %s", relatorio.texto().replace("\n", " | "))
+    return relatorio